@@ -2,20 +2,19 @@
 __init__.py — ComfyUI-AssetManager 확장 노드 진입점
 ComfyUI 서버에 API 라우트를 등록하고, 정적 파일 서빙 및
 프론트엔드 앱 엔드포인트(/assetmanager/app)를 설정합니다.
-각 API 모듈(models, system, gallery, library, generate, tools)의
-라우트 등록 함수를 호출하여 백엔드 기능을 초기화합니다.
+각 API 모듈(models, system, gallery, library, generate, tools, thumbnails)은
+api/startup.py가 서버 시작 후 불러와 라우트 등록 함수를 호출합니다.
 """
 
 import os
+import time
+
+_load_started = time.perf_counter()
+
 from aiohttp import web
 from server import PromptServer
 
-from .api.models import setup_models_api
-from .api.system import setup_system_api
-from .api.gallery import setup_gallery_api
-from .api.library import setup_library_api
-from .api.generate import setup_generate_api
-from .api.tools import setup_tools_api
+from .api.startup import lazy_api
 
 routes = PromptServer.instance.routes
 
@@ -31,12 +30,9 @@ async def serve_app(request):
     """프론트엔드 SPA의 index.html을 반환하는 메인 엔드포인트"""
     return web.FileResponse(os.path.join(WEB_DIR, "index.html"))
 
-setup_models_api(routes)
-setup_system_api(routes, WEB_DIR)
-setup_gallery_api(routes)
-setup_library_api(routes, WEB_DIR)
-setup_generate_api(routes, DATA_DIR)
-setup_tools_api(routes)
+# API 모듈은 ComfyUI 시작 시간에 영향을 주지 않도록 서버가 뜬 뒤(또는 첫 요청에서) 불러온다.
+# 여기서는 /assetmanager/api/ 전체 경로 라우트와 요청 계측 미들웨어(/assetmanager/api/metrics)만 등록한다.
+lazy_api.register(routes, WEB_DIR, DATA_DIR, load_started=_load_started)
 
 # ComfyUI 커스텀 노드 정의 (이 확장은 노드를 등록하지 않음)
 NODE_CLASS_MAPPINGS = {}
@@ -0,0 +1,374 @@
+"""
+api/archive.py — 오래된 출력 이미지 무손실 재인코딩(보관)
+거의 다시 열지 않는 큰 PNG를 무손실 WebP(또는 최대 압축 PNG)로 다시 써서 디스크 사용량과 /view 전송량을 줄입니다.
+  - 정책  : output 기준 폴더마다 보관할 최소 경과 일수와 형식을 지정한다 (하위 폴더는 가장 가까운 상위 정책을 따른다)
+  - 작업  : 갤러리 인덱스에서 정책에 맞는 PNG를 골라 CPU 풀에서 하나씩 재인코딩한다
+  - 검증  : 다시 디코딩한 픽셀이 원본과 같고, ComfyUI prompt/workflow 등 텍스트 메타데이터를
+            메타데이터 API와 같은 리더(image_metadata.py)로 읽었을 때 그대로일 때만 원본을 바꾼다
+  - 조절  : 동시 재인코딩 수(ASSETMANAGER_ARCHIVE_WORKERS, 기본 1)를 제한하고, ComfyUI 큐에 생성 작업이 있으면 기다린다
+처리 결과(파일별 상태, 줄어든 바이트)는 갤러리 인덱스 DB의 archive_result 테이블에 기록하여 같은 파일을 다시 시도하지 않으며,
+진행 상황은 웹소켓 이벤트(assetmanager.archive)로 보냅니다. 정책이 있으면 ASSETMANAGER_ARCHIVE_INTERVAL_HOURS(기본 6)마다 자동 실행합니다.
+"""
+
+import os
+import json
+import time
+import shutil
+import asyncio
+
+from .executors import run_io, run_cpu, comfy_busy, BUSY_POLL_SECONDS
+from .gallery_index import AttachedIndex, AttachedIndexHandle
+from .gallery_watcher import gallery_watcher
+from .image_metadata import read_image_text
+from .image_ops import ARCHIVE_FORMATS, transcode_lossless
+from .file_ops import normalize_subfolder, free_path
+from .jobs import JobQueue, env_float
+
+ARCHIVE_EVENT = "assetmanager.archive"
+# 재인코딩 중인 임시 파일 접미사 (이미지 확장자가 아니므로 갤러리 인덱스가 건너뛴다)
+TEMP_SUFFIX = ".am-archive.tmp"
+# 진행 알림/갤러리 갱신 단위
+CHUNK_SIZE = 16
+
+ARCHIVE_INTERVAL_SECONDS = env_float("ASSETMANAGER_ARCHIVE_INTERVAL_HOURS", 6.0) * 3600
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS archive_policy (
+    folder TEXT PRIMARY KEY,
+    min_age_days REAL NOT NULL,
+    format TEXT NOT NULL,
+    enabled INTEGER NOT NULL DEFAULT 1
+);
+CREATE TABLE IF NOT EXISTS archive_result (
+    subfolder TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    reason TEXT,
+    source TEXT,
+    src_bytes INTEGER,
+    dst_bytes INTEGER,
+    archived REAL NOT NULL,
+    PRIMARY KEY (subfolder, filename)
+);
+"""
+
+
+def _same_text(original, encoded):
+    """원본 텍스트 메타데이터가 재인코딩한 파일에서 모두 같은 값으로 읽히는지 (JSON은 파싱한 값으로 비교)."""
+    for key, value in original.items():
+        other = encoded.get(key)
+        if other is None:
+            return False
+        if other == value:
+            continue
+        try:
+            if json.loads(other) != json.loads(value):
+                return False
+        except (TypeError, ValueError):
+            return False
+    return True
+
+
+def _make_policy(folder, min_age_days, format_type=None, enabled=True):
+    """요청 값으로 정책 dict를 만든다. 잘못된 값은 ValueError."""
+    try:
+        min_age_days = float(min_age_days)
+    except (TypeError, ValueError):
+        raise ValueError("min_age_days는 숫자여야 합니다.")
+    if min_age_days < 0:
+        raise ValueError("min_age_days는 0 이상이어야 합니다.")
+    format_type = format_type or "webp"
+    if format_type not in ARCHIVE_FORMATS:
+        raise ValueError(f"지원하지 않는 형식입니다: {format_type}")
+    return {"folder": normalize_subfolder(folder), "min_age_days": min_age_days, "format": format_type,
+            "enabled": bool(enabled)}
+
+
+class ArchiveIndex(AttachedIndex):
+    """
+    보관 정책과 파일별 처리 결과. 갤러리 인덱스 DB 파일에 별도 연결로 접근하며
+    images 테이블과 비교하여 아직 처리하지 않았거나 바뀐 PNG만 후보로 고른다.
+    모든 메서드는 스레드 안전하며 블로킹 I/O를 수행한다.
+    """
+
+    SCHEMA = _SCHEMA
+
+    # ── 정책 ──
+
+    def get_policies(self):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT folder, min_age_days, format, enabled FROM archive_policy ORDER BY folder"
+            ).fetchall()
+        return [{"folder": folder, "min_age_days": age, "format": fmt, "enabled": bool(enabled)}
+                for folder, age, fmt, enabled in rows]
+
+    def set_policy(self, folder, min_age_days, format_type, enabled=True):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO archive_policy (folder, min_age_days, format, enabled) VALUES (?, ?, ?, ?)",
+                (folder, min_age_days, format_type, 1 if enabled else 0)
+            )
+
+    def delete_policy(self, folder):
+        with self._lock, self._conn:
+            return self._conn.execute("DELETE FROM archive_policy WHERE folder = ?", (folder,)).rowcount > 0
+
+    # ── 후보 / 결과 ──
+
+    def plan(self, policies, now=None):
+        """
+        정책에 맞는 보관 후보를 고른다. 파일마다 가장 가까운 상위 폴더의 정책을 적용하며,
+        꺼 둔(enabled=False) 정책은 그 아래를 제외한다.
+        반환값: [(subfolder, filename, size, format), ...]
+        """
+        now = time.time() if now is None else now
+        by_folder = {p["folder"]: p for p in policies}
+        if not any(p["enabled"] for p in policies):
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT i.subfolder, i.filename, i.mtime_ns, i.size FROM images i LEFT JOIN archive_result r "
+                "ON r.subfolder = i.subfolder AND r.filename = i.filename "
+                "WHERE lower(i.filename) LIKE '%.png' "
+                "AND (r.mtime_ns IS NULL OR r.mtime_ns != i.mtime_ns OR r.size != i.size) "
+                "ORDER BY i.subfolder, i.filename"
+            ).fetchall()
+
+        resolved = {}
+
+        def policy_for(subfolder):
+            if subfolder not in resolved:
+                folder = subfolder
+                while folder not in by_folder and folder:
+                    folder = folder.rpartition("/")[0]
+                resolved[subfolder] = by_folder.get(folder)
+            return resolved[subfolder]
+
+        plan = []
+        for subfolder, filename, mtime_ns, size in rows:
+            policy = policy_for(subfolder)
+            if policy is None or not policy["enabled"]:
+                continue
+            if mtime_ns / 1e9 > now - policy["min_age_days"] * 86400:
+                continue
+            plan.append((subfolder, filename, size, policy["format"]))
+        return plan
+
+    def record(self, subfolder, filename, status, reason=None, source=None, src_bytes=None, dst_bytes=None):
+        """처리 결과를 기록한다 (현재 파일의 mtime/크기와 함께 저장하여 바뀌면 다시 후보가 된다)."""
+        path = os.path.join(self.root_dir, subfolder, filename)
+        try:
+            st = os.stat(path)
+        except OSError:
+            return
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO archive_result (subfolder, filename, mtime_ns, size, status, reason, source, "
+                "src_bytes, dst_bytes, archived) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (subfolder, filename, st.st_mtime_ns, st.st_size, status, reason, source, src_bytes, dst_bytes,
+                 time.time())
+            )
+
+    def totals(self):
+        """지금까지 보관한 파일 수와 줄어든 바이트, 건너뛴 이유별 파일 수"""
+        with self._lock:
+            count, src_bytes, dst_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(src_bytes), 0), COALESCE(SUM(dst_bytes), 0) "
+                "FROM archive_result WHERE status = 'done'"
+            ).fetchone()
+            skipped = self._conn.execute(
+                "SELECT reason, COUNT(*) FROM archive_result WHERE status = 'skipped' GROUP BY reason"
+            ).fetchall()
+        return {"archived": count, "src_bytes": src_bytes, "dst_bytes": dst_bytes,
+                "saved_bytes": src_bytes - dst_bytes, "skipped": dict(skipped)}
+
+
+def _commit(src, temp_path, format_type):
+    """
+    재인코딩한 임시 파일의 메타데이터를 원본과 비교하고, 크기가 줄었으면 원본을 바꾼다.
+    수정 시각은 원본 것을 옮겨 갤러리 정렬과 보관 경과 일수가 그대로 유지된다.
+    반환값: (상태, 이유, 최종 파일 이름)
+    """
+    original = read_image_text(src)["text"]
+    encoded = read_image_text(temp_path)["text"]
+    if not _same_text(original, encoded):
+        return "skipped", "metadata_mismatch", None
+    if os.path.getsize(temp_path) >= os.path.getsize(src):
+        return "skipped", "not_smaller", None
+    shutil.copystat(src, temp_path)
+    if format_type == "png":
+        os.replace(temp_path, src)
+        return "done", None, os.path.basename(src)
+    dest = free_path(os.path.splitext(src)[0] + "." + format_type)
+    os.rename(temp_path, dest)
+    os.remove(src)
+    return "done", None, os.path.basename(dest)
+
+
+class OutputArchiver(JobQueue):
+    """
+    보관 작업 대기열. 작업은 하나씩 실행되며 파일마다 재인코딩(CPU 풀) → 검증/교체(I/O 풀) 순서로 처리한다.
+    파일 작업(file_ops.py)과는 별도 대기열이라 오래 걸리는 보관 작업이 휴지통/이동을 막지 않는다.
+    공개 메서드는 이벤트 루프에서 호출한다.
+    """
+
+    EVENT = ARCHIVE_EVENT
+    LABEL = "보관 작업"
+
+    def __init__(self):
+        super().__init__()
+        self._policy_task = None
+        self._index = AttachedIndexHandle(ArchiveIndex)
+
+    def get_index(self):
+        """현재 갤러리 인덱스 DB에 대한 ArchiveIndex를 반환 (output 경로가 바뀌면 새로 연다)."""
+        return self._index.get()
+
+    def start(self):
+        super().start()
+        if ARCHIVE_INTERVAL_SECONDS and (self._policy_task is None or self._policy_task.done()):
+            self._policy_task = asyncio.ensure_future(self._policy_loop())
+
+    # ── 공개 API ──
+
+    async def submit(self, folder=None, min_age_days=None, format_type=None, dry_run=False, auto=False):
+        """
+        보관 작업을 등록하고 요약을 반환한다. 잘못된 요청은 ValueError.
+          - min_age_days를 주면 folder(기본 루트) 아래에 그 조건만 적용하는 1회성 작업
+          - 생략하면 저장된 폴더별 정책 전체를 적용
+          - dry_run이면 후보 수와 크기만 센다
+        """
+        if min_age_days is not None:
+            policies = [_make_policy(folder, min_age_days, format_type)]
+        else:
+            policies = await run_io("gallery", lambda: self.get_index().get_policies())
+            if not any(p["enabled"] for p in policies):
+                raise ValueError("보관 정책이 없습니다. folder와 min_age_days를 지정하거나 정책을 먼저 추가하세요.")
+
+        job = self.new_job(
+            "archive", auto=auto, dry_run=bool(dry_run), policies=policies, paused=False,
+            total=0, done=0, skipped=0, failed=0, candidate_bytes=0, src_bytes=0, dst_bytes=0, saved_bytes=0,
+            reasons={},
+        )
+        return await self.enqueue(job)
+
+    async def set_policy(self, folder, min_age_days, format_type=None, enabled=True):
+        """폴더 보관 정책을 추가/변경한다. 잘못된 값은 ValueError."""
+        if min_age_days is None:
+            raise ValueError("min_age_days가 필요합니다.")
+        policy = _make_policy(folder, min_age_days, format_type, enabled)
+        await run_io("gallery", lambda: self.get_index().set_policy(
+            policy["folder"], policy["min_age_days"], policy["format"], policy["enabled"]))
+        return policy
+
+    async def delete_policy(self, folder):
+        """폴더 보관 정책을 지운다. 없던 정책이면 False."""
+        folder = normalize_subfolder(folder)
+        return await run_io("gallery", lambda: self.get_index().delete_policy(folder))
+
+    async def summary(self):
+        def load():
+            index = self.get_index()
+            return index.get_policies(), index.totals()
+
+        policies, totals = await run_io("gallery", load)
+        return {
+            "policies": policies,
+            "totals": totals,
+            "jobs": self.list_jobs(),
+            "formats": list(ARCHIVE_FORMATS),
+            "interval_hours": ARCHIVE_INTERVAL_SECONDS / 3600,
+        }
+
+    # ── 실행 ──
+
+    def _finish(self, job):
+        job["paused"] = False
+        if job["done"]:
+            print(f"[ComfyUI-AssetManager] 보관 작업 {job['id']}: {job['done']}개 파일, "
+                  f"{job['saved_bytes'] / 1024 ** 2:.1f}MB 절약 (건너뜀 {job['skipped']}, 실패 {job['failed']})")
+
+    async def _execute(self, job):
+        await run_io("gallery", gallery_watcher.refresh_and_broadcast)
+        index = await run_io("gallery", self.get_index)
+        plan = await run_io("gallery", index.plan, job["policies"])
+        job["total"] = len(plan)
+        job["candidate_bytes"] = sum(size for _, _, size, _ in plan)
+        self._emit(job)
+        if job["dry_run"]:
+            return
+
+        for start in range(0, len(plan), CHUNK_SIZE):
+            await self._wait_idle(job)
+            if job["_cancel"]:
+                break
+            results = await asyncio.gather(*(self._archive_one(index, entry) for entry in plan[start:start + CHUNK_SIZE]))
+            for status, reason, src_bytes, dst_bytes in results:
+                job[status] += 1
+                if status == "done":
+                    job["src_bytes"] += src_bytes
+                    job["dst_bytes"] += dst_bytes
+                    job["saved_bytes"] = job["src_bytes"] - job["dst_bytes"]
+                elif reason:
+                    job["reasons"][reason] = job["reasons"].get(reason, 0) + 1
+                    if status == "failed":
+                        self.add_errors(job, [reason])
+            # 바뀐 폴더만 다시 읽어 갤러리 변경분(원본 삭제, 새 파일)을 바로 보낸다
+            await run_io("gallery", gallery_watcher.refresh_and_broadcast)
+            self._emit(job)
+
+    async def _wait_idle(self, job):
+        """ComfyUI가 이미지를 생성하는 동안은 재인코딩을 쉬어 GPU 작업의 CPU/디스크를 빼앗지 않는다."""
+        while not job["_cancel"] and comfy_busy():
+            if not job["paused"]:
+                job["paused"] = True
+                self._emit(job)
+            await asyncio.sleep(BUSY_POLL_SECONDS)
+        if job["paused"]:
+            job["paused"] = False
+            self._emit(job)
+
+    async def _archive_one(self, index, entry):
+        """파일 하나를 재인코딩하고 검증을 통과하면 교체한다. 반환값: (상태, 이유, 원본 바이트, 결과 바이트)"""
+        subfolder, filename, _, format_type = entry
+        src = os.path.join(index.root_dir, subfolder, filename)
+        temp_path = src + TEMP_SUFFIX
+        try:
+            result = await run_cpu("archive", transcode_lossless, src, temp_path, format_type)
+            if result["status"] != "done":
+                await run_io("files", index.record, subfolder, filename, "skipped", result["reason"])
+                return "skipped", result["reason"], None, None
+            status, reason, final_name = await run_io("files", _commit, src, temp_path, format_type)
+            if status != "done":
+                await run_io("files", index.record, subfolder, filename, status, reason)
+                return status, reason, None, None
+            await run_io("files", index.record, subfolder, final_name, "done", None, filename,
+                         result["src_bytes"], result["dst_bytes"])
+            return "done", None, result["src_bytes"], result["dst_bytes"]
+        except Exception as e:
+            return "failed", f"{os.path.join(subfolder, filename)}: {e}", None, None
+        finally:
+            if os.path.exists(temp_path):
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
+
+    # ── 자동 실행 ──
+
+    async def _policy_loop(self):
+        while True:
+            await asyncio.sleep(ARCHIVE_INTERVAL_SECONDS)
+            if self.has_active():
+                continue
+            try:
+                await self.submit(auto=True)
+            except ValueError:
+                # 켜 둔 정책이 없음
+                continue
+
+
+output_archiver = OutputArchiver()
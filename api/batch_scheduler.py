@@ -0,0 +1,488 @@
+"""
+api/batch_scheduler.py — 서버측 배치 생성 스케줄러
+브라우저가 작업마다 완료를 기다렸다가 다음 /prompt를 보내는 대신, 백엔드가 작업 목록을 받아
+프롬프트를 직접 조립하고 ComfyUI 큐에 항상 일정 개수(depth)의 작업이 대기하도록 채워 넣습니다.
+  - 제출/상태 확인은 ComfyUI 자체 HTTP API(/prompt, /queue, /history)를 루프백으로 호출
+  - 배치 상태는 web/data/batch_jobs.json에 저장되어 서버 재시작 후 이어서 진행
+  - 변경 사항은 웹소켓 이벤트(assetmanager.batch)로 전송하고, 조회 API로도 확인 가능
+배치 종류(kind)는 두 가지입니다.
+  - generate : 생성 대기열 작업 (build_prompt)
+  - censor   : 단독 검열 도구의 이미지 목록 (build_censor_prompt). output 폴더의 파일은 업로드 없이
+               LoadImage의 "[output]" 주석 경로로 바로 읽고, 결과는 output/censor/<배치 ID>/에 모은다
+"""
+
+import os
+import json
+import time
+import uuid
+import asyncio
+import aiohttp
+from server import PromptServer
+
+from .executors import run_io
+from .prompt_builder import build_prompt, build_censor_prompt, compile_workflow, random_seed, render_path_template
+
+BATCH_EVENT = "assetmanager.batch"
+DEFAULT_DEPTH = 2
+MAX_DEPTH = 16
+POLL_SECONDS = 1.0
+RETRY_SECONDS = 5.0
+# 완료/취소된 배치는 최근 것만 보관한다
+KEEP_FINISHED_BATCHES = 20
+MAX_BATCH_ITEMS = 10000
+# 검열 배치 결과가 모이는 output 하위 폴더
+CENSOR_OUTPUT_SUBFOLDER = "censor"
+
+ACTIVE_STATUSES = ("running", "paused")
+ITEM_STATUSES = ("pending", "queued", "done", "failed", "cancelled")
+
+
+def _server_base_url():
+    """ComfyUI 서버 자신의 주소 (0.0.0.0 등 와일드카드 주소는 루프백으로 바꾼다)."""
+    server = PromptServer.instance
+    address = getattr(server, "address", None) or "127.0.0.1"
+    if address in ("0.0.0.0", ""):
+        address = "127.0.0.1"
+    elif address == "::":
+        address = "::1"
+    if ":" in address:
+        address = f"[{address}]"
+    scheme = "http"
+    try:
+        from comfy.cli_args import args
+        if getattr(args, "tls_keyfile", None) and getattr(args, "tls_certfile", None):
+            scheme = "https"
+    except ImportError:
+        pass
+    return f"{scheme}://{address}:{getattr(server, 'port', 8188)}"
+
+
+def _summary(batch):
+    counts = dict.fromkeys(ITEM_STATUSES, 0)
+    for item in batch["items"]:
+        counts[item["status"]] += 1
+    return {
+        "id": batch["id"],
+        "kind": batch.get("kind", "generate"),
+        "name": batch.get("name", ""),
+        "status": batch["status"],
+        "created": batch["created"],
+        "finished": batch.get("finished"),
+        "depth": batch["depth"],
+        "total": len(batch["items"]),
+        "counts": counts,
+    }
+
+
+def _public_item(item):
+    return {k: item.get(k) for k in ("index", "source", "prefix", "seed", "status", "prompt_id", "error", "images")}
+
+
+class BatchScheduler:
+    """
+    배치 목록을 메모리에 두고 asyncio 태스크 하나로 제출/완료 확인을 반복한다.
+    공개 메서드는 이벤트 루프에서 호출한다 (파일 기록만 I/O 풀에서 수행).
+    """
+
+    def __init__(self, state_file):
+        self.state_file = state_file
+        self._batches = []
+        self._loaded = False
+        self._task = None
+        self._wakeup = None
+        self._dirty = False
+        self._save_lock = None
+        self._session = None
+        self._base_url = None
+        # 이번 서버 실행 중에 제출한 prompt_id. ComfyUI 큐/히스토리는 메모리에만 있으므로
+        # 여기 없는 queued 항목은 재시작 전에 제출한 것이다
+        self._submitted = set()
+
+    # ── 상태 파일 ──
+
+    async def load(self):
+        if self._loaded:
+            return
+
+        def read_state():
+            if not os.path.exists(self.state_file):
+                return []
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                return json.load(f).get("batches", [])
+
+        try:
+            self._batches = await run_io("batch", read_state)
+        except (OSError, ValueError) as e:
+            print(f"[ComfyUI-AssetManager] 배치 상태 파일 읽기 실패: {e}")
+            self._batches = []
+        for batch in self._batches:
+            # 항목마다 그래프를 조립하므로 저장된 워크플로우 사본에 제목 색인을 붙여 둔다
+            batch["workflow"] = compile_workflow(batch["workflow"])
+        self._loaded = True
+
+    async def _save(self):
+        if not self._dirty:
+            return
+        self._dirty = False
+        data = json.dumps({"batches": self._batches}, ensure_ascii=False).encode("utf-8")
+
+        def write_state():
+            tmp_path = self.state_file + ".tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, self.state_file)
+
+        async with self._save_lock:
+            try:
+                await run_io("batch", write_state)
+            except OSError as e:
+                self._dirty = True
+                print(f"[ComfyUI-AssetManager] 배치 상태 저장 실패: {e}")
+
+    # ── 공개 API ──
+
+    async def start(self):
+        """스케줄러 태스크를 시작한다 (이미 실행 중이면 무시). 저장된 배치가 있으면 이어서 진행한다."""
+        await self.load()
+        if self._task and not self._task.done():
+            return
+        self._wakeup = asyncio.Event()
+        self._save_lock = asyncio.Lock()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def create_batch(self, payload, workflow):
+        """
+        작업 목록을 이미지 단위 항목으로 펼쳐 새 배치를 만든다.
+        payload: {jobs: [{labels, fullPrompt, repeatCount}], path_template, base_positive,
+                  base_negative, settings, depth, client_id, name}
+        """
+        jobs = payload.get("jobs")
+        if not isinstance(jobs, list) or not jobs:
+            raise ValueError("jobs가 비어 있습니다.")
+        settings = payload.get("settings") or {}
+        template = payload.get("path_template") or ""
+        base_pos = payload.get("base_positive") or ""
+        base_neg = payload.get("base_negative") or ""
+        fixed_seed = settings.get("seed")
+
+        items = []
+        for job in jobs:
+            full_prompt = [p for p in (job.get("fullPrompt") or []) if p]
+            positive = base_pos + (", " + ", ".join(full_prompt) if full_prompt else "")
+            prefix = render_path_template(template, job.get("labels"))
+            try:
+                repeat = max(1, int(job.get("repeatCount") or 1))
+            except (TypeError, ValueError):
+                raise ValueError("repeatCount가 올바르지 않습니다.")
+            for _ in range(repeat):
+                items.append({
+                    "index": len(items),
+                    "positive": positive,
+                    "negative": base_neg,
+                    "prefix": prefix,
+                    # 재시작 후 다시 제출해도 같은 이미지가 나오도록 시드를 미리 정해 둔다
+                    "seed": fixed_seed if fixed_seed is not None else random_seed(),
+                    "status": "pending",
+                })
+                if len(items) > MAX_BATCH_ITEMS:
+                    raise ValueError(f"한 배치는 최대 {MAX_BATCH_ITEMS}장까지 만들 수 있습니다.")
+
+        batch = self._new_batch(payload, workflow, items, kind="generate", settings=settings)
+        return await self._add_batch(batch)
+
+    async def create_censor_batch(self, payload, workflow, sources):
+        """
+        이미지마다 검열 그래프 하나를 만드는 배치를 만든다.
+        payload: {censor: {labels, mode, intensity}, depth, client_id, name}
+        sources: [{"image": LoadImage 입력값, "source": 표시용 원본 경로, "upload": 업로드 임시 파일 경로?}]
+        """
+        censor = payload.get("censor") or {}
+        labels = [label for label in (censor.get("labels") or []) if label]
+        if not labels:
+            raise ValueError("검열 타겟 부위(labels)가 비어 있습니다.")
+        if not sources:
+            raise ValueError("검열할 이미지가 없습니다.")
+        if len(sources) > MAX_BATCH_ITEMS:
+            raise ValueError(f"한 배치는 최대 {MAX_BATCH_ITEMS}장까지 만들 수 있습니다.")
+
+        batch = self._new_batch(payload, workflow, [], kind="censor", censor={
+            "labels": labels,
+            "mode": censor.get("mode") or "mosaic",
+            "intensity": censor.get("intensity"),
+        })
+        for index, source in enumerate(sources):
+            stem = os.path.splitext(os.path.basename(source["source"].replace("\\", "/")))[0]
+            item = {
+                "index": index,
+                "image": source["image"],
+                "source": source["source"],
+                # 결과는 배치별 폴더에 원본 파일명을 유지하여 모은다 (ZIP 내려받기 단위)
+                "prefix": f"{CENSOR_OUTPUT_SUBFOLDER}/{batch['id']}/{stem}",
+                "status": "pending",
+            }
+            if source.get("upload"):
+                item["upload"] = source["upload"]
+            batch["items"].append(item)
+        return await self._add_batch(batch)
+
+    def result_files(self, batch_id):
+        """완료된 항목의 결과 이미지 목록 [(subfolder, filename)]. 배치가 없으면 None."""
+        batch = self._find(batch_id)
+        if batch is None:
+            return None
+        return [(image.get("subfolder") or "", image["filename"])
+                for item in batch["items"] if item["status"] == "done"
+                for image in item.get("images") or [] if image.get("filename")]
+
+    def _new_batch(self, payload, workflow, items, kind, **extra):
+        try:
+            depth = max(1, min(int(payload.get("depth") or DEFAULT_DEPTH), MAX_DEPTH))
+        except (TypeError, ValueError):
+            depth = DEFAULT_DEPTH
+        batch = {
+            "id": uuid.uuid4().hex[:12],
+            "kind": kind,
+            "name": payload.get("name") or "",
+            "status": "running",
+            "created": time.time(),
+            "finished": None,
+            "depth": depth,
+            "client_id": payload.get("client_id") or "",
+            "workflow": workflow,
+            "items": items,
+        }
+        batch.update(extra)
+        return batch
+
+    async def _add_batch(self, batch):
+        self._batches.append(batch)
+        self._prune_finished()
+        self._dirty = True
+        await self._save()
+        self._emit(batch)
+        self._wakeup.set()
+        return _summary(batch)
+
+    def list_batches(self):
+        return [_summary(b) for b in self._batches]
+
+    def get_batch(self, batch_id, include_items=True):
+        batch = self._find(batch_id)
+        if batch is None:
+            return None
+        result = _summary(batch)
+        if include_items:
+            result["items"] = [_public_item(item) for item in batch["items"]]
+        return result
+
+    async def set_status(self, batch_id, action):
+        """pause / resume / cancel. 취소 시 아직 시작하지 않은 ComfyUI 큐 항목도 지운다."""
+        batch = self._find(batch_id)
+        if batch is None:
+            return None
+        if batch["status"] not in ACTIVE_STATUSES:
+            raise ValueError(f"이미 종료된 배치입니다: {batch['status']}")
+
+        if action == "pause":
+            batch["status"] = "paused"
+        elif action == "resume":
+            batch["status"] = "running"
+        elif action == "cancel":
+            queued = [item["prompt_id"] for item in batch["items"] if item["status"] == "queued"]
+            if queued and self._session is not None:
+                try:
+                    await self._request("POST", "/queue", {"delete": queued})
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    print(f"[ComfyUI-AssetManager] ComfyUI 큐 항목 삭제 실패: {e}")
+            for item in batch["items"]:
+                if item["status"] == "pending":
+                    item["status"] = "cancelled"
+            batch["status"] = "cancelled"
+            self._finish_if_complete(batch)
+        else:
+            raise ValueError(f"알 수 없는 동작: {action}")
+
+        self._dirty = True
+        await self._save()
+        self._emit(batch)
+        self._wakeup.set()
+        return _summary(batch)
+
+    async def delete_batch(self, batch_id):
+        batch = self._find(batch_id)
+        if batch is None:
+            return False
+        if batch["status"] in ACTIVE_STATUSES:
+            raise ValueError("진행 중인 배치는 먼저 취소해야 합니다.")
+        self._batches.remove(batch)
+        self._discard_uploads(batch)
+        self._dirty = True
+        await self._save()
+        return True
+
+    # ── 내부 ──
+
+    def _find(self, batch_id):
+        return next((b for b in self._batches if b["id"] == batch_id), None)
+
+    def _prune_finished(self):
+        finished = [b for b in self._batches if b["status"] not in ACTIVE_STATUSES]
+        for batch in finished[:max(0, len(finished) - KEEP_FINISHED_BATCHES)]:
+            self._batches.remove(batch)
+            self._discard_uploads(batch)
+
+    @staticmethod
+    def _discard_uploads(batch):
+        """검열 배치를 위해 input 폴더에 올려 둔 업로드 파일을 지운다 (배치 기록이 사라질 때)."""
+        paths = [item["upload"] for item in batch["items"] if item.get("upload")]
+        if not paths:
+            return
+
+        def remove_all():
+            for path in paths:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+        asyncio.ensure_future(run_io("batch", remove_all))
+
+    def _emit(self, batch, item=None):
+        payload = {"batch": _summary(batch)}
+        if item is not None:
+            payload["item"] = _public_item(item)
+        PromptServer.instance.send_sync(BATCH_EVENT, payload)
+
+    def _finish_if_complete(self, batch):
+        if any(item["status"] in ("pending", "queued") for item in batch["items"]):
+            return
+        if batch["status"] == "running":
+            batch["status"] = "done"
+        batch["finished"] = time.time()
+
+    async def _request(self, method, path, body=None):
+        async with self._session.request(method, self._base_url + path, json=body) as response:
+            if response.content_type == "application/json":
+                data = await response.json()
+            else:
+                data = {"error": await response.text()}
+            return response.status, data
+
+    async def _run(self):
+        self._base_url = _server_base_url()
+        timeout = aiohttp.ClientTimeout(total=30)
+        connector = aiohttp.TCPConnector(ssl=False)
+        async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+            self._session = session
+            while True:
+                active = [b for b in self._batches if b["status"] in ACTIVE_STATUSES
+                          or any(item["status"] == "queued" for item in b["items"])]
+                if not active:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+                try:
+                    await self._tick(active)
+                    delay = POLL_SECONDS
+                except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+                    # 서버 시작 직후(아직 포트가 열리지 않음) 등: 잠시 후 재시도
+                    print(f"[ComfyUI-AssetManager] 배치 스케줄러 ComfyUI 통신 실패, {RETRY_SECONDS:.0f}초 후 재시도: {e}")
+                    delay = RETRY_SECONDS
+                except Exception as e:
+                    print(f"[ComfyUI-AssetManager] 배치 스케줄러 오류: {e}")
+                    delay = RETRY_SECONDS
+                await self._save()
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _tick(self, active):
+        """제출한 작업의 완료 여부를 확인하고, ComfyUI 큐가 depth보다 적으면 다음 항목을 제출한다."""
+        _, queue = await self._request("GET", "/queue")
+        in_queue = {entry[1] for key in ("queue_running", "queue_pending") for entry in queue.get(key, [])}
+        queue_size = len(in_queue)
+
+        # 1) 큐에서 빠진 작업: 히스토리에 있으면 완료/실패. 없으면 유실된 것인데,
+        #    서버 재시작 전에 제출한 작업이면 다시 제출하고, 이번 실행 중에 제출한 작업이면 사용자가
+        #    ComfyUI 큐에서 지웠거나 히스토리를 비운 것이므로 다시 만들지 않고 취소로 기록한다
+        for batch in active:
+            for item in batch["items"]:
+                if item["status"] != "queued" or item["prompt_id"] in in_queue:
+                    continue
+                _, history = await self._request("GET", f"/history/{item['prompt_id']}")
+                entry = history.get(item["prompt_id"])
+                if entry is None:
+                    if batch["status"] == "cancelled":
+                        item["status"] = "cancelled"
+                    elif item["prompt_id"] in self._submitted:
+                        item["status"] = "cancelled"
+                        item["error"] = "ComfyUI 큐 또는 히스토리에서 삭제되었습니다."
+                    else:
+                        item["status"] = "pending"
+                    self._submitted.discard(item["prompt_id"])
+                    item["prompt_id"] = None
+                else:
+                    self._submitted.discard(item["prompt_id"])
+                    self._record_result(item, entry)
+                self._dirty = True
+                self._finish_if_complete(batch)
+                self._emit(batch, item)
+
+        # 2) 큐 채우기: 먼저 만든 배치부터, 큐 전체 크기가 배치의 depth에 닿을 때까지 제출
+        #    depth가 작은 배치가 꽉 차도 뒤의 배치는 자기 depth까지 채운다
+        for batch in active:
+            if batch["status"] != "running":
+                continue
+            for item in batch["items"]:
+                if queue_size >= batch["depth"]:
+                    break
+                if item["status"] != "pending":
+                    continue
+                if await self._submit(batch, item):
+                    queue_size += 1
+                self._dirty = True
+                self._finish_if_complete(batch)
+                self._emit(batch, item)
+
+    async def _submit(self, batch, item):
+        if batch.get("kind") == "censor":
+            prompt = build_censor_prompt(batch["workflow"], batch["censor"], item["image"], item["prefix"])
+        else:
+            prompt = build_prompt(batch["workflow"], batch["settings"], item["positive"], item["negative"],
+                                  item["prefix"], item["seed"])
+        body = {"prompt": prompt}
+        if batch.get("client_id"):
+            body["client_id"] = batch["client_id"]
+        status, data = await self._request("POST", "/prompt", body)
+        if status == 200 and data.get("prompt_id"):
+            item["status"] = "queued"
+            item["prompt_id"] = data["prompt_id"]
+            self._submitted.add(data["prompt_id"])
+            item["error"] = None
+            return True
+        if status >= 500:
+            raise aiohttp.ClientError(f"/prompt HTTP {status}")
+        # 검증 실패(400): 이 항목만 실패 처리하고 다음 항목으로 넘어간다
+        error = data.get("error")
+        item["status"] = "failed"
+        item["error"] = error.get("message") if isinstance(error, dict) else str(error or f"HTTP {status}")
+        return False
+
+    @staticmethod
+    def _record_result(item, entry):
+        status = (entry.get("status") or {}).get("status_str")
+        images = []
+        for output in (entry.get("outputs") or {}).values():
+            for image in output.get("images", []) or []:
+                if image.get("type") == "output":
+                    images.append({"filename": image.get("filename"), "subfolder": image.get("subfolder", "")})
+        item["images"] = images
+        if status == "error":
+            item["status"] = "failed"
+            messages = [m[1].get("exception_message") for m in (entry.get("status") or {}).get("messages", [])
+                        if isinstance(m, list) and len(m) > 1 and m[0] == "execution_error"]
+            item["error"] = messages[0] if messages else "execution error"
+        else:
+            item["status"] = "done"
@@ -0,0 +1,154 @@
+"""
+api/executors.py — 공용 작업 실행 계층
+aiohttp 핸들러의 블로킹 작업(디스크 I/O, JSON 읽기/쓰기, PIL 디코딩, 서브프로세스)을
+이벤트 루프 밖에서 실행하여 ComfyUI의 웹소켓 진행 상황 전송과 /prompt 처리가 멈추지 않게 합니다.
+  - run_io  : 크기가 제한된 스레드 풀 (파일 I/O, SQLite, JSON, 서브프로세스, 썸네일)
+  - run_cpu : 이미지 CPU 작업 풀 (기본 스레드 풀, Pillow 인코딩/디코딩은 GIL을 놓으므로 병렬로 실행된다)
+작업 종류(op)별 동시 실행 수 상한이 있어, 한 종류의 느린 작업이 풀 전체를 차지하지 못합니다.
+오래 걸리는 백그라운드 작업(해시 계산, 보관 재인코딩 등)은 comfy_busy()로 ComfyUI 생성 작업에 양보합니다.
+"""
+
+import os
+import time
+import asyncio
+import functools
+import threading
+import contextvars
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from server import PromptServer
+
+# 환경 변수로 풀 크기를 조정할 수 있다.
+#   ASSETMANAGER_IO_WORKERS  : I/O 스레드 수 (기본 16)
+#   ASSETMANAGER_CPU_WORKERS : 이미지 작업 워커 수 (기본: CPU 수 - 1)
+#   ASSETMANAGER_CPU_POOL    : thread / process (기본 thread, process는 fork 가능한 OS에서만)
+#   ASSETMANAGER_ARCHIVE_WORKERS : 보관(무손실 재인코딩) 동시 실행 수 (기본 1)
+
+
+def _env_int(name, default):
+    try:
+        return max(1, int(os.environ.get(name, "")))
+    except ValueError:
+        return default
+
+
+IO_WORKERS = _env_int("ASSETMANAGER_IO_WORKERS", 16)
+CPU_WORKERS = _env_int("ASSETMANAGER_CPU_WORKERS", max(1, (os.cpu_count() or 2) - 1))
+
+# 작업 종류별 동시 실행 상한 (목록에 없는 종류는 DEFAULT_LIMIT)
+OPERATION_LIMITS = {
+    "gallery": 2,      # 갤러리 인덱스 갱신/조회
+    "search": 4,       # 메타데이터 검색
+    "metadata": 4,     # 이미지 메타데이터 파싱
+    "files": 2,        # 삭제/이동 등 파일 조작
+    "models": 4,       # 모델 목록/사이드카/프리뷰 경로 확인
+    "library": 1,      # 프롬프트 라이브러리 JSON
+    "state": 1,        # 앱 상태 JSON
+    "log": 2,          # 로그 검색 (기록은 전용 스레드가 담당)
+    "shell": 1,        # OS 탐색기 열기
+    "zip": 2,          # ZIP 스트리밍 압축 (작업 하나가 스레드 하나를 오래 점유)
+    "compress": 2,     # 큰 JSON 응답 gzip/brotli 압축
+    "upload": 4,       # 업로드 파일 임시 저장
+    "thumbnail": 4,    # 썸네일 생성 (Pillow, 스레드)
+    "view": 8,         # 파일 서빙 전 경로/stat 확인
+    "batch": 1,        # 배치 스케줄러 상태 파일
+    "resize": CPU_WORKERS,
+    "archive": _env_int("ASSETMANAGER_ARCHIVE_WORKERS", 1),  # 오래된 출력 재인코딩 (백그라운드, 생성 작업에 양보)
+}
+DEFAULT_LIMIT = 4
+# 백그라운드 작업이 ComfyUI 큐가 비었는지 다시 확인하는 간격
+BUSY_POLL_SECONDS = 5.0
+
+_io_pool = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="am-io")
+_cpu_pool = None
+_pool_lock = threading.Lock()
+_semaphores = {}
+# 작업 종류별 [대기 중, 실행 중, 시작 수, 누적 대기 시간(초)] — 이벤트 루프에서만 갱신 (metrics.py가 읽음)
+_op_stats = {}
+
+
+def get_cpu_pool():
+    """이미지 CPU 작업 풀 싱글턴을 반환 (최초 호출 시 생성)."""
+    global _cpu_pool
+    with _pool_lock:
+        if _cpu_pool is None:
+            kind = os.environ.get("ASSETMANAGER_CPU_POOL", "thread").lower()
+            if kind == "process" and "fork" in multiprocessing.get_all_start_methods():
+                # 명시적으로 켠 경우에만 사용한다. 이미 스레드가 많은 ComfyUI 프로세스(torch/CUDA, aiohttp, 작업 풀)를
+                # fork하면 fork 시점에 잡혀 있던 잠금 때문에 자식이 멈출 수 있다.
+                # ComfyUI 커스텀 노드 패키지는 spawn 방식의 새 프로세스에서 다시 import할 수 없으므로 fork만 가능하다.
+                _cpu_pool = ProcessPoolExecutor(max_workers=CPU_WORKERS, mp_context=multiprocessing.get_context("fork"))
+            else:
+                _cpu_pool = ThreadPoolExecutor(max_workers=CPU_WORKERS, thread_name_prefix="am-cpu")
+        return _cpu_pool
+
+
+def _semaphore(op):
+    sem = _semaphores.get(op)
+    if sem is None:
+        sem = _semaphores[op] = asyncio.Semaphore(OPERATION_LIMITS.get(op, DEFAULT_LIMIT))
+    return sem
+
+
+async def _run(op, pool, func, *args):
+    stats = _op_stats.get(op)
+    if stats is None:
+        stats = _op_stats[op] = [0, 0, 0, 0.0]
+    queued_at = time.perf_counter()
+    stats[0] += 1
+    try:
+        await _semaphore(op).acquire()
+    finally:
+        stats[0] -= 1
+    stats[1] += 1
+    stats[2] += 1
+    stats[3] += time.perf_counter() - queued_at
+    try:
+        return await asyncio.get_running_loop().run_in_executor(pool, func, *args)
+    finally:
+        stats[1] -= 1
+        _semaphore(op).release()
+
+
+async def run_io(op, func, *args, **kwargs):
+    """블로킹 함수를 I/O 스레드 풀에서 실행한다. 호출 시점의 contextvars를 그대로 넘긴다."""
+    call = functools.partial(contextvars.copy_context().run, func, *args, **kwargs)
+    return await _run(op, _io_pool, call)
+
+
+async def run_cpu(op, func, *args):
+    """
+    이미지 CPU 작업을 CPU 풀에서 실행한다.
+    프로세스 풀일 수 있으므로 func는 모듈 최상위 함수, 인자는 pickle 가능한 값이어야 한다.
+    """
+    return await _run(op, get_cpu_pool(), func, *args)
+
+
+def operation_stats():
+    """작업 종류별 대기/실행 수와 누적 대기 시간, 공용 I/O 풀의 미처리 작업 수."""
+    operations = {
+        op: {
+            "waiting": waiting,
+            "running": running,
+            "started": started,
+            "wait_seconds": round(wait_seconds, 6),
+            "limit": OPERATION_LIMITS.get(op, DEFAULT_LIMIT),
+        }
+        for op, (waiting, running, started, wait_seconds) in list(_op_stats.items())
+    }
+    return {"operations": operations, "io_queue": _io_pool._work_queue.qsize()}
+
+
+def comfy_busy():
+    """ComfyUI 큐에 실행 중이거나 대기 중인 생성 작업이 있는지"""
+    queue = getattr(PromptServer.instance, "prompt_queue", None)
+    try:
+        return queue is not None and queue.get_tasks_remaining() > 0
+    except Exception:
+        return False
+
+
+def wait_until_idle(poll=BUSY_POLL_SECONDS):
+    """(백그라운드 스레드용) ComfyUI 큐가 빌 때까지 기다린다. 생성 중에는 디스크/CPU를 쓰지 않게 한다."""
+    while comfy_busy():
+        time.sleep(poll)
@@ -0,0 +1,392 @@
+"""
+api/file_ops.py — 갤러리 일괄 파일 작업 (휴지통 / 이동 / 복원 / 영구 삭제)
+요청을 작업(job)으로 받아 백그라운드에서 하나씩 실행하고, 진행 상황을 웹소켓 이벤트(assetmanager.fileops)로 보냅니다.
+  - trash   : output/.assetmanager_trash/<휴지통 ID>/files/<원래 상대 경로>로 이름 변경 (같은 파일 시스템이라 원자적)
+  - move    : output 안의 다른 폴더로 이름 변경 (같은 이름이 있으면 " (1)"을 붙인다)
+  - restore : 휴지통 묶음을 원래 경로로 되돌린다
+  - purge   : 휴지통 묶음을 실제로 지운다
+휴지통 폴더는 점(.)으로 시작하므로 갤러리 인덱스가 건너뛰며, 묶음마다 trash.json에 생성 시각/개수/크기를 기록합니다.
+일정 크기(ASSETMANAGER_TRASH_MAX_GB)나 기간(ASSETMANAGER_TRASH_MAX_DAYS)을 넘은 묶음은 백그라운드에서 오래된 것부터 비웁니다.
+작업 중에는 조각(chunk)마다 갤러리 인덱스를 증분 갱신하므로 변경분이 assetmanager.gallery 이벤트로 바로 전달됩니다.
+"""
+
+import os
+import json
+import time
+import errno
+import shutil
+import asyncio
+import folder_paths
+
+from .executors import run_io
+from .gallery_watcher import gallery_watcher
+from .jobs import JobQueue, env_float
+
+FILE_OPS_EVENT = "assetmanager.fileops"
+TRASH_DIR_NAME = ".assetmanager_trash"
+TRASH_META_NAME = "trash.json"
+OPERATIONS = ("trash", "move", "restore", "purge")
+
+# 조각 하나에서 처리할 최소 파일 수 (큰 작업은 진행 알림이 약 PROGRESS_STEPS번 가도록 키운다)
+CHUNK_SIZE = 500
+PROGRESS_STEPS = 20
+POLICY_INTERVAL_SECONDS = 3600.0
+
+# 휴지통 보관 정책 (0이면 해당 기준으로는 비우지 않음)
+TRASH_MAX_BYTES = int(env_float("ASSETMANAGER_TRASH_MAX_GB", 20.0) * 1024 ** 3)
+TRASH_MAX_DAYS = env_float("ASSETMANAGER_TRASH_MAX_DAYS", 30.0)
+
+
+def free_path(path):
+    """path가 이미 있으면 "이름 (n).확장자" 중 비어 있는 경로를 반환한다."""
+    if not os.path.lexists(path):
+        return path
+    base, ext = os.path.splitext(path)
+    n = 1
+    while os.path.lexists(f"{base} ({n}){ext}"):
+        n += 1
+    return f"{base} ({n}){ext}"
+
+
+def _rename(src, dst):
+    """같은 파일 시스템이면 원자적 이름 변경, 아니면(하위 폴더가 다른 드라이브에 연결된 경우) 복사 후 삭제."""
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    try:
+        os.rename(src, dst)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        shutil.move(src, dst)
+
+
+def _prune_empty_dirs(path, stop):
+    """path부터 stop 직전까지 비어 있는 상위 폴더를 지운다."""
+    while path != stop and path.startswith(stop + os.sep):
+        try:
+            os.rmdir(path)
+        except OSError:
+            return
+        path = os.path.dirname(path)
+
+
+def normalize_subfolder(subfolder):
+    """
+    output 기준 폴더 경로를 "a/b" 형태로 정리한다. 빈 문자열은 output 루트.
+    상위 폴더 참조(..)나 숨김 폴더(점으로 시작, 휴지통 포함)는 ValueError.
+    """
+    parts = [p for p in str(subfolder or "").replace("\\", "/").split("/") if p and p != "."]
+    for part in parts:
+        if part == ".." or part.startswith("."):
+            raise ValueError(f"사용할 수 없는 폴더 이름입니다: {part}")
+    return "/".join(parts)
+
+
+class TrashStore:
+    """
+    휴지통 폴더. 묶음(휴지통 ID) 하나가 trash 작업 하나에 해당하며,
+    files/ 아래에 원래 상대 경로 그대로 파일을 두므로 폴더 구조 자체가 복원 목록이다.
+    """
+
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+        self.root = os.path.join(output_dir, TRASH_DIR_NAME)
+
+    def batch_dir(self, trash_id):
+        if not trash_id or os.sep in trash_id or "/" in trash_id or trash_id.startswith("."):
+            raise ValueError(f"잘못된 휴지통 ID: {trash_id}")
+        return os.path.join(self.root, trash_id)
+
+    def files_dir(self, trash_id):
+        return os.path.join(self.batch_dir(trash_id), "files")
+
+    def create(self, trash_id, folders):
+        os.makedirs(self.files_dir(trash_id), exist_ok=True)
+        meta = {"id": trash_id, "created": time.time(), "count": 0, "bytes": 0, "folders": folders}
+        self.write_meta(meta)
+        return meta
+
+    def write_meta(self, meta):
+        path = os.path.join(self.batch_dir(meta["id"]), TRASH_META_NAME)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def read_meta(self, trash_id):
+        """trash.json을 읽는다. 없거나 깨졌으면 (작업 도중 종료 등) 폴더를 훑어 다시 만든다."""
+        batch_dir = self.batch_dir(trash_id)
+        try:
+            with open(os.path.join(batch_dir, TRASH_META_NAME), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            pass
+        entries = self.entries(trash_id)
+        count, size = self.measure(trash_id, entries)
+        folders = sorted({os.path.dirname(rel) for rel in entries})
+        meta = {"id": trash_id, "created": os.stat(batch_dir).st_mtime, "count": count, "bytes": size,
+                "folders": folders[:20]}
+        self.write_meta(meta)
+        return meta
+
+    def entries(self, trash_id):
+        """묶음에 들어 있는 파일의 원래 상대 경로 목록"""
+        files_dir = self.files_dir(trash_id)
+        result = []
+        for dirpath, _, filenames in os.walk(files_dir):
+            rel_dir = os.path.relpath(dirpath, files_dir).replace(os.sep, "/")
+            for filename in filenames:
+                result.append(filename if rel_dir == "." else f"{rel_dir}/{filename}")
+        return result
+
+    def measure(self, trash_id, entries):
+        files_dir = self.files_dir(trash_id)
+        count = size = 0
+        for rel in entries:
+            try:
+                size += os.stat(os.path.join(files_dir, rel)).st_size
+                count += 1
+            except OSError:
+                pass
+        return count, size
+
+    def ids(self):
+        try:
+            return sorted(name for name in os.listdir(self.root)
+                          if not name.startswith(".") and os.path.isdir(os.path.join(self.root, name)))
+        except FileNotFoundError:
+            return []
+
+    def list(self):
+        """묶음 목록 (최근 것이 앞)"""
+        batches = []
+        for trash_id in self.ids():
+            try:
+                batches.append(self.read_meta(trash_id))
+            except OSError:
+                continue
+        batches.sort(key=lambda b: b["created"], reverse=True)
+        return batches
+
+    def remove(self, trash_id):
+        shutil.rmtree(self.batch_dir(trash_id), ignore_errors=True)
+
+    def enforce_policy(self, max_bytes=TRASH_MAX_BYTES, max_days=TRASH_MAX_DAYS, keep=()):
+        """보관 기간을 넘었거나 전체 크기가 상한을 넘는 묶음을 오래된 것부터 지운다. 반환값: 지운 묶음 목록"""
+        batches = [b for b in self.list() if b["id"] not in keep]
+        batches.sort(key=lambda b: b["created"])
+        total = sum(b["bytes"] for b in batches)
+        cutoff = time.time() - max_days * 86400 if max_days else None
+        removed = []
+        for batch in batches:
+            expired = cutoff is not None and batch["created"] < cutoff
+            if not expired and not (max_bytes and total > max_bytes):
+                continue
+            self.remove(batch["id"])
+            total -= batch["bytes"]
+            removed.append(batch)
+        return removed
+
+
+class FileOpsManager(JobQueue):
+    """
+    파일 작업 대기열. 작업은 등록 순서대로 하나씩 실행되며(같은 파일을 두 작업이 동시에 건드리지 않도록),
+    실제 이름 변경/삭제는 I/O 풀("files")에서 조각 단위로 수행한다. 공개 메서드는 이벤트 루프에서 호출한다.
+    """
+
+    EVENT = FILE_OPS_EVENT
+    LABEL = "파일 작업"
+
+    def __init__(self):
+        super().__init__()
+        self._policy_task = None
+
+    def trash_store(self):
+        return TrashStore(os.path.abspath(folder_paths.get_output_directory()))
+
+    def start(self):
+        super().start()
+        if self._policy_task is None or self._policy_task.done():
+            self._policy_task = asyncio.ensure_future(self._policy_loop())
+
+    # ── 공개 API ──
+
+    async def submit(self, op, images=None, dest=None, trash_ids=None):
+        """
+        작업을 등록하고 요약을 반환한다. 잘못된 요청은 ValueError.
+          trash/move : images=[{filename, subfolder}], move는 dest(output 기준 폴더)
+          restore/purge : trash_ids=[휴지통 ID], purge는 ["*"]이면 휴지통 전체
+        """
+        if op not in OPERATIONS:
+            raise ValueError(f"알 수 없는 작업입니다: {op}")
+        job = self.new_job(op, total=0, done=0, failed=0, bytes=0)
+        if op in ("trash", "move"):
+            images = [img for img in images or [] if isinstance(img, dict) and img.get("filename")]
+            if not images:
+                raise ValueError("대상 이미지가 없습니다.")
+            job["total"] = len(images)
+            job["_images"] = images
+            if op == "move":
+                if dest is None:
+                    raise ValueError("이동할 폴더(dest)가 필요합니다.")
+                job["dest"] = normalize_subfolder(dest)
+            else:
+                job["trash_id"] = time.strftime("%Y%m%d-%H%M%S-") + job["id"][:6]
+        else:
+            trash_ids = [str(t) for t in trash_ids or [] if t]
+            if not trash_ids:
+                raise ValueError("휴지통 ID가 없습니다.")
+            if op == "restore" and "*" in trash_ids:
+                raise ValueError("복원할 휴지통 ID를 지정해야 합니다.")
+            for trash_id in trash_ids:
+                if trash_id != "*":
+                    self.trash_store().batch_dir(trash_id)
+            job["trash_ids"] = trash_ids
+        return await self.enqueue(job)
+
+    # ── 실행 ──
+
+    async def _execute(self, job):
+        store = self.trash_store()
+        plan = await run_io("files", self._plan, job, store)
+        job["total"] = len(plan) + job["failed"]
+        chunk_size = max(CHUNK_SIZE, -(-len(plan) // PROGRESS_STEPS))
+        # 조각마다 갤러리 변경분을 보내면 큰 작업은 조각마다 reset(전체 다시 불러오기)이 가므로,
+        # 작업 중에는 감시 스레드를 멈추고 끝난 뒤 한 번만 보낸다
+        with gallery_watcher.paused():
+            try:
+                for start in range(0, len(plan), chunk_size):
+                    if job["_cancel"]:
+                        break
+                    done, failed, size, errors = await run_io("files", self._apply, job, store, plan[start:start + chunk_size])
+                    job["done"] += done
+                    job["failed"] += failed
+                    job["bytes"] += size
+                    self.add_errors(job, errors)
+                    self._emit(job)
+            finally:
+                await run_io("files", self._finalize, job, store)
+                if job["op"] != "purge":
+                    await run_io("gallery", gallery_watcher.refresh_and_broadcast)
+        if job["op"] == "trash":
+            await self.enforce_policy(keep=(job["trash_id"],))
+
+    def _plan(self, job, store):
+        """작업을 (원본, 대상) 목록으로 바꾼다. 경로를 확인할 수 없는 항목은 실패로 센다."""
+        output_dir = store.output_dir
+        op = job["op"]
+        if op == "purge":
+            ids = store.ids() if "*" in job["trash_ids"] else job["trash_ids"]
+            return [(trash_id, None) for trash_id in ids if os.path.isdir(store.batch_dir(trash_id))]
+        if op == "restore":
+            plan = []
+            for trash_id in job["trash_ids"]:
+                files_dir = store.files_dir(trash_id)
+                for rel in store.entries(trash_id):
+                    plan.append((os.path.join(files_dir, rel), os.path.join(output_dir, rel), trash_id))
+            return plan
+
+        plan = []
+        folders = set()
+        target_dir = os.path.join(output_dir, job["dest"]) if op == "move" and job["dest"] else output_dir
+        for img in job["_images"]:
+            try:
+                subfolder = normalize_subfolder(img.get("subfolder", ""))
+            except ValueError:
+                job["failed"] += 1
+                continue
+            filename = os.path.basename(str(img["filename"]))
+            src = os.path.join(output_dir, subfolder, filename) if subfolder else os.path.join(output_dir, filename)
+            if op == "trash":
+                dst = os.path.join(store.files_dir(job["trash_id"]), subfolder, filename)
+                folders.add(subfolder)
+            else:
+                dst = os.path.join(target_dir, filename)
+            plan.append((src, dst))
+        if op == "trash":
+            store.create(job["trash_id"], sorted(folders)[:20])
+        return plan
+
+    def _apply(self, job, store, chunk):
+        done = failed = size = 0
+        errors = []
+        op = job["op"]
+        for entry in chunk:
+            try:
+                if op == "purge":
+                    trash_id = entry[0]
+                    size += store.read_meta(trash_id)["bytes"]
+                    store.remove(trash_id)
+                    done += 1
+                    continue
+                src, dst = entry[0], entry[1]
+                if not os.path.isfile(src):
+                    raise FileNotFoundError(f"파일이 없습니다: {os.path.relpath(src, store.output_dir)}")
+                if os.path.normcase(src) == os.path.normcase(dst):
+                    done += 1
+                    continue
+                file_size = os.path.getsize(src)
+                _rename(src, free_path(dst))
+                if op == "restore":
+                    _prune_empty_dirs(os.path.dirname(src), store.files_dir(entry[2]))
+                size += file_size
+                done += 1
+            except (OSError, ValueError) as e:
+                failed += 1
+                errors.append(str(e))
+        return done, failed, size, errors
+
+    def _finalize(self, job, store):
+        """휴지통 묶음의 trash.json을 실제 내용과 맞춘다 (빈 묶음은 지운다)."""
+        if job["op"] == "trash":
+            ids = [job["trash_id"]]
+        elif job["op"] == "restore":
+            ids = job["trash_ids"]
+        else:
+            return
+        for trash_id in ids:
+            if not os.path.isdir(store.batch_dir(trash_id)):
+                continue
+            entries = store.entries(trash_id)
+            if not entries:
+                store.remove(trash_id)
+                continue
+            meta = store.read_meta(trash_id)
+            meta["count"], meta["bytes"] = store.measure(trash_id, entries)
+            store.write_meta(meta)
+
+    # ── 휴지통 정책 ──
+
+    async def enforce_policy(self, keep=()):
+        # 대기/실행 중인 작업이 다룰 묶음은 남겨 둔다
+        keep = set(keep)
+        for job in self._jobs:
+            if job["status"] in ("queued", "running"):
+                keep.update(job.get("trash_ids") or [])
+                if job.get("trash_id"):
+                    keep.add(job["trash_id"])
+        try:
+            removed = await run_io("files", self.trash_store().enforce_policy, TRASH_MAX_BYTES, TRASH_MAX_DAYS, keep)
+        except OSError as e:
+            print(f"[ComfyUI-AssetManager] 휴지통 정리 실패: {e}")
+            return []
+        if removed:
+            print(f"[ComfyUI-AssetManager] 휴지통 정리: {len(removed)}개 묶음, "
+                  f"{sum(b['count'] for b in removed)}개 파일 영구 삭제")
+        return removed
+
+    async def _policy_loop(self):
+        while True:
+            await self.enforce_policy()
+            await asyncio.sleep(POLICY_INTERVAL_SECONDS)
+
+    async def trash_summary(self):
+        batches = await run_io("files", self.trash_store().list)
+        return {
+            "batches": batches,
+            "count": sum(b["count"] for b in batches),
+            "bytes": sum(b["bytes"] for b in batches),
+            "policy": {"max_bytes": TRASH_MAX_BYTES, "max_days": TRASH_MAX_DAYS},
+        }
+
+
+file_ops = FileOpsManager()
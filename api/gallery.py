@@ -1,22 +1,45 @@
 """
 api/gallery.py — 갤러리(출력 이미지 브라우저) API
-ComfyUI output 폴더를 재귀 스캔하여 폴더별 이미지 목록을 반환하고,
-이미지 메타데이터 파싱, 파일 삭제, OS 탐색기 열기 등의 기능을 제공합니다.
+ComfyUI output 폴더의 영구 인덱스(gallery_index.py)를 통해 폴더별 이미지 목록을 반환하고,
+이미지 메타데이터 파싱, 유사 이미지 묶음(image_hashes.py), 휴지통/이동 등 일괄 파일 작업(file_ops.py), OS 탐색기 열기 등의 기능을 제공합니다.
 """
 
 import os
-import json
+import asyncio
 import subprocess
 import platform
 import urllib.parse
-from PIL import Image
 from aiohttp import web
-from server import PromptServer
 import folder_paths
 
+from .gallery_index import get_gallery_index
+from .gallery_watcher import gallery_watcher
+from .metadata_index import metadata_indexer
+from .image_hashes import image_hash_indexer, DEFAULT_THRESHOLD
+from .executors import run_io
+from .image_metadata import read_comfy_metadata
+from .file_ops import file_ops
+from .archive import output_archiver
+from .http_cache import cached_json
+from .startup import on_server_start, route_info
+
+METADATA_BATCH_LIMIT = 2000
+METADATA_BATCH_CHUNK = 64
+
 
 def setup_gallery_api(routes):
-    """갤러리 관련 API 라우트를 등록한다."""
+    """갤러리 관련 API 라우트를 등록하고 output 폴더 감시와 메타데이터/지각 해시 인덱싱을 시작한다."""
+
+    gallery_watcher.start()
+    metadata_indexer.start()
+    image_hash_indexer.start()
+
+    async def start_file_ops(app):
+        # 휴지통 보관 정책과 출력 보관(무손실 재인코딩) 정책을 주기적으로 적용한다
+        file_ops.start()
+        output_archiver.start()
+
+    on_server_start(start_file_ops)
 
     @routes.get("/assetmanager/api/open_folder")
     async def api_open_folder(request):
@@ -27,110 +50,297 @@ def setup_gallery_api(routes):
         output_dir = folder_paths.get_output_directory()
         target_path = os.path.join(output_dir, subfolder, filename) if subfolder else os.path.join(output_dir, filename)
         target_path = os.path.abspath(target_path)
-        
-        if not os.path.exists(target_path):
-            target_path = os.path.dirname(target_path)
 
-        try:
+        def open_in_explorer(target_path):
+            if not os.path.exists(target_path):
+                target_path = os.path.dirname(target_path)
             if platform.system() == "Windows":
                 subprocess.run(['explorer', '/select,', target_path])
             elif platform.system() == "Darwin":
                 subprocess.run(['open', '-R', target_path])
             else:
                 subprocess.run(['xdg-open', os.path.dirname(target_path)])
+
+        try:
+            await run_io("shell", open_in_explorer, target_path)
             return web.json_response({"status": "success"})
         except Exception as e:
             return web.json_response({"status": "error", "message": str(e)}, status=500)
 
+    def resolve_output_path(filename, subfolder):
+        """output 폴더 안의 파일 경로. ".."나 절대 경로로 output 밖을 가리키면 None."""
+        output_dir = os.path.abspath(folder_paths.get_output_directory())
+        file_path = os.path.abspath(os.path.join(output_dir, subfolder, filename))
+        return file_path if file_path.startswith(output_dir + os.sep) else None
+
+    def load_image_metadata(file_path):
+        """청크 리더로 메타데이터를 읽어 응답 형태로 변환. 파일이 없거나 output 밖의 경로면 None."""
+        if file_path is None or not os.path.exists(file_path):
+            return None
+        metadata = read_comfy_metadata(file_path)
+        return {
+            "status": "success",
+            "prompt": metadata["prompt"] or {},
+            "workflow": metadata["workflow"] or {},
+            "raw_info": metadata["raw_info"]
+        }
+
     @routes.get("/assetmanager/api/image_metadata")
     async def api_image_metadata(request):
         """
-        PNG 이미지 파일에서 ComfyUI 메타데이터(prompt, workflow)를 추출하여 반환.
-        ComfyUI는 PNG의 tEXt 청크에 prompt와 workflow를 JSON 문자열로 저장한다.
+        이미지 파일에서 ComfyUI 메타데이터(prompt, workflow)를 추출하여 반환.
+        ComfyUI는 PNG의 tEXt 청크(WebP/JPEG는 EXIF)에 prompt와 workflow를 JSON 문자열로 저장하며,
+        image_metadata.py의 청크 리더로 픽셀 데이터 앞부분까지만 읽는다.
         """
         filename = request.query.get("filename", "")
         subfolder = request.query.get("subfolder", "")
-        
-        output_dir = folder_paths.get_output_directory()
-        file_path = os.path.join(output_dir, subfolder, filename) if subfolder else os.path.join(output_dir, filename)
-            
-        if not os.path.exists(file_path):
-            return web.json_response({"status": "error", "message": "File not found"}, status=404)
-            
+        file_path = resolve_output_path(filename, subfolder)
+
         try:
-            with Image.open(file_path) as img:
-                metadata = img.info
-                prompt_data = json.loads(metadata.get('prompt', '{}'))
-                workflow_data = json.loads(metadata.get('workflow', '{}'))
-                
-                return web.json_response({
-                    "status": "success",
-                    "prompt": prompt_data,
-                    "workflow": workflow_data,
-                    "raw_info": {k: v for k, v in metadata.items() if k not in ['prompt', 'workflow']}
-                })
+            result = await run_io("metadata", load_image_metadata, file_path)
         except Exception as e:
             return web.json_response({"status": "error", "message": str(e)}, status=500)
+        if result is None:
+            return web.json_response({"status": "error", "message": "File not found"}, status=404)
+        return web.json_response(result)
+
+    @routes.post("/assetmanager/api/image_metadata/batch")
+    async def api_image_metadata_batch(request):
+        """
+        여러 이미지의 메타데이터를 한 번에 추출.
+        요청 JSON: {"images": [{"filename", "subfolder"}, ...], "fields": ["prompt", "workflow", "raw_info"] (생략 시 전부)}
+        응답: {"status": "success", "results": [{"filename", "subfolder", "status", ...fields}]} (요청 순서 유지)
+        """
+        try:
+            data = await request.json()
+        except Exception as e:
+            return web.json_response({"status": "error", "message": str(e)}, status=400)
+
+        images = data.get("images", [])
+        if not images:
+            return web.json_response({"status": "error", "message": "No images provided"}, status=400)
+        if len(images) > METADATA_BATCH_LIMIT:
+            return web.json_response({"status": "error", "message": f"Too many images (max {METADATA_BATCH_LIMIT})"}, status=400)
+        fields = data.get("fields") or ["prompt", "workflow", "raw_info"]
+
+        def load_chunk(chunk):
+            results = []
+            for img in chunk:
+                filename = img.get("filename", "")
+                subfolder = img.get("subfolder", "")
+                item = {"filename": filename, "subfolder": subfolder}
+                try:
+                    metadata = load_image_metadata(resolve_output_path(filename, subfolder))
+                except Exception as e:
+                    item.update(status="error", message=str(e))
+                else:
+                    if metadata is None:
+                        item.update(status="error", message="File not found")
+                    else:
+                        item["status"] = "success"
+                        item.update({field: metadata[field] for field in fields if field in metadata})
+                results.append(item)
+            return results
+
+        # 파일 묶음을 나누어 metadata 작업 상한만큼 병렬로 읽는다
+        chunks = [images[i:i + METADATA_BATCH_CHUNK] for i in range(0, len(images), METADATA_BATCH_CHUNK)]
+        chunk_results = await asyncio.gather(*(run_io("metadata", load_chunk, chunk) for chunk in chunks))
+        return web.json_response({"status": "success", "results": [item for chunk in chunk_results for item in chunk]})
+
+    def index_version():
+        """갤러리 응답 ETag용 버전: 인덱스 경로와 세대 번호"""
+        index = get_gallery_index()
+        return index.root_dir, index.generation
+
+    def refreshed_index_version():
+        """인덱스를 증분 갱신(변경분은 웹소켓 전송)한 뒤의 버전"""
+        gallery_watcher.refresh_and_broadcast()
+        return index_version()
 
     @routes.get("/assetmanager/api/gallery")
     async def api_get_gallery(request):
         """
-        output 폴더를 재귀적으로 스캔하여 폴더별 이미지 목록을 반환.
-        각 이미지에는 파일명, 서브폴더, 프리뷰 URL, 생성 시간이 포함된다.
+        output 폴더의 폴더별 이미지 목록을 반환.
+        영구 인덱스(gallery_index.db)를 증분 갱신한 뒤 인덱스에서 조회하므로,
+        변경된 폴더만 다시 스캔하고 나머지는 디렉토리 stat 한 번으로 끝난다.
+        갱신 중 발견된 변경분은 웹소켓(assetmanager.gallery)으로도 전송된다.
         결과는 폴더명 알파벳 순으로 정렬되며, 루트 폴더가 항상 맨 앞에 위치한다.
+        쿼리 파라미터:
+          - format : columns(기본) — 폴더마다 filenames/timestamps 병렬 배열과 공통 url_template
+                     rows          — 이전 형식, 이미지마다 파일명, 서브폴더, 프리뷰 URL, 생성 시간
         """
+        fmt = request.query.get("format", "columns")
+        if fmt not in ("columns", "rows"):
+            return web.json_response({"status": "error", "message": "format은 columns 또는 rows여야 합니다."}, status=400)
+
         output_dir = folder_paths.get_output_directory()
         if not os.path.exists(output_dir):
             return web.json_response({"status": "error", "message": "Output directory not found"}, status=404)
-            
-        result = []
-        
+
         try:
-            folder_dict = {}
-            
-            for dirpath, dirnames, filenames in os.walk(output_dir):
-                rel_dir = os.path.relpath(dirpath, output_dir)
-                subfolder = "" if rel_dir == "." else rel_dir.replace("\\", "/")
-                display_folder = "📝 분류되지 않음 (Root)" if not subfolder else subfolder
-                
-                images_in_this_folder = []
-                
-                for f in filenames:
-                    if f.lower().endswith(('.png', '.jpg', '.jpeg', '.webp')):
-                        full_path = os.path.join(dirpath, f)
-                        if os.path.isfile(full_path):
-                            ctime = os.path.getctime(full_path)
-                            images_in_this_folder.append({
-                                "filename": f,
-                                "subfolder": subfolder,
-                                "url": f"/view?filename={f}&type=output&subfolder={subfolder}",
-                                "timestamp": ctime
-                            })
-                
-                if images_in_this_folder:
-                    images_in_this_folder.sort(key=lambda x: x["timestamp"], reverse=True)
-                    folder_dict[display_folder] = images_in_this_folder
-                    
-            sorted_folders = sorted(folder_dict.keys())
-            if "📝 분류되지 않음 (Root)" in sorted_folders:
-                sorted_folders.remove("📝 분류되지 않음 (Root)")
-                sorted_folders.insert(0, "📝 분류되지 않음 (Root)")
-                
-            for folder in sorted_folders:
-                result.append({
-                    "folder": folder,
-                    "images": folder_dict[folder]
-                })
-                    
+            if fmt == "rows":
+                return await cached_json(request, "gallery", refreshed_index_version,
+                                         lambda: {"status": "success", "gallery": get_gallery_index().get_gallery()})
+            return await cached_json(request, "gallery", refreshed_index_version,
+                                     lambda: get_gallery_index().get_gallery_json())
         except Exception as e:
             print(f"Error scanning output directory: {e}")
-            
-        return web.json_response({"status": "success", "gallery": result})
+        return web.json_response({"status": "success", "gallery": []})
+
+    @routes.get("/assetmanager/api/gallery/folders")
+    async def api_get_gallery_folders(request):
+        """
+        폴더 트리 구성에 필요한 폴더 목록과 폴더별 이미지 수만 반환.
+        이미지 목록은 /assetmanager/api/gallery/images에서 페이지 단위로 불러온다.
+        """
+        output_dir = folder_paths.get_output_directory()
+        if not os.path.exists(output_dir):
+            return web.json_response({"status": "error", "message": "Output directory not found"}, status=404)
+
+        def load_folders():
+            folders = get_gallery_index().get_folders()
+            return {"status": "success", "folders": folders, "total": sum(f["count"] for f in folders)}
+
+        try:
+            return await cached_json(request, "gallery", refreshed_index_version, load_folders)
+        except Exception as e:
+            return web.json_response({"status": "error", "message": str(e)}, status=500)
+
+    @routes.get("/assetmanager/api/gallery/images")
+    async def api_get_gallery_images(request):
+        """
+        폴더(하위 폴더 포함)의 이미지를 커서 기반으로 한 페이지씩 반환.
+        쿼리 파라미터:
+          - folder : 폴더 경로 (생략 시 전체, 루트 라벨이면 루트만)
+          - cursor : 직전 응답의 next_cursor
+          - limit  : 페이지 크기 (1~500, 기본 100)
+          - order  : newest(기본) / oldest / name
+        인덱스 갱신은 폴더 목록 요청에서 수행하므로 여기서는 조회만 한다.
+        """
+        folder = request.query.get("folder", "")
+        cursor = request.query.get("cursor") or None
+        order = request.query.get("order", "newest")
+        try:
+            limit = max(1, min(int(request.query.get("limit", 100)), 500))
+        except ValueError:
+            return web.json_response({"status": "error", "message": "Invalid limit"}, status=400)
+
+        def load_page():
+            images, next_cursor = get_gallery_index().get_images(folder, cursor, limit, order)
+            return {"status": "success", "images": images, "next_cursor": next_cursor}
+
+        try:
+            return await cached_json(request, "gallery", index_version, load_page)
+        except ValueError as e:
+            return web.json_response({"status": "error", "message": str(e)}, status=400)
+        except Exception as e:
+            return web.json_response({"status": "error", "message": str(e)}, status=500)
+
+    @routes.get("/assetmanager/api/gallery/search")
+    async def api_search_gallery(request):
+        """
+        메타데이터 인덱스에서 생성 파라미터로 이미지를 검색하여 한 페이지씩 반환.
+        쿼리 파라미터:
+          - q          : 프롬프트/모델 이름 전문 검색
+          - checkpoint : 체크포인트 이름
+          - lora       : 로라 이름 (여러 번 지정하면 모두 사용한 이미지)
+          - seed, sampler, folder, cursor, limit(1~500, 기본 100), order(newest/oldest)
+        아직 인덱싱되지 않은 이미지 수는 pending으로 함께 반환한다.
+        """
+        query = request.query
+        try:
+            limit = max(1, min(int(query.get("limit", 100)), 500))
+        except ValueError:
+            return web.json_response({"status": "error", "message": "Invalid limit"}, status=400)
+
+        def search():
+            index = metadata_indexer.get_index()
+            images, next_cursor = index.search(
+                q=query.get("q", ""),
+                checkpoint=query.get("checkpoint") or None,
+                loras=[l for l in query.getall("lora", []) if l],
+                seed=query.get("seed") or None,
+                sampler=query.get("sampler") or None,
+                folder=query.get("folder", ""),
+                cursor=query.get("cursor") or None,
+                limit=limit,
+                order=query.get("order", "newest")
+            )
+            return images, next_cursor, index.pending_count()
+
+        try:
+            images, next_cursor, pending = await run_io("search", search)
+        except ValueError as e:
+            return web.json_response({"status": "error", "message": str(e)}, status=400)
+        except Exception as e:
+            return web.json_response({"status": "error", "message": str(e)}, status=500)
+
+        return web.json_response({
+            "status": "success",
+            "images": images,
+            "next_cursor": next_cursor,
+            "pending": pending
+        })
+
+    @routes.get("/assetmanager/api/gallery/search/facets")
+    async def api_search_facets(request):
+        """검색 필터 구성을 위한 체크포인트/로라/샘플러 목록과 이미지 수를 반환"""
+        def load_facets():
+            return metadata_indexer.get_index().get_facets()
+
+        try:
+            facets = await run_io("search", load_facets)
+        except Exception as e:
+            return web.json_response({"status": "error", "message": str(e)}, status=500)
+
+        return web.json_response({"status": "success", **facets})
+
+    @routes.get("/assetmanager/api/gallery/duplicates")
+    async def api_gallery_duplicates(request):
+        """
+        지각 해시가 비슷한 이미지 묶음을 반환한다.
+          - threshold : 64비트 해시의 해밍 거리 상한 (기본 6, 0이면 같은 해시만)
+          - algorithm : phash(기본, 크기 변경/재압축에 강함) / dhash
+          - folder    : 폴더 (하위 폴더 포함)
+          - limit     : 반환할 묶음 수 (1~5000, 기본 500, 큰 묶음부터)
+        아직 해시를 계산하지 않은 이미지 수는 pending으로 함께 반환한다.
+        """
+        query = request.query
+        try:
+            threshold = int(query.get("threshold", DEFAULT_THRESHOLD))
+            limit = max(1, min(int(query.get("limit", 500)), 5000))
+        except ValueError:
+            return web.json_response({"status": "error", "message": "Invalid threshold or limit"}, status=400)
+
+        def find_duplicates():
+            index = image_hash_indexer.get_index()
+            clusters, total, hashed = index.find_duplicates(
+                threshold=threshold,
+                folder=query.get("folder", ""),
+                algorithm=query.get("algorithm", "phash"),
+                limit=limit
+            )
+            return clusters, total, hashed, index.pending_count()
+
+        try:
+            clusters, total, hashed, pending = await run_io("search", find_duplicates)
+        except ValueError as e:
+            return web.json_response({"status": "error", "message": str(e)}, status=400)
+        except Exception as e:
+            return web.json_response({"status": "error", "message": str(e)}, status=500)
+
+        return web.json_response({
+            "status": "success",
+            "clusters": clusters,
+            "total_clusters": total,
+            "hashed": hashed,
+            "pending": pending
+        })
 
     @routes.post("/assetmanager/api/delete_images")
     async def api_delete_images(request):
         """
-        지정된 이미지 파일들을 삭제한다.
+        지정된 이미지 파일들을 영구 삭제한다 (갤러리 화면은 휴지통 작업 /assetmanager/api/file_ops를 사용).
         보안: output 디렉토리 외부의 파일은 삭제할 수 없도록 경로를 정규화한다.
         """
         try:
@@ -140,29 +350,30 @@ def setup_gallery_api(routes):
             if not images_to_delete:
                 return web.json_response({"status": "error", "message": "No images provided for deletion"}, status=400)
                 
-            output_dir = folder_paths.get_output_directory()
-            deleted_count = 0
-            failed_count = 0
-            
-            for img in images_to_delete:
-                filename = img.get("filename", "")
-                subfolder = img.get("subfolder", "")
-                
-                target_path = os.path.join(output_dir, subfolder, filename) if subfolder else os.path.join(output_dir, filename)
-                
-                target_path = os.path.abspath(target_path)
-                output_dir_abs = os.path.abspath(output_dir)
-                
-                if target_path.startswith(output_dir_abs) and os.path.exists(target_path) and os.path.isfile(target_path):
+            output_dir = os.path.abspath(folder_paths.get_output_directory())
+
+            def delete_files():
+                deleted_count = 0
+                failed_count = 0
+                for img in images_to_delete:
+                    subfolder = img.get("subfolder", "")
+                    target_path = os.path.abspath(os.path.join(output_dir, subfolder, img.get("filename", "")))
+                    if not target_path.startswith(output_dir + os.sep):
+                        failed_count += 1
+                        continue
                     try:
                         os.remove(target_path)
                         deleted_count += 1
-                    except Exception as e:
+                    except OSError as e:
                         print(f"Failed to delete {target_path}: {e}")
                         failed_count += 1
-                else:
-                    failed_count += 1
-                    
+                return deleted_count, failed_count
+
+            deleted_count, failed_count = await run_io("files", delete_files)
+
+            if deleted_count:
+                gallery_watcher.notify_changed()
+
             return web.json_response({
                 "status": "success", 
                 "deleted": deleted_count,
@@ -171,6 +382,118 @@ def setup_gallery_api(routes):
         except Exception as e:
             return web.json_response({"status": "error", "message": str(e)}, status=500)
 
+    @routes.post("/assetmanager/api/file_ops")
+    async def api_submit_file_op(request):
+        """
+        일괄 파일 작업을 등록한다. 실제 처리는 백그라운드에서 진행되며 진행 상황은 assetmanager.fileops 이벤트로 온다.
+        요청 JSON:
+          - op        : trash(휴지통으로) / move(폴더 이동) / restore(휴지통 복원) / purge(영구 삭제)
+          - images    : trash/move 대상 [{filename, subfolder}]
+          - dest      : move 대상 폴더 (output 기준, 빈 문자열이면 루트)
+          - trash_ids : restore/purge 대상 휴지통 ID 목록 (purge는 ["*"]이면 전체)
+        """
+        try:
+            data = await request.json()
+            job = await file_ops.submit(data.get("op"), images=data.get("images"), dest=data.get("dest"),
+                                        trash_ids=data.get("trash_ids"))
+        except (ValueError, AttributeError) as e:
+            return web.json_response({"status": "error", "message": str(e)}, status=400)
+        return web.json_response({"status": "success", "job": job})
+
+    @routes.get("/assetmanager/api/file_ops")
+    async def api_list_file_ops(request):
+        """진행 중/최근 파일 작업 목록"""
+        return web.json_response({"status": "success", "jobs": file_ops.list_jobs()})
+
+    @routes.get("/assetmanager/api/file_ops/{job_id}")
+    async def api_get_file_op(request):
+        job = file_ops.get_job(route_info(request)["job_id"])
+        if job is None:
+            return web.json_response({"status": "error", "message": "Job not found"}, status=404)
+        return web.json_response({"status": "success", "job": job})
+
+    @routes.post("/assetmanager/api/file_ops/{job_id}/cancel")
+    async def api_cancel_file_op(request):
+        """작업 취소 (이미 처리한 파일은 그대로 둔다)"""
+        try:
+            job = file_ops.cancel(route_info(request)["job_id"])
+        except ValueError as e:
+            return web.json_response({"status": "error", "message": str(e)}, status=409)
+        if job is None:
+            return web.json_response({"status": "error", "message": "Job not found"}, status=404)
+        return web.json_response({"status": "success", "job": job})
+
+    @routes.get("/assetmanager/api/trash")
+    async def api_get_trash(request):
+        """휴지통 묶음 목록(최근 것부터)과 전체 개수/크기, 보관 정책"""
+        try:
+            return web.json_response({"status": "success", **await file_ops.trash_summary()})
+        except OSError as e:
+            return web.json_response({"status": "error", "message": str(e)}, status=500)
+
+    @routes.get("/assetmanager/api/archive")
+    async def api_get_archive(request):
+        """보관 정책, 누적 절약 바이트, 진행 중/최근 보관 작업"""
+        return web.json_response({"status": "success", **await output_archiver.summary()})
+
+    @routes.post("/assetmanager/api/archive")
+    async def api_submit_archive(request):
+        """
+        오래된 PNG 출력을 무손실 재인코딩하는 작업을 등록한다. 진행 상황은 assetmanager.archive 이벤트로 온다.
+        요청 JSON (모두 선택):
+          - folder       : output 기준 폴더 (min_age_days와 함께, 빈 문자열이면 루트)
+          - min_age_days : 이 일수보다 오래된 파일만 (생략하면 저장된 폴더별 정책 전체를 적용)
+          - format       : webp(무손실 WebP, 기본) / png(최대 압축 PNG로 다시 저장)
+          - dry_run      : true면 후보 수와 크기만 센다
+        """
+        try:
+            data = await request.json() if request.can_read_body else {}
+            job = await output_archiver.submit(data.get("folder"), data.get("min_age_days"), data.get("format"),
+                                               dry_run=bool(data.get("dry_run")))
+        except (ValueError, AttributeError) as e:
+            return web.json_response({"status": "error", "message": str(e)}, status=400)
+        return web.json_response({"status": "success", "job": job})
+
+    @routes.post("/assetmanager/api/archive/policy")
+    async def api_set_archive_policy(request):
+        """폴더 보관 정책 추가/변경. 요청 JSON: {folder, min_age_days, format, enabled}"""
+        try:
+            data = await request.json()
+            policy = await output_archiver.set_policy(data.get("folder"), data.get("min_age_days"), data.get("format"),
+                                                      data.get("enabled", True))
+        except (ValueError, AttributeError) as e:
+            return web.json_response({"status": "error", "message": str(e)}, status=400)
+        return web.json_response({"status": "success", "policy": policy})
+
+    @routes.delete("/assetmanager/api/archive/policy")
+    async def api_delete_archive_policy(request):
+        """폴더 보관 정책 삭제 (?folder=)"""
+        try:
+            deleted = await output_archiver.delete_policy(request.query.get("folder", ""))
+        except ValueError as e:
+            return web.json_response({"status": "error", "message": str(e)}, status=400)
+        if not deleted:
+            return web.json_response({"status": "error", "message": "Policy not found"}, status=404)
+        return web.json_response({"status": "success"})
+
+    @routes.get("/assetmanager/api/archive/{job_id}")
+    async def api_get_archive_job(request):
+        job = output_archiver.get_job(route_info(request)["job_id"])
+        if job is None:
+            return web.json_response({"status": "error", "message": "Job not found"}, status=404)
+        return web.json_response({"status": "success", "job": job})
+
+    @routes.post("/assetmanager/api/archive/{job_id}/cancel")
+    async def api_cancel_archive_job(request):
+        """보관 작업 취소 (이미 바꾼 파일은 그대로 둔다)"""
+        try:
+            job = output_archiver.cancel(route_info(request)["job_id"])
+        except ValueError as e:
+            return web.json_response({"status": "error", "message": str(e)}, status=409)
+        if job is None:
+            return web.json_response({"status": "error", "message": "Job not found"}, status=404)
+        return web.json_response({"status": "success", "job": job})
+
     @routes.get("/assetmanager/api/view_image")
     async def api_view_image(request):
         """
@@ -178,7 +501,7 @@ def setup_gallery_api(routes):
         보안: 이미지 확장자(.png, .jpg 등)만 허용한다.
         """
         img_path = request.query.get("path", "")
-        if not img_path or not os.path.exists(img_path):
+        if not img_path or not await run_io("view", os.path.exists, img_path):
             return web.Response(status=404, text="Image not found")
             
         ext = os.path.splitext(img_path)[1].lower()
@@ -0,0 +1,512 @@
+"""
+api/gallery_index.py — 갤러리 영구 인덱스 (SQLite)
+ComfyUI output 폴더의 이미지 목록을 web/data/gallery_index.db에 보관하고,
+디렉토리 mtime을 비교하여 변경된 폴더만 다시 스캔하는 증분 갱신을 수행합니다.
+변경이 없는 폴더는 stat 한 번으로 건너뛰므로, 이미지가 수십만 장이어도
+갤러리 로딩은 인덱스 조회만으로 끝납니다.
+전체 목록은 이미지마다 dict를 만들지 않도록 열(column) 기반 스냅샷(GalleryColumns)으로 보관하며,
+응답에는 이미지별 URL 대신 URL 템플릿 하나만 담습니다.
+"""
+
+import os
+import json
+import time
+import base64
+import sqlite3
+import threading
+from array import array
+import folder_paths
+
+from .metrics import count_files, count_cache
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp')
+ROOT_FOLDER_LABEL = "📝 분류되지 않음 (Root)"
+# 원본 이미지 URL 템플릿. 클라이언트가 {filename}/{subfolder}를 URL 인코딩하여 채운다.
+VIEW_URL_TEMPLATE = "/view?filename={filename}&type=output&subfolder={subfolder}"
+
+# 방금 수정된 디렉토리는 mtime 해상도(FAT 2초 등) 안에서 추가 변경이 누락될 수 있으므로
+# 이 시간 안에 수정된 디렉토리는 mtime을 기록하지 않고 다음 갱신 때 다시 스캔한다.
+_MTIME_SETTLE_SECONDS = 2.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS dirs (
+    subfolder TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS images (
+    subfolder TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    timestamp REAL NOT NULL,
+    PRIMARY KEY (subfolder, filename)
+);
+CREATE INDEX IF NOT EXISTS idx_images_timestamp ON images (timestamp);
+CREATE INDEX IF NOT EXISTS idx_images_folder_timestamp ON images (subfolder, timestamp);
+CREATE INDEX IF NOT EXISTS idx_images_filename ON images (filename);
+"""
+
+# 정렬 순서별 (ORDER BY 절, 커서 비교 연산자, 커서 컬럼)
+_SORT_ORDERS = {
+    "newest": ("timestamp DESC, subfolder DESC, filename DESC", "<", ("timestamp", "subfolder", "filename")),
+    "oldest": ("timestamp ASC, subfolder ASC, filename ASC", ">", ("timestamp", "subfolder", "filename")),
+    "name": ("filename ASC, subfolder ASC", ">", ("filename", "subfolder")),
+}
+
+
+def _parent_of(subfolder):
+    """서브폴더 경로의 부모 경로를 반환. 루트("")의 부모는 None."""
+    if not subfolder:
+        return None
+    return subfolder.rpartition("/")[0]
+
+
+def encode_cursor(values):
+    """페이지 커서(마지막 행의 정렬 키)를 URL-safe 문자열로 인코딩"""
+    raw = json.dumps(values, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    """encode_cursor로 만든 커서를 정렬 키 리스트로 복원. 잘못된 커서는 ValueError."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8"))
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {e}")
+    if not isinstance(values, list):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def folder_filter(folder):
+    """
+    프론트엔드 폴더 경로를 SQL WHERE 절로 변환.
+    - None/"" : 전체 이미지
+    - 루트 라벨 : 루트 폴더 이미지만
+    - 그 외 : 해당 폴더와 모든 하위 폴더 (상위 폴더 선택 시 병합 조회)
+    하위 폴더 조건은 LIKE 대신 범위 비교를 사용하여 인덱스를 타고 와일드카드 문자도 안전하다.
+    """
+    if not folder:
+        return "", ()
+    if folder == ROOT_FOLDER_LABEL:
+        return "subfolder = ?", ("",)
+    folder = folder.replace("\\", "/").strip("/")
+    return "(subfolder = ? OR (subfolder >= ? AND subfolder < ?))", (folder, folder + "/", folder + "0")
+
+
+class GalleryColumns:
+    """
+    갤러리 전체 목록의 열 기반 스냅샷 (만든 뒤에는 바뀌지 않으므로 잠금 없이 읽는다).
+      - folders       : 서브폴더 문자열 표 (폴더마다 한 번만 보관, 루트 ""가 맨 앞)
+      - folder_starts : 폴더별 첫 이미지 위치 (이미지는 폴더 순, 폴더 안에서는 최신순으로 연속 배치)
+      - names         : 파일명을 NUL로 구분하여 이어 붙인 UTF-8 바이트, name_offsets는 각 파일명의 시작 위치
+      - timestamps / sizes : 이미지별 생성 시간과 파일 크기 병렬 배열
+    이미지 100만 장 기준 수십 MB로, 이미지마다 dict와 URL 문자열을 만드는 것보다 10배 이상 작다.
+    """
+
+    __slots__ = ("generation", "folders", "folder_starts", "names", "name_offsets", "timestamps", "sizes")
+
+    def __init__(self, generation, rows):
+        """rows: (subfolder, filename, timestamp, size)를 폴더 순 → 최신순으로 내는 반복자 (SQLite 커서)"""
+        self.generation = generation
+        self.folders = []
+        self.folder_starts = array("q")
+        self.name_offsets = array("q", [0])
+        self.timestamps = array("d")
+        self.sizes = array("q")
+        names = bytearray()
+        current = None
+        for subfolder, filename, timestamp, size in rows:
+            if subfolder != current:
+                current = subfolder
+                self.folders.append(subfolder)
+                self.folder_starts.append(len(self.timestamps))
+            names += filename.encode("utf-8", "surrogatepass")
+            names += b"\0"
+            self.name_offsets.append(len(names))
+            self.timestamps.append(timestamp)
+            self.sizes.append(size)
+        self.folder_starts.append(len(self.timestamps))
+        self.names = bytes(names)
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def folder_range(self, k):
+        """k번째 폴더의 이미지 구간 (start, end)"""
+        return self.folder_starts[k], self.folder_starts[k + 1]
+
+    def filenames(self, start, end):
+        """구간의 파일명 목록 (바이트 한 조각을 한 번에 디코딩하여 나눈다)"""
+        if end <= start:
+            return []
+        chunk = self.names[self.name_offsets[start]:self.name_offsets[end] - 1]
+        return chunk.decode("utf-8", "surrogatepass").split("\0")
+
+    def to_json(self):
+        """
+        열 형식 갤러리 응답을 JSON 바이트로 직렬화한다. 폴더마다 파일명/시간 배열을 통째로 인코딩하므로
+        이미지 수만큼의 dict와 URL 문자열을 만들지 않는다.
+        {"status", "format": "columns", "url_template", "gallery": [{"folder", "subfolder", "filenames", "timestamps"}]}
+        """
+        parts = [b'{"status":"success","format":"columns","url_template":', json.dumps(VIEW_URL_TEMPLATE).encode(), b',"gallery":[']
+        for k, subfolder in enumerate(self.folders):
+            start, end = self.folder_range(k)
+            parts.append(("%s{\"folder\":%s,\"subfolder\":%s,\"filenames\":%s,\"timestamps\":%s}" % (
+                "," if k else "",
+                json.dumps(subfolder or ROOT_FOLDER_LABEL),
+                json.dumps(subfolder),
+                json.dumps(self.filenames(start, end)),
+                json.dumps(self.timestamps[start:end].tolist()),
+            )).encode("utf-8"))
+        parts.append(b"]}")
+        return b"".join(parts)
+
+
+class GalleryIndex:
+    """
+    output 폴더의 영구 이미지 인덱스.
+    모든 메서드는 스레드 안전하며 블로킹 I/O를 수행하므로
+    aiohttp 핸들러에서는 executor를 통해 호출해야 한다.
+    """
+
+    def __init__(self, db_path, root_dir):
+        self.db_path = db_path
+        self.root_dir = os.path.abspath(root_dir)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        # 이미지 행이 바뀔 때마다 증가 (응답 ETag용, http_cache.py)
+        self.generation = 0
+        # 커밋까지 끝난 세대. 같은 DB를 다른 연결로 읽는 인덱스(메타데이터/해시)가 집계 캐시 키로 쓴다
+        self.committed_generation = 0
+        self._columns = None
+        self._check_root()
+
+    def _check_root(self):
+        """인덱스가 다른 output 경로에서 만들어졌다면 내용을 비운다."""
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'root_dir'").fetchone()
+        if row and row[0] == self.root_dir:
+            return
+        with self._conn:
+            self._conn.execute("DELETE FROM images")
+            self._conn.execute("DELETE FROM dirs")
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('root_dir', ?)", (self.root_dir,))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # ──────────────────────────────────────────────
+    # 증분 갱신
+    # ──────────────────────────────────────────────
+
+    def refresh(self):
+        """
+        디렉토리 트리를 mtime 기준으로 증분 갱신한다.
+        mtime이 그대로인 폴더는 인덱스에 기록된 하위 폴더 목록만 따라 내려가고,
+        mtime이 바뀐 폴더만 scandir로 다시 읽는다.
+        반환값: {"added": [(subfolder, filename, timestamp), ...], "removed": [(subfolder, filename), ...],
+                 "initial": 처음 만드는(빈 인덱스, output 경로 변경) 갱신인지}
+        """
+        with self._lock:
+            known_dirs = dict(self._conn.execute("SELECT subfolder, mtime_ns FROM dirs"))
+            children = {}
+            for sub in known_dirs:
+                parent = _parent_of(sub)
+                if parent is not None:
+                    children.setdefault(parent, []).append(sub)
+
+            changes = {"added": [], "removed": [], "initial": not known_dirs}
+            seen_dirs = set()
+            stack = [""]
+            now = time.time()
+            rescanned = 0
+
+            with self._conn:
+                while stack:
+                    sub = stack.pop()
+                    abs_dir = os.path.join(self.root_dir, sub) if sub else self.root_dir
+                    try:
+                        dir_mtime_ns = os.stat(abs_dir).st_mtime_ns
+                    except OSError:
+                        continue
+                    seen_dirs.add(sub)
+
+                    if known_dirs.get(sub) == dir_mtime_ns:
+                        stack.extend(children.get(sub, []))
+                        continue
+
+                    rescanned += 1
+                    subdirs = self._rescan_dir(sub, abs_dir, changes)
+                    stack.extend(subdirs)
+
+                    recorded = -1 if now - dir_mtime_ns / 1e9 < _MTIME_SETTLE_SECONDS else dir_mtime_ns
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO dirs (subfolder, mtime_ns) VALUES (?, ?)",
+                        (sub, recorded)
+                    )
+
+                for sub in set(known_dirs) - seen_dirs:
+                    self._drop_dir(sub, changes)
+            self.committed_generation = self.generation
+
+            count_files("stat", len(seen_dirs))
+            count_cache("gallery_dirs", True, len(seen_dirs) - rescanned)
+            count_cache("gallery_dirs", False, rescanned)
+            return changes
+
+    def _rescan_dir(self, sub, abs_dir, changes):
+        """단일 폴더를 scandir로 읽어 인덱스 행을 갱신하고, 하위 폴더 목록을 반환한다."""
+        indexed = {
+            row[0]: (row[1], row[2])
+            for row in self._conn.execute(
+                "SELECT filename, mtime_ns, size FROM images WHERE subfolder = ?", (sub,)
+            )
+        }
+        subdirs = []
+        present = set()
+        upserts = []
+        listed = stated = 0
+
+        try:
+            with os.scandir(abs_dir) as it:
+                for entry in it:
+                    listed += 1
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if not entry.name.startswith('.'):
+                                subdirs.append(f"{sub}/{entry.name}" if sub else entry.name)
+                            continue
+                        if not entry.name.lower().endswith(IMAGE_EXTENSIONS) or not entry.is_file():
+                            continue
+                        stated += 1
+                        st = entry.stat()
+                    except OSError:
+                        continue
+
+                    present.add(entry.name)
+                    previous = indexed.get(entry.name)
+                    if previous == (st.st_mtime_ns, st.st_size):
+                        continue
+                    # 생성 시간. 보관 재인코딩처럼 수정 시각을 옮겨 받은 파일은 ctime이 새로 바뀌므로 더 이른 쪽을 쓴다
+                    timestamp = min(st.st_ctime, st.st_mtime)
+                    if previous is None:
+                        changes["added"].append((sub, entry.name, timestamp))
+                    upserts.append((sub, entry.name, st.st_mtime_ns, st.st_size, timestamp))
+        except OSError as e:
+            print(f"[ComfyUI-AssetManager] 갤러리 인덱스 스캔 실패 ({abs_dir}): {e}")
+            return subdirs
+        finally:
+            count_files("listed", listed)
+            count_files("stat", stated)
+
+        missing = [name for name in indexed if name not in present]
+        if upserts or missing:
+            self.generation += 1
+        if upserts:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO images (subfolder, filename, mtime_ns, size, timestamp) VALUES (?, ?, ?, ?, ?)",
+                upserts
+            )
+        if missing:
+            self._conn.executemany(
+                "DELETE FROM images WHERE subfolder = ? AND filename = ?",
+                [(sub, name) for name in missing]
+            )
+            changes["removed"].extend((sub, name) for name in missing)
+
+        return subdirs
+
+    def _drop_dir(self, sub, changes):
+        """사라진 폴더의 인덱스 행을 제거한다."""
+        removed = self._conn.execute("SELECT filename FROM images WHERE subfolder = ?", (sub,)).fetchall()
+        changes["removed"].extend((sub, row[0]) for row in removed)
+        self.generation += 1
+        self._conn.execute("DELETE FROM images WHERE subfolder = ?", (sub,))
+        self._conn.execute("DELETE FROM dirs WHERE subfolder = ?", (sub,))
+
+    # ──────────────────────────────────────────────
+    # 조회
+    # ──────────────────────────────────────────────
+
+    def get_columns(self):
+        """현재 세대의 열 기반 전체 목록 스냅샷 (이미지 행이 바뀌었을 때만 다시 만든다)."""
+        with self._lock:
+            columns = self._columns
+            count_cache("gallery_columns", columns is not None and columns.generation == self.generation)
+            if columns is None or columns.generation != self.generation:
+                cursor = self._conn.execute(
+                    "SELECT subfolder, filename, timestamp, size FROM images ORDER BY subfolder, timestamp DESC"
+                )
+                columns = self._columns = GalleryColumns(self.generation, cursor)
+            return columns
+
+    def get_gallery_json(self):
+        """/assetmanager/api/gallery 열 형식 응답 (JSON 바이트). 폴더 순서는 루트가 맨 앞, 나머지는 이름순."""
+        return self.get_columns().to_json()
+
+    def get_gallery(self):
+        """
+        이전 형식(format=rows)의 폴더별 이미지 목록. 이미지마다 url을 포함한다.
+        폴더명 알파벳 순으로 정렬하되 루트 폴더를 맨 앞에 둔다.
+        """
+        columns = self.get_columns()
+        gallery = []
+        for k, subfolder in enumerate(columns.folders):
+            start, end = columns.folder_range(k)
+            gallery.append({"folder": subfolder or ROOT_FOLDER_LABEL, "images": [{
+                "filename": filename,
+                "subfolder": subfolder,
+                "url": VIEW_URL_TEMPLATE.format(filename=filename, subfolder=subfolder),
+                "timestamp": timestamp
+            } for filename, timestamp in zip(columns.filenames(start, end), columns.timestamps[start:end])]})
+        return gallery
+
+    def get_folders(self):
+        """
+        폴더 목록과 폴더별 이미지 수만 반환 (이미지 목록 없음).
+        정렬 규칙은 get_gallery와 같다.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT subfolder, COUNT(*) FROM images GROUP BY subfolder ORDER BY subfolder"
+            ).fetchall()
+
+        folders = [
+            {"folder": subfolder or ROOT_FOLDER_LABEL, "subfolder": subfolder, "count": count}
+            for subfolder, count in rows
+        ]
+        folders.sort(key=lambda f: (f["subfolder"] != "", f["folder"]))
+        return folders
+
+    def get_images(self, folder=None, cursor=None, limit=100, order="newest"):
+        """
+        폴더(하위 포함)의 이미지를 정렬 순서대로 한 페이지 반환.
+        커서는 직전 페이지 마지막 행의 정렬 키이며, 키셋 페이지네이션으로
+        OFFSET 없이 인덱스에서 바로 다음 페이지를 읽는다.
+        반환값: (이미지 목록, 다음 페이지 커서 또는 None)
+        """
+        if order not in _SORT_ORDERS:
+            raise ValueError(f"Unknown order: {order}")
+        order_by, op, key_columns = _SORT_ORDERS[order]
+
+        where, params = folder_filter(folder)
+        clauses = [where] if where else []
+        params = list(params)
+        if cursor:
+            values = decode_cursor(cursor)
+            if len(values) != len(key_columns):
+                raise ValueError("Invalid cursor")
+            clauses.append(f"({', '.join(key_columns)}) {op} ({', '.join('?' * len(key_columns))})")
+            params.extend(values)
+
+        sql = "SELECT subfolder, filename, timestamp FROM images"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += f" ORDER BY {order_by} LIMIT ?"
+        params.append(limit + 1)
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        images = [{
+            "filename": filename,
+            "subfolder": subfolder,
+            "timestamp": timestamp
+        } for subfolder, filename, timestamp in rows]
+
+        next_cursor = None
+        if has_more and rows:
+            last = {"subfolder": rows[-1][0], "filename": rows[-1][1], "timestamp": rows[-1][2]}
+            next_cursor = encode_cursor([last[col] for col in key_columns])
+        return images, next_cursor
+
+
+_DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "web", "data")
+_instance = None
+_instance_lock = threading.Lock()
+
+
+def get_gallery_index():
+    """
+    현재 output 디렉토리에 대한 GalleryIndex 싱글턴을 반환.
+    output 경로가 바뀌었다면 인덱스를 새로 연다.
+    """
+    global _instance
+    output_dir = os.path.abspath(folder_paths.get_output_directory())
+    with _instance_lock:
+        if _instance is None or _instance.root_dir != output_dir:
+            if _instance is not None:
+                _instance.close()
+            os.makedirs(_DATA_DIR, exist_ok=True)
+            _instance = GalleryIndex(os.path.join(_DATA_DIR, "gallery_index.db"), output_dir)
+        return _instance
+
+
+class AttachedIndex:
+    """
+    갤러리 인덱스 DB에 별도 연결로 자기 테이블(SCHEMA)을 두고 images 테이블과 JOIN하는 부가 인덱스의 공통 부분
+    (메타데이터, 지각 해시, 보관 결과). 모든 메서드는 스레드 안전하며 블로킹 I/O를 수행한다.
+    PENDING_SQL이 있으면 pending_count()가 처리 대기 수를 갤러리 세대별로 캐시한다.
+    """
+
+    SCHEMA = ""
+    PENDING_SQL = None
+
+    def __init__(self, db_path, root_dir):
+        self.db_path = db_path
+        self.root_dir = root_dir
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+        # (갤러리 인덱스 세대, 처리 대기 수)
+        self._pending = None
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def pending_count(self):
+        """
+        아직 처리하지 않았거나 수정된 이미지 수.
+        전체 JOIN은 갤러리 인덱스가 바뀌었을 때만 다시 세고, 그 사이에는 처리한 만큼 빼서 쓴다.
+        """
+        generation = get_gallery_index().committed_generation
+        with self._lock:
+            if self._pending is None or self._pending[0] != generation:
+                self._pending = (generation, self._conn.execute(self.PENDING_SQL).fetchone()[0])
+            return self._pending[1]
+
+    def _consume_pending(self, n):
+        """처리한 이미지 수만큼 대기 수 캐시를 줄인다 (self._lock 안에서 호출)."""
+        if self._pending is not None:
+            self._pending = (self._pending[0], max(0, self._pending[1] - n))
+
+
+class AttachedIndexHandle:
+    """현재 갤러리 인덱스 DB에 대한 부가 인덱스 하나를 열어 두고, output 경로가 바뀌면 새로 연다."""
+
+    def __init__(self, index_class):
+        self._index_class = index_class
+        self._index = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        gallery = get_gallery_index()
+        with self._lock:
+            if self._index is None or self._index.db_path != gallery.db_path or self._index.root_dir != gallery.root_dir:
+                if self._index is not None:
+                    self._index.close()
+                self._index = self._index_class(gallery.db_path, gallery.root_dir)
+            return self._index
@@ -0,0 +1,189 @@
+"""
+api/gallery_watcher.py — output 폴더 감시 및 갤러리 변경 푸시
+백그라운드 스레드에서 갤러리 인덱스를 최신 상태로 유지하고,
+추가/삭제/이동된 이미지를 ComfyUI 웹소켓(assetmanager.gallery 이벤트)으로 전송합니다.
+watchdog 패키지가 설치되어 있으면 OS 파일 시스템 알림(inotify 등)을 사용하고,
+없으면 일정 간격으로 디렉토리 mtime만 확인하는 폴링 방식으로 동작합니다.
+"""
+
+import os
+import threading
+import contextlib
+import folder_paths
+from server import PromptServer
+
+from .gallery_index import get_gallery_index, IMAGE_EXTENSIONS
+from .metadata_index import metadata_indexer
+from .image_hashes import image_hash_indexer
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+
+GALLERY_EVENT = "assetmanager.gallery"
+POLL_INTERVAL_SECONDS = 2.0
+# 파일 시스템 알림이 연속으로 들어올 때 한 번에 모아서 처리하기 위한 대기 시간
+DEBOUNCE_SECONDS = 0.5
+# 알림 누락(네트워크 드라이브 등)에 대비한 알림 모드의 안전 폴링 간격
+SAFETY_POLL_SECONDS = 30.0
+# 변경분이 이보다 많으면 목록 대신 reset 이벤트를 보내 클라이언트가 폴더 목록부터 다시 불러오게 한다
+MAX_DELTA_ITEMS = 500
+
+
+def build_gallery_delta(changes):
+    """
+    인덱스 갱신 결과를 웹소켓 페이로드로 변환.
+    같은 파일명이 한쪽에서 사라지고 다른 폴더에 나타나면 이동(moved)으로 묶는다.
+    """
+    removed_by_name = {}
+    for subfolder, filename in changes["removed"]:
+        removed_by_name.setdefault(filename, []).append(subfolder)
+
+    added = []
+    moved = []
+    for subfolder, filename, timestamp in changes["added"]:
+        item = {
+            "filename": filename,
+            "subfolder": subfolder,
+            "timestamp": timestamp
+        }
+        sources = removed_by_name.get(filename)
+        if sources:
+            moved.append({"from": {"filename": filename, "subfolder": sources.pop()}, "to": item})
+        else:
+            added.append(item)
+
+    removed = [
+        {"filename": filename, "subfolder": subfolder}
+        for filename, subfolders in removed_by_name.items()
+        for subfolder in subfolders
+    ]
+    return {"added": added, "removed": removed, "moved": moved}
+
+
+class _ChangeHandler(FileSystemEventHandler):
+    """watchdog 이벤트 중 이미지/폴더 변경만 골라 감시 스레드를 깨운다."""
+
+    def __init__(self, watcher):
+        self.watcher = watcher
+
+    def on_any_event(self, event):
+        paths = [getattr(event, "src_path", ""), getattr(event, "dest_path", "")]
+        if event.is_directory or any(str(p).lower().endswith(IMAGE_EXTENSIONS) for p in paths if p):
+            self.watcher.notify_changed()
+
+
+class GalleryWatcher:
+    """
+    갤러리 인덱스를 백그라운드에서 갱신하고 변경분을 브로드캐스트하는 감시자.
+    인덱스 갱신 자체는 디렉토리 mtime 기반 증분 스캔이므로, 알림 모드든 폴링 모드든
+    변경된 폴더만 다시 읽는다.
+    """
+
+    def __init__(self, poll_interval=POLL_INTERVAL_SECONDS):
+        self.poll_interval = poll_interval
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._observer = None
+        self._holds = 0
+        self.mode = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._start_observer()
+        self._thread = threading.Thread(target=self._run, name="am-gallery-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+        if self._observer:
+            self._observer.stop()
+
+    def notify_changed(self):
+        """즉시 인덱스를 갱신하도록 감시 스레드를 깨운다 (삭제 API 등에서 호출)."""
+        self._wakeup.set()
+
+    @contextlib.contextmanager
+    def paused(self):
+        """
+        블록 동안 감시 스레드의 갱신/전송을 멈춘다 (이벤트 루프에서 사용).
+        많은 파일을 옮기는 작업이 중간 변경분마다 reset을 보내지 않도록, 작업이 끝난 뒤 호출한 쪽에서 한 번 갱신한다.
+        """
+        self._holds += 1
+        try:
+            yield
+        finally:
+            self._holds -= 1
+
+    def _start_observer(self):
+        """watchdog이 있으면 OS 알림 기반 감시를 시작하고, 실패하면 폴링으로 대체한다."""
+        self.mode = "polling"
+        if Observer is None:
+            return
+        output_dir = folder_paths.get_output_directory()
+        if not os.path.isdir(output_dir):
+            return
+        try:
+            observer = Observer()
+            observer.daemon = True
+            observer.schedule(_ChangeHandler(self), output_dir, recursive=True)
+            observer.start()
+            self._observer = observer
+            self.mode = "notify"
+        except Exception as e:
+            print(f"[ComfyUI-AssetManager] 파일 시스템 알림 감시 실패, 폴링으로 대체: {e}")
+
+    def _run(self):
+        timeout = SAFETY_POLL_SECONDS if self.mode == "notify" else self.poll_interval
+        while not self._stop.is_set():
+            triggered = self._wakeup.wait(timeout)
+            if self._stop.is_set():
+                break
+            if triggered:
+                # 연속 이벤트(배치 저장 등)를 모아서 한 번만 갱신
+                self._stop.wait(DEBOUNCE_SECONDS)
+                self._wakeup.clear()
+            if self._holds:
+                # 파일 작업 중: 작업이 끝나면 작업 쪽에서 변경분을 한 번에 보낸다
+                continue
+            self.refresh_and_broadcast()
+
+    def refresh_and_broadcast(self):
+        """
+        인덱스를 증분 갱신하고 변경분이 있으면 웹소켓으로 전송한다.
+        변경분이 크면(첫 인덱싱 포함) {"reset": true}만 보내고 클라이언트가 /gallery/folders부터 다시 불러온다.
+        """
+        if not os.path.isdir(folder_paths.get_output_directory()):
+            return None
+        try:
+            changes = get_gallery_index().refresh()
+        except Exception as e:
+            print(f"[ComfyUI-AssetManager] 갤러리 감시 갱신 실패: {e}")
+            return None
+
+        if not changes["added"] and not changes["removed"]:
+            return None
+
+        metadata_indexer.notify()
+        image_hash_indexer.notify()
+
+        delta = build_gallery_delta(changes)
+        # 첫 인덱싱(빈 DB, output 경로 변경)은 트리 전체가 added로 나오므로 모든 클라이언트에 목록을 보내지 않는다
+        if changes.get("initial") or len(changes["added"]) + len(changes["removed"]) > MAX_DELTA_ITEMS:
+            payload = {"reset": True}
+        else:
+            payload = delta
+        try:
+            PromptServer.instance.send_sync(GALLERY_EVENT, payload)
+        except Exception as e:
+            print(f"[ComfyUI-AssetManager] 갤러리 변경 전송 실패: {e}")
+        return delta
+
+
+gallery_watcher = GalleryWatcher()
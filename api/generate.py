@@ -1,23 +1,263 @@
 """
-api/generate.py — 워크플로우 템플릿 API
-프론트엔드 이미지 생성에 사용되는 워크플로우 JSON 파일을 제공합니다.
+api/generate.py — 워크플로우 템플릿 / 배치 생성 API
+워크플로우 템플릿(TemplateRegistry)을 제공하고, 생성 설정으로 바로 보낼 수 있는 /prompt 본문을 조립하며,
+대기열 전체를 서버에서 이어서 생성하는 배치 작업(BatchScheduler)을 관리합니다.
+단독 검열 도구의 일괄 처리도 같은 스케줄러의 검열 배치로 실행하고, 결과를 ZIP으로 내려받습니다.
 """
 
 import os
 import json
+import time
+import folder_paths
 from aiohttp import web
 
+from .executors import run_io
+from .batch_scheduler import BatchScheduler
+from .prompt_builder import build_prompt, random_seed
+from .workflow_templates import TemplateRegistry, DEFAULT_TEMPLATE
+from .zip_stream import build_zip_entries, stream_zip
+from .startup import on_server_start, route_info
+
+# 검열 배치용 업로드 파일을 두는 input 하위 폴더
+CENSOR_UPLOAD_SUBFOLDER = "AssetManager_Censor"
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# 찾을 수 없는 경로 오류 메시지에 나열하는 최대 개수
+MAX_MISSING_SHOWN = 10
+
 
 def setup_generate_api(routes, data_dir):
-    """워크플로우 관련 API 라우트를 등록한다."""
+    """워크플로우 및 배치 생성 관련 API 라우트를 등록한다."""
+
+    templates = TemplateRegistry(data_dir)
+    scheduler = BatchScheduler(os.path.join(data_dir, "batch_jobs.json"))
+
+    def template_not_found(name):
+        return web.json_response({"status": "error", "message": f"Workflow template not found: {name}"}, status=404)
+
+    async def discard_uploads(paths):
+        for path in paths:
+            try:
+                await run_io("upload", os.remove, path)
+            except OSError:
+                pass
+
+    async def start_scheduler(app):
+        # 서버 시작 시 저장된 배치가 있으면 이어서 진행한다
+        await scheduler.start()
+
+    on_server_start(start_scheduler)
 
     @routes.get("/assetmanager/api/workflow")
     async def api_get_workflow(request):
-        """data/workflow.json 파일을 읽어 워크플로우 구조를 반환"""
-        workflow_path = os.path.join(data_dir, "workflow.json")
-        if os.path.exists(workflow_path):
-            with open(workflow_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            return web.json_response({"status": "success", "workflow": data})
-        else:
-            return web.json_response({"status": "error", "message": "workflow.json not found in web/data/"}, status=404)
+        """워크플로우 템플릿 구조를 반환 (?name=, 기본 data/workflow.json). 파일이 바뀌지 않았으면 캐시된 본문을 보낸다."""
+        name = request.query.get("name") or DEFAULT_TEMPLATE
+        try:
+            template = await run_io("workflow", templates.get, name)
+        except ValueError as e:
+            return web.json_response({"status": "error", "message": str(e)}, status=500)
+        if template is None:
+            return template_not_found(name)
+        return web.Response(body=template.response_body, content_type="application/json")
+
+    @routes.get("/assetmanager/api/workflows")
+    async def api_list_workflows(request):
+        """템플릿 목록과 각 템플릿의 주입 지점(노드 ID) / 사용 가능한 후처리 단계"""
+        return web.json_response({"status": "success", "templates": await run_io("workflow", templates.list)})
+
+    @routes.post("/assetmanager/api/workflow/build")
+    async def api_build_workflow(request):
+        """
+        생성 설정으로 ComfyUI /prompt에 그대로 보낼 본문을 만든다.
+        요청 본문: {template, settings(생성 설정), positive, negative, filename_prefix, seed, client_id}
+        응답: {payload: {prompt, client_id}, seed(실제 사용한 시드), titles(노드 ID → 제목)}
+        """
+        try:
+            data = await request.json()
+            name = data.get("template") or DEFAULT_TEMPLATE
+            settings = data.get("settings") or {}
+            seed = data.get("seed")
+            if seed is None:
+                seed = settings.get("seed")
+            if seed is None:
+                seed = random_seed()
+            seed = int(seed)
+
+            def build():
+                template = templates.get(name)
+                if template is None:
+                    return None
+                return build_prompt(template.graph, settings, data.get("positive") or "", data.get("negative") or "",
+                                    data.get("filename_prefix") or "AssetManager_Output", seed)
+
+            prompt = await run_io("workflow", build)
+            if prompt is None:
+                return template_not_found(name)
+        except (ValueError, TypeError, AttributeError) as e:
+            return web.json_response({"status": "error", "message": str(e)}, status=400)
+        except Exception as e:
+            return web.json_response({"status": "error", "message": str(e)}, status=500)
+
+        payload = {"prompt": prompt}
+        if data.get("client_id"):
+            payload["client_id"] = data["client_id"]
+        titles = {node_id: node["_meta"]["title"] for node_id, node in prompt.items()
+                  if isinstance(node.get("_meta"), dict) and node["_meta"].get("title")}
+        return web.json_response({"status": "success", "payload": payload, "seed": seed, "titles": titles})
+
+    @routes.post("/assetmanager/api/batch")
+    async def api_create_batch(request):
+        """
+        대기열 작업 목록으로 배치를 만들고 바로 생성을 시작한다.
+        요청 본문: {jobs: [{labels, fullPrompt, repeatCount}], path_template, base_positive, base_negative,
+                   settings(생성 설정), template, depth(ComfyUI 큐에 유지할 작업 수), client_id, name}
+        """
+        try:
+            payload = await request.json()
+            name = payload.get("template") or DEFAULT_TEMPLATE
+            template = await run_io("workflow", templates.get, name)
+            if template is None:
+                return template_not_found(name)
+            await scheduler.start()
+            batch = await scheduler.create_batch(payload, template.graph)
+            return web.json_response({"status": "success", "batch": batch})
+        except ValueError as e:
+            return web.json_response({"status": "error", "message": str(e)}, status=400)
+        except Exception as e:
+            return web.json_response({"status": "error", "message": str(e)}, status=500)
+
+    @routes.get("/assetmanager/api/batch")
+    async def api_list_batches(request):
+        """진행 중/최근 배치 요약 목록을 반환"""
+        await scheduler.start()
+        return web.json_response({"status": "success", "batches": scheduler.list_batches()})
+
+    @routes.post("/assetmanager/api/censor/batch")
+    async def api_create_censor_batch(request):
+        """
+        여러 이미지를 검열 파이프라인에 한꺼번에 넣는다 (진행 상황은 배치 API / assetmanager.batch 이벤트).
+        JSON 요청   : {paths: [output 기준 상대 경로], censor: {labels, mode, intensity}, depth, client_id, name}
+        multipart   : "payload" 필드(위 JSON) + 이미지 파일들. 파일은 input/AssetManager_Censor/에 저장된다.
+        output 폴더의 파일은 업로드하지 않고 LoadImage가 "[output]" 경로로 직접 읽는다.
+        paths 중 output 안에 없는 파일이 있으면 항목 순서가 어긋나지 않도록 400으로 거부하고 그 경로를 알려준다.
+        """
+        output_dir = os.path.abspath(folder_paths.get_output_directory())
+        upload_dir = os.path.join(folder_paths.get_input_directory(), CENSOR_UPLOAD_SUBFOLDER)
+        stamp = time.strftime("%Y%m%d%H%M%S")
+        payload, sources, uploads = {}, [], []
+
+        try:
+            if request.content_type == "application/json":
+                payload = await request.json()
+            else:
+                reader = await request.multipart()
+                async for part in reader:
+                    if part.filename is None:
+                        if part.name == "payload":
+                            payload = json.loads(await part.text())
+                        continue
+                    name = os.path.basename(part.filename.replace("\\", "/")) or "image.png"
+                    stored = f"{stamp}_{len(uploads)}_{name}"
+                    path = os.path.join(upload_dir, stored)
+                    await run_io("upload", os.makedirs, upload_dir, exist_ok=True)
+                    f = await run_io("upload", open, path, "wb")
+                    uploads.append(path)
+                    try:
+                        while True:
+                            chunk = await part.read_chunk(UPLOAD_CHUNK_SIZE)
+                            if not chunk:
+                                break
+                            await run_io("upload", f.write, chunk)
+                    finally:
+                        await run_io("upload", f.close)
+                    sources.append({"image": f"{CENSOR_UPLOAD_SUBFOLDER}/{stored}", "source": name, "upload": path})
+
+            def resolve_paths():
+                # 항목 번호(index)가 요청 순서와 같아야 클라이언트가 결과를 맞출 수 있으므로 하나라도 없으면 거부한다
+                resolved, missing = [], []
+                for rel_path in payload.get("paths") or []:
+                    src = os.path.abspath(os.path.join(output_dir, str(rel_path)))
+                    if src.startswith(output_dir + os.sep) and os.path.isfile(src):
+                        rel = os.path.relpath(src, output_dir).replace(os.sep, "/")
+                        resolved.append({"image": f"{rel} [output]", "source": rel})
+                    else:
+                        missing.append(str(rel_path))
+                if missing:
+                    shown = ", ".join(missing[:MAX_MISSING_SHOWN])
+                    more = f" 외 {len(missing) - MAX_MISSING_SHOWN}개" if len(missing) > MAX_MISSING_SHOWN else ""
+                    raise ValueError(f"output 폴더에서 찾을 수 없는 이미지: {shown}{more}")
+                return resolved
+
+            sources = await run_io("files", resolve_paths) + sources
+            name = payload.get("template") or DEFAULT_TEMPLATE
+            template = await run_io("workflow", templates.get, name)
+            if template is None:
+                await discard_uploads(uploads)
+                return template_not_found(name)
+            await scheduler.start()
+            batch = await scheduler.create_censor_batch(payload, template.graph, sources)
+            return web.json_response({"status": "success", "batch": batch})
+        except ValueError as e:
+            # 잘못된 payload JSON, 찾을 수 없는 경로, 빈 목록, 검열 부위 미선택
+            await discard_uploads(uploads)
+            return web.json_response({"status": "error", "message": str(e)}, status=400)
+        except Exception as e:
+            await discard_uploads(uploads)
+            return web.json_response({"status": "error", "message": str(e)}, status=500)
+
+    @routes.get("/assetmanager/api/batch/{batch_id}")
+    async def api_get_batch(request):
+        """배치 상세 (항목별 상태, 프롬프트 ID, 결과 이미지). items=0이면 요약만 반환."""
+        await scheduler.start()
+        include_items = request.query.get("items", "1") != "0"
+        batch = scheduler.get_batch(route_info(request)["batch_id"], include_items)
+        if batch is None:
+            return web.json_response({"status": "error", "message": "Batch not found"}, status=404)
+        return web.json_response({"status": "success", "batch": batch})
+
+    @routes.get("/assetmanager/api/batch/{batch_id}/archive")
+    async def api_batch_archive(request):
+        """배치의 완료된 결과 이미지를 ZIP으로 압축하며 스트리밍한다 (진행 중이면 지금까지 완료된 것만)."""
+        await scheduler.start()
+        batch_id = route_info(request)["batch_id"]
+        files = scheduler.result_files(batch_id)
+        if files is None:
+            return web.json_response({"status": "error", "message": "Batch not found"}, status=404)
+        output_dir = os.path.abspath(folder_paths.get_output_directory())
+
+        def collect_files():
+            file_paths = []
+            for subfolder, filename in files:
+                file_path = os.path.abspath(os.path.join(output_dir, subfolder, filename))
+                if file_path.startswith(output_dir + os.sep) and os.path.isfile(file_path):
+                    file_paths.append(file_path)
+            return file_paths
+
+        file_paths = await run_io("files", collect_files)
+        if not file_paths:
+            return web.json_response({"status": "error", "message": "No files found"}, status=404)
+        return await stream_zip(request, build_zip_entries(file_paths), f"batch_{batch_id}.zip")
+
+    @routes.post("/assetmanager/api/batch/{batch_id}/{action:pause|resume|cancel}")
+    async def api_control_batch(request):
+        """배치 일시정지 / 재개 / 취소"""
+        await scheduler.start()
+        params = route_info(request)
+        try:
+            batch = await scheduler.set_status(params["batch_id"], params["action"])
+        except ValueError as e:
+            return web.json_response({"status": "error", "message": str(e)}, status=409)
+        if batch is None:
+            return web.json_response({"status": "error", "message": "Batch not found"}, status=404)
+        return web.json_response({"status": "success", "batch": batch})
+
+    @routes.delete("/assetmanager/api/batch/{batch_id}")
+    async def api_delete_batch(request):
+        """종료된 배치 기록 삭제"""
+        await scheduler.start()
+        try:
+            deleted = await scheduler.delete_batch(route_info(request)["batch_id"])
+        except ValueError as e:
+            return web.json_response({"status": "error", "message": str(e)}, status=409)
+        if not deleted:
+            return web.json_response({"status": "error", "message": "Batch not found"}, status=404)
+        return web.json_response({"status": "success"})
@@ -0,0 +1,185 @@
+"""
+api/http_cache.py — JSON 응답 조건부 요청(ETag/304)과 압축
+목록형 JSON 엔드포인트(갤러리, 모델 목록, 라이브러리, 앱 상태)가 매번 전체 본문을 보내지 않도록
+데이터 버전(세대 카운터, 파일 stat 등)으로 강한 ETag를 만들고 If-None-Match가 같으면 304를 반환합니다.
+ETag는 본문을 해싱하지 않으므로 304 응답은 본문을 만들지도 않습니다.
+큰 본문은 brotli(설치된 경우) 또는 gzip으로 압축하며, 압축된 본문은 ETag별로 메모리에 보관하여
+다른 탭/새로 고침에서 같은 버전을 요청하면 JSON 직렬화와 압축을 건너뜁니다.
+"""
+
+import os
+import gzip
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from aiohttp import web
+
+from .executors import run_io
+from .metrics import count_cache
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# 이보다 작은 본문은 압축하지 않는다
+COMPRESS_MIN_BYTES = 1024
+# 이벤트 루프에서 바로 압축할 최대 크기 (더 크면 작업 풀에서 압축)
+INLINE_COMPRESS_BYTES = 64 * 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+# 인코딩된 본문 캐시 상한
+BODY_CACHE_ENTRIES = 32
+BODY_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# 세대 카운터는 재시작하면 0부터 다시 세므로, 프로세스마다 다른 값을 ETag에 섞는다
+EPOCH = format(int(time.time() * 1000) ^ (os.getpid() << 20), "x")
+
+_CACHE_HEADERS = {"Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+
+
+class EncodedResponse(web.Response):
+    """
+    이미 압축한 본문을 보내는 응답.
+    ComfyUI의 --enable-compress-response-body 미들웨어가 다시 압축하지 않도록 압축 설정을 무시한다.
+    """
+
+    def enable_compression(self, force=None, strategy=None):
+        pass
+
+
+def make_etag(*parts):
+    """데이터 버전 값들로 강한 ETag를 만든다 (본문이 아니라 버전만 해싱)."""
+    raw = "|".join(str(part) for part in parts)
+    return f'"{EPOCH}-{hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]}"'
+
+
+def etag_matches(request, etag):
+    """If-None-Match가 etag와 일치하는지 (약한 비교, '*' 허용)"""
+    header = request.headers.get("If-None-Match")
+    if not header or not etag:
+        return False
+    tags = [tag.strip() for tag in header.split(",")]
+    return "*" in tags or etag in [tag[2:] if tag.startswith("W/") else tag for tag in tags]
+
+
+def not_modified(etag):
+    return web.Response(status=304, headers={"ETag": etag, **_CACHE_HEADERS})
+
+
+def _accepts(request, coding):
+    """Accept-Encoding에 coding이 q=0이 아닌 값으로 들어 있는지"""
+    for item in request.headers.get("Accept-Encoding", "").lower().split(","):
+        name, _, params = item.strip().partition(";")
+        if name.strip() != coding:
+            continue
+        q = params.strip()
+        return not (q.startswith("q=") and q[2:].strip() in ("0", "0.0", "0.00", "0.000"))
+    return False
+
+
+def negotiate_encoding(request, size):
+    """본문 크기와 Accept-Encoding으로 압축 방식을 정한다 (br > gzip > 없음)."""
+    if size < COMPRESS_MIN_BYTES:
+        return None
+    if brotli is not None and _accepts(request, "br"):
+        return "br"
+    if _accepts(request, "gzip"):
+        return "gzip"
+    return None
+
+
+def encode_body(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=GZIP_LEVEL)
+    return body
+
+
+def _response(body, etag, encoding, content_type):
+    headers = dict(_CACHE_HEADERS)
+    if etag:
+        headers["ETag"] = etag
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return EncodedResponse(body=body, content_type=content_type, headers=headers)
+
+
+class _BodyCache:
+    """(URL, ETag, 클라이언트 인코딩) → (인코딩된 본문, 인코딩). 가장 오래 사용되지 않은 항목부터 버린다."""
+
+    def __init__(self, max_entries, max_bytes):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry):
+        if len(entry[0]) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._total_bytes -= len(previous[0])
+            self._entries[key] = entry
+            self._total_bytes += len(entry[0])
+            while len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes:
+                _, (old, _) = self._entries.popitem(last=False)
+                self._total_bytes -= len(old)
+
+
+_body_cache = _BodyCache(BODY_CACHE_ENTRIES, BODY_CACHE_MAX_BYTES)
+
+
+async def encoded_response(request, body, etag=None, content_type="application/json"):
+    """바이트 본문을 협상한 방식으로 압축하여 응답한다 (큰 본문은 작업 풀에서 압축)."""
+    encoding = negotiate_encoding(request, len(body))
+    if encoding and len(body) > INLINE_COMPRESS_BYTES:
+        body = await run_io("compress", encode_body, body, encoding)
+    else:
+        body = encode_body(body, encoding)
+    return _response(body, etag, encoding, content_type)
+
+
+async def cached_json(request, op, version, build):
+    """
+    버전 기반 조건부 JSON 응답.
+      - version() : 현재 데이터 버전 (세대 카운터 등 값싼 값, 튜플 가능)
+      - build()   : 응답할 JSON 데이터 (이미 직렬화한 bytes를 반환하면 그대로 보낸다)
+    둘 다 run_io(op) 작업 안에서 차례로 실행된다. If-None-Match가 현재 버전과 같으면 build 없이 304,
+    같은 URL/버전/인코딩의 본문이 캐시에 있으면 직렬화와 압축 없이 그대로 보낸다.
+    """
+    url = request.path_qs
+
+    def respond():
+        etag = make_etag(url, version())
+        if etag_matches(request, etag):
+            return etag, None, None
+        key = (url, etag, negotiate_encoding(request, COMPRESS_MIN_BYTES))
+        cached = _body_cache.get(key)
+        count_cache("http_body", cached is not None)
+        if cached is not None:
+            return (etag,) + cached
+        raw = build()
+        if not isinstance(raw, bytes):
+            raw = json.dumps(raw).encode("utf-8")
+        encoding = negotiate_encoding(request, len(raw))
+        body = encode_body(raw, encoding)
+        _body_cache.put(key, (body, encoding))
+        return etag, body, encoding
+
+    etag, body, encoding = await run_io(op, respond)
+    if body is None:
+        return not_modified(etag)
+    return _response(body, etag, encoding, "application/json")
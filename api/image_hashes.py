@@ -0,0 +1,346 @@
+"""
+api/image_hashes.py — 출력 이미지 지각 해시(pHash/dHash)와 유사 이미지 묶음
+output 이미지를 32×32 흑백으로 축소하여 pHash(저주파 DCT)와 dHash(가로 밝기 차이) 64비트 해시를 만들고
+갤러리 인덱스 DB(gallery_index.db)의 image_hash 테이블에 경로 + mtime 기준으로 저장합니다.
+해시 계산은 백그라운드 스레드에서 배치 단위로 NumPy 행렬 연산으로 처리하며 (ComfyUI 큐에 생성 작업이 있으면 쉰다),
+유사 이미지 묶음은 해밍 거리 다중 인덱스(64비트를 16비트 4개 구간으로 나눈 버킷)로 후보만 비교하므로
+n² 비교 없이 10만 장 이상에서도 수 초 안에 끝납니다.
+"""
+
+import os
+import threading
+
+import numpy as np
+
+from .gallery_index import AttachedIndex, AttachedIndexHandle, folder_filter
+from .metrics import count_files
+from .executors import wait_until_idle
+
+# 한 번의 트랜잭션에서 해시를 계산할 이미지 수
+HASH_BATCH_SIZE = 64
+# 새 이미지 알림이 없을 때 누락분을 확인하는 간격
+IDLE_RECHECK_SECONDS = 30.0
+
+HASH_ALGORITHMS = ("phash", "dhash")
+DCT_SIZE = 32
+HASH_SIZE = 8
+# 다중 인덱스 구간 수. 해밍 거리 t 이하인 두 해시는 어느 한 구간의 거리가 t // BANDS 이하이다 (비둘기집 원리).
+BANDS = 4
+BAND_BITS = 64 // BANDS
+DEFAULT_THRESHOLD = 6
+# 구간 반경 2(구간당 탐색 137개)까지만 허용하여 질의 시간을 제한한다
+MAX_THRESHOLD = 3 * BANDS - 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS image_hash (
+    subfolder TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    phash INTEGER,
+    dhash INTEGER,
+    PRIMARY KEY (subfolder, filename)
+);
+"""
+
+
+# ──────────────────────────────────────────────
+# 해시 계산
+# ──────────────────────────────────────────────
+
+def _dct_matrix(n):
+    """n점 DCT-II 정규직교 행렬"""
+    k = np.arange(n)[:, None]
+    x = np.arange(n)[None, :]
+    m = np.cos(np.pi * (2 * x + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    m[0] /= np.sqrt(2.0)
+    return m.astype(np.float32)
+
+
+# 저주파 8개 행만 사용한다: DCT(X)[:8, :8] = D8 @ X @ D8ᵀ
+_DCT_LOW = _dct_matrix(DCT_SIZE)[:HASH_SIZE]
+_POPCOUNT8 = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def load_hash_input(file_path):
+    """
+    이미지를 해시 입력인 32×32 흑백 배열로 읽는다.
+    JPEG은 draft로 1/2^n 축소 디코딩하고, 큰 PNG도 BOX 축소라 픽셀당 한 번만 훑는다.
+    """
+    from PIL import Image
+
+    with Image.open(file_path) as img:
+        img.draft("L", (DCT_SIZE * 2, DCT_SIZE * 2))
+        if img.mode in ("RGBA", "LA", "P"):
+            # 투명 영역은 흰 배경으로 합성하여 같은 그림이면 알파 유무와 관계없이 같은 해시가 나오게 한다
+            img = img.convert("RGBA")
+            background = Image.new("RGBA", img.size, (255, 255, 255, 255))
+            img = Image.alpha_composite(background, img)
+        small = img.convert("L").resize((DCT_SIZE, DCT_SIZE), getattr(Image, 'Resampling', Image).BOX)
+        return np.asarray(small, dtype=np.float32)
+
+
+def _pack_bits(bits):
+    """(N, 64) 불리언 배열을 SQLite INTEGER에 맞는 부호 있는 int64 해시 (N,)로 묶는다."""
+    packed = np.packbits(bits, axis=1)
+    return np.ascontiguousarray(packed).view(">u8").ravel().astype(np.uint64).view(np.int64)
+
+
+def compute_hashes(pixels):
+    """
+    (N, 32, 32) 흑백 배열 묶음에서 pHash/dHash를 한 번의 행렬 연산으로 계산한다.
+      - pHash: 32×32 DCT의 저주파 8×8 계수가 (DC 제외) 중앙값보다 큰지
+      - dHash: 9×8로 축소한 뒤 가로로 이웃한 픽셀보다 밝은지
+    반환값: (phash int64 배열, dhash int64 배열)
+    """
+    n = len(pixels)
+    coeffs = (_DCT_LOW @ pixels @ _DCT_LOW.T).reshape(n, HASH_SIZE * HASH_SIZE)
+    median = np.median(coeffs[:, 1:], axis=1, keepdims=True)
+    phash = _pack_bits(coeffs > median)
+
+    # 32열 → 9열 구간 평균, 32행 → 8행 평균 (BOX 축소와 같은 결과)
+    rows = pixels.reshape(n, HASH_SIZE, DCT_SIZE // HASH_SIZE, DCT_SIZE).mean(axis=2)
+    edges = np.linspace(0, DCT_SIZE, HASH_SIZE + 2).round().astype(int)
+    cols = np.stack([rows[:, :, a:b].mean(axis=2) for a, b in zip(edges[:-1], edges[1:])], axis=2)
+    dhash = _pack_bits((cols[:, :, 1:] > cols[:, :, :-1]).reshape(n, HASH_SIZE * HASH_SIZE))
+    return phash, dhash
+
+
+def popcount64(values):
+    """uint64 배열의 원소별 1 비트 수"""
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(values)
+    values = np.ascontiguousarray(values, dtype=np.uint64)
+    return _POPCOUNT8[values.view(np.uint8)].reshape(values.shape + (8,)).sum(axis=-1)
+
+
+# ──────────────────────────────────────────────
+# 유사 해시 묶음 (다중 인덱스 해싱)
+# ──────────────────────────────────────────────
+
+def _band_masks(radius):
+    """16비트 구간에서 1 비트 수가 radius 이하인 XOR 마스크 목록"""
+    return [m for m in range(1 << BAND_BITS) if bin(m).count("1") <= radius]
+
+
+def _connected_labels(n, src, dst):
+    """간선 목록으로 연결 요소 라벨을 구한다 (최솟값 전파 + 포인터 점프)."""
+    labels = np.arange(n)
+    if len(src) == 0:
+        return labels
+    while True:
+        previous = labels.copy()
+        low = np.minimum(labels[src], labels[dst])
+        np.minimum.at(labels, src, low)
+        np.minimum.at(labels, dst, low)
+        labels = labels[labels]
+        if np.array_equal(labels, previous):
+            return labels
+
+
+def cluster_hashes(hashes, threshold=DEFAULT_THRESHOLD):
+    """
+    해밍 거리 threshold 이하로 이어지는 해시끼리 묶는다 (단일 연결).
+    같은 해시는 먼저 하나로 합치고, 구간마다 16비트 값별 버킷을 만든 뒤
+    구간 반경 이내의 버킷 쌍에서 나온 후보만 전체 64비트 거리로 확인한다.
+    반환값: 원소 2개 이상인 묶음의 인덱스 배열 목록
+    """
+    hashes = np.asarray(hashes, dtype=np.int64).view(np.uint64)
+    if len(hashes) < 2:
+        return []
+    uniq, inverse = np.unique(hashes, return_inverse=True)
+    inverse = inverse.ravel()
+    n = len(uniq)
+    ids = np.arange(n)
+    src_parts, dst_parts = [], []
+
+    masks = _band_masks(threshold // BANDS) if threshold > 0 else []
+    for band in range(BANDS):
+        keys = ((uniq >> np.uint64(band * BAND_BITS)) & np.uint64(0xFFFF)).astype(np.int64)
+        order = np.argsort(keys, kind="stable")
+        bucket_sizes = np.bincount(keys, minlength=1 << BAND_BITS)
+        bucket_starts = np.cumsum(bucket_sizes) - bucket_sizes
+        for mask in masks:
+            target = keys ^ mask
+            counts = bucket_sizes[target]
+            total = int(counts.sum())
+            if total == 0:
+                continue
+            src = np.repeat(ids, counts)
+            offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+            dst = order[np.repeat(bucket_starts[target], counts) + offsets]
+            keep = src < dst
+            src, dst = src[keep], dst[keep]
+            close = popcount64(uniq[src] ^ uniq[dst]) <= threshold
+            src_parts.append(src[close])
+            dst_parts.append(dst[close])
+
+    src = np.concatenate(src_parts) if src_parts else np.empty(0, dtype=np.int64)
+    dst = np.concatenate(dst_parts) if dst_parts else np.empty(0, dtype=np.int64)
+    labels = _connected_labels(n, src, dst)[inverse]
+
+    order = np.argsort(labels, kind="stable")
+    sorted_labels = labels[order]
+    splits = np.flatnonzero(np.diff(sorted_labels)) + 1
+    return [group for group in np.split(order, splits) if len(group) > 1]
+
+
+class ImageHashIndex(AttachedIndex):
+    """
+    이미지 지각 해시 인덱스. 갤러리 인덱스 DB 파일에 별도 연결로 접근하며
+    images 테이블과 비교하여 새로 생겼거나 수정된 이미지만 해시를 계산한다.
+    모든 메서드는 스레드 안전하며 블로킹 I/O를 수행한다.
+    """
+
+    SCHEMA = _SCHEMA
+    PENDING_SQL = (
+        "SELECT COUNT(*) FROM images i LEFT JOIN image_hash h "
+        "ON h.subfolder = i.subfolder AND h.filename = i.filename "
+        "WHERE h.mtime_ns IS NULL OR h.mtime_ns != i.mtime_ns"
+    )
+
+    # ──────────────────────────────────────────────
+    # 인덱싱
+    # ──────────────────────────────────────────────
+
+    def index_batch(self, after=None, limit=HASH_BATCH_SIZE):
+        """
+        해시 대상 이미지를 (subfolder, filename) 순서로 after 다음부터 최대 limit개 처리한다.
+        읽을 수 없는 이미지는 해시 없이 기록하여 파일이 바뀔 때까지 다시 시도하지 않는다.
+        반환값: 마지막으로 처리한 키 (None이면 더 할 일이 없음)
+        """
+        sql = (
+            "SELECT i.subfolder, i.filename, i.mtime_ns FROM images i LEFT JOIN image_hash h "
+            "ON h.subfolder = i.subfolder AND h.filename = i.filename "
+            "WHERE (h.mtime_ns IS NULL OR h.mtime_ns != i.mtime_ns)"
+        )
+        params = []
+        if after:
+            sql += " AND (i.subfolder, i.filename) > (?, ?)"
+            params.extend(after)
+        sql += " ORDER BY i.subfolder, i.filename LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        if not rows:
+            return None
+
+        # 디코딩은 락 밖에서 수행하여 묶음 조회를 막지 않는다
+        decoded, failed = [], []
+        for row in rows:
+            try:
+                decoded.append((row, load_hash_input(os.path.join(self.root_dir, row[0], row[1]))))
+            except Exception:
+                failed.append(row)
+        count_files("decoded", len(decoded))
+
+        values = [(subfolder, filename, mtime_ns, None, None) for subfolder, filename, mtime_ns in failed]
+        if decoded:
+            phash, dhash = compute_hashes(np.stack([pixels for _, pixels in decoded]))
+            values.extend(
+                (subfolder, filename, mtime_ns, int(p), int(d))
+                for ((subfolder, filename, mtime_ns), _), p, d in zip(decoded, phash, dhash)
+            )
+
+        with self._lock, self._conn:
+            self._consume_pending(len(values))
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO image_hash (subfolder, filename, mtime_ns, phash, dhash) VALUES (?, ?, ?, ?, ?)",
+                values
+            )
+        return rows[-1][0], rows[-1][1]
+
+    def purge_removed(self):
+        """갤러리 인덱스에서 사라진 이미지의 해시 행을 삭제한다."""
+        with self._lock, self._conn:
+            return self._conn.execute(
+                "DELETE FROM image_hash WHERE NOT EXISTS "
+                "(SELECT 1 FROM images i WHERE i.subfolder = image_hash.subfolder AND i.filename = image_hash.filename)"
+            ).rowcount
+
+    # ──────────────────────────────────────────────
+    # 유사 이미지 조회
+    # ──────────────────────────────────────────────
+
+    def find_duplicates(self, threshold=DEFAULT_THRESHOLD, folder=None, algorithm="phash", limit=500):
+        """
+        해밍 거리 threshold 이하로 이어지는 유사 이미지 묶음을 반환한다.
+        묶음 안의 이미지는 최신순이며, 첫 이미지(가장 최근 것)와의 거리를 distance로 함께 준다.
+        묶음은 이미지 수가 많은 순서로 최대 limit개까지 반환한다.
+        반환값: (묶음 목록, 전체 묶음 수, 해시가 있는 이미지 수)
+        """
+        if algorithm not in HASH_ALGORITHMS:
+            raise ValueError(f"Unknown algorithm: {algorithm}")
+        if not 0 <= threshold <= MAX_THRESHOLD:
+            raise ValueError(f"threshold must be between 0 and {MAX_THRESHOLD}")
+
+        where, params = folder_filter(folder)
+        sql = (
+            f"SELECT i.subfolder, i.filename, i.timestamp, h.{algorithm} FROM image_hash h "
+            "JOIN images i ON i.subfolder = h.subfolder AND i.filename = h.filename AND i.mtime_ns = h.mtime_ns "
+            f"WHERE h.{algorithm} IS NOT NULL"
+        )
+        if where:
+            sql += " AND " + where.replace("subfolder", "i.subfolder")
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        if not rows:
+            return [], 0, 0
+
+        hashes = np.fromiter((r[3] for r in rows), dtype=np.int64, count=len(rows))
+        groups = cluster_hashes(hashes, threshold)
+        groups.sort(key=len, reverse=True)
+
+        clusters = []
+        for group in groups[:limit]:
+            members = sorted(group.tolist(), key=lambda k: (rows[k][2], rows[k][0], rows[k][1]), reverse=True)
+            distances = popcount64(hashes[members].view(np.uint64) ^ hashes[members[0]].view(np.uint64))
+            clusters.append([{
+                "filename": rows[k][1],
+                "subfolder": rows[k][0],
+                "timestamp": rows[k][2],
+                "distance": int(distance),
+            } for k, distance in zip(members, distances)])
+        return clusters, len(groups), len(rows)
+
+
+class ImageHashIndexer:
+    """갤러리 인덱스에 새로 들어온 이미지의 지각 해시를 백그라운드에서 계산하는 작업자."""
+
+    def __init__(self):
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._index = AttachedIndexHandle(ImageHashIndex)
+
+    def get_index(self):
+        """현재 갤러리 인덱스 DB에 대한 ImageHashIndex를 반환 (output 경로가 바뀌면 새로 연다)."""
+        return self._index.get()
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._wakeup.set()
+        self._thread = threading.Thread(target=self._run, name="am-hash-indexer", daemon=True)
+        self._thread.start()
+
+    def notify(self):
+        """새 이미지가 해시 계산 대기 중임을 알린다 (갤러리 감시자에서 호출)."""
+        self._wakeup.set()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(IDLE_RECHECK_SECONDS)
+            self._wakeup.clear()
+            try:
+                index = self.get_index()
+                # 이미지 디코딩은 디스크/CPU를 많이 쓰므로 ComfyUI가 생성 중이면 배치마다 기다린다
+                wait_until_idle()
+                last_key = index.index_batch()
+                while last_key:
+                    wait_until_idle()
+                    last_key = index.index_batch(last_key)
+                index.purge_removed()
+            except Exception as e:
+                print(f"[ComfyUI-AssetManager] 이미지 해시 계산 실패: {e}")
+
+
+image_hash_indexer = ImageHashIndexer()
@@ -0,0 +1,232 @@
+"""
+api/image_metadata.py — 이미지 메타데이터 청크 리더
+PIL로 이미지를 열지 않고 파일 구조를 직접 읽어 ComfyUI 메타데이터(prompt, workflow)를 추출합니다.
+  - PNG  : IHDR(크기)과 tEXt/zTXt/iTXt 청크만 읽고, 나머지 청크는 건너뛰며 IDAT에서 멈춤
+  - WebP : RIFF 청크 중 VP8X/VP8/VP8L(크기)과 EXIF 청크만 읽음
+  - JPEG : SOS 이전의 APP1(Exif) 세그먼트와 SOF(크기)만 읽음
+EXIF는 ComfyUI 저장 노드가 쓰는 "Prompt:{...}", "Workflow:{...}" 형식의 문자열 태그를 찾습니다.
+(보관 재인코딩이 PNG의 다른 텍스트 청크를 옮겨 둔 0x010D~0x010F 태그의 "키:값"도 읽습니다.)
+"""
+
+import json
+import zlib
+import struct
+
+from .metrics import count_files
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# 텍스트 청크 하나의 최대 크기 (손상된 파일에서 거대한 길이를 읽지 않도록)
+MAX_TEXT_CHUNK = 64 * 1024 * 1024
+
+_EXIF_IFD_POINTER = 0x8769
+_EXIF_USER_COMMENT = 0x9286
+# ComfyUI가 prompt(0x0110)와 추가 텍스트(0x010F부터 내려감)를 "키:값"으로 쓰는 IFD0 태그
+_EXIF_COMFY_TEXT_TAGS = (0x0110, 0x010F, 0x010E, 0x010D)
+_TIFF_TYPE_SIZES = {1: 1, 2: 1, 3: 2, 4: 4, 5: 8, 7: 1, 9: 4, 10: 8}
+
+
+def _decode_latin1(data):
+    return data.decode("latin-1", "replace")
+
+
+def _read_png(f):
+    """PNG 텍스트 청크와 크기를 읽는다. 첫 IDAT(픽셀 데이터)에서 멈춘다."""
+    text = {}
+    size = (None, None)
+    f.seek(len(PNG_SIGNATURE))
+    while True:
+        header = f.read(8)
+        if len(header) < 8:
+            break
+        length, chunk_type = struct.unpack(">I4s", header)
+        if chunk_type in (b"IDAT", b"IEND"):
+            break
+        if chunk_type == b"IHDR":
+            data = f.read(length)
+            size = struct.unpack(">II", data[:8])
+            f.seek(4, 1)
+            continue
+        if chunk_type not in (b"tEXt", b"zTXt", b"iTXt") or length > MAX_TEXT_CHUNK:
+            f.seek(length + 4, 1)
+            continue
+
+        data = f.read(length)
+        f.seek(4, 1)  # CRC
+        keyword, _, rest = data.partition(b"\x00")
+        key = _decode_latin1(keyword)
+        try:
+            if chunk_type == b"tEXt":
+                text[key] = _decode_latin1(rest)
+            elif chunk_type == b"zTXt":
+                text[key] = _decode_latin1(zlib.decompress(rest[1:]))
+            else:
+                compressed, rest = rest[0], rest[2:]
+                _, _, rest = rest.partition(b"\x00")  # 언어 태그
+                _, _, rest = rest.partition(b"\x00")  # 번역된 키워드
+                if compressed:
+                    rest = zlib.decompress(rest)
+                text[key] = rest.decode("utf-8", "replace")
+        except (zlib.error, IndexError):
+            continue
+    return text, size
+
+
+def _parse_tiff_strings(data):
+    """
+    EXIF(TIFF) 블록의 IFD0와 Exif IFD에서 문자열 태그 값을 모두 꺼낸다.
+    반환값: 태그 번호 → 문자열
+    """
+    if len(data) < 8 or data[:2] not in (b"II", b"MM"):
+        return {}
+    endian = "<" if data[:2] == b"II" else ">"
+    values = {}
+
+    def read_ifd(offset, depth=0):
+        if depth > 2 or offset + 2 > len(data):
+            return
+        count = struct.unpack_from(endian + "H", data, offset)[0]
+        for i in range(count):
+            entry = offset + 2 + i * 12
+            if entry + 12 > len(data):
+                return
+            tag, typ, n = struct.unpack_from(endian + "HHI", data, entry)
+            if tag == _EXIF_IFD_POINTER:
+                read_ifd(struct.unpack_from(endian + "I", data, entry + 8)[0], depth + 1)
+                continue
+            if typ not in (2, 7):
+                continue
+            nbytes = n * _TIFF_TYPE_SIZES.get(typ, 1)
+            if nbytes <= 4:
+                raw = data[entry + 8:entry + 8 + nbytes]
+            else:
+                start = struct.unpack_from(endian + "I", data, entry + 8)[0]
+                raw = data[start:start + nbytes]
+            if tag == _EXIF_USER_COMMENT and raw[:8] in (b"UNICODE\x00", b"ASCII\x00\x00\x00", b"\x00" * 8):
+                codec = "utf-16-be" if endian == ">" else "utf-16-le"
+                raw_text = raw[8:].decode(codec if raw[:7] == b"UNICODE" else "utf-8", "replace")
+            else:
+                raw_text = raw.decode("utf-8", "replace")
+            values[tag] = raw_text.rstrip("\x00")
+
+    read_ifd(struct.unpack_from(endian + "I", data, 4)[0])
+    return values
+
+
+def _exif_text(exif):
+    """EXIF 문자열 중 "Prompt:" / "Workflow:" 접두어 값을 text 사전으로 변환한다."""
+    text = {}
+    for tag, value in _parse_tiff_strings(exif).items():
+        key, sep, rest = value.partition(":")
+        if sep and key.lower() in ("prompt", "workflow"):
+            text[key.lower()] = rest
+        elif sep and tag in _EXIF_COMFY_TEXT_TAGS and key.isidentifier():
+            text.setdefault(key, rest)
+        elif tag == _EXIF_USER_COMMENT and value:
+            text.setdefault("parameters", value)
+    return text
+
+
+def _read_webp(f):
+    """WebP(RIFF) 청크에서 EXIF와 크기를 읽는다."""
+    text = {}
+    size = (None, None)
+    f.seek(12)
+    while True:
+        header = f.read(8)
+        if len(header) < 8:
+            break
+        fourcc, length = struct.unpack("<4sI", header)
+        padded = length + (length & 1)
+        if fourcc == b"VP8X":
+            data = f.read(padded)
+            size = (int.from_bytes(data[4:7], "little") + 1, int.from_bytes(data[7:10], "little") + 1)
+        elif fourcc == b"VP8 " and size[0] is None:
+            data = f.read(padded)
+            size = (struct.unpack_from("<H", data, 6)[0] & 0x3FFF, struct.unpack_from("<H", data, 8)[0] & 0x3FFF)
+        elif fourcc == b"VP8L" and size[0] is None:
+            data = f.read(padded)
+            bits = struct.unpack_from("<I", data, 1)[0]
+            size = ((bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1)
+        elif fourcc == b"EXIF" and length <= MAX_TEXT_CHUNK:
+            data = f.read(padded)[:length]
+            if data.startswith(b"Exif\x00\x00"):
+                data = data[6:]
+            text.update(_exif_text(data))
+        else:
+            f.seek(padded, 1)
+    return text, size
+
+
+def _read_jpeg(f):
+    """JPEG 세그먼트를 SOS(스캔 데이터) 전까지 읽어 APP1 Exif와 크기를 찾는다."""
+    text = {}
+    size = (None, None)
+    f.seek(2)
+    while True:
+        marker = f.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            break
+        code = marker[1]
+        if code in (0xD8, 0x01) or 0xD0 <= code <= 0xD7:
+            continue
+        if code in (0xD9, 0xDA):
+            break
+        length_bytes = f.read(2)
+        if len(length_bytes) < 2:
+            break
+        length = struct.unpack(">H", length_bytes)[0] - 2
+        if code == 0xE1:
+            data = f.read(length)
+            if data.startswith(b"Exif\x00\x00"):
+                text.update(_exif_text(data[6:]))
+        elif 0xC0 <= code <= 0xCF and code not in (0xC4, 0xC8, 0xCC):
+            data = f.read(length)
+            height, width = struct.unpack_from(">HH", data, 1)
+            size = (width, height)
+        else:
+            f.seek(length, 1)
+    return text, size
+
+
+def read_image_text(file_path):
+    """
+    이미지 파일의 메타데이터 텍스트와 크기를 읽는다 (픽셀 디코딩 없음).
+    반환값: {"format": "PNG"|"WEBP"|"JPEG"|None, "text": {키: 문자열}, "width", "height"}
+    """
+    count_files("read")
+    with open(file_path, "rb") as f:
+        head = f.read(12)
+        if head.startswith(PNG_SIGNATURE):
+            fmt, (text, size) = "PNG", _read_png(f)
+        elif head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+            fmt, (text, size) = "WEBP", _read_webp(f)
+        elif head[:2] == b"\xff\xd8":
+            fmt, (text, size) = "JPEG", _read_jpeg(f)
+        else:
+            fmt, text, size = None, {}, (None, None)
+    return {"format": fmt, "text": text, "width": size[0], "height": size[1]}
+
+
+def _parse_json(raw):
+    if not raw:
+        return None
+    try:
+        return json.loads(raw)
+    except (TypeError, ValueError):
+        return None
+
+
+def read_comfy_metadata(file_path):
+    """
+    ComfyUI prompt/workflow를 JSON으로 파싱하여 반환한다.
+    반환값: {"prompt": dict|None, "workflow": dict|None, "raw_info": 나머지 텍스트, "width", "height"}
+    """
+    info = read_image_text(file_path)
+    text = info["text"]
+    return {
+        "prompt": _parse_json(text.get("prompt")),
+        "workflow": _parse_json(text.get("workflow")),
+        "raw_info": {k: v for k, v in text.items() if k not in ("prompt", "workflow")},
+        "width": info["width"],
+        "height": info["height"],
+    }
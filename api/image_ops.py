@@ -0,0 +1,189 @@
+"""
+api/image_ops.py — 이미지 변환 작업 함수 (리사이즈/포맷 변환)
+CPU 작업 풀(executors.run_cpu)의 워커 프로세스에서 실행될 수 있도록
+ComfyUI 모듈에 의존하지 않는 모듈 최상위 순수 함수만 둡니다.
+"""
+
+import io
+import os
+import json
+
+RESIZE_FORMATS = ("png", "jpeg", "webp")
+# 보관(archive) 재인코딩 형식: 무손실 WebP 또는 최대 압축으로 다시 쓴 PNG
+ARCHIVE_FORMATS = ("webp", "png")
+# 픽셀을 그대로 RGB/RGBA로 옮길 수 있는 모드 (16비트/부동소수 모드는 보관 대상에서 제외)
+ARCHIVE_MODES = ("1", "L", "LA", "P", "PA", "RGB", "RGBA")
+# ComfyUI WebP 저장 노드와 같은 EXIF 태그 배치: prompt는 0x0110(Model), 나머지 텍스트는 0x010F(Make)부터 내려간다
+EXIF_PROMPT_TAG = 0x0110
+EXIF_TEXT_TAGS = (0x010F, 0x010E, 0x010D)
+ARCHIVE_WEBP_METHOD = 4
+
+
+def compute_resize_size(width, height, options):
+    """리사이즈 모드(scale/longest/exact)에 따른 새 크기를 계산한다."""
+    mode = options.get("mode", "none")
+    new_w, new_h = width, height
+    if mode == "scale":
+        scale_val = float(options.get("val_scale", 50)) / 100.0
+        new_w = int(width * scale_val)
+        new_h = int(height * scale_val)
+    elif mode == "longest":
+        longest_val = int(options.get("val_longest", 1024))
+        if width >= height:
+            new_w = longest_val
+            new_h = int(height * (longest_val / width))
+        else:
+            new_h = longest_val
+            new_w = int(width * (longest_val / height))
+    elif mode == "exact":
+        new_w = int(options.get("val_width", 512))
+        new_h = int(options.get("val_height", 512))
+    return new_w, new_h
+
+
+def resize_image(src, dest_dir, dest_name, options):
+    """
+    이미지를 리사이즈/포맷 변환하여 dest_dir/dest_name.<format>으로 저장한다.
+    src는 파일 경로 또는 이미지 바이트. 같은 이름이 있으면 번호를 붙인다.
+    반환값: {"filename", "width", "height"}
+    """
+    from PIL import Image
+
+    format_type = options.get("format", "webp").lower()
+    if format_type not in RESIZE_FORMATS:
+        raise ValueError(f"Unsupported format: {format_type}")
+    quality = int(options.get("quality", 85))
+
+    with Image.open(io.BytesIO(src) if isinstance(src, (bytes, bytearray)) else src) as img:
+        original_w, original_h = img.size
+        new_w, new_h = compute_resize_size(original_w, original_h, options)
+        resizing = (new_w, new_h) != (original_w, original_h) and new_w > 0 and new_h > 0
+
+        if resizing and img.format == "JPEG" and new_w < original_w and new_h < original_h:
+            # JPEG 원본은 목표 크기 이상인 1/2^n 축소 디코딩(draft)으로 디코딩 비용을 줄인다
+            img.draft(img.mode, (new_w, new_h))
+        img.load()
+
+        if resizing:
+            resample_filter = getattr(Image, 'Resampling', Image).LANCZOS
+            img = img.resize((new_w, new_h), resample_filter, reducing_gap=3.0)
+
+        # JPEG는 투명도 미지원이므로 RGBA→RGB 변환 (흰 배경 합성)
+        if format_type == "jpeg" and img.mode in ("RGBA", "LA", "P"):
+            img = img.convert("RGBA")
+            background = Image.new("RGB", img.size, (255, 255, 255))
+            background.paste(img, mask=img.split()[3])
+            img = background
+        elif format_type == "jpeg" and img.mode != "RGB":
+            img = img.convert("RGB")
+        elif format_type == "png" and img.mode == "P":
+            img = img.convert("RGBA")
+
+        os.makedirs(dest_dir, exist_ok=True)
+        # 배치 변환은 같은 이름(다른 폴더의 같은 파일명)을 병렬로 저장하므로, 존재 확인 대신
+        # O_EXCL로 빈 파일을 만들어 이름을 선점한다
+        final_filename = f"{dest_name}.{format_type}"
+        n = 1
+        while True:
+            try:
+                os.close(os.open(os.path.join(dest_dir, final_filename), os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                break
+            except FileExistsError:
+                final_filename = f"{dest_name}_{n}.{format_type}"
+                n += 1
+
+        save_kwargs = {}
+        if format_type in ["jpeg", "webp"]:
+            save_kwargs["quality"] = quality
+        try:
+            img.save(os.path.join(dest_dir, final_filename), format=format_type.upper(), **save_kwargs)
+        except Exception:
+            os.remove(os.path.join(dest_dir, final_filename))
+            raise
+        return {"filename": final_filename, "width": img.size[0], "height": img.size[1]}
+
+
+def _exif_text_value(key, value):
+    """EXIF 문자열 태그 값 "key:value". JSON이면 ComfyUI처럼 ASCII JSON으로, 아니면 UTF-8 바이트로 쓴다."""
+    try:
+        return f"{key}:{json.dumps(json.loads(value))}"
+    except (TypeError, ValueError):
+        return f"{key}:{value}".encode("utf-8")
+
+
+def _archive_exif(text):
+    """PNG 텍스트 청크를 WebP EXIF로 옮긴다. 옮길 수 있는 태그보다 키가 많으면 None."""
+    from PIL import Image
+
+    exif = Image.Exif()
+    others = [key for key in text if key != "prompt"]
+    others.sort(key=lambda key: key != "workflow")
+    if len(others) > len(EXIF_TEXT_TAGS):
+        return None
+    if "prompt" in text:
+        exif[EXIF_PROMPT_TAG] = _exif_text_value("prompt", text["prompt"])
+    for tag, key in zip(EXIF_TEXT_TAGS, others):
+        exif[tag] = _exif_text_value(key, text[key])
+    return exif.tobytes()
+
+
+def _archive_pnginfo(text):
+    from PIL import PngImagePlugin
+
+    info = PngImagePlugin.PngInfo()
+    for key, value in text.items():
+        try:
+            value.encode("latin-1")
+            info.add_text(key, value, zip=len(value) > 1024)
+        except UnicodeEncodeError:
+            info.add_itxt(key, value, zip=True)
+    return info
+
+
+def transcode_lossless(src, dest, format_type):
+    """
+    PNG 이미지를 무손실 format_type(webp/png)으로 dest에 저장하고, 다시 디코딩하여 픽셀이 같은지 확인한다.
+    PNG 텍스트 청크(ComfyUI prompt/workflow 등)는 WebP면 EXIF로, PNG면 텍스트 청크로 옮긴다.
+    메타데이터 검증과 원본 교체는 호출하는 쪽에서 한다.
+    반환값: {"status": "done"|"skipped", "reason", "src_bytes", "dst_bytes"}
+    """
+    from PIL import Image
+
+    if format_type not in ARCHIVE_FORMATS:
+        raise ValueError(f"Unsupported archive format: {format_type}")
+    src_bytes = os.path.getsize(src)
+
+    def skipped(reason):
+        return {"status": "skipped", "reason": reason, "src_bytes": src_bytes, "dst_bytes": None}
+
+    with Image.open(src) as img:
+        if img.format != "PNG":
+            return skipped("not_png")
+        if getattr(img, "n_frames", 1) > 1:
+            return skipped("animated")
+        if img.mode not in ARCHIVE_MODES:
+            return skipped(f"mode_{img.mode}")
+        img.load()
+        text = {k: v for k, v in getattr(img, "text", {}).items() if isinstance(v, str)}
+        has_alpha = img.mode in ("LA", "PA", "RGBA") or "transparency" in img.info
+        compare_mode = "RGBA" if has_alpha else "RGB"
+        reference = img.convert(compare_mode)
+        icc_profile = img.info.get("icc_profile")
+
+        save_kwargs = {"icc_profile": icc_profile} if icc_profile else {}
+        if format_type == "webp":
+            exif = _archive_exif(text)
+            if exif is None:
+                return skipped("too_many_text_chunks")
+            # exact: 완전히 투명한 픽셀의 RGB 값도 그대로 보존
+            reference.save(dest, format="WEBP", lossless=True, quality=100, method=ARCHIVE_WEBP_METHOD,
+                           exact=True, exif=exif, **save_kwargs)
+        else:
+            img.save(dest, format="PNG", optimize=True, pnginfo=_archive_pnginfo(text), **save_kwargs)
+
+    with Image.open(dest) as encoded:
+        encoded.load()
+        if encoded.size != reference.size or encoded.convert(compare_mode).tobytes() != reference.tobytes():
+            os.remove(dest)
+            return skipped("pixel_mismatch")
+    return {"status": "done", "reason": None, "src_bytes": src_bytes, "dst_bytes": os.path.getsize(dest)}
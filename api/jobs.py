@@ -0,0 +1,142 @@
+"""
+api/jobs.py — 백그라운드 작업 대기열 공통 부분
+파일 작업(file_ops.py)과 출력 보관(archive.py)처럼 요청을 작업(job)으로 받아 하나씩 실행하고
+진행 상황을 웹소켓 이벤트로 보내는 관리자의 기반 클래스입니다.
+작업은 dict이며 "_"로 시작하는 키(취소 플래그, 실행 중에만 필요한 대상 목록 등)는 응답/이벤트에서 뺍니다.
+"""
+
+import os
+import time
+import uuid
+import asyncio
+from server import PromptServer
+
+# 완료된 작업은 최근 것만 보관한다
+KEEP_FINISHED_JOBS = 20
+# 작업 하나의 오류 메시지는 앞부분만 보관한다
+MAX_JOB_ERRORS = 20
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+def env_float(name, default):
+    """0 이상의 실수 환경 변수 (없거나 잘못된 값이면 default)"""
+    try:
+        return max(0.0, float(os.environ.get(name, "")))
+    except ValueError:
+        return default
+
+
+def public_job(job):
+    return {k: v for k, v in job.items() if not k.startswith("_")}
+
+
+class JobQueue:
+    """
+    작업 대기열. 작업은 등록 순서대로 하나씩 실행된다. 공개 메서드는 이벤트 루프에서 호출한다.
+    하위 클래스는 EVENT, LABEL과 _execute(job)를 정의하고, 끝난 작업 정리가 더 필요하면 _finish(job)를 재정의한다.
+    """
+
+    EVENT = None
+    LABEL = "작업"
+
+    def __init__(self):
+        self._jobs = []
+        self._queue = None
+        self._worker = None
+
+    def start(self):
+        if self._worker is None or self._worker.done():
+            self._queue = self._queue or asyncio.Queue()
+            self._worker = asyncio.ensure_future(self._work())
+
+    def new_job(self, op, **fields):
+        """대기 상태의 새 작업 dict (아직 등록하지 않음)"""
+        job = {
+            "id": uuid.uuid4().hex[:12],
+            "op": op,
+            "status": "queued",
+            "created": time.time(),
+            "finished": None,
+            "errors": [],
+            "_cancel": False,
+        }
+        job.update(fields)
+        return job
+
+    async def enqueue(self, job):
+        """작업을 대기열에 넣고 요약을 반환한다."""
+        self.start()
+        self._jobs.append(job)
+        self._prune_jobs()
+        await self._queue.put(job)
+        self._emit(job)
+        return public_job(job)
+
+    def get_job(self, job_id):
+        job = self._find(job_id)
+        return public_job(job) if job else None
+
+    def list_jobs(self):
+        return [public_job(j) for j in reversed(self._jobs)]
+
+    def has_active(self):
+        return any(j["status"] in ACTIVE_STATUSES for j in self._jobs)
+
+    def cancel(self, job_id):
+        """대기 중이면 바로, 실행 중이면 현재 조각이 끝난 뒤 멈춘다. 이미 처리한 파일은 그대로 둔다."""
+        job = self._find(job_id)
+        if job is None:
+            return None
+        if job["status"] not in ACTIVE_STATUSES:
+            raise ValueError(f"이미 종료된 작업입니다: {job['status']}")
+        job["_cancel"] = True
+        return public_job(job)
+
+    @staticmethod
+    def add_errors(job, errors):
+        job["errors"].extend(errors[:MAX_JOB_ERRORS - len(job["errors"])])
+
+    # ── 실행 ──
+
+    def _find(self, job_id):
+        return next((j for j in self._jobs if j["id"] == job_id), None)
+
+    def _prune_jobs(self):
+        finished = [j for j in self._jobs if j["status"] not in ACTIVE_STATUSES]
+        for job in finished[:-KEEP_FINISHED_JOBS]:
+            self._jobs.remove(job)
+
+    def _emit(self, job):
+        try:
+            PromptServer.instance.send_sync(self.EVENT, {"job": public_job(job)})
+        except Exception as e:
+            print(f"[ComfyUI-AssetManager] {self.LABEL} 이벤트 전송 실패: {e}")
+
+    async def _work(self):
+        while True:
+            job = await self._queue.get()
+            if job["_cancel"]:
+                job["status"] = "cancelled"
+            else:
+                job["status"] = "running"
+                self._emit(job)
+                try:
+                    await self._execute(job)
+                    job["status"] = "cancelled" if job["_cancel"] else "done"
+                except Exception as e:
+                    job["status"] = "failed"
+                    job["message"] = str(e)
+                    print(f"[ComfyUI-AssetManager] {self.LABEL} 실패 ({job['op']} {job['id']}): {e}")
+            job["finished"] = time.time()
+            for key in [k for k in job if k.startswith("_") and k != "_cancel"]:
+                del job[key]
+            self._finish(job)
+            self._emit(job)
+            self._prune_jobs()
+
+    async def _execute(self, job):
+        raise NotImplementedError
+
+    def _finish(self, job):
+        """작업이 끝난 뒤(완료/취소/실패) 마지막 이벤트를 보내기 전에 호출된다."""
@@ -2,12 +2,45 @@
 api/library.py — 프롬프트 라이브러리 API
 prompt_library.json 파일의 읽기/쓰기를 담당합니다.
 프론트엔드의 작품 > 그룹 > 조각 3단 계층 데이터를 저장·반환합니다.
+저장은 LibraryStore(스냅샷 + 저널)를 거치며, 편집은 PATCH로 변경분만 받습니다.
+응답의 ETag를 If-Match로 돌려보내면 다른 탭이 먼저 저장했을 때 412로 거절합니다.
+화면은 작품/그룹 개요(outline)만 먼저 받고 조각은 펼친 작품 단위(items)로 받으며,
+조각 검색과 태그 자동 완성은 서버의 역색인(library_index.py)으로 처리합니다.
 """
 
 import os
-import json
 from aiohttp import web
 
+from .executors import run_io
+from .library_store import LibraryStore, LibraryPatchError, PreconditionFailed, _find_index
+from .library_index import LibraryIndex
+from .http_cache import etag_matches, not_modified, encoded_response, cached_json
+
+
+def _precondition_failed(e):
+    return web.json_response(
+        {"status": "error", "message": str(e), "etag": e.etag},
+        status=412, headers={"ETag": e.etag}
+    )
+
+
+def _outline(doc, etag):
+    """작품/그룹 개요: 조각 목록 대신 조각 수(item_count)만 담는다. 구 포맷 문서는 그대로 반환."""
+    works = doc.get("works")
+    if not isinstance(works, list):
+        return doc
+    outline = []
+    for work in works:
+        if not isinstance(work, dict):
+            continue
+        entry = {k: v for k, v in work.items() if k != "categories"}
+        entry["categories"] = [
+            {**{k: v for k, v in cat.items() if k != "items"}, "item_count": len(cat.get("items") or [])}
+            for cat in work.get("categories") or [] if isinstance(cat, dict)
+        ]
+        outline.append(entry)
+    return {"works": outline, "outline": True, "etag": etag}
+
 
 def setup_library_api(routes, web_dir):
     """프롬프트 라이브러리 관련 API 라우트를 등록한다."""
@@ -17,27 +50,132 @@ def setup_library_api(routes, web_dir):
         os.makedirs(data_dir)
 
     library_file = os.path.join(data_dir, "prompt_library.json")
+    store = LibraryStore(library_file)
+    index = LibraryIndex()
+    store.subscribe(index.on_change)
+
+    def ensure_index():
+        # etag()가 파일 외부 변경을 확인하며, 바뀌었으면 인덱스에 알린다
+        store.etag()
+        if index.dirty:
+            store.read(lambda doc, etag: index.rebuild(doc))
 
     @routes.get("/assetmanager/api/library")
     async def api_get_library(request):
-        """프롬프트 라이브러리 데이터를 반환. 파일이 없으면 빈 기본 구조를 반환."""
-        if not os.path.exists(library_file):
-            default_lib = {"categories": []}
-            return web.json_response(default_lib)
+        """
+        프롬프트 라이브러리 데이터를 반환. 파일이 없으면 빈 기본 구조를 반환.
+        If-None-Match가 현재 ETag와 같으면 문서를 직렬화하지 않고 304를 반환한다.
+        """
         try:
-            with open(library_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            return web.json_response(data)
+            etag = await run_io("library", store.etag)
+            if etag_matches(request, etag):
+                return not_modified(etag)
+            body, etag = await run_io("library", store.get_json)
+            return await encoded_response(request, body, etag)
         except Exception as e:
             return web.json_response({"status": "error", "message": str(e)}, status=500)
 
     @routes.post("/assetmanager/api/library")
     async def api_save_library(request):
-        """프론트엔드에서 전달받은 라이브러리 데이터를 JSON 파일로 저장"""
+        """라이브러리 전체를 교체하여 저장 (가져오기/마이그레이션용). If-Match가 있으면 버전을 확인한다."""
         try:
             data = await request.json()
-            with open(library_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=4, ensure_ascii=False)
-            return web.json_response({"status": "success"})
+            etag = await run_io("library", store.replace, data, request.headers.get("If-Match"))
+            return web.json_response({"status": "success", "etag": etag}, headers={"ETag": etag})
+        except PreconditionFailed as e:
+            return _precondition_failed(e)
+        except LibraryPatchError as e:
+            return web.json_response({"status": "error", "message": str(e)}, status=e.status)
         except Exception as e:
             return web.json_response({"status": "error", "message": str(e)}, status=500)
+
+    @routes.patch("/assetmanager/api/library")
+    async def api_patch_library(request):
+        """
+        변경분만 적용. 요청 본문: {"ops": [{"op", "path", "value"?, "from"?, "index"?}, ...]}
+        연산은 모두 적용되거나 하나도 적용되지 않으며, 성공하면 새 ETag를 반환한다.
+        """
+        try:
+            data = await request.json()
+            ops = data.get("ops") if isinstance(data, dict) else data
+            etag = await run_io("library", store.patch, ops, request.headers.get("If-Match"))
+            return web.json_response({"status": "success", "etag": etag}, headers={"ETag": etag})
+        except PreconditionFailed as e:
+            return _precondition_failed(e)
+        except LibraryPatchError as e:
+            return web.json_response({"status": "error", "message": str(e)}, status=e.status)
+        except Exception as e:
+            return web.json_response({"status": "error", "message": str(e)}, status=500)
+
+    @routes.get("/assetmanager/api/library/outline")
+    async def api_get_library_outline(request):
+        """작품/그룹 개요 (조각 제외). 본문의 etag는 저장 시 If-Match로 보낼 문서 버전이다."""
+        return await cached_json(request, "library", store.etag, lambda: store.read(_outline))
+
+    @routes.get("/assetmanager/api/library/items")
+    async def api_get_library_items(request):
+        """
+        작품 하나의 조각 목록. 응답: {"categories": {그룹 ID: [조각, ...]}, "etag"}
+          - work     : 작품 ID (필수)
+          - category : 그룹 ID (지정 시 그 그룹만)
+        """
+        work_id = request.query.get("work")
+        cat_id = request.query.get("category")
+        if not work_id:
+            return web.json_response({"status": "error", "message": "work 파라미터가 필요합니다."}, status=400)
+
+        def pick(doc, etag):
+            works = doc.get("works") if isinstance(doc.get("works"), list) else []
+            idx = _find_index(works, work_id)
+            if idx < 0:
+                return None
+            return {
+                "categories": {
+                    cat.get("id"): cat.get("items") or []
+                    for cat in works[idx].get("categories") or []
+                    if isinstance(cat, dict) and (cat_id is None or cat.get("id") == cat_id)
+                },
+                "etag": etag,
+            }
+
+        if await run_io("library", store.read, lambda doc, etag: _find_index(doc.get("works") or [], work_id)) < 0:
+            return web.json_response({"status": "error", "message": f"작품을 찾을 수 없습니다: {work_id}"}, status=404)
+        return await cached_json(request, "library", store.etag, lambda: store.read(pick) or {"categories": {}})
+
+    @routes.get("/assetmanager/api/library/search")
+    async def api_search_library(request):
+        """
+        조각 검색 (이름/프롬프트/태그/ID, 점수 순).
+          - q      : 검색어 (모든 단어 포함, 마지막 단어는 접두어 일치)
+          - work   : 작품 ID로 범위 제한
+          - limit, offset
+        """
+        q = request.query.get("q", "")
+        work_id = request.query.get("work") or None
+        try:
+            limit = max(1, min(500, int(request.query.get("limit", 50))))
+            offset = max(0, int(request.query.get("offset", 0)))
+        except ValueError:
+            return web.json_response({"status": "error", "message": "limit/offset은 정수여야 합니다."}, status=400)
+
+        def search():
+            ensure_index()
+            return index.search(q, work_id, limit, offset)
+
+        results, total = await run_io("search", search)
+        return web.json_response({"status": "success", "results": results, "total": total})
+
+    @routes.get("/assetmanager/api/library/suggest")
+    async def api_suggest_library(request):
+        """태그/단어 자동 완성. prefix로 시작하는 항목을 많이 쓰인 순서로 반환"""
+        prefix = request.query.get("prefix", "")
+        try:
+            limit = max(1, min(50, int(request.query.get("limit", 10))))
+        except ValueError:
+            limit = 10
+
+        def suggest():
+            ensure_index()
+            return index.suggest(prefix, limit)
+
+        return web.json_response({"status": "success", "suggestions": await run_io("search", suggest)})
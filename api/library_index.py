@@ -0,0 +1,364 @@
+"""
+api/library_index.py — 프롬프트 라이브러리 검색 인덱스
+라이브러리의 모든 조각(작품 > 그룹 > 조각)을 메모리 역색인으로 유지하여
+이름/프롬프트/ID 검색을 전체 문서 순회 없이 처리하고, 점수 순으로 정렬하여 페이지 단위로 반환합니다.
+  - 역색인    : 단어 → {조각 번호: 가중치}. 이름 단어는 프롬프트 단어보다 가중치가 높고,
+                쉼표로 나눈 프롬프트 태그 전체("blue hair")도 별도 항목으로 색인
+  - 접두어 트리: 태그/단어 자동 완성. 노드마다 상위 후보를 캐시하고 변경된 경로만 무효화
+  - 증분 갱신 : LibraryStore가 패치를 적용하면 연산 경로로 영향을 받은 작품/그룹만 다시 비교하고,
+                (이름, 프롬프트)가 바뀐 조각만 색인을 고친다. 전체 교체/외부 변경 시에는 다음 검색 때 다시 만든다.
+"""
+
+import re
+import math
+import heapq
+import threading
+
+from .library_store import _split_pointer, _find_index, LibraryPatchError
+
+_WORD_RE = re.compile(r"\w+")
+# 태그 정규화: 괄호 강조와 가중치 표기 "(tag:1.2)" 제거
+_TAG_BRACKETS_RE = re.compile(r"[()\[\]{}]")
+_TAG_WEIGHT_RE = re.compile(r":\s*[\d.]+\s*$")
+
+# 필드별 가중치
+NAME_WEIGHT = 3.0
+TAG_WEIGHT = 2.0
+PROMPT_WEIGHT = 1.0
+ID_WEIGHT = 1.0
+# 검색어 마지막 단어를 접두어로 확장할 때 후보 수와 감점 비율
+PREFIX_EXPANSIONS = 64
+PREFIX_PENALTY = 0.8
+# 접두어 트리 노드마다 캐시하는 상위 후보 수 (접두어 확장 후보 수 이상)
+SUGGEST_CACHE_SIZE = 64
+# 단어 빈도 포화 계수 (BM25 k1)
+TF_SATURATION = 1.2
+
+
+def _words(text):
+    return _WORD_RE.findall(text.lower()) if isinstance(text, str) else []
+
+
+def normalize_tag(tag):
+    """프롬프트 태그를 비교용 형태로 만든다 (소문자, 밑줄→공백, 괄호/가중치 제거, 공백 정리)."""
+    tag = _TAG_BRACKETS_RE.sub("", tag.lower().replace("_", " "))
+    return " ".join(_TAG_WEIGHT_RE.sub("", tag).split())
+
+
+def _tags(prompt):
+    if not isinstance(prompt, str):
+        return []
+    return [tag for tag in (normalize_tag(part) for part in prompt.split(",")) if tag]
+
+
+def _item_terms(item):
+    """조각 하나의 색인 항목 {단어: 가중치}. 태그 항목은 단어와 겹치지 않도록 '#'을 붙인다."""
+    terms = {}
+    for text, weight in ((item.get("name"), NAME_WEIGHT), (item.get("prompt"), PROMPT_WEIGHT), (item.get("id"), ID_WEIGHT)):
+        for word in _words(text):
+            terms[word] = terms.get(word, 0.0) + weight
+    for tag in _tags(item.get("prompt")):
+        terms["#" + tag] = terms.get("#" + tag, 0.0) + TAG_WEIGHT
+    return terms
+
+
+def _suggestions(terms):
+    """자동 완성 후보 (태그와 단어가 같은 글자이면 한 번만 센다)"""
+    return {term[1:] if term.startswith("#") else term for term in terms}
+
+
+class _TrieNode:
+    __slots__ = ("children", "count", "term", "top")
+
+    def __init__(self):
+        self.children = {}
+        self.count = 0
+        self.term = None
+        self.top = None
+
+
+class PrefixTrie:
+    """자동 완성용 접두어 트리. 항목마다 등장 조각 수(count)를 세고, 많이 쓰인 순서로 후보를 반환한다."""
+
+    def __init__(self):
+        self.root = _TrieNode()
+
+    def add(self, term, delta):
+        node = self.root
+        node.top = None
+        for ch in term:
+            child = node.children.get(ch)
+            if child is None:
+                child = node.children[ch] = _TrieNode()
+            node = child
+            node.top = None
+        node.term = term
+        node.count = max(0, node.count + delta)
+
+    def complete(self, prefix, limit=10):
+        """prefix로 시작하는 항목을 [(항목, 개수)]로 반환 (개수 내림차순, 같으면 사전순)."""
+        node = self.root
+        for ch in prefix:
+            node = node.children.get(ch)
+            if node is None:
+                return []
+        if limit > SUGGEST_CACHE_SIZE:
+            return self._collect(node, limit)
+        if node.top is None:
+            node.top = self._collect(node, SUGGEST_CACHE_SIZE)
+        return node.top[:limit]
+
+    @staticmethod
+    def _collect(node, limit):
+        found = []
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            if current.count > 0:
+                found.append((current.term, current.count))
+            stack.extend(current.children.values())
+        return heapq.nsmallest(limit, found, key=lambda x: (-x[1], x[0]))
+
+
+class LibraryIndex:
+    """
+    프롬프트 라이브러리 역색인. 스레드 안전하며, 문서 변경 알림(on_change)은 LibraryStore의 잠금 안에서 호출된다.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.dirty = True
+        self._clear()
+
+    def _clear(self):
+        self._next_id = 0
+        self._docs = {}          # 조각 번호 → (작품 ID, 그룹 ID, 조각 ID, 이름, 프롬프트, {항목: 가중치})
+        self._postings = {}      # 항목 → {조각 번호: 가중치}
+        self._by_cat = {}        # (작품 ID, 그룹 ID) → {조각 ID: 조각 번호}
+        self._work_names = {}
+        self._cat_names = {}
+        self._trie = PrefixTrie()
+
+    # ──────────────────────────────────────────────
+    # 갱신
+    # ──────────────────────────────────────────────
+
+    def on_change(self, doc, ops):
+        """LibraryStore 변경 알림. ops가 None이면(전체 교체, 외부 수정) 다음 검색 때 다시 만든다."""
+        with self._lock:
+            if self.dirty:
+                return
+            if ops is None:
+                self.dirty = True
+                return
+            try:
+                for scope in self._scopes(ops):
+                    if scope is None:
+                        self.dirty = True
+                        return
+                    self._sync_scope(doc, scope)
+            except Exception as e:
+                print(f"[ComfyUI-AssetManager] 라이브러리 검색 인덱스 갱신 실패, 다시 만듭니다: {e}")
+                self.dirty = True
+
+    def rebuild(self, doc):
+        """문서 전체로 인덱스를 다시 만든다."""
+        with self._lock:
+            self._clear()
+            works = doc.get("works") if isinstance(doc, dict) else None
+            for work in works if isinstance(works, list) else []:
+                if isinstance(work, dict) and work.get("id") not in self._work_names:
+                    self._sync_work(work.get("id"), work)
+            self.dirty = False
+
+    @staticmethod
+    def _scopes(ops):
+        """
+        연산 경로에서 영향을 받은 범위를 구한다: (작품 ID,) 또는 (작품 ID, 그룹 ID).
+        작품 배열 밖을 바꾸는 연산이면 None (전체 재구성).
+        """
+        scopes = []
+        for op in ops:
+            for key in ("path", "from"):
+                if key not in op:
+                    continue
+                try:
+                    segments = _split_pointer(op[key])
+                except LibraryPatchError:
+                    scopes.append(None)
+                    continue
+                if segments[0] != "works" or len(segments) < 2:
+                    scopes.append(None)
+                elif len(segments) < 4 or segments[2] != "categories":
+                    scopes.append((segments[1],))
+                    # 작품 ID 변경: 새 ID로도 다시 읽는다
+                    if segments[2:] == ["id"] and isinstance(op.get("value"), str):
+                        scopes.append((op["value"],))
+                else:
+                    scopes.append((segments[1], segments[3]))
+                    if segments[4:] == ["id"] and isinstance(op.get("value"), str):
+                        scopes.append((segments[1], op["value"]))
+        # 작품 범위가 있으면 그 작품의 그룹 범위는 생략
+        works = {scope[0] for scope in scopes if scope is not None and len(scope) == 1}
+        unique = []
+        for scope in scopes:
+            if (scope is None or len(scope) == 1 or scope[0] not in works) and scope not in unique:
+                unique.append(scope)
+        return unique
+
+    def _sync_scope(self, doc, scope):
+        works = doc.get("works") if isinstance(doc, dict) else None
+        works = works if isinstance(works, list) else []
+        idx = _find_index(works, scope[0])
+        work = works[idx] if idx >= 0 else None
+        if len(scope) == 1:
+            self._sync_work(scope[0], work)
+            return
+        categories = work.get("categories") if isinstance(work, dict) else None
+        categories = categories if isinstance(categories, list) else []
+        idx = _find_index(categories, scope[1])
+        self._sync_category(scope[0], scope[1], categories[idx] if idx >= 0 else None)
+
+    def _sync_work(self, work_id, work):
+        categories = work.get("categories") if isinstance(work, dict) else None
+        categories = categories if isinstance(categories, list) else []
+        if work is None:
+            self._work_names.pop(work_id, None)
+        else:
+            self._work_names[work_id] = work.get("name") or work_id
+        present = set()
+        for cat in categories:
+            if isinstance(cat, dict) and cat.get("id") not in present:
+                present.add(cat.get("id"))
+                self._sync_category(work_id, cat.get("id"), cat)
+        for key in [key for key in self._by_cat if key[0] == work_id and key[1] not in present]:
+            self._sync_category(work_id, key[1], None)
+
+    def _sync_category(self, work_id, cat_id, cat):
+        """그룹의 조각을 색인과 비교하여 (이름, 프롬프트, ID)가 바뀐 조각만 다시 색인한다."""
+        key = (work_id, cat_id)
+        existing = self._by_cat.pop(key, {})
+        self._cat_names.pop(key, None)
+        items = cat.get("items") if isinstance(cat, dict) else None
+        current = {}
+        if isinstance(cat, dict):
+            self._cat_names[key] = cat.get("name") or cat_id
+        for item in items if isinstance(items, list) else []:
+            if not isinstance(item, dict) or item.get("id") in current:
+                continue
+            item_id = item.get("id")
+            doc_id = existing.pop(item_id, None)
+            if doc_id is not None:
+                entry = self._docs[doc_id]
+                if entry[3] == item.get("name") and entry[4] == item.get("prompt"):
+                    current[item_id] = doc_id
+                    continue
+                self._remove_doc(doc_id)
+            current[item_id] = self._add_doc(work_id, cat_id, item)
+        for doc_id in existing.values():
+            self._remove_doc(doc_id)
+        if current:
+            self._by_cat[key] = current
+
+    def _add_doc(self, work_id, cat_id, item):
+        doc_id = self._next_id
+        self._next_id += 1
+        terms = _item_terms(item)
+        self._docs[doc_id] = (work_id, cat_id, item.get("id"), item.get("name"), item.get("prompt"), terms)
+        for term, weight in terms.items():
+            self._postings.setdefault(term, {})[doc_id] = weight
+        for suggestion in _suggestions(terms):
+            self._trie.add(suggestion, 1)
+        return doc_id
+
+    def _remove_doc(self, doc_id):
+        entry = self._docs.pop(doc_id)
+        for term in entry[5]:
+            posting = self._postings.get(term)
+            if posting is not None:
+                posting.pop(doc_id, None)
+                if not posting:
+                    del self._postings[term]
+        for suggestion in _suggestions(entry[5]):
+            self._trie.add(suggestion, -1)
+
+    # ──────────────────────────────────────────────
+    # 조회
+    # ──────────────────────────────────────────────
+
+    def _idf(self, term):
+        return math.log(1.0 + len(self._docs) / len(self._postings[term]))
+
+    def _term_scores(self, token, expand):
+        """검색어 단어 하나에 대해 {조각 번호: 점수}. expand이면 접두어가 같은 단어도 감점하여 포함한다."""
+        candidates = [(token, 1.0)] if token in self._postings else []
+        if expand:
+            for term, _ in self._trie.complete(token, PREFIX_EXPANSIONS):
+                if term != token and term in self._postings:
+                    candidates.append((term, PREFIX_PENALTY))
+        scores = {}
+        for term, factor in candidates:
+            idf = self._idf(term) * factor
+            for doc_id, tf in self._postings[term].items():
+                score = idf * tf * (TF_SATURATION + 1) / (tf + TF_SATURATION)
+                if score > scores.get(doc_id, 0.0):
+                    scores[doc_id] = score
+        return scores
+
+    def search(self, q, work_id=None, limit=50, offset=0):
+        """
+        조각을 검색하여 점수 순으로 반환한다. 모든 단어가 들어 있는 조각만 찾으며(AND),
+        입력 중인 마지막 단어는 접두어로 확장한다. 검색어 전체가 태그와 일치하면 가산점을 준다.
+        반환값: (결과 목록, 전체 개수)
+        """
+        tokens = _words(q)
+        if not tokens:
+            return [], 0
+        expand_last = not q[-1:].isspace() and not q.endswith(",")
+        with self._lock:
+            total_scores = None
+            for i, token in enumerate(tokens):
+                scores = self._term_scores(token, expand_last and i == len(tokens) - 1)
+                if total_scores is None:
+                    total_scores = scores
+                else:
+                    total_scores = {doc_id: s + scores[doc_id] for doc_id, s in total_scores.items() if doc_id in scores}
+                if not total_scores:
+                    return [], 0
+            tag = "#" + normalize_tag(q)
+            if tag in self._postings:
+                bonus = self._idf(tag) * TAG_WEIGHT
+                for doc_id in self._postings[tag]:
+                    if doc_id in total_scores:
+                        total_scores[doc_id] += bonus
+
+            if work_id is not None:
+                total_scores = {doc_id: s for doc_id, s in total_scores.items() if self._docs[doc_id][0] == work_id}
+            # 점수가 같으면 색인된 순서대로
+            ranked = heapq.nsmallest(offset + limit, total_scores.items(), key=lambda x: (-x[1], x[0]))[offset:]
+            results = []
+            for doc_id, score in ranked:
+                w, c, item_id, name, prompt, _ = self._docs[doc_id]
+                results.append({
+                    "work_id": w,
+                    "work_name": self._work_names.get(w, w),
+                    "category_id": c,
+                    "category_name": self._cat_names.get((w, c), c),
+                    "item_id": item_id,
+                    "name": name,
+                    "prompt": prompt,
+                    "score": round(score, 3),
+                })
+            return results, len(total_scores)
+
+    def suggest(self, prefix, limit=10):
+        """태그/단어 자동 완성 후보 [{"term", "count"}]"""
+        prefix = normalize_tag(prefix)
+        if not prefix:
+            return []
+        with self._lock:
+            return [{"term": term, "count": count} for term, count in self._trie.complete(prefix, limit)]
+
+    def stats(self):
+        with self._lock:
+            return {"items": len(self._docs), "terms": len(self._postings)}
@@ -0,0 +1,474 @@
+"""
+api/library_store.py — 프롬프트 라이브러리 저장소 (스냅샷 + 저널)
+prompt_library.json(스냅샷)과 prompt_library.json.journal(추가 전용 변경 기록)로 라이브러리를 보관합니다.
+  - 편집은 JSON-Patch 형식의 작은 연산 목록으로 받아 메모리 문서에 적용하고 저널 끝에 한 줄만 추가
+  - 저널이 일정 크기를 넘으면 전체 문서를 임시 파일에 쓴 뒤 rename으로 교체(스냅샷)하고 저널을 비움
+  - 문서 버전으로 ETag를 만들어, 다른 탭이 먼저 저장한 경우 If-Match 불일치(412)로 덮어쓰기를 막음
+
+경로는 RFC 6901 JSON Pointer 형식이되, id를 가진 객체 배열(works/categories/items)의 원소는
+인덱스 대신 id로 가리킵니다.  예) /works/work_1/categories/cat_2/items/item_3/prompt
+  - add     : 배열 원소 추가(value.id == 마지막 세그먼트, index 생략 시 끝에 추가) 또는 필드 설정
+  - replace : 기존 원소/필드 교체
+  - remove  : 원소/필드 삭제
+  - move    : from 원소를 path 위치로 이동 (같은 배열 내 순서 변경 또는 다른 부모로 이동, index 지정 가능)
+"""
+
+import os
+import json
+import uuid
+import threading
+
+# 저널에 이 개수 이상의 패치가 쌓이거나 이 크기를 넘으면 스냅샷으로 합친다
+COMPACT_PATCHES = 200
+COMPACT_BYTES = 1024 * 1024
+
+# id로 원소를 찾는 배열 필드
+ID_ARRAYS = ("works", "categories", "items")
+
+
+class LibraryPatchError(Exception):
+    """패치 적용 실패. status는 HTTP 상태 코드 (400: 잘못된 연산, 409: 경로 충돌)"""
+
+    def __init__(self, message, status=409):
+        super().__init__(message)
+        self.status = status
+
+
+class PreconditionFailed(Exception):
+    """If-Match ETag가 현재 버전과 다름"""
+
+    def __init__(self, etag):
+        super().__init__("라이브러리가 다른 곳에서 변경되었습니다.")
+        self.etag = etag
+
+
+def _split_pointer(path):
+    if not isinstance(path, str) or not path.startswith("/"):
+        raise LibraryPatchError(f"잘못된 경로: {path!r}", 400)
+    return [seg.replace("~1", "/").replace("~0", "~") for seg in path[1:].split("/")]
+
+
+def _find_index(array, item_id):
+    for i, item in enumerate(array):
+        if isinstance(item, dict) and item.get("id") == item_id:
+            return i
+    return -1
+
+
+class _Patcher:
+    """연산을 문서에 직접 적용하고, 실패하면 되돌릴 수 있도록 역연산을 기록한다."""
+
+    def __init__(self, doc):
+        self.doc = doc
+        self.undo = []
+
+    def rollback(self):
+        for action in reversed(self.undo):
+            action()
+        self.undo.clear()
+
+    # ── 기본 변경 (역연산 기록) ──
+
+    def _set_key(self, obj, key, value):
+        if key in obj:
+            old = obj[key]
+            self.undo.append(lambda: obj.__setitem__(key, old))
+        else:
+            self.undo.append(lambda: obj.pop(key, None))
+        obj[key] = value
+
+    def _del_key(self, obj, key):
+        old = obj.pop(key)
+        self.undo.append(lambda: obj.__setitem__(key, old))
+
+    def _insert(self, array, index, value):
+        array.insert(index, value)
+        self.undo.append(lambda: array.pop(index))
+
+    def _pop(self, array, index):
+        old = array.pop(index)
+        self.undo.append(lambda: array.insert(index, old))
+        return old
+
+    # ── 경로 해석 ──
+
+    def _resolve(self, segments):
+        """마지막 세그먼트의 부모 컨테이너와 (부모 키, 마지막 세그먼트)를 반환한다."""
+        node, parent_key = self.doc, None
+        for seg in segments[:-1]:
+            node, parent_key = self._child(node, parent_key, seg), seg
+        return node, parent_key, segments[-1]
+
+    def _child(self, node, parent_key, seg):
+        if isinstance(node, list):
+            idx = _find_index(node, seg) if parent_key in ID_ARRAYS else self._list_index(node, seg)
+            if idx < 0:
+                raise LibraryPatchError(f"'{parent_key}'에 '{seg}' 항목이 없습니다.")
+            return node[idx]
+        if isinstance(node, dict) and seg in node:
+            return node[seg]
+        raise LibraryPatchError(f"경로를 찾을 수 없습니다: {seg}")
+
+    @staticmethod
+    def _list_index(array, seg):
+        try:
+            idx = int(seg)
+        except ValueError:
+            return -1
+        return idx if 0 <= idx < len(array) else -1
+
+    def _check_id_unique(self, container, parent_key, value):
+        if parent_key in ID_ARRAYS and isinstance(value, dict):
+            if _find_index(container, value.get("id")) >= 0:
+                raise LibraryPatchError(f"중복된 ID입니다: {value.get('id')}")
+
+    def _insert_position(self, array, op):
+        index = op.get("index")
+        if index is None:
+            return len(array)
+        if not isinstance(index, int) or not 0 <= index <= len(array):
+            raise LibraryPatchError(f"잘못된 index: {index!r}", 400)
+        return index
+
+    # ── 연산 ──
+
+    def apply(self, op):
+        if not isinstance(op, dict):
+            raise LibraryPatchError("연산은 객체여야 합니다.", 400)
+        kind = op.get("op")
+        handler = getattr(self, f"_op_{kind}", None) if isinstance(kind, str) else None
+        if handler is None:
+            raise LibraryPatchError(f"지원하지 않는 연산: {kind!r}", 400)
+        handler(op)
+
+    def _op_add(self, op, replace=False):
+        if "value" not in op:
+            raise LibraryPatchError("value가 필요합니다.", 400)
+        value = op["value"]
+        container, parent_key, last = self._resolve(_split_pointer(op.get("path")))
+
+        if isinstance(container, dict):
+            if replace and last not in container:
+                raise LibraryPatchError(f"교체할 필드가 없습니다: {last}")
+            if last == "id" and isinstance(value, str) and value != container.get("id"):
+                self._check_id_rename(op, value)
+            self._set_key(container, last, value)
+            return
+
+        if not isinstance(container, list):
+            raise LibraryPatchError(f"'{last}'의 부모가 컨테이너가 아닙니다.")
+        if parent_key in ID_ARRAYS:
+            if not isinstance(value, dict) or value.get("id") != last:
+                raise LibraryPatchError("value.id가 경로의 마지막 세그먼트와 같아야 합니다.", 400)
+            idx = _find_index(container, last)
+            if replace:
+                if idx < 0:
+                    raise LibraryPatchError(f"교체할 항목이 없습니다: {last}")
+                self._pop(container, idx)
+                self._insert(container, idx, value)
+                return
+            if idx >= 0:
+                raise LibraryPatchError(f"중복된 ID입니다: {last}")
+            self._insert(container, self._insert_position(container, op), value)
+            return
+
+        if last == "-" and not replace:
+            self._insert(container, len(container), value)
+            return
+        idx = self._list_index(container, last)
+        if idx < 0 and not (not replace and last.isdigit() and int(last) == len(container)):
+            raise LibraryPatchError(f"잘못된 배열 인덱스: {last}")
+        if replace:
+            self._pop(container, idx)
+            self._insert(container, idx, value)
+        else:
+            self._insert(container, int(last), value)
+
+    def _check_id_rename(self, op, new_id):
+        """/…/<배열>/<id>/id 필드 변경 시 형제 원소와 id가 겹치지 않는지 확인한다."""
+        segments = _split_pointer(op.get("path"))
+        if len(segments) < 3 or segments[-3] not in ID_ARRAYS:
+            return
+        siblings, _, _ = self._resolve(segments[:-1])
+        if _find_index(siblings, new_id) >= 0:
+            raise LibraryPatchError(f"중복된 ID입니다: {new_id}")
+
+    def _op_replace(self, op):
+        self._op_add(op, replace=True)
+
+    def _op_remove(self, op):
+        self._take(op.get("path"))
+
+    def _take(self, path):
+        container, parent_key, last = self._resolve(_split_pointer(path))
+        if isinstance(container, dict):
+            if last not in container:
+                raise LibraryPatchError(f"삭제할 필드가 없습니다: {last}")
+            old = container[last]
+            self._del_key(container, last)
+            return old
+        if not isinstance(container, list):
+            raise LibraryPatchError(f"'{last}'의 부모가 컨테이너가 아닙니다.")
+        idx = _find_index(container, last) if parent_key in ID_ARRAYS else self._list_index(container, last)
+        if idx < 0:
+            raise LibraryPatchError(f"삭제할 항목이 없습니다: {last}")
+        return self._pop(container, idx)
+
+    def _op_move(self, op):
+        value = self._take(op.get("from"))
+        container, parent_key, last = self._resolve(_split_pointer(op.get("path")))
+        if not isinstance(container, list) or parent_key not in ID_ARRAYS:
+            raise LibraryPatchError("move 대상은 works/categories/items 원소여야 합니다.", 400)
+        if not isinstance(value, dict) or value.get("id") != last:
+            raise LibraryPatchError("이동하는 항목의 id가 경로의 마지막 세그먼트와 같아야 합니다.", 400)
+        self._check_id_unique(container, parent_key, value)
+        self._insert(container, self._insert_position(container, op), value)
+
+
+class LibraryStore:
+    """
+    프롬프트 라이브러리 문서를 메모리에 두고 스냅샷 + 저널로 영속화한다.
+    모든 메서드는 블로킹이며 run_io("library") 안에서 호출한다 (내부 잠금으로 직렬화).
+    """
+
+    def __init__(self, snapshot_path, journal_path=None):
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path or snapshot_path + ".journal"
+        self._lock = threading.Lock()
+        self._doc = None
+        self._epoch = None
+        self._version = 0
+        self._stamp = None
+        self._journal_patches = 0
+        self._journal_bytes = 0
+        self._listeners = []
+
+    # ── 공개 API ──
+
+    def subscribe(self, listener):
+        """
+        문서 변경 알림을 등록한다. listener(doc, ops)는 저장소 잠금 안에서 호출되며,
+        ops는 적용된 패치 연산 목록이거나 None(처음 읽기, 전체 교체, 외부 수정)이다.
+        """
+        self._listeners.append(listener)
+
+    def read(self, func):
+        """잠금 안에서 func(문서, ETag)를 호출하고 결과를 반환한다 (문서 일부만 꺼낼 때 사용)."""
+        with self._lock:
+            self._ensure_loaded()
+            return func(self._doc, self._etag())
+
+    def get(self):
+        """(문서, ETag)를 반환한다. 문서는 내부 객체이므로 호출자는 수정하지 않는다."""
+        with self._lock:
+            self._ensure_loaded()
+            return self._doc, self._etag()
+
+    def etag(self):
+        """현재 ETag만 반환한다 (문서를 직렬화하지 않으므로 If-None-Match 확인용으로 값싸다)."""
+        with self._lock:
+            self._ensure_loaded()
+            return self._etag()
+
+    def get_json(self):
+        """(JSON 바이트, ETag)를 반환한다."""
+        with self._lock:
+            self._ensure_loaded()
+            return json.dumps(self._doc, ensure_ascii=False).encode("utf-8"), self._etag()
+
+    def replace(self, doc, if_match=None):
+        """문서 전체를 교체하고 스냅샷을 바로 기록한다. 반환값: 새 ETag"""
+        if not isinstance(doc, dict):
+            raise LibraryPatchError("라이브러리 데이터는 객체여야 합니다.", 400)
+        with self._lock:
+            self._ensure_loaded()
+            self._check_precondition(if_match)
+            self._doc = doc
+            self._version += 1
+            self._write_snapshot()
+            self._notify(None)
+            return self._etag()
+
+    def patch(self, ops, if_match=None):
+        """
+        연산 목록을 원자적으로 적용한다 (하나라도 실패하면 모두 되돌림).
+        반환값: 새 ETag. 실패 시 LibraryPatchError / PreconditionFailed
+        """
+        if not isinstance(ops, list):
+            raise LibraryPatchError("ops는 배열이어야 합니다.", 400)
+        with self._lock:
+            self._ensure_loaded()
+            self._check_precondition(if_match)
+            if not ops:
+                return self._etag()
+
+            # 연산의 value 객체는 적용 후 문서의 일부가 되어 이후 편집으로 바뀌므로, 저널 줄을 먼저 만든다
+            line = self._journal_line(self._version + 1, ops)
+            patcher = _Patcher(self._doc)
+            try:
+                for op in ops:
+                    patcher.apply(op)
+                self._append_journal(line)
+            except Exception:
+                patcher.rollback()
+                raise
+            self._version += 1
+            self._notify(ops)
+
+            if self._journal_patches >= COMPACT_PATCHES or self._journal_bytes >= COMPACT_BYTES:
+                try:
+                    self._write_snapshot()
+                except OSError as e:
+                    # 저널에는 이미 기록되었으므로 다음 기회에 다시 합친다
+                    print(f"[ComfyUI-AssetManager] 라이브러리 스냅샷 기록 실패: {e}")
+            return self._etag()
+
+    def compact(self):
+        """저널 내용을 스냅샷에 합친다 (저널이 비어 있으면 아무것도 하지 않음)."""
+        with self._lock:
+            self._ensure_loaded()
+            if self._journal_patches:
+                self._write_snapshot()
+
+    # ── 내부 ──
+
+    def _notify(self, ops):
+        for listener in self._listeners:
+            try:
+                listener(self._doc, ops)
+            except Exception as e:
+                print(f"[ComfyUI-AssetManager] 라이브러리 변경 알림 실패: {e}")
+
+    def _etag(self):
+        # epoch는 저널이 새로 만들어질 때 정해지고 헤더에 보존되므로, 서버를 재시작해도 ETag가 유지된다
+        return f'"{self._epoch}-{self._version}"'
+
+    def _check_precondition(self, if_match):
+        if not if_match or if_match.strip() == "*":
+            return
+        current = self._etag()
+        tags = [tag.strip() for tag in if_match.split(",")]
+        if current not in [tag[2:] if tag.startswith("W/") else tag for tag in tags]:
+            raise PreconditionFailed(current)
+
+    def _snapshot_stamp(self):
+        try:
+            st = os.stat(self.snapshot_path)
+        except FileNotFoundError:
+            return None
+        return [st.st_mtime_ns, st.st_size]
+
+    def _ensure_loaded(self):
+        """
+        최초 호출 시 스냅샷 + 저널을 읽는다. 이후에는 stat 한 번으로 스냅샷이 외부에서
+        바뀌었는지만 확인하고, 바뀌었으면 파일 내용을 새 기준으로 다시 읽는다.
+        """
+        stamp = self._snapshot_stamp()
+        if self._doc is not None and stamp == self._stamp:
+            return
+
+        if stamp is None:
+            doc = {"categories": []}
+        else:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                doc = json.load(f)
+
+        if self._doc is not None:
+            # 실행 중 사용자가 prompt_library.json을 직접 고친 경우: 파일이 기준, 저널은 폐기
+            print("[ComfyUI-AssetManager] prompt_library.json 외부 변경 감지, 다시 읽습니다.")
+            self._doc = doc
+            self._version += 1
+            self._stamp = stamp
+            self._reset_journal()
+            self._notify(None)
+            return
+
+        self._doc = doc
+        self._stamp = stamp
+        self._replay_journal()
+        self._notify(None)
+
+    def _replay_journal(self):
+        """
+        저널 헤더의 스냅샷 stamp가 현재 스냅샷과 같을 때만 기록된 패치를 다시 적용한다.
+        (다르면 스냅샷 교체 직후 저널을 비우기 전에 종료된 것이므로 패치는 이미 스냅샷에 들어 있음)
+        """
+        try:
+            with open(self.journal_path, 'rb') as f:
+                lines = f.read().split(b"\n")
+        except FileNotFoundError:
+            lines = []
+
+        try:
+            header = json.loads(lines[0])
+        except (ValueError, IndexError):
+            header = {}
+        self._epoch = header.get("epoch") or uuid.uuid4().hex[:12]
+        self._version = int(header.get("base", 0))
+        if header.get("stamp") != self._stamp:
+            self._version += 1
+            self._reset_journal()
+            return
+
+        replayed = 0
+        for line in lines[1:]:
+            if not line.strip():
+                continue
+            patcher = _Patcher(self._doc)
+            try:
+                entry = json.loads(line)
+                for op in entry["ops"]:
+                    patcher.apply(op)
+            except (ValueError, KeyError, TypeError, LibraryPatchError) as e:
+                # 마지막 줄이 기록 도중 끊긴 경우 등: 여기까지만 복구하고 나머지는 버린다
+                patcher.rollback()
+                print(f"[ComfyUI-AssetManager] 라이브러리 저널 복구 중단: {e}")
+                break
+            self._version = int(entry.get("v", self._version + 1))
+            replayed += 1
+
+        if replayed:
+            # 재생한 내용을 스냅샷으로 합쳐 시작 시점의 저널을 비운다
+            self._write_snapshot()
+        else:
+            self._reset_journal()
+
+    @staticmethod
+    def _journal_line(version, ops):
+        return json.dumps({"v": version, "ops": ops}, ensure_ascii=False).encode("utf-8") + b"\n"
+
+    def _append_journal(self, line):
+        with open(self.journal_path, 'ab') as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+        self._journal_patches += 1
+        self._journal_bytes += len(line)
+
+    def _write_atomic(self, path, data):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def _reset_journal(self):
+        header = json.dumps({"epoch": self._epoch, "base": self._version, "stamp": self._stamp}).encode("utf-8") + b"\n"
+        self._write_atomic(self.journal_path, header)
+        self._journal_patches = 0
+        self._journal_bytes = len(header)
+
+    def _write_snapshot(self):
+        """전체 문서를 임시 파일 + rename으로 기록한 뒤 저널을 새 스냅샷 기준으로 비운다."""
+        data = json.dumps(self._doc, indent=4, ensure_ascii=False).encode("utf-8")
+        self._write_atomic(self.snapshot_path, data)
+        self._stamp = self._snapshot_stamp()
+        self._reset_journal()
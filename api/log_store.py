@@ -0,0 +1,338 @@
+"""
+api/log_store.py — 생성 로그 기록/조회
+요청마다 파일을 열고 닫지 않도록, 로그 레코드를 메모리 큐에 넣고 백그라운드 스레드가 모아서 기록합니다.
+  - 형식   : 하루 단위 JSON Lines 파일 (web/log/YYYY-MM-DD.jsonl), 한 줄에 레코드 하나
+  - 회전   : 파일이 MAX_FILE_BYTES를 넘거나 날짜가 바뀌면 gzip으로 압축 보관
+             (YYYY-MM-DD.N.jsonl.gz: 같은 날의 N번째 조각, YYYY-MM-DD.jsonl.gz: 그날의 마지막 조각)
+  - 조회   : 파일 이름으로 날짜 범위를 먼저 거르고, 남은 파일만 한 줄씩 스트리밍으로 읽어 필터링
+이전 버전의 텍스트 로그(YYYY-MM-DD.log)도 한 줄을 메시지 하나로 간주하여 함께 조회합니다.
+"""
+
+import os
+import re
+import gzip
+import json
+import time
+import queue
+import atexit
+import shutil
+import datetime
+import threading
+from collections import deque
+
+from .gallery_index import encode_cursor, decode_cursor
+
+# 모아서 기록하는 주기와 한 번에 기록하는 최대 레코드 수
+FLUSH_INTERVAL_SECONDS = 1.0
+FLUSH_MAX_RECORDS = 500
+# 하루 로그 파일이 이 크기를 넘으면 압축 조각으로 넘긴다
+MAX_FILE_BYTES = 8 * 1024 * 1024
+
+# 레코드에 그대로 옮겨 담는 클라이언트 필드
+RECORD_FIELDS = ("type", "status", "prompt_id", "duration_ms", "client_ts", "fields")
+
+_LOG_NAME = re.compile(r"^(\d{4}-\d{2}-\d{2})(?:\.(\d+))?\.(jsonl|jsonl\.gz|log)$")
+# 같은 날짜 안에서의 파일 순서: 구 텍스트 로그 → 번호 조각 → 마지막 조각
+_LAST_PART = 1 << 30
+_DAY = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+# 압축 조각처럼 다시 바뀌지 않는 파일의 줄 수 캐시: 경로 → ((mtime_ns, 크기), 줄 수)
+_line_counts = {}
+
+
+def _file_key(name):
+    """로그 파일 이름의 정렬 키 (날짜, 조각 순서). 로그 파일이 아니면 None."""
+    m = _LOG_NAME.match(name)
+    if not m:
+        return None
+    day, part, ext = m.groups()
+    return (day, -1 if ext == "log" else (int(part) if part else _LAST_PART))
+
+
+def _log_files(log_dir, date_from=None, date_to=None):
+    """날짜 범위에 드는 로그 파일을 시간 순서로 반환한다: [(정렬 키, 파일 이름)]"""
+    files = []
+    try:
+        names = os.listdir(log_dir)
+    except FileNotFoundError:
+        return files
+    for name in names:
+        key = _file_key(name)
+        if key is None:
+            continue
+        if (date_from and key[0] < date_from) or (date_to and key[0] > date_to):
+            continue
+        files.append((key, name))
+    files.sort()
+    return files
+
+
+def _iter_lines(path):
+    """로그 파일을 한 줄씩 읽는다 (.gz는 압축을 풀며 스트리밍)."""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if line:
+                yield line
+
+
+def _parse_line(name, line):
+    if name.endswith(".log"):
+        return {"ts": name[:10], "type": "generation", "message": line}
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return None
+    return record if isinstance(record, dict) else None
+
+
+def _matches(record, q, status, type_):
+    if status and record.get("status") != status:
+        return False
+    if type_ and record.get("type") != type_:
+        return False
+    if q:
+        haystack = record.get("message", "")
+        if record.get("fields"):
+            haystack += " " + json.dumps(record["fields"], ensure_ascii=False)
+        if q not in haystack.lower():
+            return False
+    return True
+
+
+def _count_lines(path):
+    """로그 파일의 레코드(빈 줄 제외) 수. 파일 크기/수정 시각이 같으면 이전 결과를 재사용한다."""
+    st = os.stat(path)
+    stamp = (st.st_mtime_ns, st.st_size)
+    cached = _line_counts.get(path)
+    if cached and cached[0] == stamp:
+        return cached[1]
+    count = sum(1 for _ in _iter_lines(path))
+    _line_counts[path] = (stamp, count)
+    return count
+
+
+def _day_offsets(log_dir, names):
+    """
+    같은 날짜의 파일들(시간 순서)에서 각 파일 첫 줄의 하루 기준 순번.
+    회전은 오늘 파일을 통째로 다음 조각으로 넘길 뿐이므로, 하루 안의 순번은 회전 전후로 같다.
+    """
+    offsets, total = [], 0
+    for i, name in enumerate(names):
+        offsets.append(total)
+        if i + 1 < len(names):
+            total += _count_lines(os.path.join(log_dir, name))
+    return offsets
+
+
+def query_logs(log_dir, date_from=None, date_to=None, q="", status=None, type_=None,
+               cursor=None, limit=50, order="newest"):
+    """
+    로그 레코드를 필터링하여 한 페이지를 반환한다.
+      - date_from/date_to : YYYY-MM-DD (포함)
+      - q                 : 메시지/필드 부분 문자열 (대소문자 무시)
+      - cursor            : 직전 응답의 next_cursor ([날짜, 그날의 레코드 순번])
+    반환값: (레코드 목록, next_cursor 또는 None)
+    커서는 파일 이름 대신 하루 단위 순번을 쓰므로, 페이지 사이에 오늘 파일이 압축 조각으로 넘어가도 어긋나지 않는다.
+    파일 전체를 메모리에 올리지 않고, newest 순서에서도 파일당 limit개만 유지하며 앞에서부터 읽는다.
+    """
+    newest = order != "oldest"
+    q = (q or "").lower()
+    cursor_day, cursor_seq = None, None
+    if cursor:
+        values = decode_cursor(cursor)
+        if (len(values) != 2 or not isinstance(values[0], str) or not _DAY.match(values[0])
+                or not isinstance(values[1], int)):
+            raise ValueError("Invalid cursor")
+        cursor_day, cursor_seq = values
+
+    days = {}
+    for key, name in _log_files(log_dir, date_from, date_to):
+        days.setdefault(key[0], []).append(name)
+    day_list = sorted(days, reverse=newest)
+
+    results = []
+    for day in day_list:
+        bound = None
+        if cursor_day is not None:
+            # 커서보다 앞(정렬 방향 기준)의 날짜는 이미 반환했으므로 건너뛴다
+            if (day > cursor_day) if newest else (day < cursor_day):
+                continue
+            if day == cursor_day:
+                bound = cursor_seq
+        names = days[day]
+        try:
+            offsets = _day_offsets(log_dir, names)
+        except (OSError, EOFError) as e:
+            print(f"[ComfyUI-AssetManager] 로그 파일 읽기 실패 ({day}): {e}")
+            continue
+        indexes = range(len(names) - 1, -1, -1) if newest else range(len(names))
+        for i in indexes:
+            name, first = names[i], offsets[i]
+            if bound is not None:
+                # 커서 이전(정렬 방향 기준)의 레코드만 있는 파일은 열지 않는다
+                if newest and first >= bound:
+                    continue
+                if not newest and i + 1 < len(names) and offsets[i + 1] <= bound + 1:
+                    continue
+            limit_left = limit + 1 - len(results)
+            matched = deque(maxlen=limit_left) if newest else []
+            path = os.path.join(log_dir, name)
+            try:
+                for lineno, line in enumerate(_iter_lines(path)):
+                    seq = first + lineno
+                    if bound is not None:
+                        if newest and seq >= bound:
+                            break
+                        if not newest and seq <= bound:
+                            continue
+                    if q and q not in line.lower():
+                        # 원문에 검색어가 없으면 JSON 파싱 없이 건너뛴다 (한글은 ensure_ascii=False로 기록됨)
+                        continue
+                    record = _parse_line(name, line)
+                    if record is None or not _matches(record, q, status, type_):
+                        continue
+                    matched.append((seq, record))
+                    if not newest and len(matched) >= limit_left:
+                        break
+            except (OSError, EOFError) as e:
+                print(f"[ComfyUI-AssetManager] 로그 파일 읽기 실패 ({name}): {e}")
+                continue
+
+            ordered = reversed(matched) if newest else matched
+            for seq, record in ordered:
+                results.append((day, seq, record))
+            if len(results) > limit:
+                break
+        if len(results) > limit:
+            break
+
+    next_cursor = None
+    if len(results) > limit:
+        results = results[:limit]
+        day, seq, _ = results[-1]
+        next_cursor = encode_cursor([day, seq])
+    return [record for _, _, record in results], next_cursor
+
+
+class LogWriter:
+    """
+    로그 레코드를 큐에 모아 백그라운드 스레드에서 JSON Lines 파일에 일괄 기록하는 작업자.
+    write()는 큐에 넣기만 하므로 이벤트 루프에서 바로 호출해도 된다.
+    """
+
+    def __init__(self, log_dir):
+        self.log_dir = log_dir
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._file = None
+        self._file_day = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name="am-log-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.flush, 5.0)
+
+    def write(self, message, **extra):
+        """레코드를 기록 대기열에 넣는다. 서버 수신 시각(ts, time)이 함께 기록된다."""
+        now = time.time()
+        record = {
+            "ts": datetime.datetime.fromtimestamp(now).isoformat(timespec="milliseconds"),
+            "time": round(now, 3),
+            "type": "generation",
+            "message": message,
+        }
+        record.update({k: v for k, v in extra.items() if v is not None})
+        self._queue.put(record)
+
+    def flush(self, timeout=None):
+        """대기 중인 레코드가 모두 파일에 기록될 때까지 기다린다 (조회 전 호출)."""
+        if not (self._thread and self._thread.is_alive()):
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    # ── 백그라운드 스레드 ──
+
+    def _run(self):
+        self._compress_old_days()
+        while True:
+            batch, waiters = [], []
+            item = self._queue.get()
+            deadline = time.monotonic() + FLUSH_INTERVAL_SECONDS
+            while True:
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                    break
+                batch.append(item)
+                if len(batch) >= FLUSH_MAX_RECORDS:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            try:
+                if batch:
+                    self._write_batch(batch)
+            except Exception as e:
+                print(f"[ComfyUI-AssetManager] 로그 기록 실패: {e}")
+            for waiter in waiters:
+                waiter.set()
+
+    def _write_batch(self, batch):
+        for record in batch:
+            day = record["ts"][:10]
+            if day != self._file_day:
+                self._open_day(day)
+            self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+        if self._file.tell() >= MAX_FILE_BYTES:
+            self._rotate_part()
+
+    def _open_day(self, day):
+        previous = self._file_day
+        if self._file:
+            self._file.close()
+            self._file = None
+        if previous and previous < day:
+            self._compress(os.path.join(self.log_dir, f"{previous}.jsonl"), f"{previous}.jsonl.gz")
+        os.makedirs(self.log_dir, exist_ok=True)
+        self._file = open(os.path.join(self.log_dir, f"{day}.jsonl"), "a", encoding="utf-8")
+        self._file_day = day
+
+    def _rotate_part(self):
+        """오늘 파일을 다음 번호 조각으로 압축해 넘기고 새 파일을 연다."""
+        day = self._file_day
+        self._file.close()
+        self._file = None
+        parts = [k[1] for k, _ in _log_files(self.log_dir, day, day) if 0 <= k[1] < _LAST_PART]
+        part = max(parts, default=0) + 1
+        self._compress(os.path.join(self.log_dir, f"{day}.jsonl"), f"{day}.{part}.jsonl.gz")
+        self._file = open(os.path.join(self.log_dir, f"{day}.jsonl"), "a", encoding="utf-8")
+
+    def _compress(self, src, dest_name):
+        """src를 gzip으로 압축해 dest_name으로 저장하고 원본을 지운다 (임시 파일 + rename)."""
+        if not os.path.exists(src):
+            return
+        dest = os.path.join(self.log_dir, dest_name)
+        tmp = dest + ".tmp"
+        with open(src, "rb") as f_in, gzip.open(tmp, "wb", compresslevel=6) as f_out:
+            shutil.copyfileobj(f_in, f_out)
+        os.replace(tmp, dest)
+        os.remove(src)
+
+    def _compress_old_days(self):
+        """서버가 꺼져 있는 동안 날짜가 바뀐 경우, 압축되지 않은 지난 날짜 파일을 정리한다."""
+        today = datetime.date.today().isoformat()
+        for (day, order), name in _log_files(self.log_dir, date_to=today):
+            if day < today and name.endswith(".jsonl") and order == _LAST_PART:
+                try:
+                    self._compress(os.path.join(self.log_dir, name), name + ".gz")
+                except OSError as e:
+                    print(f"[ComfyUI-AssetManager] 로그 압축 실패 ({name}): {e}")
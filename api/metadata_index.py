@@ -0,0 +1,460 @@
+"""
+api/metadata_index.py — 생성 이미지 메타데이터 검색 인덱스
+output 이미지에 저장된 ComfyUI 프롬프트 그래프를 한 번만 읽어
+체크포인트, 로라(가중치), 시드, 샘플러, 긍정/부정 프롬프트를 정규화된 형태로 저장합니다.
+갤러리 인덱스(gallery_index.db)와 같은 DB 파일에 테이블을 두어 이미지 목록과 JOIN하며,
+프롬프트 텍스트는 SQLite FTS5 전문 검색 테이블로 검색합니다.
+인덱싱은 백그라운드 스레드에서 아직 처리하지 않았거나 수정된 이미지만 대상으로 합니다.
+"""
+
+import os
+import sqlite3
+import threading
+
+from .image_metadata import read_comfy_metadata
+from .gallery_index import AttachedIndex, AttachedIndexHandle, folder_filter, encode_cursor, decode_cursor
+
+# 한 번의 트랜잭션에서 처리할 이미지 수
+INDEX_BATCH_SIZE = 200
+# 새 이미지 알림이 없을 때 누락분을 확인하는 간격
+IDLE_RECHECK_SECONDS = 30.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS image_meta (
+    subfolder TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    has_prompt INTEGER NOT NULL,
+    checkpoint TEXT,
+    seed TEXT,
+    sampler TEXT,
+    scheduler TEXT,
+    steps INTEGER,
+    cfg REAL,
+    width INTEGER,
+    height INTEGER,
+    positive TEXT,
+    negative TEXT,
+    PRIMARY KEY (subfolder, filename)
+);
+CREATE INDEX IF NOT EXISTS idx_image_meta_checkpoint ON image_meta (checkpoint);
+CREATE INDEX IF NOT EXISTS idx_image_meta_seed ON image_meta (seed);
+CREATE TABLE IF NOT EXISTS image_loras (
+    subfolder TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    lora TEXT NOT NULL,
+    strength REAL
+);
+CREATE INDEX IF NOT EXISTS idx_image_loras_lora ON image_loras (lora);
+CREATE INDEX IF NOT EXISTS idx_image_loras_image ON image_loras (subfolder, filename);
+"""
+
+_FTS_SCHEMA = "CREATE VIRTUAL TABLE IF NOT EXISTS image_meta_fts USING fts5(positive, negative, models)"
+
+# 검색 결과 정렬 순서별 (ORDER BY 절, 커서 비교 연산자, 커서 컬럼)
+_SEARCH_ORDERS = {
+    "newest": ("i.timestamp DESC, i.subfolder DESC, i.filename DESC", "<", ("timestamp", "subfolder", "filename")),
+    "oldest": ("i.timestamp ASC, i.subfolder ASC, i.filename ASC", ">", ("timestamp", "subfolder", "filename")),
+}
+
+_SAMPLER_TYPES = ("KSampler", "KSamplerAdvanced")
+
+
+# ──────────────────────────────────────────────
+# 프롬프트 그래프 해석
+# ──────────────────────────────────────────────
+
+def _is_link(value):
+    """API 포맷 프롬프트의 노드 연결 값([노드 ID, 출력 인덱스])인지 확인"""
+    return isinstance(value, list) and len(value) == 2 and isinstance(value[0], str) and isinstance(value[1], int)
+
+
+def _resolve_input(prompt, value, key, depth=0):
+    """
+    노드 입력값을 실제 값으로 해석한다. 다른 노드에 연결된 값이면 해당 노드를 따라가서
+    같은 이름의 입력 → value 입력 → 출력 인덱스 순서의 스칼라 입력 순으로 찾는다.
+    (INTConstant, Sampler Scheduler Settings (JPS), Text Prompt Combo (JPS) 등)
+    """
+    if not _is_link(value):
+        return value
+    if depth > 8:
+        return None
+    node = prompt.get(value[0])
+    if not isinstance(node, dict):
+        return None
+    inputs = node.get("inputs", {})
+    if key in inputs:
+        return _resolve_input(prompt, inputs[key], key, depth + 1)
+    if "value" in inputs:
+        return _resolve_input(prompt, inputs["value"], key, depth + 1)
+    scalars = [v for v in inputs.values() if not isinstance(v, (dict, list))]
+    if value[1] < len(scalars):
+        return scalars[value[1]]
+    return None
+
+
+def _resolve_text(prompt, link, depth=0):
+    """KSampler의 positive/negative 연결을 따라가 프롬프트 문자열을 찾는다."""
+    if not _is_link(link) or depth > 8:
+        return None
+    node = prompt.get(link[0])
+    if not isinstance(node, dict):
+        return None
+    inputs = node.get("inputs", {})
+    if "text" in inputs:
+        text = _resolve_input(prompt, inputs["text"], "text")
+        return text if isinstance(text, str) else None
+    if node.get("class_type") == "Text Prompt Combo (JPS)":
+        return inputs.get("pos") if link[1] == 0 else inputs.get("neg")
+    # ConditioningCombine 등 중간 노드는 첫 번째 conditioning 입력을 따라간다
+    for value in inputs.values():
+        if _is_link(value):
+            text = _resolve_text(prompt, value, depth + 1)
+            if text:
+                return text
+    return None
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def extract_generation_params(prompt):
+    """
+    ComfyUI API 포맷 프롬프트 그래프에서 검색용 생성 파라미터를 추출한다.
+    프론트엔드의 applyMetadataToForm과 같은 노드 규칙(체크포인트 로더, 표준/rgthree 로라,
+    JPS/CLIP 프롬프트)을 따르며, 디노이즈가 가장 큰 KSampler를 기본 샘플러로 본다.
+    """
+    nodes = [node for node in prompt.values() if isinstance(node, dict)]
+    params = {
+        "checkpoint": None, "seed": None, "sampler": None, "scheduler": None,
+        "steps": None, "cfg": None, "positive": None, "negative": None, "loras": []
+    }
+
+    ckpt_node = next((n for n in nodes if n.get("class_type") == "CheckpointLoaderSimple"), None)
+    if ckpt_node:
+        params["checkpoint"] = _resolve_input(prompt, ckpt_node.get("inputs", {}).get("ckpt_name"), "ckpt_name")
+
+    samplers = [n for n in nodes if n.get("class_type") in _SAMPLER_TYPES]
+    if samplers:
+        sampler = max(samplers, key=lambda n: _to_float(_resolve_input(prompt, n["inputs"].get("denoise", 1), "denoise")) or 0)
+        inputs = sampler.get("inputs", {})
+        seed = _resolve_input(prompt, inputs.get("seed", inputs.get("noise_seed")), "seed")
+        params["seed"] = str(seed) if isinstance(seed, int) else None
+        params["sampler"] = _resolve_input(prompt, inputs.get("sampler_name"), "sampler_name")
+        params["scheduler"] = _resolve_input(prompt, inputs.get("scheduler"), "scheduler")
+        params["steps"] = _to_int(_resolve_input(prompt, inputs.get("steps"), "steps"))
+        params["cfg"] = _to_float(_resolve_input(prompt, inputs.get("cfg"), "cfg"))
+        params["positive"] = _resolve_text(prompt, inputs.get("positive"))
+        params["negative"] = _resolve_text(prompt, inputs.get("negative"))
+
+    combo = next((n for n in nodes if n.get("class_type") == "Text Prompt Combo (JPS)"), None)
+    if combo:
+        params["positive"] = params["positive"] or combo.get("inputs", {}).get("pos")
+        params["negative"] = params["negative"] or combo.get("inputs", {}).get("neg")
+
+    for node in nodes:
+        inputs = node.get("inputs", {})
+        if node.get("class_type") == "LoraLoader":
+            name = _resolve_input(prompt, inputs.get("lora_name"), "lora_name")
+            if isinstance(name, str):
+                params["loras"].append((name, _to_float(_resolve_input(prompt, inputs.get("strength_model"), "strength_model"))))
+        elif node.get("class_type") == "Power Lora Loader (rgthree)":
+            for key, lora in inputs.items():
+                if key.startswith("lora_") and isinstance(lora, dict) and lora.get("on") and lora.get("lora") not in (None, "None"):
+                    params["loras"].append((lora["lora"], _to_float(lora.get("strength"))))
+
+    for key in ("checkpoint", "sampler", "scheduler", "positive", "negative"):
+        if not isinstance(params[key], str):
+            params[key] = None
+    return params
+
+
+def read_prompt_graph(file_path):
+    """
+    이미지 파일에서 ComfyUI 프롬프트 그래프와 이미지 크기를 읽는다.
+    청크 리더(image_metadata.py)를 사용하므로 픽셀 데이터는 읽지 않는다.
+    반환값: (prompt dict 또는 None, (width, height))
+    """
+    metadata = read_comfy_metadata(file_path)
+    prompt = metadata["prompt"]
+    return (prompt if isinstance(prompt, dict) else None), (metadata["width"], metadata["height"])
+
+
+def _fts_query(text):
+    """사용자 검색어를 FTS5 쿼리로 변환 (각 단어를 따옴표로 감싸 접두어 AND 검색)"""
+    tokens = [t for t in text.replace(",", " ").split() if t]
+    return " ".join('"' + t.replace('"', '""') + '"*' for t in tokens)
+
+
+class MetadataIndex(AttachedIndex):
+    """
+    이미지 메타데이터 인덱스. 갤러리 인덱스 DB 파일에 별도 연결로 접근하며
+    images 테이블과 비교하여 새로 생겼거나 수정된 이미지만 인덱싱한다.
+    모든 메서드는 스레드 안전하며 블로킹 I/O를 수행한다.
+    """
+
+    SCHEMA = _SCHEMA
+    PENDING_SQL = (
+        "SELECT COUNT(*) FROM images i LEFT JOIN image_meta m "
+        "ON m.subfolder = i.subfolder AND m.filename = i.filename "
+        "WHERE m.mtime_ns IS NULL OR m.mtime_ns != i.mtime_ns"
+    )
+
+    def __init__(self, db_path, root_dir):
+        super().__init__(db_path, root_dir)
+        try:
+            self._conn.execute(_FTS_SCHEMA)
+            self.fts = True
+        except sqlite3.OperationalError:
+            # FTS5가 빠진 SQLite 빌드에서는 LIKE 검색으로 대체한다
+            self.fts = False
+
+    # ──────────────────────────────────────────────
+    # 인덱싱
+    # ──────────────────────────────────────────────
+
+    def index_batch(self, after=None, limit=INDEX_BATCH_SIZE):
+        """
+        인덱싱 대상 이미지를 (subfolder, filename) 순서로 after 다음부터 최대 limit개 처리한다.
+        반환값: 마지막으로 처리한 키 (None이면 더 할 일이 없음)
+        """
+        sql = (
+            "SELECT i.subfolder, i.filename, i.mtime_ns FROM images i LEFT JOIN image_meta m "
+            "ON m.subfolder = i.subfolder AND m.filename = i.filename "
+            "WHERE (m.mtime_ns IS NULL OR m.mtime_ns != i.mtime_ns)"
+        )
+        params = []
+        if after:
+            sql += " AND (i.subfolder, i.filename) > (?, ?)"
+            params.extend(after)
+        sql += " ORDER BY i.subfolder, i.filename LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        if not rows:
+            return None
+
+        # 파일 읽기는 락 밖에서 수행하여 검색 요청을 막지 않는다
+        extracted = []
+        for subfolder, filename, mtime_ns in rows:
+            file_path = os.path.join(self.root_dir, subfolder, filename)
+            try:
+                prompt, size = read_prompt_graph(file_path)
+            except Exception:
+                prompt, size = None, (None, None)
+            params = extract_generation_params(prompt) if prompt else None
+            extracted.append((subfolder, filename, mtime_ns, params, size))
+
+        with self._lock, self._conn:
+            self._consume_pending(len(extracted))
+            for subfolder, filename, mtime_ns, params, size in extracted:
+                self._delete_rows(subfolder, filename)
+                p = params or {}
+                cur = self._conn.execute(
+                    "INSERT INTO image_meta (subfolder, filename, mtime_ns, has_prompt, checkpoint, seed, sampler, "
+                    "scheduler, steps, cfg, width, height, positive, negative) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (subfolder, filename, mtime_ns, 1 if params else 0, p.get("checkpoint"), p.get("seed"),
+                     p.get("sampler"), p.get("scheduler"), p.get("steps"), p.get("cfg"), size[0], size[1],
+                     p.get("positive"), p.get("negative"))
+                )
+                loras = p.get("loras", [])
+                if loras:
+                    self._conn.executemany(
+                        "INSERT INTO image_loras (subfolder, filename, lora, strength) VALUES (?, ?, ?, ?)",
+                        [(subfolder, filename, name, strength) for name, strength in loras]
+                    )
+                if self.fts and params:
+                    models = " ".join([p.get("checkpoint") or ""] + [name for name, _ in loras])
+                    self._conn.execute(
+                        "INSERT INTO image_meta_fts (rowid, positive, negative, models) VALUES (?, ?, ?, ?)",
+                        (cur.lastrowid, p.get("positive") or "", p.get("negative") or "", models)
+                    )
+        return rows[-1][0], rows[-1][1]
+
+    def _delete_rows(self, subfolder, filename):
+        row = self._conn.execute(
+            "SELECT rowid FROM image_meta WHERE subfolder = ? AND filename = ?", (subfolder, filename)
+        ).fetchone()
+        if row is None:
+            return
+        if self.fts:
+            self._conn.execute("DELETE FROM image_meta_fts WHERE rowid = ?", (row[0],))
+        self._conn.execute("DELETE FROM image_meta WHERE rowid = ?", (row[0],))
+        self._conn.execute("DELETE FROM image_loras WHERE subfolder = ? AND filename = ?", (subfolder, filename))
+
+    def purge_removed(self):
+        """갤러리 인덱스에서 사라진 이미지의 메타데이터 행을 삭제한다."""
+        with self._lock, self._conn:
+            stale = self._conn.execute(
+                "SELECT m.rowid, m.subfolder, m.filename FROM image_meta m "
+                "WHERE NOT EXISTS (SELECT 1 FROM images i WHERE i.subfolder = m.subfolder AND i.filename = m.filename)"
+            ).fetchall()
+            if not stale:
+                return 0
+            self._delete_stale(stale)
+            return len(stale)
+
+    def _delete_stale(self, stale):
+        if self.fts:
+            self._conn.executemany("DELETE FROM image_meta_fts WHERE rowid = ?", [(r[0],) for r in stale])
+        self._conn.executemany("DELETE FROM image_meta WHERE rowid = ?", [(r[0],) for r in stale])
+        self._conn.executemany(
+            "DELETE FROM image_loras WHERE subfolder = ? AND filename = ?", [(r[1], r[2]) for r in stale]
+        )
+
+    # ──────────────────────────────────────────────
+    # 검색
+    # ──────────────────────────────────────────────
+
+    def search(self, q="", checkpoint=None, loras=(), seed=None, sampler=None,
+               folder=None, cursor=None, limit=100, order="newest"):
+        """
+        조건에 맞는 이미지를 정렬 순서대로 한 페이지 반환 (키셋 페이지네이션).
+          - q          : 프롬프트/모델 이름 전문 검색 (단어별 접두어 AND)
+          - checkpoint : 체크포인트 이름 (정확히 일치)
+          - loras      : 로라 이름 목록 (모두 사용한 이미지)
+          - seed, sampler, folder : 정확히 일치 / 폴더는 하위 폴더 포함
+        반환값: (이미지 목록, 다음 페이지 커서 또는 None)
+        """
+        if order not in _SEARCH_ORDERS:
+            raise ValueError(f"Unknown order: {order}")
+        order_by, op, key_columns = _SEARCH_ORDERS[order]
+
+        clauses = []
+        params = []
+        where, folder_params = folder_filter(folder)
+        if where:
+            clauses.append(where.replace("subfolder", "i.subfolder"))
+            params.extend(folder_params)
+        if checkpoint:
+            clauses.append("m.checkpoint = ?")
+            params.append(checkpoint)
+        if seed:
+            clauses.append("m.seed = ?")
+            params.append(str(seed))
+        if sampler:
+            clauses.append("m.sampler = ?")
+            params.append(sampler)
+        for lora in loras:
+            clauses.append(
+                "EXISTS (SELECT 1 FROM image_loras l WHERE l.lora = ? AND l.subfolder = m.subfolder AND l.filename = m.filename)"
+            )
+            params.append(lora)
+        if q and q.strip():
+            if self.fts:
+                clauses.append("m.rowid IN (SELECT rowid FROM image_meta_fts WHERE image_meta_fts MATCH ?)")
+                params.append(_fts_query(q))
+            else:
+                for token in q.replace(",", " ").split():
+                    clauses.append("(m.positive LIKE ? OR m.negative LIKE ? OR m.checkpoint LIKE ?)")
+                    params.extend([f"%{token}%"] * 3)
+        if cursor:
+            values = decode_cursor(cursor)
+            if len(values) != len(key_columns):
+                raise ValueError("Invalid cursor")
+            clauses.append(f"({', '.join('i.' + c for c in key_columns)}) {op} ({', '.join('?' * len(key_columns))})")
+            params.extend(values)
+
+        sql = (
+            "SELECT i.subfolder, i.filename, i.timestamp, m.checkpoint, m.seed FROM image_meta m "
+            "JOIN images i ON i.subfolder = m.subfolder AND i.filename = m.filename"
+        )
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += f" ORDER BY {order_by} LIMIT ?"
+        params.append(limit + 1)
+
+        with self._lock:
+            try:
+                rows = self._conn.execute(sql, params).fetchall()
+            except sqlite3.OperationalError as e:
+                # 잘못된 FTS 쿼리 문법 등
+                raise ValueError(f"Invalid search query: {e}")
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        images = [{
+            "filename": filename,
+            "subfolder": subfolder,
+            "timestamp": timestamp,
+            "checkpoint": ckpt,
+            "seed": seed_value
+        } for subfolder, filename, timestamp, ckpt, seed_value in rows]
+
+        next_cursor = None
+        if has_more and rows:
+            last = {"subfolder": rows[-1][0], "filename": rows[-1][1], "timestamp": rows[-1][2]}
+            next_cursor = encode_cursor([last[col] for col in key_columns])
+        return images, next_cursor
+
+    def get_facets(self):
+        """검색 필터용 체크포인트/로라/샘플러 이름과 이미지 수"""
+        with self._lock:
+            checkpoints = self._conn.execute(
+                "SELECT checkpoint, COUNT(*) FROM image_meta WHERE checkpoint IS NOT NULL "
+                "GROUP BY checkpoint ORDER BY COUNT(*) DESC"
+            ).fetchall()
+            loras = self._conn.execute(
+                "SELECT lora, COUNT(*) FROM image_loras GROUP BY lora ORDER BY COUNT(*) DESC"
+            ).fetchall()
+            samplers = self._conn.execute(
+                "SELECT sampler, COUNT(*) FROM image_meta WHERE sampler IS NOT NULL "
+                "GROUP BY sampler ORDER BY COUNT(*) DESC"
+            ).fetchall()
+        return {
+            "checkpoints": [{"name": n, "count": c} for n, c in checkpoints],
+            "loras": [{"name": n, "count": c} for n, c in loras],
+            "samplers": [{"name": n, "count": c} for n, c in samplers],
+        }
+
+
+class MetadataIndexer:
+    """갤러리 인덱스에 새로 들어온 이미지를 백그라운드에서 메타데이터 인덱스에 반영하는 작업자."""
+
+    def __init__(self):
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._index = AttachedIndexHandle(MetadataIndex)
+
+    def get_index(self):
+        """현재 갤러리 인덱스 DB에 대한 MetadataIndex를 반환 (output 경로가 바뀌면 새로 연다)."""
+        return self._index.get()
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._wakeup.set()
+        self._thread = threading.Thread(target=self._run, name="am-metadata-indexer", daemon=True)
+        self._thread.start()
+
+    def notify(self):
+        """새 이미지가 인덱싱 대기 중임을 알린다 (갤러리 감시자에서 호출)."""
+        self._wakeup.set()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(IDLE_RECHECK_SECONDS)
+            self._wakeup.clear()
+            try:
+                index = self.get_index()
+                last_key = index.index_batch()
+                while last_key:
+                    last_key = index.index_batch(last_key)
+                index.purge_removed()
+            except Exception as e:
+                print(f"[ComfyUI-AssetManager] 메타데이터 인덱싱 실패: {e}")
+
+
+metadata_indexer = MetadataIndexer()
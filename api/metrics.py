@@ -0,0 +1,267 @@
+"""
+api/metrics.py — 요청 계측 / Prometheus 지표
+/assetmanager/ 로 시작하는 모든 요청을 미들웨어로 감싸 경로(라우트 템플릿)별로 다음을 기록합니다.
+  - 지연 시간 히스토그램, 요청/응답 크기 히스토그램, 상태 코드별 요청 수
+  - 요청 하나가 건드린 파일 수 (stat / 디렉토리 나열 / 메타데이터 읽기 / 픽셀 디코딩)
+그 외에 캐시 적중률(count_cache)과 작업 풀 대기열(executors.operation_stats)을 모아
+GET /assetmanager/api/metrics 에서 Prometheus 텍스트 형식으로 내보냅니다.
+ASSETMANAGER_SLOW_REQUEST_MS를 지정하면 그보다 오래 걸린 요청을 로그로 남깁니다.
+"""
+
+import os
+import time
+import threading
+import contextvars
+from aiohttp import web
+
+from . import executors
+from . import startup
+
+ROUTE_PREFIX = "/assetmanager/"
+
+# 느린 요청 기록 기준 (밀리초, 0이면 기록하지 않음)
+try:
+    SLOW_REQUEST_MS = max(0.0, float(os.environ.get("ASSETMANAGER_SLOW_REQUEST_MS", "0")))
+except ValueError:
+    SLOW_REQUEST_MS = 0.0
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (256, 1024, 10 * 1024, 100 * 1024, 1024 * 1024, 10 * 1024 * 1024, 100 * 1024 * 1024)
+FILE_COUNT_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000)
+
+# 파일 접근 종류: stat(os.stat), listed(scandir 항목), read(메타데이터 헤더 파싱), decoded(픽셀 디코딩)
+FILE_KINDS = ("stat", "listed", "read", "decoded")
+
+_request_files = contextvars.ContextVar("assetmanager_request_files", default=None)
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.sum += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def lines(self, name, labels):
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            yield f'{name}_bucket{_labels(labels, le=_number(bound))} {cumulative}'
+        yield f'{name}_bucket{_labels(labels, le="+Inf")} {self.count}'
+        yield f'{name}_sum{_labels(labels)} {_number(self.sum)}'
+        yield f'{name}_count{_labels(labels)} {self.count}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels, **extra):
+    items = list(labels) + list(extra.items())
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+
+class MetricsRegistry:
+    """
+    지표 저장소 싱글턴. 이벤트 루프와 작업 풀 스레드 양쪽에서 기록하므로 잠금 하나로 보호한다.
+    라벨 조합은 라우트 템플릿 / 파일 종류 / 캐시 이름처럼 개수가 정해진 값만 사용한다.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latency = {}        # (route, method) -> _Histogram
+        self._request_size = {}   # route -> _Histogram
+        self._response_size = {}  # route -> _Histogram
+        self._request_files = {}  # (route, kind) -> _Histogram
+        self._responses = {}      # (route, method, status) -> count
+        self._files = dict.fromkeys(FILE_KINDS, 0)
+        self._cache = {}          # name -> [hit, miss]
+        self._slow = 0
+        self.started = startup.STARTED_AT
+
+    def count_files(self, kind, n=1):
+        """파일 접근 수를 더한다. 계측 중인 요청 안에서 호출되면 그 요청의 집계에도 더한다."""
+        if not n:
+            return
+        stats = _request_files.get()
+        with self._lock:
+            self._files[kind] = self._files.get(kind, 0) + n
+            if stats is not None:
+                stats[kind] = stats.get(kind, 0) + n
+
+    def count_cache(self, name, hit, n=1):
+        with self._lock:
+            entry = self._cache.setdefault(name, [0, 0])
+            entry[0 if hit else 1] += n
+
+    def record_request(self, route, method, status, seconds, request_bytes, response_bytes, files):
+        with self._lock:
+            key = (route, method)
+            hist = self._latency.get(key) or self._latency.setdefault(key, _Histogram(LATENCY_BUCKETS))
+            hist.observe(seconds)
+            status_key = (route, method, status)
+            self._responses[status_key] = self._responses.get(status_key, 0) + 1
+            if request_bytes is not None:
+                self._request_size.setdefault(route, _Histogram(SIZE_BUCKETS)).observe(request_bytes)
+            if response_bytes is not None:
+                self._response_size.setdefault(route, _Histogram(SIZE_BUCKETS)).observe(response_bytes)
+            for kind in FILE_KINDS:
+                if files.get(kind) or (route, kind) in self._request_files:
+                    self._request_files.setdefault((route, kind), _Histogram(FILE_COUNT_BUCKETS)).observe(files.get(kind, 0))
+
+    def count_slow(self):
+        with self._lock:
+            self._slow += 1
+
+    def render(self):
+        """Prometheus 텍스트 형식 (version 0.0.4)"""
+        out = []
+
+        def header(name, kind, help_text):
+            out.append(f"# HELP {name} {help_text}")
+            out.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            header("assetmanager_request_duration_seconds", "histogram", "AssetManager HTTP request latency")
+            for (route, method), hist in sorted(self._latency.items()):
+                out.extend(hist.lines("assetmanager_request_duration_seconds", (("route", route), ("method", method))))
+
+            header("assetmanager_requests_total", "counter", "AssetManager HTTP responses by status")
+            for (route, method, status), count in sorted(self._responses.items()):
+                out.append(f"assetmanager_requests_total{_labels((('route', route), ('method', method), ('status', status)))} {count}")
+
+            header("assetmanager_request_size_bytes", "histogram", "Request body size")
+            for route, hist in sorted(self._request_size.items()):
+                out.extend(hist.lines("assetmanager_request_size_bytes", (("route", route),)))
+
+            header("assetmanager_response_size_bytes", "histogram", "Response body size (streamed responses included)")
+            for route, hist in sorted(self._response_size.items()):
+                out.extend(hist.lines("assetmanager_response_size_bytes", (("route", route),)))
+
+            header("assetmanager_request_files", "histogram", "Files touched per request by access kind")
+            for (route, kind), hist in sorted(self._request_files.items()):
+                out.extend(hist.lines("assetmanager_request_files", (("route", route), ("kind", kind))))
+
+            header("assetmanager_files_total", "counter", "Files touched including background work")
+            for kind, count in sorted(self._files.items()):
+                out.append(f"assetmanager_files_total{_labels((('kind', kind),))} {count}")
+
+            header("assetmanager_cache_requests_total", "counter", "Cache lookups by result")
+            for name, (hit, miss) in sorted(self._cache.items()):
+                out.append(f"assetmanager_cache_requests_total{_labels((('cache', name), ('result', 'hit')))} {hit}")
+                out.append(f"assetmanager_cache_requests_total{_labels((('cache', name), ('result', 'miss')))} {miss}")
+
+            header("assetmanager_cache_hit_ratio", "gauge", "Cache hit ratio since server start")
+            for name, (hit, miss) in sorted(self._cache.items()):
+                ratio = hit / (hit + miss) if hit + miss else 0.0
+                out.append(f"assetmanager_cache_hit_ratio{_labels((('cache', name),))} {_number(round(ratio, 6))}")
+
+            header("assetmanager_slow_requests_total", "counter", "Requests slower than ASSETMANAGER_SLOW_REQUEST_MS")
+            out.append(f"assetmanager_slow_requests_total {self._slow}")
+
+        stats = executors.operation_stats()
+        header("assetmanager_executor_waiting", "gauge", "Tasks waiting for an operation slot")
+        for op, s in sorted(stats["operations"].items()):
+            out.append(f"assetmanager_executor_waiting{_labels((('op', op),))} {s['waiting']}")
+        header("assetmanager_executor_running", "gauge", "Tasks running in the pools")
+        for op, s in sorted(stats["operations"].items()):
+            out.append(f"assetmanager_executor_running{_labels((('op', op),))} {s['running']}")
+        header("assetmanager_executor_wait_seconds", "summary", "Time spent waiting for an operation slot")
+        for op, s in sorted(stats["operations"].items()):
+            out.append(f"assetmanager_executor_wait_seconds_sum{_labels((('op', op),))} {_number(s['wait_seconds'])}")
+            out.append(f"assetmanager_executor_wait_seconds_count{_labels((('op', op),))} {s['started']}")
+        header("assetmanager_executor_limit", "gauge", "Concurrent task limit per operation")
+        for op, s in sorted(stats["operations"].items()):
+            out.append(f"assetmanager_executor_limit{_labels((('op', op),))} {s['limit']}")
+        header("assetmanager_io_pool_queue", "gauge", "Work items queued in the shared I/O thread pool")
+        out.append(f"assetmanager_io_pool_queue {stats['io_queue']}")
+
+        header("assetmanager_start_time_seconds", "gauge", "Extension load time")
+        out.append(f"assetmanager_start_time_seconds {_number(round(self.started, 3))}")
+        header("assetmanager_startup_seconds", "gauge", "Extension import, lazy API load and warm-up durations")
+        for phase, seconds in sorted(startup.lazy_api.timings.items()):
+            out.append(f"assetmanager_startup_seconds{_labels((('phase', phase),))} {_number(round(seconds, 6))}")
+        return "\n".join(out) + "\n"
+
+
+metrics = MetricsRegistry()
+
+# 느린 요청 기록 대상 (system.py가 생성 로그 기록기를 연결한다). None이면 콘솔에만 출력.
+slow_request_sink = None
+
+
+def count_files(kind, n=1):
+    metrics.count_files(kind, n)
+
+
+def count_cache(name, hit, n=1):
+    metrics.count_cache(name, hit, n)
+
+
+def _route_name(request):
+    resource = startup.route_info(request).route.resource
+    return resource.canonical if resource is not None else "unmatched"
+
+
+def _response_size(response):
+    if response is None:
+        return None
+    if response.prepared:
+        # 핸들러 안에서 스트리밍을 끝낸 응답 (ZIP, NDJSON)
+        return response.body_length
+    body = getattr(response, "body", None)
+    if isinstance(body, (bytes, bytearray)):
+        return len(body)
+    return response.content_length
+
+
+@web.middleware
+async def metrics_middleware(request, handler):
+    """
+    AssetManager 요청의 지연 시간·크기·파일 접근 수를 기록한다 (그 외 ComfyUI 요청은 그대로 통과).
+    /api 아래의 복제 경로도 원래 라우트 이름으로 함께 집계한다.
+    """
+    if not startup.is_assetmanager_path(request.path):
+        return await handler(request)
+
+    files = {}
+    token = _request_files.set(files)
+    started = time.perf_counter()
+    response = None
+    status = 500
+    try:
+        response = await handler(request)
+        status = response.status
+        return response
+    except web.HTTPException as e:
+        status = e.status
+        raise
+    finally:
+        _request_files.reset(token)
+        elapsed = time.perf_counter() - started
+        route = _route_name(request)
+        metrics.record_request(route, request.method, status, elapsed,
+                               request.content_length, _response_size(response), files)
+        if SLOW_REQUEST_MS and elapsed * 1000 >= SLOW_REQUEST_MS:
+            metrics.count_slow()
+            message = f"느린 요청 {request.method} {request.path_qs} → {status} ({elapsed * 1000:.0f}ms)"
+            print(f"[ComfyUI-AssetManager] {message} files={files}")
+            if slow_request_sink is not None:
+                slow_request_sink(message, type="slow_request", status=str(status),
+                                  duration_ms=round(elapsed * 1000), fields={"route": route, "files": files})
@@ -0,0 +1,161 @@
+"""
+api/model_catalog.py — 모델 카탈로그 캐시
+모델 폴더(checkpoints, loras 등)를 os.scandir로 한 번만 나열하여
+모델 파일 경로, 프리뷰 이미지, 메타데이터 사이드카 파일을 목록에서 바로 찾습니다.
+모델마다 os.path.exists를 여러 번 호출하던 방식을 대체하며,
+캐시는 나열했던 디렉토리들의 mtime이 바뀌면 해당 폴더 종류만 다시 만듭니다.
+"""
+
+import os
+import threading
+import folder_paths
+
+from .metrics import count_files, count_cache
+
+# 스캔할 프리뷰 이미지 확장자 (우선순위 순서)
+PREVIEW_EXTENSIONS = (".preview.jpeg", ".preview.jpg", ".preview.png", ".jpeg", ".jpg", ".png")
+# 메타데이터 사이드카 파일 확장자 (우선순위 순서)
+SIDECAR_EXTENSIONS = (".civitai.info", ".metadata.json", ".json")
+
+# 보조 모델 드롭다운 키 → ComfyUI 폴더 이름
+AUX_MODEL_FOLDERS = {"upscale": "upscale_models", "bbox": "ultralytics", "segm": "sams"}
+
+
+def _norm(rel_path):
+    """목록 조회용 키. 경로 구분자를 통일하고 Windows에서는 대소문자를 무시한다."""
+    rel_path = rel_path.replace("\\", "/")
+    return rel_path.lower() if os.name == "nt" else rel_path
+
+
+class _FolderListing:
+    """한 폴더 종류(예: loras)의 디렉토리 나열 결과와 모델별 해석 결과."""
+
+    def __init__(self, bases):
+        self.bases = bases
+        self.dir_mtimes = {}
+        self.files = {}  # base -> {정규화된 상대 경로: 실제 상대 경로}
+        self.entries = None  # 모델 이름 순서의 해석 결과 목록
+        self.by_name = {}
+
+    def scan(self):
+        listed = 0
+        for base in self.bases:
+            found = {}
+            self.files[base] = found
+            stack = [(base, "")]
+            while stack:
+                abs_dir, rel_dir = stack.pop()
+                try:
+                    self.dir_mtimes[abs_dir] = os.stat(abs_dir).st_mtime_ns
+                    with os.scandir(abs_dir) as it:
+                        for entry in it:
+                            listed += 1
+                            rel = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                            try:
+                                if entry.is_dir():
+                                    stack.append((entry.path, rel))
+                                else:
+                                    found[_norm(rel)] = rel
+                            except OSError:
+                                continue
+                except OSError:
+                    continue
+        count_files("stat", len(self.dir_mtimes))
+        count_files("listed", listed)
+
+    def is_fresh(self, bases):
+        """폴더 경로 구성과 나열했던 모든 디렉토리의 mtime이 그대로인지 확인 (디렉토리당 stat 1회)."""
+        if bases != self.bases:
+            return False
+        count_files("stat", len(self.dir_mtimes))
+        for abs_dir, mtime_ns in self.dir_mtimes.items():
+            try:
+                if os.stat(abs_dir).st_mtime_ns != mtime_ns:
+                    return False
+            except OSError:
+                return False
+        return True
+
+    def resolve(self, folder_name, names):
+        """모델 이름마다 실제 경로, 프리뷰 확장자, 사이드카 파일 경로를 나열 결과에서 찾는다."""
+        entries = []
+        for name in names:
+            key = _norm(name)
+            for base in self.bases:
+                listing = self.files.get(base, {})
+                if key not in listing:
+                    continue
+                stem = os.path.splitext(key)[0]
+                full_path = os.path.join(base, listing[key])
+                stem_path = os.path.splitext(full_path)[0]
+                preview_ext = next((ext for ext in PREVIEW_EXTENSIONS if stem + ext in listing), None)
+                sidecars = [stem_path + ext for ext in SIDECAR_EXTENSIONS if stem + ext in listing]
+                entries.append({
+                    "name": name,
+                    "folder": folder_name,
+                    "full_path": full_path,
+                    "preview_ext": preview_ext,
+                    "preview_path": stem_path + preview_ext if preview_ext else None,
+                    "sidecars": sidecars
+                })
+                break
+        self.entries = entries
+        self.by_name = {entry["name"]: entry for entry in entries}
+
+
+class ModelCatalog:
+    """
+    폴더 종류별 모델 목록 캐시. 스레드 안전하며 블로킹 I/O를 수행하므로
+    aiohttp 핸들러에서는 executor를 통해 호출해야 한다.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._listings = {}
+        self.generation = 0
+
+    def _listing(self, folder_name):
+        if folder_name not in folder_paths.folder_names_and_paths:
+            return None
+        bases = [b for b in folder_paths.get_folder_paths(folder_name) if os.path.isdir(b)]
+        with self._lock:
+            listing = self._listings.get(folder_name)
+            if listing is not None and listing.is_fresh(bases):
+                count_cache("model_catalog", True)
+                return listing
+            count_cache("model_catalog", False)
+            listing = _FolderListing(bases)
+            listing.scan()
+            listing.resolve(folder_name, folder_paths.get_filename_list(folder_name))
+            self._listings[folder_name] = listing
+            self.generation += 1
+            return listing
+
+    def get_models(self, folder_name):
+        """폴더 종류의 모델 해석 결과 목록을 반환 (모델 이름 순서 유지)."""
+        listing = self._listing(folder_name)
+        return listing.entries if listing else []
+
+    def find(self, folder_name, name):
+        """모델 이름으로 해석 결과 하나를 찾는다. 없으면 None."""
+        listing = self._listing(folder_name)
+        return listing.by_name.get(name) if listing else None
+
+    def version(self, folder_names):
+        """폴더 종류들의 나열 결과가 최신인지 확인하고(바뀌었으면 다시 나열) 현재 세대 번호를 반환 (응답 ETag용)."""
+        for folder_name in folder_names:
+            self._listing(folder_name)
+        return self.generation
+
+    def get_names(self, folder_name):
+        return [entry["name"] for entry in self.get_models(folder_name)]
+
+    def invalidate(self, folder_name=None):
+        with self._lock:
+            if folder_name is None:
+                self._listings.clear()
+            else:
+                self._listings.pop(folder_name, None)
+
+
+model_catalog = ModelCatalog()
@@ -0,0 +1,517 @@
+"""
+api/model_index.py — 모델 메타데이터 / 해시 인덱스
+체크포인트와 로라의 사이드카 파일(.civitai.info, .metadata.json, .json)을 한 번만 읽어
+모델 이름, 베이스 모델, 태그, 트리거 단어를 web/data/model_index.db에 정규화하여 저장하고,
+사이드카에 해시가 없는 모델은 SHA256(AutoV2)을 백그라운드 스레드 풀에서 계산합니다
+(ComfyUI 큐에 생성 작업이 있으면 모델 로딩과 디스크를 다투지 않도록 읽기를 멈춘다).
+모든 결과는 모델 경로 + mtime + 크기(사이드카는 경로 + mtime)로 캐시되어 바뀐 파일만 다시 읽으며,
+태그/트리거 단어/베이스 모델/해시 검색은 인덱스 조회 한 번으로 끝납니다.
+"""
+
+import os
+import json
+import zlib
+import sqlite3
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .model_catalog import model_catalog
+from .metrics import count_files
+from .executors import wait_until_idle
+
+INDEXED_FOLDERS = ("checkpoints", "loras")
+
+# 해시 계산 스레드 수 (0이면 계산하지 않고 사이드카의 해시만 사용)
+#   ASSETMANAGER_MODEL_HASH_WORKERS (기본 2)
+try:
+    HASH_WORKERS = max(0, int(os.environ.get("ASSETMANAGER_MODEL_HASH_WORKERS", "2")))
+except ValueError:
+    HASH_WORKERS = 2
+# 해시 계산 읽기 버퍼 (hashlib은 큰 버퍼를 GIL 없이 처리한다)
+HASH_BUFFER_BYTES = 8 * 1024 * 1024
+# 모델 폴더 변경 확인 간격과, 폴더가 그대로여도 사이드카 수정을 확인하는 간격
+RECHECK_SECONDS = 30.0
+FULL_RECHECK_SECONDS = 600.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS models (
+    folder TEXT NOT NULL,
+    name TEXT NOT NULL,
+    path TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    preview_ext TEXT,
+    sidecar TEXT,
+    sidecar_mtime_ns INTEGER,
+    sidecar_json BLOB,
+    model_name TEXT,
+    base_model TEXT,
+    tags TEXT,
+    trained_words TEXT,
+    sha256 TEXT,
+    PRIMARY KEY (folder, name)
+);
+CREATE INDEX IF NOT EXISTS idx_models_base_model ON models (base_model);
+CREATE INDEX IF NOT EXISTS idx_models_sha256 ON models (sha256);
+CREATE TABLE IF NOT EXISTS model_tags (
+    folder TEXT NOT NULL,
+    name TEXT NOT NULL,
+    tag TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_model_tags_tag ON model_tags (tag);
+CREATE INDEX IF NOT EXISTS idx_model_tags_model ON model_tags (folder, name);
+CREATE TABLE IF NOT EXISTS file_hashes (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    sha256 TEXT NOT NULL
+);
+"""
+
+_FTS_SCHEMA = "CREATE VIRTUAL TABLE IF NOT EXISTS models_fts USING fts5(name, model_name, tags, trained_words, base_model)"
+
+_HEX = frozenset("0123456789abcdef")
+
+
+# ──────────────────────────────────────────────
+# 사이드카 해석 / 해시 계산
+# ──────────────────────────────────────────────
+
+def _first(*values):
+    for value in values:
+        if isinstance(value, str) and value.strip():
+            return value.strip()
+    return None
+
+
+def _words(*values):
+    """문자열 목록 또는 쉼표 구분 문자열들을 중복 없는 단어 목록으로 합친다."""
+    result = []
+    for value in values:
+        if isinstance(value, str):
+            value = value.split(",")
+        if not isinstance(value, list):
+            continue
+        for word in value:
+            if isinstance(word, dict):
+                word = word.get("name")
+            if isinstance(word, str) and word.strip() and word.strip() not in result:
+                result.append(word.strip())
+    return result
+
+
+def _sidecar_sha256(data, model_path):
+    """CivitAI 파일 목록 또는 hashes/sha256 키에서 이 모델 파일의 SHA256을 찾는다."""
+    candidates = []
+    files = data.get("files") if isinstance(data.get("files"), list) else []
+    civitai = data.get("civitai") if isinstance(data.get("civitai"), dict) else {}
+    files += civitai.get("files") if isinstance(civitai.get("files"), list) else []
+    basename = os.path.basename(model_path)
+    # 같은 파일명 → primary → 나머지 순서
+    files.sort(key=lambda f: (not isinstance(f, dict) or f.get("name") != basename, not (isinstance(f, dict) and f.get("primary"))))
+    for f in files:
+        if isinstance(f, dict) and isinstance(f.get("hashes"), dict):
+            candidates.append(f["hashes"].get("SHA256"))
+    hashes = data.get("hashes") or data.get("Hashes")
+    if isinstance(hashes, dict):
+        candidates += [hashes.get("SHA256"), hashes.get("sha256")]
+    candidates.append(data.get("sha256"))
+    for value in candidates:
+        if isinstance(value, str) and len(value) == 64 and set(value.lower()) <= _HEX:
+            return value.lower()
+    return None
+
+
+def extract_model_metadata(data, model_path):
+    """
+    사이드카 JSON에서 검색용 필드를 추출한다. 지원 형식:
+      - CivitAI 모델 버전 (.civitai.info): baseModel, trainedWords, model.name/tags, files[].hashes
+      - LoRA Manager (.metadata.json): model_name, base_model, tags, sha256, civitai{...}
+      - StabilityMatrix (.cm-info 형식 .json): ModelName, BaseModel, TrainedWords, Hashes
+      - A1111 (.json): "sd version", "activation text"
+    """
+    civitai = data.get("civitai") if isinstance(data.get("civitai"), dict) else {}
+    model = data.get("model") if isinstance(data.get("model"), dict) else {}
+    civitai_model = civitai.get("model") if isinstance(civitai.get("model"), dict) else {}
+    base_model = _first(data.get("base_model"), data.get("baseModel"), data.get("BaseModel"),
+                        civitai.get("baseModel"), data.get("sd version"))
+    return {
+        "model_name": _first(data.get("model_name"), model.get("name"), civitai_model.get("name"),
+                             data.get("ModelName"), data.get("name")),
+        "base_model": None if base_model in ("Unknown", "Other") else base_model,
+        "tags": _words(data.get("tags"), model.get("tags"), civitai_model.get("tags"), data.get("Tags")),
+        "trained_words": _words(data.get("trainedWords"), civitai.get("trainedWords"), data.get("TrainedWords"),
+                                data.get("activation text")),
+        "sha256": _sidecar_sha256(data, model_path),
+    }
+
+
+def sha256_file(path, buffer_size=HASH_BUFFER_BYTES, pause=None):
+    """
+    파일의 SHA256을 큰 버퍼로 읽어 계산한다 (버퍼를 재사용하여 할당 없이 readinto).
+    pause가 있으면 버퍼마다 호출하여, 수 GB 파일을 읽는 도중에도 쉴 수 있게 한다.
+    """
+    digest = hashlib.sha256()
+    buffer = bytearray(buffer_size)
+    view = memoryview(buffer)
+    with open(path, "rb", buffering=0) as f:
+        while True:
+            if pause is not None:
+                pause()
+            n = f.readinto(buffer)
+            if not n:
+                break
+            digest.update(view[:n])
+    count_files("read")
+    return digest.hexdigest()
+
+
+def autov2(sha256):
+    """A1111/CivitAI AutoV2 해시 (SHA256 앞 10자리)"""
+    return sha256[:10].upper() if sha256 else None
+
+
+def _fts_query(text):
+    """검색어를 FTS5 쿼리로 변환 (각 단어를 따옴표로 감싸 접두어 AND 검색)"""
+    tokens = [t for t in text.replace(",", " ").split() if t]
+    return " ".join('"' + t.replace('"', '""') + '"*' for t in tokens)
+
+
+class ModelIndex:
+    """
+    모델 메타데이터 인덱스. 모든 메서드는 스레드 안전하며 블로킹 I/O를 수행한다.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        try:
+            self._conn.execute(_FTS_SCHEMA)
+            self.fts = True
+        except sqlite3.OperationalError:
+            # FTS5가 빠진 SQLite 빌드에서는 LIKE 검색으로 대체한다
+            self.fts = False
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # ──────────────────────────────────────────────
+    # 인덱싱
+    # ──────────────────────────────────────────────
+
+    def sync(self, folder_name, entries):
+        """
+        모델 카탈로그의 해석 결과(entries)와 인덱스를 맞춘다.
+        모델 파일과 사이드카를 stat하여 바뀐 모델만 사이드카를 다시 읽고, 사라진 모델은 삭제한다.
+        반환값: 새로 읽은 모델 수
+        """
+        with self._lock:
+            known = {
+                row[0]: row[1:]
+                for row in self._conn.execute(
+                    "SELECT name, path, mtime_ns, size, preview_ext, sidecar, sidecar_mtime_ns FROM models WHERE folder = ?",
+                    (folder_name,)
+                )
+            }
+
+        updates = []
+        stated = 0
+        for entry in entries:
+            sidecar = entry["sidecars"][0] if entry["sidecars"] else None
+            try:
+                st = os.stat(entry["full_path"])
+            except OSError:
+                continue
+            sidecar_mtime = None
+            if sidecar:
+                try:
+                    sidecar_mtime = os.stat(sidecar).st_mtime_ns
+                except OSError:
+                    sidecar = None
+            stated += 2 if sidecar else 1
+            state = (entry["full_path"], st.st_mtime_ns, st.st_size, entry["preview_ext"], sidecar, sidecar_mtime)
+            if known.get(entry["name"]) == state:
+                continue
+            raw, meta = None, {}
+            if sidecar:
+                try:
+                    with open(sidecar, "rb") as f:
+                        raw = f.read()
+                    data = json.loads(raw)
+                    if isinstance(data, dict):
+                        meta = extract_model_metadata(data, entry["full_path"])
+                    count_files("read")
+                except Exception as e:
+                    print(f"[ComfyUI-AssetManager] 모델 메타데이터 파싱 실패 ({sidecar}): {e}")
+            updates.append((entry["name"], state, raw, meta))
+        count_files("stat", stated)
+
+        present = {entry["name"] for entry in entries}
+        removed = [name for name in known if name not in present]
+        if not updates and not removed:
+            return 0
+
+        with self._lock, self._conn:
+            for name in removed:
+                self._delete_rows(folder_name, name)
+            for name, (path, mtime_ns, size, preview_ext, sidecar, sidecar_mtime), raw, meta in updates:
+                self._delete_rows(folder_name, name)
+                sha256 = meta.get("sha256") or self._cached_hash(path, mtime_ns, size)
+                cur = self._conn.execute(
+                    "INSERT INTO models (folder, name, path, mtime_ns, size, preview_ext, sidecar, sidecar_mtime_ns, "
+                    "sidecar_json, model_name, base_model, tags, trained_words, sha256) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (folder_name, name, path, mtime_ns, size, preview_ext, sidecar, sidecar_mtime,
+                     zlib.compress(raw) if raw else None, meta.get("model_name"), meta.get("base_model"),
+                     json.dumps(meta.get("tags", []), ensure_ascii=False),
+                     json.dumps(meta.get("trained_words", []), ensure_ascii=False), sha256)
+                )
+                if meta.get("tags"):
+                    self._conn.executemany(
+                        "INSERT INTO model_tags (folder, name, tag) VALUES (?, ?, ?)",
+                        [(folder_name, name, tag.lower()) for tag in meta["tags"]]
+                    )
+                if self.fts:
+                    self._conn.execute(
+                        "INSERT INTO models_fts (rowid, name, model_name, tags, trained_words, base_model) VALUES (?, ?, ?, ?, ?, ?)",
+                        (cur.lastrowid, name.replace("\\", "/").replace("/", " ").replace("_", " "),
+                         meta.get("model_name") or "", " ".join(meta.get("tags", [])),
+                         " ".join(meta.get("trained_words", [])), meta.get("base_model") or "")
+                    )
+        return len(updates)
+
+    def _delete_rows(self, folder_name, name):
+        row = self._conn.execute("SELECT rowid FROM models WHERE folder = ? AND name = ?", (folder_name, name)).fetchone()
+        if row is None:
+            return
+        if self.fts:
+            self._conn.execute("DELETE FROM models_fts WHERE rowid = ?", (row[0],))
+        self._conn.execute("DELETE FROM models WHERE rowid = ?", (row[0],))
+        self._conn.execute("DELETE FROM model_tags WHERE folder = ? AND name = ?", (folder_name, name))
+
+    def _cached_hash(self, path, mtime_ns, size):
+        row = self._conn.execute(
+            "SELECT sha256 FROM file_hashes WHERE path = ? AND mtime_ns = ? AND size = ?", (path, mtime_ns, size)
+        ).fetchone()
+        return row[0] if row else None
+
+    def unhashed(self):
+        """해시가 없는 모델 파일 목록 [(path, mtime_ns, size)] (작은 파일부터)"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT DISTINCT path, mtime_ns, size FROM models WHERE sha256 IS NULL ORDER BY size"
+            ).fetchall()
+
+    def store_hash(self, path, mtime_ns, size, sha256):
+        """계산한 해시를 경로+mtime+크기로 기록하고, 같은 파일을 가리키는 모델 행에 채운다."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO file_hashes (path, mtime_ns, size, sha256) VALUES (?, ?, ?, ?)",
+                (path, mtime_ns, size, sha256)
+            )
+            self._conn.execute(
+                "UPDATE models SET sha256 = ? WHERE path = ? AND mtime_ns = ? AND size = ? AND sha256 IS NULL",
+                (sha256, path, mtime_ns, size)
+            )
+
+    def purge_hash_cache(self):
+        """어느 모델도 가리키지 않는 해시 캐시 행을 삭제한다."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM file_hashes WHERE path NOT IN (SELECT path FROM models)")
+
+    # ──────────────────────────────────────────────
+    # 조회
+    # ──────────────────────────────────────────────
+
+    def search(self, q="", folder=None, base_model=None, tags=(), sha256=None, limit=100, offset=0):
+        """
+        조건에 맞는 모델을 반환한다.
+          - q          : 파일명/모델 이름/태그/트리거 단어/베이스 모델 전문 검색 (단어별 접두어 AND)
+          - folder     : checkpoints / loras
+          - base_model : 베이스 모델 (정확히 일치)
+          - tags       : 태그 목록 (모두 가진 모델, 대소문자 무시)
+          - sha256     : SHA256 또는 AutoV2 해시 접두어
+        반환값: (모델 목록, 전체 개수)
+        """
+        clauses, params = [], []
+        if folder:
+            clauses.append("m.folder = ?")
+            params.append(folder)
+        if base_model:
+            clauses.append("m.base_model = ?")
+            params.append(base_model)
+        for tag in tags:
+            clauses.append("EXISTS (SELECT 1 FROM model_tags t WHERE t.tag = ? AND t.folder = m.folder AND t.name = m.name)")
+            params.append(tag.lower())
+        if sha256:
+            prefix = sha256.strip().lower()
+            if not prefix or not set(prefix) <= _HEX:
+                raise ValueError("Invalid hash")
+            # 범위 비교로 sha256 인덱스를 탄다 (16진수 다음 문자 'g')
+            clauses.append("m.sha256 >= ? AND m.sha256 < ?")
+            params.extend([prefix, prefix + "g"])
+        order_by = "m.folder, m.name"
+        if q and q.strip():
+            if self.fts:
+                clauses.append("m.rowid IN (SELECT rowid FROM models_fts WHERE models_fts MATCH ?)")
+                params.append(_fts_query(q))
+            else:
+                for token in q.replace(",", " ").split():
+                    clauses.append("(m.name LIKE ? OR m.model_name LIKE ? OR m.tags LIKE ? OR m.trained_words LIKE ?)")
+                    params.extend([f"%{token}%"] * 4)
+
+        where = (" WHERE " + " AND ".join(clauses)) if clauses else ""
+        with self._lock:
+            try:
+                total = self._conn.execute(f"SELECT COUNT(*) FROM models m{where}", params).fetchone()[0]
+                rows = self._conn.execute(
+                    "SELECT m.folder, m.name, m.preview_ext, m.model_name, m.base_model, m.tags, m.trained_words, m.sha256 "
+                    f"FROM models m{where} ORDER BY {order_by} LIMIT ? OFFSET ?",
+                    params + [limit, offset]
+                ).fetchall()
+            except sqlite3.OperationalError as e:
+                raise ValueError(f"Invalid search query: {e}")
+
+        return [{
+            "folder": folder_name,
+            "name": name,
+            "preview_ext": preview_ext,
+            "model_name": model_name,
+            "base_model": base,
+            "tags": json.loads(tags_json or "[]"),
+            "trained_words": json.loads(words_json or "[]"),
+            "sha256": sha256_value,
+            "autov2": autov2(sha256_value),
+        } for folder_name, name, preview_ext, model_name, base, tags_json, words_json, sha256_value in rows], total
+
+    def get_facets(self, folder=None):
+        """검색 필터용 베이스 모델 / 태그 목록과 모델 수, 해시 계산 대기 수"""
+        where, params = ("WHERE folder = ?", (folder,)) if folder else ("", ())
+        with self._lock:
+            base_models = self._conn.execute(
+                f"SELECT base_model, COUNT(*) FROM models {where} {'AND' if where else 'WHERE'} base_model IS NOT NULL "
+                "GROUP BY base_model ORDER BY COUNT(*) DESC", params
+            ).fetchall()
+            tags = self._conn.execute(
+                f"SELECT tag, COUNT(*) FROM model_tags {where} GROUP BY tag ORDER BY COUNT(*) DESC LIMIT 200", params
+            ).fetchall()
+            unhashed = self._conn.execute(
+                f"SELECT COUNT(*) FROM models {where} {'AND' if where else 'WHERE'} sha256 IS NULL", params
+            ).fetchone()[0]
+        return {
+            "base_models": [{"name": n, "count": c} for n, c in base_models],
+            "tags": [{"name": n, "count": c} for n, c in tags],
+            "unhashed": unhashed,
+        }
+
+    def get_info(self, folder_name, name, sidecar_path):
+        """
+        인덱스에 저장된 사이드카 JSON과 해시를 반환한다.
+        사이드카가 인덱싱 이후 바뀌었으면(경로/mtime 불일치) None을 반환하여 호출자가 파일을 읽게 한다.
+          - sidecar_path : 현재 우선순위가 가장 높은 사이드카 경로 (없으면 None)
+        반환값: (사이드카 dict 또는 None, sha256) 또는 None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT sidecar, sidecar_mtime_ns, sidecar_json, sha256 FROM models WHERE folder = ? AND name = ?",
+                (folder_name, name)
+            ).fetchone()
+        if row is None:
+            return None
+        sidecar, sidecar_mtime, blob, sha256 = row
+        if sidecar != sidecar_path:
+            return None
+        if sidecar:
+            try:
+                if os.stat(sidecar).st_mtime_ns != sidecar_mtime:
+                    return None
+            except OSError:
+                return None
+        data = json.loads(zlib.decompress(blob)) if blob else None
+        return (data if isinstance(data, dict) else None), sha256
+
+
+_DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "web", "data")
+
+
+class ModelIndexer:
+    """모델 폴더 변경을 확인하여 사이드카를 인덱싱하고, 해시가 없는 모델의 SHA256을 계산하는 작업자."""
+
+    def __init__(self):
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._index = None
+        self._index_lock = threading.Lock()
+        self._hash_pool = None
+        self._catalog_generation = None
+
+    def get_index(self):
+        with self._index_lock:
+            if self._index is None:
+                os.makedirs(_DATA_DIR, exist_ok=True)
+                self._index = ModelIndex(os.path.join(_DATA_DIR, "model_index.db"))
+            return self._index
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        if HASH_WORKERS and self._hash_pool is None:
+            self._hash_pool = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="am-model-hash")
+        self._wakeup.set()
+        self._thread = threading.Thread(target=self._run, name="am-model-indexer", daemon=True)
+        self._thread.start()
+
+    def notify(self):
+        """모델 폴더를 다시 확인하도록 알린다."""
+        self._wakeup.set()
+
+    def _run(self):
+        idle = FULL_RECHECK_SECONDS
+        while True:
+            notified = self._wakeup.wait(RECHECK_SECONDS)
+            self._wakeup.clear()
+            idle += RECHECK_SECONDS
+            try:
+                # 모델 폴더(디렉토리 mtime)가 그대로면 사이드카 stat은 가끔만 다시 한다
+                generation = model_catalog.version(INDEXED_FOLDERS)
+                if not notified and generation == self._catalog_generation and idle < FULL_RECHECK_SECONDS:
+                    continue
+                self._catalog_generation = generation
+                idle = 0.0
+                self.index_all()
+            except Exception as e:
+                print(f"[ComfyUI-AssetManager] 모델 인덱싱 실패: {e}")
+
+    def index_all(self):
+        """모든 모델 폴더를 동기화한 뒤 해시가 없는 모델의 해시를 계산한다 (블로킹)."""
+        index = self.get_index()
+        for folder_name in INDEXED_FOLDERS:
+            index.sync(folder_name, model_catalog.get_models(folder_name))
+        index.purge_hash_cache()
+        if self._hash_pool is None:
+            return
+
+        def hash_one(path, mtime_ns, size):
+            try:
+                # 생성 작업이 있으면 끝날 때까지 기다린다 (모델 로딩과 디스크 대역폭을 다투지 않음)
+                sha256 = sha256_file(path, pause=wait_until_idle)
+                st = os.stat(path)
+            except OSError as e:
+                print(f"[ComfyUI-AssetManager] 모델 해시 계산 실패 ({path}): {e}")
+                return
+            # 계산 도중 파일이 바뀌었으면 기록하지 않는다 (다음 확인 때 다시 계산)
+            if (st.st_mtime_ns, st.st_size) == (mtime_ns, size):
+                index.store_hash(path, mtime_ns, size, sha256)
+
+        futures = [self._hash_pool.submit(hash_one, *row) for row in index.unhashed()]
+        for future in futures:
+            future.result()
+
+
+model_indexer = ModelIndexer()
@@ -1,85 +1,138 @@
 """
 api/models.py — 모델(체크포인트, 로라, 보조 모델) 목록 API
-ComfyUI의 folder_paths를 통해 체크포인트/로라/업스케일러/디테일러 모델 목록을
-조회하고, 각 모델의 프리뷰 이미지 파일 존재 여부도 함께 반환합니다.
+ComfyUI의 folder_paths와 모델 카탈로그 캐시(model_catalog.py)를 통해
+체크포인트/로라/업스케일러/디테일러 모델 목록을 조회하고,
+각 모델의 프리뷰 이미지(원본/썸네일) URL도 함께 반환합니다.
 """
 
 import os
+import urllib.parse
 from aiohttp import web
 from server import PromptServer
 import folder_paths
 
+from .model_catalog import model_catalog, AUX_MODEL_FOLDERS
+from .model_index import model_indexer, autov2
+from .executors import run_io
+from .http_cache import cached_json
+
 
 def setup_models_api(routes):
     """모델 관련 API 라우트를 등록한다."""
+    model_indexer.start()
+
+    def preview_urls(folder_name, model, img_ext):
+        """모델 카드의 원본/썸네일 프리뷰 URL"""
+        if not img_ext:
+            return None, None
+        return (f"/assetmanager/api/file?folder={folder_name}&name={model}&ext={img_ext}",
+                f"/assetmanager/api/thumbnail?folder={folder_name}&name={urllib.parse.quote(model)}&ext={urllib.parse.quote(img_ext)}&size=256")
 
     def get_model_info(folder_name):
         """
-        지정된 폴더(checkpoints/loras)의 모델 목록을 조회하고,
-        각 모델 파일 옆에 프리뷰 이미지(.preview.jpeg 등)가 있는지 확인하여
-        이미지 URL을 함께 반환한다.
+        지정된 폴더(checkpoints/loras)의 모델 목록과 프리뷰 이미지 URL을 반환한다.
+        프리뷰 존재 여부는 모델 카탈로그의 디렉토리 나열 결과에서 찾으므로
+        모델마다 파일 시스템을 조회하지 않는다.
         """
-        models = folder_paths.get_filename_list(folder_name)
         result = []
-        
-        for model in models:
-            full_path = folder_paths.get_full_path(folder_name, model)
-            if not full_path: continue
-            
-            base, _ = os.path.splitext(full_path)
-            
-            # 스캔할 이미지 확장자 (우선순위 순서)
-            possible_exts = [
-                ".preview.jpeg", ".preview.jpg", ".preview.png",
-                ".jpeg", ".jpg", ".png"
-            ]
-            
-            img_ext = None
-            for ext in possible_exts:
-                if os.path.exists(base + ext):
-                    img_ext = ext
-                    break
-
+        for entry in model_catalog.get_models(folder_name):
+            image_url, thumb_url = preview_urls(folder_name, entry["name"], entry["preview_ext"])
             result.append({
-                "name": model,
-                "image_url": f"/assetmanager/api/file?folder={folder_name}&name={model}&ext={img_ext}" if img_ext else None,
+                "name": entry["name"],
+                "image_url": image_url,
+                "thumb_url": thumb_url,
                 "json_url": None
             })
         return result
 
+    def get_aux_models():
+        """업스케일러, 디테일러(BBOX/SEGM) 등 보조 모델 이름 목록"""
+        aux_models = {key: [] for key in AUX_MODEL_FOLDERS}
+        try:
+            for key, folder_name in AUX_MODEL_FOLDERS.items():
+                if folder_name in folder_paths.folder_names_and_paths:
+                    aux_models[key] = folder_paths.get_filename_list(folder_name)
+        except Exception as e:
+            print(f"[ComfyUI-AssetManager] Error fetching aux models: {e}")
+        return aux_models
+
+    def catalog_version(*folder_names):
+        return lambda: model_catalog.version(folder_names)
+
     @routes.get("/assetmanager/api/checkpoints")
     async def api_get_checkpoints(request):
-        """체크포인트 모델 목록 반환"""
-        return web.json_response({"checkpoints": get_model_info("checkpoints")})
+        """체크포인트 모델 목록 반환 (모델 폴더가 그대로면 If-None-Match에 304)"""
+        return await cached_json(request, "models", catalog_version("checkpoints"),
+                                 lambda: {"checkpoints": get_model_info("checkpoints")})
 
     @routes.get("/assetmanager/api/loras")
     async def api_get_loras(request):
         """로라 모델 목록 반환"""
-        return web.json_response({"loras": get_model_info("loras")})
+        return await cached_json(request, "models", catalog_version("loras"),
+                                 lambda: {"loras": get_model_info("loras")})
 
     @routes.get("/assetmanager/api/models")
     async def api_get_aux_models(request):
         """업스케일러, 디테일러(BBOX/SEGM) 등 보조 모델 목록을 한 번에 반환"""
-        aux_models = {
-            "upscale": [],
-            "bbox": [],
-            "segm": []
-        }
-        
+        return await cached_json(request, "models", catalog_version(*AUX_MODEL_FOLDERS.values()), get_aux_models)
+
+    @routes.get("/assetmanager/api/model_catalog")
+    async def api_get_model_catalog(request):
+        """
+        체크포인트, 로라, 보조 모델 목록을 한 번의 요청으로 반환.
+        생성 탭 드롭다운과 모델 카드 갤러리가 공통으로 사용한다.
+        """
+        def load_catalog():
+            catalog = {
+                "checkpoints": get_model_info("checkpoints"),
+                "loras": get_model_info("loras"),
+            }
+            catalog.update(get_aux_models())
+            return catalog
+
+        return await cached_json(request, "models",
+                                 catalog_version("checkpoints", "loras", *AUX_MODEL_FOLDERS.values()), load_catalog)
+
+    @routes.get("/assetmanager/api/models/search")
+    async def api_search_models(request):
+        """
+        모델 메타데이터 인덱스 검색.
+          - q          : 파일명/모델 이름/태그/트리거 단어/베이스 모델 (단어별 접두어 AND)
+          - folder     : checkpoints / loras (생략 시 전체)
+          - base_model : 베이스 모델 (예: SDXL 1.0)
+          - tag        : 태그 (여러 번 지정 시 모두 가진 모델)
+          - hash       : SHA256 또는 AutoV2 해시 접두어
+          - limit, offset
+        """
+        q = request.query.get("q", "")
+        folder = request.query.get("folder") or None
+        base_model = request.query.get("base_model") or None
+        tags = [tag for tag in request.query.getall("tag", []) if tag]
+        sha256 = request.query.get("hash") or None
         try:
-            if "upscale_models" in folder_paths.folder_names_and_paths:
-                aux_models["upscale"] = folder_paths.get_filename_list("upscale_models")
-                
-            if "ultralytics" in folder_paths.folder_names_and_paths:
-                aux_models["bbox"] = folder_paths.get_filename_list("ultralytics")
-                
-            if "sams" in folder_paths.folder_names_and_paths:
-                aux_models["segm"] = folder_paths.get_filename_list("sams")
-                
-        except Exception as e:
-            print(f"[ComfyUI-AssetManager] Error fetching aux models: {e}")
-            
-        return web.json_response(aux_models)
+            limit = max(1, min(1000, int(request.query.get("limit", 100))))
+            offset = max(0, int(request.query.get("offset", 0)))
+        except ValueError:
+            return web.json_response({"status": "error", "message": "limit/offset은 정수여야 합니다."}, status=400)
+
+        def search():
+            return model_indexer.get_index().search(q, folder, base_model, tags, sha256, limit, offset)
+
+        try:
+            models, total = await run_io("search", search)
+        except ValueError as e:
+            return web.json_response({"status": "error", "message": str(e)}, status=400)
+
+        for model in models:
+            model["image_url"], model["thumb_url"] = preview_urls(model["folder"], model["name"], model.pop("preview_ext"))
+        return web.json_response({"status": "success", "models": models, "total": total})
+
+    @routes.get("/assetmanager/api/models/search/facets")
+    async def api_model_search_facets(request):
+        """검색 필터용 베이스 모델 / 태그 목록"""
+        folder = request.query.get("folder") or None
+        facets = await run_io("search", lambda: model_indexer.get_index().get_facets(folder))
+        return web.json_response({"status": "success", **facets})
 
     @routes.get("/assetmanager/api/file")
     async def api_get_file(request):
@@ -91,14 +144,16 @@ def setup_models_api(routes):
         if not folder or not name or not ext:
             return web.Response(status=400)
             
-        full_path = folder_paths.get_full_path(folder, name)
-        if not full_path:
-            return web.Response(status=404)
-            
-        base, _ = os.path.splitext(full_path)
-        target_file = base + ext
-        
-        if os.path.exists(target_file):
+        def resolve_preview():
+            full_path = folder_paths.get_full_path(folder, name)
+            if not full_path:
+                return None
+            base, _ = os.path.splitext(full_path)
+            target_file = base + ext
+            return target_file if os.path.exists(target_file) else None
+
+        target_file = await run_io("models", resolve_preview)
+        if target_file:
             return web.FileResponse(target_file)
         return web.Response(status=404)
 
@@ -117,56 +172,50 @@ def setup_models_api(routes):
         if not model_type or not model_name:
             return web.json_response({"status": "error", "message": "type과 name 파라미터가 필요합니다."}, status=400)
 
-        folder_name = model_type
-        full_path = folder_paths.get_full_path(folder_name, model_name)
-        if not full_path:
+        entry = await run_io("models", model_catalog.find, model_type, model_name)
+        if not entry:
             return web.json_response({"status": "error", "message": f"모델 파일을 찾을 수 없습니다: {model_name}"}, status=404)
 
-        base, _ = os.path.splitext(full_path)
-
-        # 메타데이터 사이드카 파일 탐색 (우선순위 순서)
-        metadata_candidates = [
-            base + ".civitai.info",
-            base + ".metadata.json",
-            base + ".json",
-        ]
-
-        info_data = None
-        for candidate in metadata_candidates:
-            if os.path.exists(candidate):
+        # 메타데이터 사이드카 파일. 인덱스에 저장된 사본이 최신이면 그것을 쓰고,
+        # 아직 인덱싱되지 않았거나 사이드카가 바뀌었으면 우선순위 순서로 직접 읽는다.
+        def read_sidecar():
+            sidecar = entry["sidecars"][0] if entry["sidecars"] else None
+            indexed = model_indexer.get_index().get_info(model_type, model_name, sidecar)
+            if indexed is not None:
+                return indexed
+            for candidate in entry["sidecars"]:
                 try:
                     with open(candidate, "r", encoding="utf-8") as f:
-                        info_data = json_module.load(f)
-                    break
+                        return json_module.load(f), None
                 except Exception as e:
                     print(f"[ComfyUI-AssetManager] 메타데이터 파싱 실패 ({candidate}): {e}")
+            return None, None
+
+        info_data, sha256 = await run_io("models", read_sidecar)
+        preview_url = entry["preview_path"]
 
         if not info_data:
-            # 프리뷰 이미지라도 있으면 기본 정보만 반환
-            preview_exts = [".preview.jpeg", ".preview.jpg", ".preview.png", ".jpeg", ".jpg", ".png"]
-            preview_url = None
-            for ext in preview_exts:
-                if os.path.exists(base + ext):
-                    preview_url = base + ext
-                    break
-
-            if preview_url:
+            # 프리뷰 이미지나 계산된 해시라도 있으면 기본 정보만 반환
+            if preview_url or sha256:
                 return web.json_response({
                     "status": "success",
                     "info": {
                         "name": model_name,
                         "preview_url": preview_url,
+                        "sha256": sha256,
+                        "autov2": autov2(sha256),
                     }
                 })
 
             return web.json_response({"status": "error", "message": "메타데이터 파일을 찾을 수 없습니다."})
 
         # 프리뷰 이미지 경로도 함께 첨부
-        preview_exts = [".preview.jpeg", ".preview.jpg", ".preview.png", ".jpeg", ".jpg", ".png"]
-        for ext in preview_exts:
-            if os.path.exists(base + ext):
-                info_data["preview_url"] = base + ext
-                break
+        if preview_url:
+            info_data["preview_url"] = preview_url
+        # 인덱서가 계산한 해시 (사이드카에 해시가 없던 모델)
+        if sha256:
+            info_data.setdefault("sha256", sha256)
+            info_data["autov2"] = autov2(sha256)
 
         return web.json_response({"status": "success", "info": info_data})
 
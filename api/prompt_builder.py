@@ -0,0 +1,356 @@
+"""
+api/prompt_builder.py — 생성 워크플로우 조립 (서버측)
+프론트엔드(executeGeneration과 파이프라인 모듈)에 있던 노드 주입·재배선 로직을 Python으로 옮긴 것으로,
+단일 생성(/assetmanager/api/workflow/build)과 배치 스케줄러가 모두 이 모듈로 /prompt 그래프를 만듭니다.
+단독 검열 도구(tools_censor.js)의 검열 전용 그래프는 build_censor_prompt로 만듭니다.
+템플릿 레지스트리(workflow_templates.py)가 넘기는 WorkflowGraph는 제목 색인을 갖고 있어
+노드 검색이 사전 조회로 끝나고, 복사도 노드의 inputs까지만 합니다.
+DOM 대신 아래 형태의 settings 사전을 받습니다 (프론트엔드 collectGenerationSettings와 같은 구조).
+
+  {
+    "checkpoint": str,
+    "steps": int, "cfg": float, "sampler": str, "scheduler": str, "dimensions": str,
+    "seed": int | None,                       # None이면 이미지마다 난수
+    "loras": [{"lora": str, "strength": float}],
+    "upscale":  {"enabled": bool, "model": str, "scale": float, "steps": int},
+    "detailer": {"enabled": bool, "face": {"enabled": bool, "model": str}, "eye": {...}, "mouth": {...}, "hand": {...}},
+    "censor":   {"enabled": bool, "labels": [str], "mode": "mosaic"|"white"|"white_solid", "intensity": int}
+  }
+"""
+
+import copy
+import random
+
+# 디테일러 이름 → 기본 모델 (pipeline_detailer.js와 동일)
+DETAILER_DEFAULTS = (
+    ("face", "Face", "bbox/face_yolov8m.pt"),
+    ("eye", "Eye", "segm/PitEyeDetailer-v2-seg.pt"),
+    ("mouth", "Mouth", "bbox/face_yolov8m.pt"),
+    ("hand", "Hand", "bbox/hand_yolov8s.pt"),
+)
+
+CENSOR_TITLES = (
+    "[Censor] NSFW Segm Detector", "[Censor] SEGS Extractor", "[Censor] Combined Mask",
+    "[Censor] Mosaic Downscale", "[Censor] Mosaic Upscale", "[Censor] Mosaic Composite",
+    "[Censor] White Canvas", "[Censor] White Edge Blur", "[Censor] White Mask Composite",
+    "[Censor] Image Save",
+)
+
+# 중간 단계 Save 노드 (최종 Save만 유지)
+REDUNDANT_SAVES = (
+    "[Upscaler] Image Save",
+    "[Detailer] Face Detailer Image Save",
+    "[Detailer] Eye Detailer Image Save",
+    "[Detailer] Mouth Detailer Image Save",
+    "[Detailer] Hand Detailer Image Save",
+)
+
+MAX_RANDOM_SEED = 10000000000000000
+# 단독 검열 그래프에서 원본 이미지를 불러오는 LoadImage 노드 ID (tools_censor.js와 동일)
+CENSOR_SOURCE_ID = "9998"
+
+
+class WorkflowGraph(dict):
+    """제목 색인(titles: 제목 → 노드 ID)을 함께 가진 워크플로우 그래프 (compile_workflow로 만든다)."""
+
+    __slots__ = ("titles",)
+
+    def __init__(self, nodes, titles):
+        super().__init__(nodes)
+        self.titles = titles
+
+
+def compile_workflow(workflow):
+    """워크플로우 사전에 제목 색인을 붙인다. 같은 제목이 여러 개면 find_node_id처럼 앞의 노드를 쓴다."""
+    titles = {}
+    for node_id, node in workflow.items():
+        meta = node.get("_meta") if isinstance(node, dict) else None
+        if meta and meta.get("title"):
+            titles.setdefault(meta["title"], node_id)
+    return WorkflowGraph(workflow, titles)
+
+
+def clone_workflow(workflow):
+    """
+    조립용 사본을 만든다. 조립 과정은 노드의 inputs 값을 통째로 바꾸거나 노드를 지우기만 하므로
+    WorkflowGraph는 노드와 inputs 사전까지만 복사한다 (그 외 값은 템플릿과 공유).
+    """
+    if not isinstance(workflow, WorkflowGraph):
+        return compile_workflow(copy.deepcopy(workflow))
+    nodes = {}
+    for node_id, node in workflow.items():
+        node = dict(node)
+        node["inputs"] = dict(node.get("inputs") or {})
+        nodes[node_id] = node
+    return WorkflowGraph(nodes, workflow.titles)
+
+
+def find_node_id(prompt, title):
+    """워크플로우에서 _meta.title이 일치하는 노드 ID를 찾는다."""
+    titles = getattr(prompt, "titles", None)
+    if titles is not None:
+        node_id = titles.get(title)
+        return node_id if node_id in prompt else None
+    for node_id, node in prompt.items():
+        meta = node.get("_meta") if isinstance(node, dict) else None
+        if meta and meta.get("title") == title:
+            return node_id
+    return None
+
+
+def _delete_titles(prompt, titles):
+    for title in titles:
+        node_id = find_node_id(prompt, title)
+        if node_id:
+            del prompt[node_id]
+
+
+def random_seed():
+    return random.randrange(MAX_RANDOM_SEED)
+
+
+def apply_upscaler_pipeline(prompt, source, options):
+    """pipeline_upscaler.js: 업스케일 노드를 연결하거나 삭제하고 새 파이프라인 끝단을 반환한다."""
+    target_id = find_node_id(prompt, "[Upscaler] Image Upscale")
+    _delete_titles(prompt, ["[Upscaler] Image Preview"])
+
+    if options.get("enabled") and target_id:
+        prompt[target_id]["inputs"]["image"] = source
+        upscaled = [target_id, 0]
+
+        model_name = options.get("model") or "4x-UltraSharp.pth"
+        model_id = find_node_id(prompt, "[Upscaler] Model Loader")
+        if model_id:
+            prompt[model_id]["inputs"]["model_name"] = model_name
+
+        ratio_id = find_node_id(prompt, "[Upscaler] Ratio")
+        if ratio_id:
+            prompt[ratio_id]["inputs"]["image"] = upscaled
+            target_scale = float(options.get("scale") or 1.5)
+            model_scale = 2 if "2x" in model_name else (8 if "8x" in model_name else 4)
+            prompt[ratio_id]["inputs"]["scale_by"] = target_scale / model_scale
+            upscaled = [ratio_id, 0]
+
+        vae_encode_id = find_node_id(prompt, "[Upscaler] VAE Encode")
+        if vae_encode_id:
+            prompt[vae_encode_id]["inputs"]["pixels"] = upscaled
+
+        vae_decode_id = find_node_id(prompt, "[Upscaler] VAE Decode")
+        if vae_decode_id:
+            return [vae_decode_id, 0]
+    elif target_id:
+        _delete_titles(prompt, ["[Upscaler] Model Loader", "[Upscaler] Image Upscale", "[Upscaler] Ratio",
+                                "[Upscaler] VAE Encode", "[Upscaler] KSampler", "[Upscaler] VAE Decode",
+                                "[Upscaler] Image Save"])
+    return source
+
+
+def apply_detailer_pipeline(prompt, source, options):
+    """pipeline_detailer.js: 활성화된 디테일러를 순서대로 체인 연결하고 나머지는 삭제한다."""
+    pipe = source
+    global_on = bool(options.get("enabled"))
+
+    for key, prefix, default_model in DETAILER_DEFAULTS:
+        detailer_id = find_node_id(prompt, f"[Detailer] {prefix} Detailer")
+        part = options.get(key) or {}
+        _delete_titles(prompt, [f"[Detailer] {prefix} Detailer Image Preview"])
+
+        if global_on and part.get("enabled") and detailer_id:
+            prompt[detailer_id]["inputs"]["image"] = pipe
+            model_id = find_node_id(prompt, f"[Detailer] {prefix} Detailer Model(BBOX)")
+            if model_id:
+                prompt[model_id]["inputs"]["model_name"] = part.get("model") or default_model
+            pipe = [detailer_id, 0]
+        elif detailer_id:
+            _delete_titles(prompt, [
+                f"[Detailer] {prefix} Detailer",
+                f"[Detailer] {prefix} Detailer Model(BBOX)",
+                f"[Detailer] {prefix} Detailer Model(SAML)",
+                f"[Detailer] {prefix} Detailer ToDetailerPipe",
+                f"[Detailer] {prefix} Detailer Image Save",
+            ])
+
+    if not global_on:
+        _delete_titles(prompt, ["[Detailer] Scheduler Adapter"])
+    return pipe
+
+
+def apply_censor_pipeline(prompt, source, options):
+    """pipeline_censor.js: 검열 모드에 맞게 노드를 연결하거나 삭제하고 새 파이프라인 끝단을 반환한다."""
+    labels = list(options.get("labels") or [])
+    if not options.get("enabled") or not labels:
+        _delete_titles(prompt, CENSOR_TITLES)
+        return source
+
+    try:
+        intensity = int(options.get("intensity") or 15)
+    except (TypeError, ValueError):
+        intensity = 15
+    if intensity < 1:
+        intensity = 15
+    mode = options.get("mode") or "mosaic"
+
+    ids = {title: find_node_id(prompt, title) for title in CENSOR_TITLES}
+    segs_id = ids["[Censor] SEGS Extractor"]
+    down_id, up_id, mosaic_comp_id = ids["[Censor] Mosaic Downscale"], ids["[Censor] Mosaic Upscale"], ids["[Censor] Mosaic Composite"]
+    white_canvas_id, white_blur_id, white_comp_id = ids["[Censor] White Canvas"], ids["[Censor] White Edge Blur"], ids["[Censor] White Mask Composite"]
+    save_id = ids["[Censor] Image Save"]
+
+    def drop(*node_ids):
+        for node_id in node_ids:
+            if node_id:
+                del prompt[node_id]
+
+    if segs_id:
+        inputs = prompt[segs_id]["inputs"]
+        inputs["image"] = source
+        inputs["labels"] = ",".join(labels)
+        inputs["dilation"] = round(intensity * 2)
+
+    final = source
+    if mode == "mosaic":
+        drop(white_canvas_id, white_blur_id, white_comp_id)
+        mapped_scale = min((intensity / 50) * 8.0, 8.0)
+        down_factor = max(0.01, 1.0 / mapped_scale)
+        if down_id:
+            prompt[down_id]["inputs"]["image"] = source
+            prompt[down_id]["inputs"]["scale_by"] = down_factor
+        if up_id:
+            prompt[up_id]["inputs"]["scale_by"] = mapped_scale
+        if mosaic_comp_id:
+            prompt[mosaic_comp_id]["inputs"]["destination"] = source
+            final = [mosaic_comp_id, 0]
+    elif mode == "white":
+        drop(down_id, up_id, mosaic_comp_id)
+        if white_blur_id:
+            prompt[white_blur_id]["inputs"]["kernel_size"] = intensity
+            prompt[white_blur_id]["inputs"]["sigma"] = intensity / 2.0
+        if white_comp_id:
+            prompt[white_comp_id]["inputs"]["destination"] = source
+            final = [white_comp_id, 0]
+    elif mode == "white_solid":
+        drop(down_id, up_id, mosaic_comp_id, white_blur_id)
+        if white_comp_id:
+            prompt[white_comp_id]["inputs"]["destination"] = source
+            combined_id = ids["[Censor] Combined Mask"]
+            if combined_id:
+                prompt[white_comp_id]["inputs"]["mask"] = [combined_id, 0]
+            final = [white_comp_id, 0]
+    if save_id:
+        prompt[save_id]["inputs"]["images"] = final
+    return final
+
+
+def build_prompt(workflow, settings, positive, negative, filename_prefix, seed=None):
+    """
+    워크플로우 템플릿에 생성 설정을 적용한 /prompt 그래프를 만든다 (템플릿은 변경하지 않음).
+    seed가 None이면 settings["seed"], 그것도 없으면 난수를 사용한다.
+    """
+    prompt = clone_workflow(workflow)
+
+    ckpt_id = find_node_id(prompt, "[Main] ckpt loader")
+    text_id = find_node_id(prompt, "[Main] Text Prompt")
+    ksampler_id = find_node_id(prompt, "[Main] KSampler")
+    lora_id = find_node_id(prompt, "[Main] Lora Loader")
+    upscaler_sampler_id = find_node_id(prompt, "[Upscaler] KSampler")
+    image_save_id = find_node_id(prompt, "[Main] Image Save")
+    vae_decode_id = find_node_id(prompt, "[Main] VAE decode")
+
+    if ckpt_id and settings.get("checkpoint"):
+        prompt[ckpt_id]["inputs"]["ckpt_name"] = settings["checkpoint"]
+    if text_id:
+        prompt[text_id]["inputs"]["pos"] = positive or "1girl, masterpiece"
+        prompt[text_id]["inputs"]["neg"] = negative or "worst quality"
+
+    # 고급 설정
+    step_id = find_node_id(prompt, "[Main] Step")
+    cfg_id = find_node_id(prompt, "[Main] CFG")
+    sampler_scheduler_id = find_node_id(prompt, "[Main] Sampler, Scheduler")
+    latent_id = find_node_id(prompt, "[Main] Latent Image")
+    if step_id:
+        prompt[step_id]["inputs"]["value"] = int(settings.get("steps") or 28)
+    if cfg_id:
+        prompt[cfg_id]["inputs"]["value"] = float(settings.get("cfg") or 5)
+    if sampler_scheduler_id:
+        prompt[sampler_scheduler_id]["inputs"]["sampler_name"] = settings.get("sampler") or "euler_ancestral"
+        prompt[sampler_scheduler_id]["inputs"]["scheduler"] = settings.get("scheduler") or "normal"
+    if latent_id:
+        prompt[latent_id]["inputs"]["dimensions"] = settings.get("dimensions") or "1024 x 1024  (square)"
+
+    if seed is None:
+        seed = settings.get("seed")
+    if seed is None:
+        seed = random_seed()
+    if ksampler_id:
+        prompt[ksampler_id]["inputs"]["seed"] = seed
+    upscale = settings.get("upscale") or {}
+    if upscaler_sampler_id:
+        prompt[upscaler_sampler_id]["inputs"]["seed"] = seed
+        prompt[upscaler_sampler_id]["inputs"]["steps"] = int(upscale.get("steps") or 10)
+
+    _delete_titles(prompt, ["[Main] Image Preview"])
+
+    # 로라 (Power Lora Loader rgthree 형식)
+    if lora_id:
+        inputs = prompt[lora_id]["inputs"]
+        inputs.pop("lora_1", None)
+        loras = settings.get("loras") or []
+        if loras:
+            for i, lora in enumerate(loras, start=1):
+                inputs[f"lora_{i}"] = {"on": True, "lora": lora.get("lora"), "strength": float(lora.get("strength", 1))}
+        else:
+            inputs["lora_1"] = {"on": False, "lora": "None", "strength": 1}
+
+    # 파이프라인 순서: VAE Decode → 업스케일러 → 디테일러 → 검열
+    source = [vae_decode_id, 0]
+    source = apply_upscaler_pipeline(prompt, source, upscale)
+    source = apply_detailer_pipeline(prompt, source, settings.get("detailer") or {})
+
+    pre_censor_source = list(source)
+    censor = settings.get("censor") or {}
+    censor_on = bool(censor.get("enabled"))
+    source = apply_censor_pipeline(prompt, source, censor)
+
+    redundant = list(REDUNDANT_SAVES)
+    if not censor_on:
+        redundant.append("[Censor] Image Save")
+    _delete_titles(prompt, redundant)
+
+    if image_save_id:
+        prompt[image_save_id]["inputs"]["images"] = pre_censor_source
+        prompt[image_save_id]["inputs"]["filename_prefix"] = filename_prefix
+    if censor_on:
+        censor_save_id = find_node_id(prompt, "[Censor] Image Save")
+        if censor_save_id:
+            prompt[censor_save_id]["inputs"]["images"] = source
+            prompt[censor_save_id]["inputs"]["filename_prefix"] = filename_prefix + "_censored"
+    return prompt
+
+
+def build_censor_prompt(workflow, censor, image, filename_prefix):
+    """
+    tools_censor.js의 단독 검열 그래프를 만든다: LoadImage(image) → 검열 파이프라인 → [Censor] Image Save.
+    image는 LoadImage 입력값 그대로 (input 기준 상대 경로, output 파일은 "sub/name.png [output]").
+    """
+    prompt = clone_workflow(workflow)
+    prompt[CENSOR_SOURCE_ID] = {"class_type": "LoadImage", "inputs": {"image": image}}
+    apply_censor_pipeline(prompt, [CENSOR_SOURCE_ID, 0], dict(censor, enabled=True))
+
+    for node_id in list(prompt):
+        if node_id == CENSOR_SOURCE_ID:
+            continue
+        title = ((prompt[node_id] or {}).get("_meta") or {}).get("title") or ""
+        if not title.startswith("[Censor]"):
+            del prompt[node_id]
+    save_id = find_node_id(prompt, "[Censor] Image Save")
+    if save_id:
+        prompt[save_id]["inputs"]["filename_prefix"] = filename_prefix
+    return prompt
+
+
+def render_path_template(template, labels):
+    """경로 템플릿의 [키]를 작업 라벨 값으로 바꾼다 (generate.js와 같이 키마다 첫 번째만 치환)."""
+    path = template or ""
+    for key, value in (labels or {}).items():
+        path = path.replace(f"[{key}]", str(value), 1)
+    return path
@@ -0,0 +1,212 @@
+"""
+api/startup.py — API 모듈 지연 로딩과 시작 후 예열
+ComfyUI 시작 시에는 이 모듈(aiohttp만 사용)만 불러와 /assetmanager/api/ 아래 요청을 받는 라우트 하나를 등록합니다.
+실제 핸들러 모듈(PIL, numpy, SQLite, subprocess, zipfile 등을 쓰는)은 서버가 뜬 뒤 백그라운드 작업이나
+첫 요청에서 import되며, 각 setup_*_api 함수가 내부 라우터에 라우트를 등록합니다.
+모듈을 불러온 뒤에는 낮은 우선순위 스레드가 모델 카탈로그와 갤러리 인덱스를 미리 갱신하여
+첫 갤러리/모델 요청이 콜드 스캔을 하지 않게 합니다. 단계별 소요 시간은 콘솔과
+/assetmanager/api/metrics (assetmanager_startup_seconds)로 보고합니다.
+환경 변수:
+  - ASSETMANAGER_WARMUP       : 0이면 모델/갤러리 예열을 하지 않음 (API 모듈은 그대로 백그라운드에서 로드)
+  - ASSETMANAGER_WARMUP_DELAY : 서버 시작 후 API 모듈 로드까지 기다릴 시간 (초, 기본 2)
+"""
+
+import os
+import sys
+import time
+import asyncio
+import importlib
+import threading
+from aiohttp import web
+from server import PromptServer
+
+API_PREFIX = "/assetmanager/api/"
+ROUTE_PREFIX = "/assetmanager/"
+# ComfyUI가 모든 라우트를 한 번 더 등록하는 접두어 (/api/assetmanager/api/...)
+COMFY_API_PREFIX = "/api"
+# 내부 라우터가 찾은 라우트 정보를 담는 요청 키 (경로 변수는 route_info()로 읽는다)
+MATCH_INFO_KEY = "assetmanager.match_info"
+
+WARMUP_ENABLED = os.environ.get("ASSETMANAGER_WARMUP", "1").strip().lower() not in ("0", "false", "no", "off")
+try:
+    WARMUP_DELAY = max(0.0, float(os.environ.get("ASSETMANAGER_WARMUP_DELAY", "2")))
+except ValueError:
+    WARMUP_DELAY = 2.0
+
+# (모듈, 등록 함수, 추가 인자) — 등록 순서가 곧 라우트 우선순위 (같은 경로는 먼저 등록한 쪽이 처리)
+API_MODULES = (
+    ("models", "setup_models_api", ()),
+    ("system", "setup_system_api", ("web_dir",)),
+    ("gallery", "setup_gallery_api", ()),
+    ("library", "setup_library_api", ("web_dir",)),
+    ("generate", "setup_generate_api", ("data_dir",)),
+    ("tools", "setup_tools_api", ()),
+    ("thumbnails", "setup_thumbnails_api", ()),
+)
+
+# 확장을 불러온 시각 (metrics.py의 assetmanager_start_time_seconds)
+STARTED_AT = time.time()
+
+
+def _format_seconds(seconds):
+    return f"{seconds * 1000:.0f}ms" if seconds < 1 else f"{seconds:.2f}s"
+
+
+def _lower_thread_priority():
+    """현재 스레드의 스케줄링 우선순위를 낮춘다 (Linux는 스레드별 nice 값을 지원, 그 외 OS는 그대로 둔다)."""
+    if not sys.platform.startswith("linux"):
+        return
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 10)
+    except (AttributeError, OSError):
+        pass
+
+
+class LazyApi:
+    """
+    API 라우트 지연 등록기 싱글턴.
+    aiohttp 라우터는 서버가 시작되면 더 이상 라우트를 추가할 수 없으므로, 시작 전에는 API 경로 전체를 받는
+    라우트 하나만 등록하고 실제 라우트는 나중에 만든 내부 라우터(UrlDispatcher)에서 찾는다.
+    """
+
+    def __init__(self):
+        self._router = None
+        self._lock = None
+        self._args = {}
+        self._warm_task = None
+        self.timings = {}  # 단계 → 소요 시간(초)
+
+    @property
+    def loaded(self):
+        return self._router is not None
+
+    def register(self, routes, web_dir, data_dir, load_started=None):
+        """ComfyUI 시작 시 호출: 전체 경로 라우트, 계측 미들웨어, 서버 시작 후 로드 작업을 등록한다."""
+        self._args = {"web_dir": web_dir, "data_dir": data_dir}
+        routes.route("*", API_PREFIX + "{tail:.*}")(self.dispatch)
+        app = PromptServer.instance.app
+        # 앱이 시작되기 전에만 미들웨어를 추가할 수 있다
+        app.middlewares.append(lazy_metrics_middleware)
+        app.on_startup.append(self._on_startup)
+        if load_started is not None:
+            self.timings["import"] = time.perf_counter() - load_started
+
+    async def load(self):
+        """API 모듈을 불러와 내부 라우터를 만든다 (한 번만, 동시에 불러도 안전)."""
+        if self._router is not None:
+            return
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self._router is not None:
+                return
+            started = time.perf_counter()
+            # import(디스크 읽기, 확장 모듈 초기화)는 이벤트 루프 밖에서, 라우트 등록과 작업 시작은 루프에서 한다
+            modules = await asyncio.get_running_loop().run_in_executor(None, self._import_modules)
+            table = web.RouteTableDef()
+            for module, (_, setup_name, arg_names) in zip(modules, API_MODULES):
+                getattr(module, setup_name)(table, *(self._args[name] for name in arg_names))
+            router = web.UrlDispatcher()
+            router.add_routes(table)
+            self._router = router
+            self.timings["load"] = time.perf_counter() - started
+
+    def _import_modules(self):
+        return [importlib.import_module(f".{name}", __package__) for name, _, _ in API_MODULES]
+
+    async def dispatch(self, request):
+        """API 요청을 내부 라우터의 핸들러로 넘긴다 (모듈이 아직 없으면 먼저 불러온다)."""
+        if self._router is None:
+            await self.load()
+        lookup = request
+        if request.rel_url.path.startswith(COMFY_API_PREFIX + API_PREFIX):
+            # ComfyUI가 /api 아래에 복제한 경로: 내부 라우터에는 원래 경로로 찾는다
+            lookup = request.clone(rel_url=request.rel_url.with_path(request.rel_url.path[len(COMFY_API_PREFIX):]))
+        match_info = await self._router.resolve(lookup)
+        if match_info.http_exception is not None:
+            raise match_info.http_exception
+        # 요청의 match_info는 전체 경로 라우트 그대로 두고, 실제 라우트(경로 변수, 지표 라벨)는 요청 키로 넘긴다
+        request[MATCH_INFO_KEY] = match_info
+        return await match_info.handler(request)
+
+    async def _on_startup(self, app):
+        self._warm_task = asyncio.get_running_loop().create_task(self._warm_up())
+
+    async def _warm_up(self):
+        await asyncio.sleep(WARMUP_DELAY)
+        try:
+            await self.load()
+        except Exception as e:
+            print(f"[ComfyUI-AssetManager] API 모듈 로드 실패: {e}")
+            return
+        if not WARMUP_ENABLED:
+            self._report()
+            return
+        threading.Thread(target=self._prewarm, name="am-warmup", daemon=True).start()
+
+    def _prewarm(self):
+        """모델 카탈로그와 갤러리 인덱스를 미리 갱신한다 (낮은 우선순위 전용 스레드)."""
+        _lower_thread_priority()
+        from .model_catalog import model_catalog, AUX_MODEL_FOLDERS
+        from .gallery_watcher import gallery_watcher
+        steps = (
+            ("warm_models", lambda: model_catalog.version(("checkpoints", "loras", *AUX_MODEL_FOLDERS.values()))),
+            ("warm_gallery", gallery_watcher.refresh_and_broadcast),
+        )
+        for phase, step in steps:
+            started = time.perf_counter()
+            try:
+                step()
+            except Exception as e:
+                print(f"[ComfyUI-AssetManager] 예열 실패 ({phase}): {e}")
+            self.timings[phase] = time.perf_counter() - started
+        self._report()
+
+    def _report(self):
+        labels = (("import", "시작 시 로드"), ("load", "API 모듈 로드"),
+                  ("warm_models", "모델 카탈로그 예열"), ("warm_gallery", "갤러리 인덱스 예열"))
+        parts = [f"{label} {_format_seconds(self.timings[phase])}" for phase, label in labels if phase in self.timings]
+        print(f"[ComfyUI-AssetManager] {', '.join(parts)}")
+
+
+lazy_api = LazyApi()
+
+
+def route_info(request):
+    """요청을 처리하는 실제 라우트의 match_info (경로 변수 조회용, 지연 등록 라우트도 포함)."""
+    # match_info는 경로 변수 dict이므로 변수가 없는 라우트면 비어 있다 (참/거짓으로 판단하지 않는다)
+    match_info = request.get(MATCH_INFO_KEY)
+    return match_info if match_info is not None else request.match_info
+
+
+def is_assetmanager_path(path):
+    """AssetManager 경로인지 (ComfyUI가 /api 아래에 복제한 경로 포함)"""
+    if path.startswith(COMFY_API_PREFIX + ROUTE_PREFIX):
+        path = path[len(COMFY_API_PREFIX):]
+    return path.startswith(ROUTE_PREFIX)
+
+# 서버 시작 후 실행한 콜백 작업 (완료 전에 가비지 컬렉션되지 않도록 참조를 보관)
+_startup_tasks = set()
+
+
+def on_server_start(callback):
+    """
+    서버 시작 시 실행할 콜백(app 인자를 받는 코루틴 함수)을 등록한다.
+    API 모듈은 서버가 시작된 뒤에 로드되므로, 이미 시작되었으면 바로 실행한다.
+    """
+    app = PromptServer.instance.app
+    if app.on_startup.frozen:
+        task = asyncio.get_running_loop().create_task(callback(app))
+        _startup_tasks.add(task)
+        task.add_done_callback(_startup_tasks.discard)
+    else:
+        app.on_startup.append(callback)
+
+
+@web.middleware
+async def lazy_metrics_middleware(request, handler):
+    """AssetManager 요청만 계측 미들웨어(metrics.py)로 넘긴다. 계측 모듈은 첫 AssetManager 요청에서 불러온다."""
+    if not is_assetmanager_path(request.path):
+        return await handler(request)
+    from .metrics import metrics_middleware
+    return await metrics_middleware(request, handler)
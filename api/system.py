@@ -1,14 +1,21 @@
 """
-api/system.py — 시스템 공용 API (상태 저장/복원, 로그 기록)
+api/system.py — 시스템 공용 API (상태 저장/복원, 로그 기록/조회, 지표)
 앱 상태(app_state.json) 파일의 저장 및 불러오기와
-날짜별 로그 파일 기록 기능을 제공합니다.
+날짜별 생성 로그(JSON Lines) 기록·검색 기능, Prometheus 지표 엔드포인트를 제공합니다.
 """
 
 import os
+import re
 import json
-import datetime
 from aiohttp import web
 
+from .executors import run_io
+from .http_cache import cached_json
+from .log_store import LogWriter, RECORD_FIELDS, query_logs
+from . import metrics
+
+_DATE_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
 
 def setup_system_api(routes, web_dir):
     """시스템 관련 API 라우트를 등록한다."""
@@ -18,27 +25,47 @@ def setup_system_api(routes, web_dir):
         os.makedirs(data_dir)
 
     state_file = os.path.join(data_dir, "app_state.json")
+    # mtime 해상도가 낮은 파일 시스템에서도 저장할 때마다 ETag가 바뀌도록 저장 횟수를 함께 쓴다
+    state_saves = [0]
 
     @routes.post("/assetmanager/api/save_state")
     async def api_save_state(request):
         """프론트엔드 앱 상태를 JSON 파일로 저장"""
         try:
             data = await request.json()
-            with open(state_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=4, ensure_ascii=False) 
+
+            def save_state():
+                with open(state_file, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, indent=4, ensure_ascii=False)
+
+            await run_io("state", save_state)
+            state_saves[0] += 1
             return web.json_response({"status": "success"})
         except Exception as e:
             return web.json_response({"status": "error", "message": str(e)}, status=500)
 
     @routes.get("/assetmanager/api/load_state")
     async def api_load_state(request):
-        """저장된 앱 상태를 불러온다. 파일이 없으면 not_found 상태를 반환."""
-        if not os.path.exists(state_file):
-            return web.json_response({"status": "not_found"})
-        try:
+        """저장된 앱 상태를 불러온다. 파일이 없으면 not_found 상태를 반환. 파일이 그대로면 If-None-Match에 304."""
+        def load_state():
+            if not os.path.exists(state_file):
+                return None
             with open(state_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            return web.json_response({"status": "success", "state": data})
+                return json.load(f)
+
+        def state_version():
+            try:
+                st = os.stat(state_file)
+            except FileNotFoundError:
+                return state_saves[0], None
+            return state_saves[0], st.st_mtime_ns, st.st_size
+
+        def build_response():
+            data = load_state()
+            return {"status": "not_found"} if data is None else {"status": "success", "state": data}
+
+        try:
+            return await cached_json(request, "state", state_version, build_response)
         except Exception as e:
             return web.json_response({"status": "error", "message": str(e)}, status=500)
 
@@ -46,21 +73,77 @@ def setup_system_api(routes, web_dir):
     if not os.path.exists(log_dir):
         os.makedirs(log_dir)
 
+    log_writer = LogWriter(log_dir)
+    log_writer.start()
+    # 느린 요청(ASSETMANAGER_SLOW_REQUEST_MS)은 type=slow_request 레코드로 생성 로그와 함께 조회할 수 있다
+    metrics.slow_request_sink = log_writer.write
+
+    @routes.get("/assetmanager/api/metrics")
+    async def api_metrics(request):
+        """라우트별 지연/크기/파일 접근 수, 캐시 적중률, 작업 풀 대기열 (Prometheus 텍스트 형식)"""
+        return web.Response(text=metrics.metrics.render(), content_type="text/plain",
+                            headers={"Cache-Control": "no-store"}, charset="utf-8")
+
     @routes.post("/assetmanager/api/log")
     async def api_save_log(request):
-        """프론트엔드에서 보낸 메시지를 날짜별 로그 파일에 추가 기록"""
+        """
+        프론트엔드에서 보낸 메시지를 로그 기록 대기열에 넣는다 (파일 기록은 백그라운드에서 모아서 수행).
+        message 외에 type, status, prompt_id, duration_ms, client_ts, fields를 함께 받아 구조화하여 남긴다.
+        """
         try:
             data = await request.json()
             message = data.get("message", "")
             if not message:
                 return web.json_response({"status": "error", "message": "No message provided"}, status=400)
-                
-            today_str = datetime.datetime.now().strftime("%Y-%m-%d")
-            log_file = os.path.join(log_dir, f"{today_str}.log")
-            
-            with open(log_file, 'a', encoding='utf-8') as f:
-                f.write(message + "\n")
-                
+
+            log_writer.write(message, **{k: data.get(k) for k in RECORD_FIELDS})
             return web.json_response({"status": "success"})
         except Exception as e:
             return web.json_response({"status": "error", "message": str(e)}, status=500)
+
+    @routes.get("/assetmanager/api/log")
+    async def api_query_log(request):
+        """
+        생성 로그를 검색하여 한 페이지씩 반환.
+        쿼리 파라미터:
+          - date_from, date_to : YYYY-MM-DD (포함, 생략 시 제한 없음)
+          - q                  : 메시지/생성 정보 부분 문자열
+          - status, type       : 레코드 상태/종류 일치
+          - cursor             : 직전 응답의 next_cursor
+          - limit              : 페이지 크기 (1~500, 기본 50)
+          - order              : newest(기본) / oldest
+        """
+        query = request.query
+        date_from = query.get("date_from") or None
+        date_to = query.get("date_to") or None
+        for value in (date_from, date_to):
+            if value and not _DATE_PATTERN.match(value):
+                return web.json_response({"status": "error", "message": f"Invalid date: {value}"}, status=400)
+        try:
+            limit = max(1, min(int(query.get("limit", 50)), 500))
+        except ValueError:
+            return web.json_response({"status": "error", "message": "Invalid limit"}, status=400)
+
+        def search():
+            # 아직 큐에 남은 레코드까지 조회되도록 먼저 기록을 마친다
+            log_writer.flush(timeout=2.0)
+            return query_logs(
+                log_dir,
+                date_from=date_from,
+                date_to=date_to,
+                q=query.get("q", ""),
+                status=query.get("status") or None,
+                type_=query.get("type") or None,
+                cursor=query.get("cursor") or None,
+                limit=limit,
+                order=query.get("order", "newest")
+            )
+
+        try:
+            records, next_cursor = await run_io("log", search)
+        except ValueError as e:
+            return web.json_response({"status": "error", "message": str(e)}, status=400)
+        except Exception as e:
+            return web.json_response({"status": "error", "message": str(e)}, status=500)
+
+        return web.json_response({"status": "success", "records": records, "next_cursor": next_cursor})
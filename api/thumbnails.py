@@ -0,0 +1,270 @@
+"""
+api/thumbnails.py — 썸네일 생성 및 디스크 캐시
+갤러리 그리드와 체크포인트/로라 카드에 사용할 축소 이미지(WebP/JPEG)를 만들어
+web/data/thumbnails/ 아래에 캐시합니다.
+캐시 키는 원본 경로 + mtime + 크기 + 썸네일 규격의 해시이므로 원본이 바뀌면 자동으로 새로 만들어지고,
+전체 용량이 상한을 넘으면 가장 오래 사용되지 않은 썸네일부터 삭제합니다(LRU).
+"""
+
+import io
+import os
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from aiohttp import web
+import folder_paths
+
+from .executors import run_io
+from .metrics import count_files, count_cache
+
+THUMBNAIL_SIZES = (128, 256, 384, 512, 768, 1024)
+THUMBNAIL_FORMATS = {"webp": ("WEBP", ".webp", "image/webp"), "jpeg": ("JPEG", ".jpg", "image/jpeg")}
+THUMBNAIL_QUALITY = 80
+THUMBNAIL_CACHE_MAX_BYTES = 512 * 1024 * 1024
+PREVIEW_EXTENSIONS = (".preview.jpeg", ".preview.jpg", ".preview.png", ".jpeg", ".jpg", ".png")
+
+
+def snap_size(size):
+    """요청 크기를 미리 정한 규격 중 가장 가까운 큰 값으로 맞춘다 (캐시 변형 수 제한)."""
+    for candidate in THUMBNAIL_SIZES:
+        if size <= candidate:
+            return candidate
+    return THUMBNAIL_SIZES[-1]
+
+
+def thumbnail_key(src_path, st, size, fmt):
+    """원본 경로/mtime/파일 크기/썸네일 규격으로 캐시 키(=ETag)를 만든다."""
+    raw = f"{os.path.abspath(src_path)}|{st.st_mtime_ns}|{st.st_size}|{size}|{fmt}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def render_thumbnail(src_path, dest_path, size, fmt):
+    """
+    원본 이미지를 size×size 안에 들어가도록 축소하여 dest_path에 저장 (임시 파일 + rename).
+    인코딩된 썸네일 바이트를 반환한다.
+    """
+    from PIL import Image
+
+    pil_format, _, _ = THUMBNAIL_FORMATS[fmt]
+    with Image.open(src_path) as img:
+        # JPEG 원본은 디코딩 단계에서 1/2^n 축소(draft)로 디코딩 비용을 줄인다.
+        img.draft("RGB", (size, size))
+        img.thumbnail((size, size), getattr(Image, 'Resampling', Image).BICUBIC, reducing_gap=2.0)
+
+        if fmt == "jpeg":
+            if img.mode in ("RGBA", "LA", "P"):
+                img = img.convert("RGBA")
+                background = Image.new("RGB", img.size, (255, 255, 255))
+                background.paste(img, mask=img.split()[3])
+                img = background
+            elif img.mode != "RGB":
+                img = img.convert("RGB")
+        elif img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA" if "A" in img.getbands() or img.mode == "P" else "RGB")
+
+        save_kwargs = {"quality": THUMBNAIL_QUALITY}
+        if fmt == "webp":
+            save_kwargs["method"] = 4
+        buffer = io.BytesIO()
+        img.save(buffer, format=pil_format, **save_kwargs)
+
+    data = buffer.getvalue()
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    tmp_path = f"{dest_path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, dest_path)
+    return data
+
+
+class ThumbnailCache:
+    """
+    용량 상한이 있는 썸네일 디스크 캐시.
+    사용 순서는 메모리의 OrderedDict로 추적하며, 서버 재시작 시에는
+    파일 mtime(적중 시 갱신)을 기준으로 순서를 복원한다.
+    """
+
+    def __init__(self, cache_dir, max_bytes=THUMBNAIL_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = None  # key -> (path, size), 오래된 순
+        self._total_bytes = 0
+        self._pending = {}
+
+    def _load_entries(self):
+        """최초 사용 시 캐시 폴더를 스캔하여 LRU 순서를 복원한다."""
+        found = []
+        if os.path.isdir(self.cache_dir):
+            for dirpath, _, filenames in os.walk(self.cache_dir):
+                for name in filenames:
+                    path = os.path.join(dirpath, name)
+                    if name.endswith(".tmp"):
+                        try:
+                            os.remove(path)
+                        except OSError:
+                            pass
+                        continue
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    found.append((st.st_mtime, os.path.splitext(name)[0], path, st.st_size))
+        found.sort()
+        self._entries = OrderedDict((key, (path, size)) for _, key, path, size in found)
+        self._total_bytes = sum(size for _, _, _, size in found)
+
+    def path_for(self, key, fmt):
+        return os.path.join(self.cache_dir, key[:2], key + THUMBNAIL_FORMATS[fmt][1])
+
+    def lookup(self, key):
+        """캐시 적중 시 썸네일 바이트를 반환하고 사용 순서를 갱신한다."""
+        with self._lock:
+            if self._entries is None:
+                self._load_entries()
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+        path = entry[0]
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                if self._entries.pop(key, None):
+                    self._total_bytes -= entry[1]
+            return None
+        return data
+
+    def store(self, key, path, size):
+        """새로 만든 썸네일을 등록하고 용량 상한을 넘으면 오래된 항목부터 삭제한다."""
+        evicted = []
+        with self._lock:
+            if self._entries is None:
+                self._load_entries()
+            previous = self._entries.pop(key, None)
+            if previous:
+                self._total_bytes -= previous[1]
+            self._entries[key] = (path, size)
+            self._total_bytes += size
+
+            while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+                old_key, (old_path, old_size) = self._entries.popitem(last=False)
+                self._total_bytes -= old_size
+                evicted.append(old_path)
+
+        for old_path in evicted:
+            try:
+                os.remove(old_path)
+            except OSError:
+                pass
+
+    def _build(self, src_path, key, size, fmt):
+        """워커 스레드에서 실행: 캐시 확인 후 없으면 썸네일을 생성한다. 썸네일 바이트를 반환."""
+        data = self.lookup(key)
+        count_cache("thumbnail", data is not None)
+        if data is not None:
+            return data
+        path = self.path_for(key, fmt)
+        count_files("decoded")
+        data = render_thumbnail(src_path, path, size, fmt)
+        self.store(key, path, len(data))
+        return data
+
+    async def get(self, src_path, key, size, fmt):
+        """
+        썸네일 바이트를 반환. 없으면 공용 I/O 풀의 "thumbnail" 작업으로 생성한다.
+        (Pillow는 디코딩/리샘플링/인코딩 중 GIL을 해제하므로 스레드로도 여러 코어를 사용한다)
+        같은 썸네일에 대한 동시 요청은 하나의 생성 작업을 공유한다.
+        """
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = asyncio.ensure_future(run_io("thumbnail", self._build, src_path, key, size, fmt))
+            self._pending[key] = pending
+            pending.add_done_callback(lambda _: self._pending.pop(key, None))
+        return await asyncio.shield(pending)
+
+
+_DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "web", "data")
+thumbnail_cache = ThumbnailCache(os.path.join(_DATA_DIR, "thumbnails"))
+
+
+def resolve_thumbnail_source(query):
+    """
+    썸네일 원본 파일 경로를 쿼리 파라미터로부터 결정한다.
+      - filename, subfolder : output 폴더의 이미지 (갤러리)
+      - folder, name, ext   : 모델 파일 옆의 프리뷰 이미지 (체크포인트/로라 카드)
+    보안: output 폴더 밖의 경로나 이미지가 아닌 확장자는 None을 반환한다.
+    """
+    if query.get("folder"):
+        name = query.get("name", "")
+        ext = query.get("ext", "")
+        if not name or ext not in PREVIEW_EXTENSIONS:
+            return None
+        full_path = folder_paths.get_full_path(query["folder"], name)
+        if not full_path:
+            return None
+        return os.path.splitext(full_path)[0] + ext
+
+    filename = query.get("filename", "")
+    subfolder = query.get("subfolder", "")
+    if not filename or not filename.lower().endswith(('.png', '.jpg', '.jpeg', '.webp')):
+        return None
+    output_dir = os.path.abspath(folder_paths.get_output_directory())
+    target_path = os.path.abspath(os.path.join(output_dir, subfolder, filename))
+    if not target_path.startswith(output_dir + os.sep):
+        return None
+    return target_path
+
+
+def setup_thumbnails_api(routes):
+    """썸네일 API 라우트를 등록한다."""
+
+    @routes.get("/assetmanager/api/thumbnail")
+    async def api_get_thumbnail(request):
+        """
+        축소된 썸네일 이미지를 반환.
+        쿼리: 원본 지정 파라미터(resolve_thumbnail_source 참고), size(기본 256), format(webp/jpeg)
+        ETag는 캐시 키(원본 mtime/크기 포함)이므로, 원본이 그대로면
+        썸네일 파일을 열지 않고 304로 응답한다.
+        """
+        fmt = request.query.get("format", "webp").lower()
+        if fmt not in THUMBNAIL_FORMATS:
+            return web.Response(status=400)
+        try:
+            size = snap_size(int(request.query.get("size", 256)))
+        except ValueError:
+            return web.Response(status=400)
+
+        def locate_source():
+            src_path = resolve_thumbnail_source(request.query)
+            if not src_path:
+                return None, None
+            try:
+                return src_path, os.stat(src_path)
+            except OSError:
+                return src_path, None
+
+        src_path, st = await run_io("view", locate_source)
+        if not src_path:
+            return web.Response(status=400)
+        if st is None:
+            return web.Response(status=404)
+
+        key = thumbnail_key(src_path, st, size, fmt)
+        etag = f'"{key}"'
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+        if etag in request.headers.get("If-None-Match", ""):
+            return web.Response(status=304, headers=headers)
+
+        try:
+            data = await thumbnail_cache.get(src_path, key, size, fmt)
+        except Exception as e:
+            print(f"[ComfyUI-AssetManager] 썸네일 생성 실패 ({src_path}): {e}")
+            return web.Response(status=500)
+
+        return web.Response(body=data, content_type=THUMBNAIL_FORMATS[fmt][2], headers=headers)
@@ -1,16 +1,27 @@
 """
 api/tools.py — 도구 API (ZIP 다운로드, 이미지 리사이즈)
-검열 처리 결과의 일괄 ZIP 다운로드와
+검열 처리 결과의 일괄 ZIP 다운로드(스트리밍, zip_stream.py)와
 이미지 리사이즈(비율/최장변/정확한 크기) 및 포맷 변환 기능을 제공합니다.
+여러 이미지의 일괄 리사이즈는 작업 풀에서 병렬로 처리하며 진행 상황을 스트리밍합니다.
 """
 
 import os
-import io
+import json
 import time
-import zipfile
+import shutil
+import asyncio
+import tempfile
 import folder_paths
 from aiohttp import web
 
+from .zip_stream import build_zip_entries, stream_zip
+from .image_ops import resize_image
+from .executors import run_io, run_cpu
+from .metrics import count_files
+
+RESIZED_SUBFOLDER = "AssetManager_Resized"
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
 
 def setup_tools_api(routes):
     """도구 관련 API 라우트를 등록한다."""
@@ -18,33 +29,47 @@ def setup_tools_api(routes):
     @routes.post("/assetmanager/api/download_zip")
     async def api_download_zip(request):
         """
-        지정된 파일명 목록을 output 디렉토리에서 읽어 ZIP으로 압축하여 반환.
-        메모리 내에서 압축을 수행하며, 디렉토리 구조 없이 파일명만 보존한다.
+        지정된 파일명 목록을 output 디렉토리에서 읽어 ZIP으로 압축하며 바로 스트리밍한다.
+        요청 JSON:
+          - filenames    : output 기준 상대 경로 목록
+          - keep_folders : true면 폴더 구조를 유지 (기본: 파일명만)
+          - dedupe_names : 같은 파일명이 겹치면 번호를 붙임 (기본 true, false면 중복 제외)
+          - archive_name : 다운로드 파일명 (기본 censored_images.zip)
+        보안: output 디렉토리 밖의 파일은 제외한다.
         """
         try:
             data = await request.json()
-            filenames = data.get("filenames", [])
-            if not filenames:
-                return web.json_response({"status": "error", "message": "No filenames provided"}, status=400)
-                
-            output_dir = folder_paths.get_output_directory()
-            
-            memory_file = io.BytesIO()
-            with zipfile.ZipFile(memory_file, 'w', zipfile.ZIP_DEFLATED) as zf:
-                for fname in filenames:
-                    file_path = os.path.join(output_dir, fname)
-                    if os.path.exists(file_path):
-                        arcname = os.path.basename(file_path)
-                        zf.write(file_path, arcname)
-                        
-            memory_file.seek(0)
-            return web.Response(
-                body=memory_file.getvalue(),
-                content_type="application/zip",
-                headers={"Content-Disposition": 'attachment; filename="censored_images.zip"'}
-            )
         except Exception as e:
-            return web.json_response({"status": "error", "message": str(e)}, status=500)
+            return web.json_response({"status": "error", "message": str(e)}, status=400)
+
+        filenames = data.get("filenames", [])
+        if not filenames:
+            return web.json_response({"status": "error", "message": "No filenames provided"}, status=400)
+
+        output_dir = os.path.abspath(folder_paths.get_output_directory())
+
+        def collect_files():
+            file_paths = []
+            for fname in filenames:
+                file_path = os.path.abspath(os.path.join(output_dir, fname))
+                if file_path.startswith(output_dir + os.sep) and os.path.isfile(file_path):
+                    file_paths.append(file_path)
+            return file_paths
+
+        file_paths = await run_io("files", collect_files)
+        if not file_paths:
+            return web.json_response({"status": "error", "message": "No files found"}, status=404)
+
+        entries = build_zip_entries(
+            file_paths,
+            keep_folders=bool(data.get("keep_folders", False)),
+            base_dir=output_dir,
+            dedupe_names=bool(data.get("dedupe_names", True))
+        )
+        archive_name = os.path.basename(str(data.get("archive_name") or "censored_images.zip")).replace('"', "")
+        return await stream_zip(request, entries, archive_name)
+
+    resize_options_keys = ("mode", "format", "quality", "val_scale", "val_longest", "val_width", "val_height")
 
     @routes.post("/assetmanager/api/resize")
     async def api_quick_resize(request):
@@ -58,76 +83,23 @@ def setup_tools_api(routes):
         
         결과 파일은 output/AssetManager_Resized/ 폴더에 저장되며,
         ComfyUI /view 엔드포인트를 통해 접근 가능한 URL을 반환한다.
+        변환 작업은 CPU 작업 풀(executors.py)에서 실행된다.
         """
         try:
             data = await request.post()
             img_file = data.get("file")
             if not img_file:
                 return web.json_response({"status": "error", "message": "No file uploaded"}, status=400)
-                
-            mode = data.get("mode", "none")
-            format_type = data.get("format", "webp").lower()
-            quality = int(data.get("quality", 85))
-            
-            from PIL import Image
-            
-            file_content = img_file.file.read()
-            img = Image.open(io.BytesIO(file_content))
-            
-            original_w, original_h = img.size
-            new_w, new_h = original_w, original_h
-            
-            # 리사이즈 모드별 새 크기 계산
-            if mode == "scale":
-                scale_val = float(data.get("val_scale", 50)) / 100.0
-                new_w = int(original_w * scale_val)
-                new_h = int(original_h * scale_val)
-            elif mode == "longest":
-                longest_val = int(data.get("val_longest", 1024))
-                if original_w >= original_h:
-                    new_w = longest_val
-                    new_h = int(original_h * (longest_val / original_w))
-                else:
-                    new_h = longest_val
-                    new_w = int(original_w * (longest_val / original_h))
-            elif mode == "exact":
-                new_w = int(data.get("val_width", 512))
-                new_h = int(data.get("val_height", 512))
-                
-            if (new_w, new_h) != (original_w, original_h) and new_w > 0 and new_h > 0:
-                resample_filter = getattr(Image, 'Resampling', Image).LANCZOS
-                img = img.resize((new_w, new_h), resample_filter)
-                
-            # JPEG는 투명도 미지원이므로 RGBA→RGB 변환 (흰 배경 합성)
-            if format_type == "jpeg" and img.mode in ("RGBA", "P"):
-                background = Image.new("RGB", img.size, (255, 255, 255))
-                if img.mode == "P":
-                    img = img.convert("RGBA")
-                background.paste(img, mask=img.split()[3])
-                img = background
-            elif format_type == "png" and img.mode == "P":
-                img = img.convert("RGBA")
-                
-            output_dir = folder_paths.get_output_directory()
-            resized_dir = os.path.join(output_dir, "AssetManager_Resized")
-            if not os.path.exists(resized_dir):
-                os.makedirs(resized_dir)
-                
-            original_name = img_file.filename
-            name_no_ext = os.path.splitext(original_name)[0]
-            timestamp = int(time.time() * 1000)
-            
-            final_ext = f".{format_type}"
-            final_filename = f"{name_no_ext}_res_{timestamp}{final_ext}"
-            final_path = os.path.join(resized_dir, final_filename)
-            
-            save_kwargs = {}
-            if format_type in ["jpeg", "webp"]:
-                save_kwargs["quality"] = quality
-                
-            img.save(final_path, format=format_type.upper(), **save_kwargs)
-            
-            view_url = f"/view?filename={final_filename}&subfolder=AssetManager_Resized&type=output"
+
+            options = {key: data[key] for key in resize_options_keys if key in data}
+            file_content = await run_io("upload", img_file.file.read)
+            resized_dir = os.path.join(folder_paths.get_output_directory(), RESIZED_SUBFOLDER)
+            name_no_ext = os.path.splitext(img_file.filename)[0]
+            dest_name = f"{name_no_ext}_res_{int(time.time() * 1000)}"
+
+            result = await run_cpu("resize", resize_image, file_content, resized_dir, dest_name, options)
+            final_filename = result["filename"]
+            view_url = f"/view?filename={final_filename}&subfolder={RESIZED_SUBFOLDER}&type=output"
             
             return web.json_response({
                 "status": "success", 
@@ -137,3 +109,120 @@ def setup_tools_api(routes):
             
         except Exception as e:
             return web.json_response({"status": "error", "message": f"Resize Error: {str(e)}"}, status=500)
+
+    @routes.post("/assetmanager/api/resize_batch")
+    async def api_resize_batch(request):
+        """
+        여러 이미지를 CPU 작업 풀에서 병렬로 변환하고, 진행 상황을 NDJSON으로 스트리밍한다.
+
+        요청 형식 (둘 중 하나):
+          - multipart/form-data : 옵션 필드(mode, format, quality, val_*)를 먼저, 이어서 file 필드 여러 개.
+                                  업로드가 끝나기 전에도 도착한 파일부터 변환을 시작한다.
+          - application/json    : {"paths": [output 기준 상대 경로, ...], 옵션...}
+
+        응답 라인:
+          {"type": "progress", "index", "name", "status": "done"|"error", "filename", "url", "message", "completed", "total"}
+          {"type": "summary", "total", "succeeded", "failed", "elapsed"}
+        """
+        output_dir = os.path.abspath(folder_paths.get_output_directory())
+        resized_dir = os.path.join(output_dir, RESIZED_SUBFOLDER)
+        batch_stamp = int(time.time() * 1000)
+        started = time.time()
+        jobs = []  # (index, 원본 이름, future)
+        temp_dir = None
+
+        def submit(src, name, options):
+            # 디코딩은 CPU 풀(프로세스일 수 있음)에서 하므로 요청 쪽에서 센다
+            count_files("decoded")
+            dest_name = f"{os.path.splitext(name)[0]}_res_{batch_stamp}"
+            future = asyncio.ensure_future(run_cpu("resize", resize_image, src, resized_dir, dest_name, dict(options)))
+            jobs.append((len(jobs), name, future))
+
+        try:
+            if request.content_type == "application/json":
+                data = await request.json()
+                options = {key: data[key] for key in resize_options_keys if key in data}
+                for rel_path in data.get("paths", []):
+                    src = os.path.abspath(os.path.join(output_dir, rel_path))
+                    if not src.startswith(output_dir + os.sep):
+                        continue
+                    submit(src, os.path.basename(src), options)
+            else:
+                # 업로드 파일은 임시 폴더에 청크 단위로 기록한 뒤 경로만 워커에 넘긴다 (메모리/IPC 절약)
+                options = {}
+                temp_dir = await run_io("upload", tempfile.mkdtemp, prefix="am_resize_")
+                reader = await request.multipart()
+                async for part in reader:
+                    if part.filename is None:
+                        if part.name in resize_options_keys:
+                            options[part.name] = await part.text()
+                        continue
+                    temp_path = os.path.join(temp_dir, f"{len(jobs)}_{os.path.basename(part.filename)}")
+                    f = await run_io("upload", open, temp_path, "wb")
+                    try:
+                        while True:
+                            chunk = await part.read_chunk(UPLOAD_CHUNK_SIZE)
+                            if not chunk:
+                                break
+                            await run_io("upload", f.write, chunk)
+                    finally:
+                        await run_io("upload", f.close)
+                    submit(temp_path, os.path.basename(part.filename), options)
+        except Exception as e:
+            for _, _, future in jobs:
+                future.cancel()
+            if temp_dir:
+                await run_io("upload", shutil.rmtree, temp_dir, ignore_errors=True)
+            return web.json_response({"status": "error", "message": f"Resize Error: {str(e)}"}, status=400)
+
+        if not jobs:
+            if temp_dir:
+                await run_io("upload", shutil.rmtree, temp_dir, ignore_errors=True)
+            return web.json_response({"status": "error", "message": "No images provided"}, status=400)
+
+        response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+        await response.prepare(request)
+
+        async def wait_job(index, name, future):
+            try:
+                return index, name, await future, None
+            except Exception as e:
+                return index, name, None, e
+
+        succeeded = failed = 0
+        try:
+            for next_done in asyncio.as_completed([wait_job(*job) for job in jobs]):
+                index, name, result, error = await next_done
+                line = {"type": "progress", "index": index, "name": name}
+                if error is not None:
+                    failed += 1
+                    line.update(status="error", message=str(error))
+                else:
+                    succeeded += 1
+                    line.update(
+                        status="done",
+                        filename=result["filename"],
+                        url=f"/view?filename={result['filename']}&subfolder={RESIZED_SUBFOLDER}&type=output",
+                        width=result["width"],
+                        height=result["height"]
+                    )
+                line.update(completed=succeeded + failed, total=len(jobs))
+                await response.write((json.dumps(line, ensure_ascii=False) + "\n").encode("utf-8"))
+
+            summary = {
+                "type": "summary",
+                "total": len(jobs),
+                "succeeded": succeeded,
+                "failed": failed,
+                "elapsed": round(time.time() - started, 3)
+            }
+            await response.write((json.dumps(summary) + "\n").encode("utf-8"))
+            await response.write_eof()
+        except (ConnectionResetError, asyncio.CancelledError):
+            for _, _, future in jobs:
+                future.cancel()
+            raise
+        finally:
+            if temp_dir:
+                await run_io("upload", shutil.rmtree, temp_dir, ignore_errors=True)
+        return response
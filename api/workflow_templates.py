@@ -0,0 +1,139 @@
+"""
+api/workflow_templates.py — 워크플로우 템플릿 레지스트리
+web/data/workflow.json("default")과 web/data/workflows/*.json(파일 이름이 템플릿 이름)을 한 번만 읽어
+파싱·색인해 두고, 파일의 수정 시각/크기가 바뀌었을 때만 다시 읽습니다.
+  - 색인   : 노드 제목 → ID (prompt_builder.WorkflowGraph), 설정을 주입하는 노드와 후처리 단계 목록
+  - 응답   : GET /workflow 응답 본문도 미리 만들어 두어 요청마다 JSON을 다시 직렬화하지 않음
+"""
+
+import os
+import re
+import json
+import threading
+
+from .prompt_builder import compile_workflow, DETAILER_DEFAULTS
+from .metrics import count_cache
+
+DEFAULT_TEMPLATE = "default"
+TEMPLATE_DIR_NAME = "workflows"
+_TEMPLATE_NAME = re.compile(r"^[\w.\-]+$")
+
+# 설정 키 → 값을 주입하는 노드 제목 (prompt_builder.build_prompt 기준)
+INJECTION_POINTS = {
+    "checkpoint": "[Main] ckpt loader",
+    "prompt": "[Main] Text Prompt",
+    "seed": "[Main] KSampler",
+    "loras": "[Main] Lora Loader",
+    "steps": "[Main] Step",
+    "cfg": "[Main] CFG",
+    "sampler": "[Main] Sampler, Scheduler",
+    "dimensions": "[Main] Latent Image",
+    "save": "[Main] Image Save",
+    "source": "[Main] VAE decode",
+}
+# 템플릿에 이 노드가 없으면 /prompt를 만들 수 없다
+REQUIRED_POINTS = ("prompt", "seed", "save", "source")
+
+
+class WorkflowTemplate:
+    """파싱·색인이 끝난 템플릿 하나. graph는 읽기 전용으로 다루고 조립은 사본(clone_workflow)에서 한다."""
+
+    def __init__(self, name, path, stamp, workflow):
+        self.name = name
+        self.path = path
+        self.stamp = stamp
+        self.graph = compile_workflow(workflow)
+        titles = self.graph.titles
+        self.points = {key: titles.get(title) for key, title in INJECTION_POINTS.items()}
+        self.stages = {
+            "upscale": "[Upscaler] Image Upscale" in titles,
+            "detailer": [key for key, prefix, _ in DETAILER_DEFAULTS if f"[Detailer] {prefix} Detailer" in titles],
+            "censor": "[Censor] SEGS Extractor" in titles,
+        }
+        self.missing = [key for key in REQUIRED_POINTS if not self.points[key]]
+        self.response_body = json.dumps({"status": "success", "workflow": workflow}, ensure_ascii=False).encode("utf-8")
+
+    def summary(self):
+        return {
+            "name": self.name,
+            "nodes": len(self.graph),
+            "points": self.points,
+            "stages": self.stages,
+            "missing": self.missing,
+        }
+
+
+class TemplateRegistry:
+    """
+    이름 → WorkflowTemplate 캐시. get()은 파일 stat만 확인하고, 바뀐 경우에만 다시 파싱한다.
+    파일 I/O를 하므로 이벤트 루프에서는 run_io("workflow", ...)로 호출한다.
+    """
+
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+        self.template_dir = os.path.join(data_dir, TEMPLATE_DIR_NAME)
+        self._templates = {}
+        self._lock = threading.Lock()
+
+    def _path(self, name):
+        if name == DEFAULT_TEMPLATE:
+            return os.path.join(self.data_dir, "workflow.json")
+        if not _TEMPLATE_NAME.match(name or ""):
+            return None
+        return os.path.join(self.template_dir, name + ".json")
+
+    def names(self):
+        names = [DEFAULT_TEMPLATE] if os.path.exists(self._path(DEFAULT_TEMPLATE)) else []
+        try:
+            entries = sorted(os.listdir(self.template_dir))
+        except FileNotFoundError:
+            entries = []
+        for entry in entries:
+            stem, ext = os.path.splitext(entry)
+            if ext.lower() == ".json" and stem != DEFAULT_TEMPLATE and _TEMPLATE_NAME.match(stem):
+                names.append(stem)
+        return names
+
+    def get(self, name=DEFAULT_TEMPLATE):
+        """템플릿을 반환한다. 없으면 None, JSON이 깨졌으면 ValueError."""
+        path = self._path(name or DEFAULT_TEMPLATE)
+        if path is None:
+            return None
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            with self._lock:
+                self._templates.pop(name, None)
+            return None
+        stamp = (st.st_mtime_ns, st.st_size)
+
+        with self._lock:
+            cached = self._templates.get(name)
+            if cached is not None and cached.stamp == stamp:
+                count_cache("workflow_template", True)
+                return cached
+            count_cache("workflow_template", False)
+            with open(path, "r", encoding="utf-8") as f:
+                workflow = json.load(f)
+            if not isinstance(workflow, dict):
+                raise ValueError(f"워크플로우 템플릿 형식이 올바르지 않습니다: {name}")
+            template = WorkflowTemplate(name, path, stamp, workflow)
+            if template.missing:
+                print(f"[ComfyUI-AssetManager] 워크플로우 템플릿 '{name}'에 필요한 노드가 없습니다: {', '.join(template.missing)}")
+            self._templates[name] = template
+            if cached is not None:
+                print(f"[ComfyUI-AssetManager] 워크플로우 템플릿 다시 읽음: {name}")
+            return template
+
+    def list(self):
+        """모든 템플릿 요약 (읽을 수 없는 템플릿은 error와 함께 표시)."""
+        result = []
+        for name in self.names():
+            try:
+                template = self.get(name)
+            except (OSError, ValueError) as e:
+                result.append({"name": name, "error": str(e)})
+                continue
+            if template is not None:
+                result.append(template.summary())
+        return result
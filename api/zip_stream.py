@@ -0,0 +1,142 @@
+"""
+api/zip_stream.py — 스트리밍 ZIP 응답
+압축 파일 전체를 메모리에 만들지 않고, 워커 스레드에서 zipfile이 기록하는 청크를
+aiohttp StreamResponse로 바로 전송합니다. 클라이언트가 느리면 큐가 차서 압축 스레드가
+대기하므로(역압) 메모리 사용량은 큐 크기 정도로 유지됩니다.
+"""
+
+import os
+import asyncio
+import zipfile
+import concurrent.futures
+from aiohttp import web
+
+from .executors import run_io
+
+# 이미 압축된 포맷은 deflate 없이 저장한다 (CPU만 쓰고 크기는 거의 줄지 않음)
+STORED_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp', '.gif', '.zip')
+CHUNK_SIZE = 256 * 1024
+QUEUE_CHUNKS = 16
+
+
+class _StreamAborted(Exception):
+    """클라이언트 연결이 끊겨 압축을 중단할 때 사용"""
+
+
+class _QueueWriter:
+    """
+    zipfile이 쓰는 바이트를 CHUNK_SIZE 단위로 모아 asyncio 큐에 넣는 쓰기 전용 파일 객체.
+    tell/seek을 지원하지 않으므로 zipfile은 데이터 디스크립터 방식으로 기록한다.
+    """
+
+    def __init__(self, loop, queue):
+        self._loop = loop
+        self._queue = queue
+        self._buffer = bytearray()
+        self.aborted = False
+
+    def write(self, data):
+        self._buffer += data
+        if len(self._buffer) >= CHUNK_SIZE:
+            self._put(bytes(self._buffer))
+            self._buffer.clear()
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        if self._buffer:
+            self._put(bytes(self._buffer))
+            self._buffer.clear()
+
+    def _put(self, chunk):
+        future = asyncio.run_coroutine_threadsafe(self._queue.put(chunk), self._loop)
+        while True:
+            try:
+                future.result(timeout=1.0)
+                return
+            except concurrent.futures.TimeoutError:
+                if self.aborted:
+                    future.cancel()
+                    raise _StreamAborted()
+
+
+def build_zip_entries(file_paths, keep_folders=False, base_dir=None, dedupe_names=True):
+    """
+    (파일 경로, ZIP 내부 이름) 목록을 만든다.
+      - keep_folders : base_dir 기준 상대 경로를 유지 (False면 파일명만)
+      - dedupe_names : 같은 이름이 겹치면 "name (1).png" 형태로 바꾼다 (False면 나중 것을 건너뜀)
+    """
+    entries = []
+    used = set()
+    for path in file_paths:
+        if keep_folders and base_dir:
+            arcname = os.path.relpath(path, base_dir).replace(os.sep, "/")
+        else:
+            arcname = os.path.basename(path)
+
+        if arcname.lower() in used:
+            if not dedupe_names:
+                continue
+            stem, ext = os.path.splitext(arcname)
+            n = 1
+            while f"{stem} ({n}){ext}".lower() in used:
+                n += 1
+            arcname = f"{stem} ({n}){ext}"
+        used.add(arcname.lower())
+        entries.append((path, arcname))
+    return entries
+
+
+def _write_zip(writer, entries):
+    """워커 스레드에서 실행: 항목을 순서대로 읽어 ZIP 스트림으로 기록한다."""
+    with zipfile.ZipFile(writer, "w", zipfile.ZIP_DEFLATED, allowZip64=True) as zf:
+        for path, arcname in entries:
+            compress_type = zipfile.ZIP_STORED if path.lower().endswith(STORED_EXTENSIONS) else zipfile.ZIP_DEFLATED
+            try:
+                zf.write(path, arcname, compress_type=compress_type)
+            except OSError as e:
+                print(f"[ComfyUI-AssetManager] ZIP 항목 추가 실패 ({path}): {e}")
+    writer.close()
+
+
+async def stream_zip(request, entries, archive_name):
+    """
+    entries([(파일 경로, ZIP 내부 이름)])를 압축하며 바로 전송하는 StreamResponse를 반환한다.
+    압축은 공용 I/O 풀의 "zip" 작업으로 수행한다 (동시 압축 수 제한).
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize=QUEUE_CHUNKS)
+    writer = _QueueWriter(loop, queue)
+
+    response = web.StreamResponse(headers={
+        "Content-Type": "application/zip",
+        "Content-Disposition": f'attachment; filename="{archive_name}"'
+    })
+    await response.prepare(request)
+
+    def on_producer_done(future):
+        # 압축 스레드 종료(정상/중단)를 소비 루프에 알린다. 큐가 가득 차 있을 수 있으므로 태스크로 넣는다.
+        if not future.cancelled():
+            future.exception()
+        loop.create_task(queue.put(None))
+
+    producer = asyncio.ensure_future(run_io("zip", _write_zip, writer, entries))
+    producer.add_done_callback(on_producer_done)
+
+    try:
+        while True:
+            chunk = await queue.get()
+            if chunk is None:
+                break
+            await response.write(chunk)
+        await producer
+        await response.write_eof()
+    except (ConnectionResetError, asyncio.CancelledError, _StreamAborted):
+        writer.aborted = True
+        raise
+    except Exception as e:
+        writer.aborted = True
+        print(f"[ComfyUI-AssetManager] ZIP 스트리밍 실패: {e}")
+    return response
@@ -0,0 +1,7 @@
+"""
+bench — ComfyUI-AssetManager API 벤치마크
+합성 ComfyUI 트리(output PNG + 모델 폴더)와 folder_paths / server 대역 모듈로
+api/* 핸들러를 aiohttp 테스트 클라이언트에서 호출하여 처리량, p50/p99 지연, 최대 RSS를 잽니다.
+ComfyUI는 확장의 __init__.py만 불러오므로 이 패키지는 서버에 로드되지 않습니다.
+사용법은 __main__.py를 참고하세요.
+"""
@@ -0,0 +1,124 @@
+"""
+bench/__main__.py — 벤치마크 명령줄
+저장소 루트에서 실행합니다.
+  python -m bench run --scale 1k 100k [--output result.json] [--baseline bench/baseline.json]
+  python -m bench compare result.json bench/baseline.json
+스케일마다 별도 프로세스에서 실행하므로 최대 RSS는 스케일별 값입니다.
+기준선과 비교해 회귀가 있으면 종료 코드 1을 반환합니다.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+
+from .synthetic import SCALES
+from .compare import compare, format_rows, DEFAULT_THRESHOLD, DEFAULT_MIN_DELTA_MS
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_WORKDIR = os.path.join(tempfile.gettempdir(), "assetmanager-bench")
+
+
+def _print_scale(name, result):
+    tree = result["tree"]
+    print(f"\n== {name}: {result['files']} files, {result['models']} models "
+          f"(tree {'reused' if tree['reused'] else 'built'} {tree['seconds']}s, {tree['bytes'] / 1e6:.0f}MB), "
+          f"peak RSS {result['peak_rss_mb']}MB")
+    print(f"{'scenario':<22} {'n':>5} {'p50 ms':>10} {'p99 ms':>10} {'req/s':>9} {'items/s':>11} {'RSS MB':>8}")
+    for scenario, r in result["scenarios"].items():
+        print(f"{scenario:<22} {r['requests']:>5} {r['p50_ms']:>10.2f} {r['p99_ms']:>10.2f} "
+              f"{r['throughput_rps']:>9.1f} {r['items_per_sec']:>11.1f} {r['peak_rss_mb'] or '-':>8}")
+
+
+def _run_worker(args):
+    from .runner import run_scale
+
+    result = run_scale(args.scale[0], args.workdir, args.repeat, progress=lambda msg: print(msg, flush=True))
+    with open(args.result_file, "w", encoding="utf-8") as f:
+        json.dump(result, f)
+    return 0
+
+
+def _run(args):
+    from .runner import machine_info
+
+    report = {"version": 1, "created": time.strftime("%Y-%m-%dT%H:%M:%S"), "machine": machine_info(),
+              "repeat": args.repeat, "scales": {}}
+    for name in args.scale:
+        fd, result_file = tempfile.mkstemp(suffix=".json", prefix=f"bench-{name}-")
+        os.close(fd)
+        try:
+            cmd = [sys.executable, "-m", "bench", "run", "--worker", "--scale", name, "--workdir", args.workdir,
+                   "--repeat", str(args.repeat), "--result-file", result_file]
+            if subprocess.call(cmd, cwd=REPO_ROOT) != 0:
+                print(f"[bench] {name} 실행 실패", file=sys.stderr)
+                return 2
+            with open(result_file, "r", encoding="utf-8") as f:
+                report["scales"][name] = json.load(f)
+        finally:
+            os.remove(result_file)
+        _print_scale(name, report["scales"][name])
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n[bench] 결과 저장: {args.output}")
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        return _report_comparison(report, baseline, args.threshold, args.min_delta_ms)
+    return 0
+
+
+def _report_comparison(report, baseline, threshold, min_delta_ms):
+    rows, regressions = compare(report, baseline, threshold, min_delta_ms)
+    print(f"\n기준선 대비 (현재 / 기준선, 회귀 기준 {threshold}x)")
+    print(format_rows(rows))
+    if regressions:
+        print(f"\n[bench] 회귀 {len(regressions)}건", file=sys.stderr)
+        return 1
+    return 0
+
+
+def _compare(args):
+    with open(args.result, "r", encoding="utf-8") as f:
+        report = json.load(f)
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    return _report_comparison(report, baseline, args.threshold, args.min_delta_ms)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench", description="ComfyUI-AssetManager API 벤치마크")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="합성 트리로 벤치마크 실행")
+    run.add_argument("--scale", nargs="+", choices=list(SCALES), default=["1k"])
+    run.add_argument("--workdir", default=DEFAULT_WORKDIR, help="합성 트리와 확장 사본을 둘 디렉토리 (재실행 시 트리 재사용)")
+    run.add_argument("--repeat", type=float, default=1.0, help="시나리오 반복 횟수 배율")
+    run.add_argument("--output", help="결과 JSON 경로")
+    run.add_argument("--baseline", help="비교할 기준선 JSON")
+    run.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    run.add_argument("--result-file", help=argparse.SUPPRESS)
+
+    cmp = sub.add_parser("compare", help="결과 JSON을 기준선과 비교")
+    cmp.add_argument("result")
+    cmp.add_argument("baseline")
+
+    for p in (run, cmp):
+        p.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="회귀로 볼 지연 배율")
+        p.add_argument("--min-delta-ms", type=float, default=DEFAULT_MIN_DELTA_MS, help="무시할 지연 차이 (ms)")
+
+    args = parser.parse_args(argv)
+    if args.command == "compare":
+        return _compare(args)
+    if args.worker:
+        return _run_worker(args)
+    return _run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
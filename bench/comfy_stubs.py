@@ -0,0 +1,116 @@
+"""
+bench/comfy_stubs.py — 벤치마크용 ComfyUI 대역 모듈
+확장이 import하는 folder_paths / server 모듈을 합성 트리 기준으로 만들어 sys.modules에 넣습니다.
+ComfyUI 없이 api/* 핸들러를 그대로 실행하기 위한 것으로, 확장이 실제로 사용하는 부분만 흉내 냅니다.
+  - folder_paths : output/input 디렉토리, 모델 폴더 목록과 get_filename_list (디렉토리 mtime 기반 캐시, ComfyUI와 같은 방식)
+  - server       : PromptServer.instance (routes, app, send_sync — 보낸 이벤트 수만 센다)
+"""
+
+import os
+import sys
+import types
+from aiohttp import web
+
+# ComfyUI folder_paths.supported_pt_extensions
+SUPPORTED_PT_EXTENSIONS = {".ckpt", ".pt", ".pt2", ".bin", ".pth", ".safetensors", ".pkl", ".sft"}
+
+MODEL_FOLDERS = ("checkpoints", "loras", "upscale_models", "ultralytics", "sams")
+
+
+def make_folder_paths(base_dir):
+    """base_dir/{output,input,models}을 가리키는 folder_paths 모듈"""
+    module = types.ModuleType("folder_paths")
+    module.base_path = base_dir
+    module.output_directory = os.path.join(base_dir, "output")
+    module.input_directory = os.path.join(base_dir, "input")
+    module.models_dir = os.path.join(base_dir, "models")
+    module.supported_pt_extensions = SUPPORTED_PT_EXTENSIONS
+    module.folder_names_and_paths = {
+        name: ([os.path.join(module.models_dir, name)], SUPPORTED_PT_EXTENSIONS) for name in MODEL_FOLDERS
+    }
+    filename_list_cache = {}
+
+    def get_output_directory():
+        return module.output_directory
+
+    def get_input_directory():
+        return module.input_directory
+
+    def get_folder_paths(folder_name):
+        return module.folder_names_and_paths[folder_name][0][:]
+
+    def _walk(base, extensions):
+        files, dirs = [], {}
+        for dirpath, _, filenames in os.walk(base, followlinks=True):
+            dirs[dirpath] = os.path.getmtime(dirpath)
+            for filename in filenames:
+                if not extensions or os.path.splitext(filename)[1].lower() in extensions:
+                    files.append(os.path.relpath(os.path.join(dirpath, filename), base).replace("\\", "/"))
+        return files, dirs
+
+    def get_filename_list(folder_name):
+        cached = filename_list_cache.get(folder_name)
+        if cached is not None:
+            result, dirs = cached
+            try:
+                if all(os.path.getmtime(d) == mtime for d, mtime in dirs.items()):
+                    return result
+            except OSError:
+                pass
+        bases, extensions = module.folder_names_and_paths[folder_name]
+        result, dirs = set(), {}
+        for base in bases:
+            files, walked = _walk(base, extensions)
+            result.update(files)
+            dirs.update(walked)
+        result = sorted(result)
+        filename_list_cache[folder_name] = (result, dirs)
+        return result
+
+    def get_full_path(folder_name, filename):
+        if folder_name not in module.folder_names_and_paths:
+            return None
+        for base in module.folder_names_and_paths[folder_name][0]:
+            full_path = os.path.join(base, filename)
+            if os.path.isfile(full_path):
+                return full_path
+        return None
+
+    module.get_output_directory = get_output_directory
+    module.get_input_directory = get_input_directory
+    module.get_folder_paths = get_folder_paths
+    module.get_filename_list = get_filename_list
+    module.get_full_path = get_full_path
+    return module
+
+
+class _PromptServer:
+    """PromptServer.instance 대역. 웹소켓 이벤트는 종류별 개수만 센다."""
+
+    instance = None
+
+    def __init__(self):
+        self.routes = web.RouteTableDef()
+        self.app = web.Application(client_max_size=1024 ** 3)
+        self.address = "127.0.0.1"
+        self.port = 8188
+        self.loop = None
+        self.client_id = None
+        self.sent = {}
+
+    def send_sync(self, event, data, sid=None):
+        self.sent[event] = self.sent.get(event, 0) + 1
+
+
+def make_server_module():
+    module = types.ModuleType("server")
+    _PromptServer.instance = _PromptServer()
+    module.PromptServer = _PromptServer
+    return module
+
+
+def install(base_dir):
+    """대역 모듈을 sys.modules에 등록하고 PromptServer.instance를 반환한다."""
+    sys.modules["folder_paths"] = make_folder_paths(base_dir)
+    sys.modules["server"] = make_server_module()
+    return _PromptServer.instance
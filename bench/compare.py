@@ -0,0 +1,62 @@
+"""
+bench/compare.py — 벤치마크 결과와 기준선(JSON) 비교
+스케일/시나리오가 양쪽에 모두 있는 항목만 비교합니다.
+  - p50/p99 지연이 기준선의 threshold배를 넘거나, 항목 처리량이 1/threshold배 아래로 떨어지면 회귀
+  - 지연 차이가 min_delta_ms보다 작으면 (1ms 안팎의 잡음) 배율과 관계없이 회귀로 보지 않는다
+"""
+
+DEFAULT_THRESHOLD = 1.3
+DEFAULT_MIN_DELTA_MS = 1.0
+
+
+def _ratio(current, baseline):
+    if current is None or not baseline:
+        return None
+    return current / baseline
+
+
+def compare(current, baseline, threshold=DEFAULT_THRESHOLD, min_delta_ms=DEFAULT_MIN_DELTA_MS):
+    """
+    반환값: (rows, regressions)
+    rows: [{scale, scenario, p50_ratio, p99_ratio, throughput_ratio, regressed: [지표 이름]}]
+    """
+    rows, regressions = [], []
+    for scale_name, scale in current.get("scales", {}).items():
+        base_scale = baseline.get("scales", {}).get(scale_name)
+        if not base_scale:
+            continue
+        for name, result in scale["scenarios"].items():
+            base = base_scale["scenarios"].get(name)
+            if not base:
+                continue
+            row = {
+                "scale": scale_name,
+                "scenario": name,
+                "p50_ratio": _ratio(result["p50_ms"], base["p50_ms"]),
+                "p99_ratio": _ratio(result["p99_ms"], base["p99_ms"]),
+                "throughput_ratio": _ratio(result["items_per_sec"], base["items_per_sec"]),
+                "regressed": [],
+            }
+            for key in ("p50", "p99"):
+                ratio = row[f"{key}_ratio"]
+                if ratio and ratio > threshold and result[f"{key}_ms"] - base[f"{key}_ms"] >= min_delta_ms:
+                    row["regressed"].append(key)
+            if row["throughput_ratio"] and row["throughput_ratio"] < 1 / threshold \
+                    and result["p50_ms"] - base["p50_ms"] >= min_delta_ms:
+                row["regressed"].append("throughput")
+            rows.append(row)
+            if row["regressed"]:
+                regressions.append(row)
+    return rows, regressions
+
+
+def format_rows(rows):
+    def fmt(ratio):
+        return f"{ratio:6.2f}x" if ratio is not None else "     -"
+
+    lines = [f"{'scale':<6} {'scenario':<22} {'p50':>7} {'p99':>7} {'items/s':>7}  "]
+    for row in rows:
+        flag = "  REGRESSION: " + ", ".join(row["regressed"]) if row["regressed"] else ""
+        lines.append(f"{row['scale']:<6} {row['scenario']:<22} {fmt(row['p50_ratio'])} {fmt(row['p99_ratio'])} "
+                     f"{fmt(row['throughput_ratio'])}{flag}")
+    return "\n".join(lines)
@@ -0,0 +1,334 @@
+"""
+bench/runner.py — 한 스케일의 벤치마크 실행
+합성 트리(synthetic.py)와 대역 모듈(comfy_stubs.py)로 확장 사본을 띄우고,
+aiohttp 테스트 클라이언트로 실제 API 핸들러를 호출하며 시나리오별 지연 시간을 잽니다.
+확장은 web/data 아래에 인덱스 DB와 썸네일을 만들므로 저장소가 아니라 작업 디렉토리의 사본을 불러옵니다.
+결과: 시나리오별 요청 수, p50/p99/평균/최대 지연(ms), 초당 요청·항목 처리량, 그 시점까지의 최대 RSS(MB)
+"""
+
+import os
+import sys
+import time
+import json
+import random
+import shutil
+import asyncio
+import platform
+import importlib.util
+
+from . import comfy_stubs
+from .synthetic import SCALES, BASE_TIME, build_tree, folder_names, checkpoint_names, lora_names
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE_NAME = "AssetManagerBench"
+# 사본에 가져가지 않는 런타임 데이터 (언제나 빈 인덱스/캐시에서 시작한다)
+_RUNTIME_DATA = ("__pycache__", "*.db", "*.db-wal", "*.db-shm", "thumbnails", "logs", "*.journal", "*.tmp",
+                 "batch_jobs.json", "app_state.json")
+RESIZED_SUBFOLDER = "AssetManager_Resized"
+
+
+def peak_rss_mb():
+    """이 프로세스의 최대 RSS (MB). 측정할 수 없는 플랫폼이면 None"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux는 KB, macOS는 바이트 단위
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def percentile(sorted_values, pct):
+    """최근접 순위 백분위수"""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def machine_info():
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def prepare_package(run_dir):
+    """확장 코드(__init__.py, api/, web/)를 run_dir에 복사한다."""
+    target = os.path.join(run_dir, "ComfyUI-AssetManager")
+    if os.path.isdir(target):
+        shutil.rmtree(target)
+    os.makedirs(target)
+    shutil.copy2(os.path.join(PACKAGE_ROOT, "__init__.py"), target)
+    ignore = shutil.ignore_patterns(*_RUNTIME_DATA)
+    for sub in ("api", "web"):
+        shutil.copytree(os.path.join(PACKAGE_ROOT, sub), os.path.join(target, sub), ignore=ignore)
+    return target
+
+
+def load_package(package_dir):
+    """확장 사본을 import하고 라우트가 등록된 aiohttp 앱을 반환한다 (대역 모듈이 먼저 설치되어 있어야 한다)."""
+    spec = importlib.util.spec_from_file_location(
+        PACKAGE_NAME, os.path.join(package_dir, "__init__.py"), submodule_search_locations=[package_dir])
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[PACKAGE_NAME] = module
+    spec.loader.exec_module(module)
+    server = sys.modules["server"].PromptServer.instance
+    server.app.add_routes(server.routes)
+    return server.app
+
+
+def _api(name):
+    return sys.modules[f"{PACKAGE_NAME}.api.{name}"]
+
+
+class ScaleBench:
+    """한 스케일의 시나리오 모음. 시나리오는 순서대로 실행되며 앞 시나리오가 만든 캐시/인덱스를 이어서 쓴다."""
+
+    def __init__(self, client, scale, tree_dir, repeat=1.0):
+        self.client = client
+        self.scale = scale
+        self.tree_dir = tree_dir
+        self.repeat = repeat
+        self.results = {}
+        rng = random.Random(scale.seed)
+        images = [(folder, f"ComfyUI_{n + 1:05d}_.png")
+                  for folder in folder_names(scale) for n in range(scale.images_per_folder)]
+        self.samples = rng.sample(images, min(len(images), 2000))
+        models = [("checkpoints", name) for i, name in enumerate(checkpoint_names(scale)) if i % 5]
+        models += [("loras", name) for i, name in enumerate(lora_names(scale)) if i % 5]
+        self.model_samples = rng.sample(models, min(len(models), 500))
+        self.tags = ("masterpiece", "cinematic", "castle", "watercolor", "neon lights", "portrait forest")
+
+    def count(self, base, heavy=False):
+        """반복 횟수. 전체 목록처럼 파일 수에 비례하는 시나리오는 큰 스케일에서 줄인다."""
+        if heavy:
+            base = base if self.scale.files <= 10000 else max(1, base // 3 if self.scale.files <= 200000 else 1)
+        return max(1, int(base * self.repeat))
+
+    async def timed(self, name, count, request, items=1):
+        """request(i)를 count번 순서대로 실행하며 잰다. request는 처리한 항목 수(없으면 items)를 반환한다."""
+        latencies = []
+        total_items = 0
+        started = time.perf_counter()
+        for i in range(count):
+            t0 = time.perf_counter()
+            handled = await request(i)
+            latencies.append(time.perf_counter() - t0)
+            total_items += handled if handled is not None else items
+        elapsed = time.perf_counter() - started
+        latencies.sort()
+        self.results[name] = {
+            "requests": count,
+            "items": total_items,
+            "seconds": round(elapsed, 4),
+            "throughput_rps": round(count / elapsed, 2) if elapsed else None,
+            "items_per_sec": round(total_items / elapsed, 1) if elapsed else None,
+            "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+            "mean_ms": round(sum(latencies) / count * 1000, 3),
+            "max_ms": round(latencies[-1] * 1000, 3),
+            "peak_rss_mb": peak_rss_mb(),
+        }
+        return self.results[name]
+
+    async def get_json(self, path, **params):
+        async with self.client.get(path, params=params) as resp:
+            if resp.status != 200:
+                raise RuntimeError(f"GET {path} → {resp.status}: {(await resp.text())[:200]}")
+            return await resp.json()
+
+    async def post_json(self, path, payload):
+        async with self.client.post(path, json=payload) as resp:
+            if resp.status != 200:
+                raise RuntimeError(f"POST {path} → {resp.status}: {(await resp.text())[:200]}")
+            return await resp.read()
+
+    # ── 갤러리 ──────────────────────────────────
+
+    async def gallery(self):
+        files = self.scale.files
+
+        async def folders(_):
+            data = await self.get_json("/assetmanager/api/gallery/folders")
+            if data["total"] != files:
+                raise RuntimeError(f"gallery total {data['total']} != {files}")
+
+        await self.timed("gallery_scan_cold", 1, folders, items=files)
+
+        # 콜드 스캔 직후 백그라운드 메타데이터 인덱싱이 끝날 때까지 (검색 시나리오의 전제)
+        indexer = _api("metadata_index").metadata_indexer
+        poll = max(0.05, files / 1e6)
+
+        async def index_all(_):
+            indexer.notify()
+            while await asyncio.to_thread(lambda: indexer.get_index().pending_count()):
+                await asyncio.sleep(poll)
+
+        await self.timed("metadata_index", 1, index_all, items=files)
+        await self.timed("gallery_folders_warm", self.count(20), folders, items=files)
+
+        async def full(_):
+            data = await self.get_json("/assetmanager/api/gallery")
+            return sum(len(folder["filenames"]) for folder in data["gallery"])
+
+        await self.timed("gallery_full", self.count(5, heavy=True), full)
+
+        cursor = {"next": None}
+
+        async def page(_):
+            params = {"limit": 100, "order": "newest"}
+            if cursor["next"]:
+                params["cursor"] = cursor["next"]
+            data = await self.get_json("/assetmanager/api/gallery/images", **params)
+            cursor["next"] = data["next_cursor"]
+            return len(data["images"])
+
+        await self.timed("gallery_pages", self.count(50), page)
+
+        checkpoints = checkpoint_names(self.scale)
+
+        async def search(i):
+            params = {"q": self.tags[i % len(self.tags)], "limit": 100}
+            if i % 2:
+                params["checkpoint"] = checkpoints[i % len(checkpoints)]
+            data = await self.get_json("/assetmanager/api/gallery/search", **params)
+            return len(data["images"])
+
+        await self.timed("gallery_search", self.count(30), search)
+
+    # ── 메타데이터 ─────────────────────────────
+
+    async def metadata(self):
+        async def single(i):
+            folder, filename = self.samples[i % len(self.samples)]
+            data = await self.get_json("/assetmanager/api/image_metadata", filename=filename, subfolder=folder)
+            if not data.get("prompt"):
+                raise RuntimeError(f"no prompt in {folder}/{filename}")
+
+        await self.timed("image_metadata", self.count(200), single)
+
+        batch_size = min(500, len(self.samples))
+
+        async def batch(i):
+            start = i * 97 % max(1, len(self.samples) - batch_size + 1)
+            images = [{"filename": f, "subfolder": d} for d, f in self.samples[start:start + batch_size]]
+            await self.post_json("/assetmanager/api/image_metadata/batch", {"images": images, "fields": ["prompt"]})
+
+        await self.timed("image_metadata_batch", self.count(10), batch, items=batch_size)
+
+    # ── 모델 ───────────────────────────────────
+
+    async def models(self):
+        model_count = self.scale.checkpoints + self.scale.loras
+
+        async def catalog(_):
+            data = await self.get_json("/assetmanager/api/model_catalog")
+            return len(data["checkpoints"]) + len(data["loras"])
+
+        await self.timed("model_catalog_cold", 1, catalog, items=model_count)
+        await self.timed("model_catalog_warm", self.count(20), catalog, items=model_count)
+
+        async def info(i):
+            folder, name = self.model_samples[i % len(self.model_samples)]
+            data = await self.get_json("/assetmanager/api/model_info", type=folder, name=name)
+            if data.get("status") != "success":
+                raise RuntimeError(f"model_info {folder}/{name}: {data}")
+
+        await self.timed("model_info", self.count(100), info)
+
+    # ── 썸네일 / ZIP / 리사이즈 ────────────────
+
+    async def files(self):
+        thumbs = self.samples[:self.count(50)]
+
+        async def thumbnail(i):
+            folder, filename = thumbs[i]
+            async with self.client.get("/assetmanager/api/thumbnail", params={
+                    "filename": filename, "subfolder": folder, "type": "output", "size": 256}) as resp:
+                if resp.status != 200:
+                    raise RuntimeError(f"thumbnail {folder}/{filename} → {resp.status}")
+                await resp.read()
+
+        await self.timed("thumbnail_cold", len(thumbs), thumbnail)
+        await self.timed("thumbnail_cached", len(thumbs), thumbnail)
+
+        zip_size = min(200, len(self.samples))
+        paths = [f"{d}/{f}" if d else f for d, f in self.samples]
+
+        async def download(i):
+            start = i * 31 % max(1, len(paths) - zip_size + 1)
+            await self.post_json("/assetmanager/api/download_zip",
+                                 {"filenames": paths[start:start + zip_size], "keep_folders": True})
+
+        await self.timed("download_zip", self.count(5), download, items=zip_size)
+
+        resize_size = min(50, len(paths))
+
+        async def resize(i):
+            start = i * 53 % max(1, len(paths) - resize_size + 1)
+            body = await self.post_json("/assetmanager/api/resize_batch", {
+                "paths": paths[start:start + resize_size], "mode": "scale", "val_scale": 50, "format": "webp"})
+            summary = json.loads(body.decode("utf-8").strip().splitlines()[-1])
+            if summary.get("failed"):
+                raise RuntimeError(f"resize_batch failed: {summary}")
+            return summary["succeeded"]
+
+        try:
+            await self.timed("resize_batch", self.count(3), resize)
+        finally:
+            # 합성 트리는 다음 실행에서도 재사용하므로 결과물을 지우고 루트 mtime을 되돌린다
+            output_dir = os.path.join(self.tree_dir, "output")
+            shutil.rmtree(os.path.join(output_dir, RESIZED_SUBFOLDER), ignore_errors=True)
+            os.utime(output_dir, (BASE_TIME, BASE_TIME))
+
+    async def run(self):
+        for group in (self.gallery, self.metadata, self.models, self.files):
+            await group()
+        return self.results
+
+
+async def _run_scenarios(app, scale, tree_dir, repeat):
+    from aiohttp.test_utils import TestClient, TestServer
+
+    async with TestClient(TestServer(app)) as client:
+        # API 모듈은 서버 시작 후 지연 로딩되므로 측정 전에 불러오고,
+        # 폴링 감시자가 측정 중에 인덱스를 갱신하지 않도록 멈춘다 (갱신은 요청 경로에서만)
+        await _api("startup").lazy_api.load()
+        _api("gallery_watcher").gallery_watcher.stop()
+        return await ScaleBench(client, scale, tree_dir, repeat).run()
+
+
+def run_scale(scale_name, workdir, repeat=1.0, progress=print):
+    """
+    스케일 하나를 이 프로세스에서 실행한다 (확장 모듈과 작업 풀이 전역이므로 스케일마다 새 프로세스에서 부른다).
+    workdir/<스케일>/ 아래 합성 트리는 재사용하고, workdir/<스케일>/run/의 확장 사본은 매번 새로 만든다.
+    """
+    scale = SCALES[scale_name]
+    scale_dir = os.path.join(workdir, scale_name)
+    tree_dir = os.path.join(scale_dir, "tree")
+    os.makedirs(tree_dir, exist_ok=True)
+    progress(f"[bench] {scale_name}: 합성 트리 준비 ({scale.files} files) — {tree_dir}")
+    tree = build_tree(tree_dir, scale, progress=lambda msg: progress(f"[bench] {scale_name}: {msg}"))
+
+    comfy_stubs.install(tree_dir)
+    # 시작 후 예열이 콜드 스캔 시나리오를 미리 해 버리지 않도록 끈다
+    os.environ["ASSETMANAGER_WARMUP"] = "0"
+    app = load_package(prepare_package(os.path.join(scale_dir, "run")))
+
+    started = time.perf_counter()
+    scenarios = asyncio.run(_run_scenarios(app, scale, tree_dir, repeat))
+    return {
+        "files": scale.files,
+        "folders": scale.folders,
+        "models": scale.checkpoints + scale.loras,
+        "tree": tree,
+        "seconds": round(time.perf_counter() - started, 3),
+        "peak_rss_mb": peak_rss_mb(),
+        "scenarios": scenarios,
+    }
@@ -0,0 +1,272 @@
+"""
+bench/synthetic.py — 벤치마크용 합성 ComfyUI 트리
+output 폴더(폴더 N개 × PNG M개)와 모델 폴더(체크포인트/로라 + 프리뷰 + .civitai.info 사이드카)를
+시드 고정 난수로 만듭니다. 같은 스케일과 시드면 언제나 같은 트리가 나옵니다.
+  - PNG  : ComfyUI SaveImage와 같은 순서로 prompt(API 그래프)/workflow(UI 그래프) tEXt 청크를 픽셀 데이터 앞에 둔다.
+           픽셀은 작은 그라데이션 이미지(기본 64px)라 파일 크기는 대부분 메타데이터 청크이다 (파일당 약 5KB).
+  - 시각 : 파일/디렉토리 mtime을 과거로 고정해 갤러리 인덱스의 "방금 바뀐 폴더" 재스캔 규칙에 걸리지 않게 한다.
+트리 루트의 bench_tree.json에 생성 조건을 기록해 두고, 조건이 같으면 다시 만들지 않고 재사용합니다.
+"""
+
+import os
+import json
+import time
+import zlib
+import random
+import shutil
+import struct
+from dataclasses import dataclass, asdict
+
+MANIFEST_NAME = "bench_tree.json"
+# 합성 파일 시각의 기준 (이 시각에서 과거로 파일마다 FILE_INTERVAL_SECONDS씩 거슬러 간다)
+BASE_TIME = 1735689600  # 2025-01-01T00:00:00Z
+FILE_INTERVAL_SECONDS = 7
+
+
+@dataclass(frozen=True)
+class Scale:
+    folders: int
+    images_per_folder: int
+    checkpoints: int
+    loras: int
+    image_size: int = 64
+    seed: int = 1234
+
+    @property
+    def files(self):
+        return self.folders * self.images_per_folder
+
+
+SCALES = {
+    "1k": Scale(folders=10, images_per_folder=100, checkpoints=20, loras=100),
+    "100k": Scale(folders=100, images_per_folder=1000, checkpoints=100, loras=1000),
+    "1m": Scale(folders=1000, images_per_folder=1000, checkpoints=200, loras=3000),
+}
+
+_SUBJECTS = ("1girl", "1boy", "landscape", "city street", "castle", "forest", "portrait", "spaceship",
+             "dragon", "cat", "mountain lake", "cyberpunk alley", "library interior", "beach at sunset")
+_TAGS = ("masterpiece", "best quality", "highly detailed", "cinematic lighting", "depth of field",
+         "soft focus", "volumetric fog", "film grain", "sharp focus", "wide shot", "close-up",
+         "golden hour", "rim light", "bokeh", "8k", "watercolor", "oil painting", "anime style",
+         "photorealistic", "dynamic pose", "looking at viewer", "smile", "long hair", "short hair",
+         "night", "rain", "snow", "neon lights", "intricate", "symmetrical")
+_NEGATIVE = ("lowres", "bad anatomy", "bad hands", "text", "error", "missing fingers", "extra digit",
+             "cropped", "worst quality", "low quality", "jpeg artifacts", "signature", "watermark", "blurry")
+_SAMPLERS = ("euler", "euler_ancestral", "dpmpp_2m", "dpmpp_2m_sde", "dpmpp_3m_sde", "uni_pc", "ddim")
+_SCHEDULERS = ("normal", "karras", "exponential", "sgm_uniform", "simple")
+_FAMILIES = ("SDXL", "Pony", "Illustrious", "SD15")
+_SIZES = ((1024, 1024), (832, 1216), (1216, 832), (896, 1152), (768, 1344))
+
+
+def checkpoint_names(scale):
+    return [f"{_FAMILIES[i % len(_FAMILIES)]}/model_{i:04d}.safetensors" for i in range(scale.checkpoints)]
+
+
+def lora_names(scale):
+    return [f"{_FAMILIES[i % len(_FAMILIES)]}/style/lora_{i:05d}.safetensors" for i in range(scale.loras)]
+
+
+def folder_names(scale):
+    """첫 폴더는 output 루트, 나머지는 날짜/세트 형태의 2단계 하위 폴더"""
+    names = [""]
+    for i in range(1, scale.folders):
+        names.append(f"2024-{1 + i // 28 % 12:02d}-{1 + i % 28:02d}/set_{i:04d}")
+    return names
+
+
+# ──────────────────────────────────────────────
+# PNG 조립
+# ──────────────────────────────────────────────
+
+def _chunk(kind, data):
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+
+def _text_chunk(keyword, text):
+    return _chunk(b"tEXt", keyword.encode("latin-1") + b"\0" + text.encode("latin-1", "replace"))
+
+
+def make_pixel_chunks(size, variant):
+    """IHDR/IDAT/IEND 바이트 (가로 RGB 그라데이션, variant마다 색이 다르다). 둘째 줄부터 Up 필터라 거의 압축된다."""
+    first = bytearray([0])
+    for x in range(size):
+        first += bytes(((x * 4 + variant * 37) & 255, (variant * 11) & 255, (x + variant * 53) & 255))
+    rows = [bytes(first)] + [bytes([2]) + bytes(size * 3)] * (size - 1)
+    ihdr = _chunk(b"IHDR", struct.pack(">IIBBBBB", size, size, 8, 2, 0, 0, 0))
+    return ihdr, _chunk(b"IDAT", zlib.compress(b"".join(rows), 6)) + _chunk(b"IEND", b"")
+
+
+def encode_png(pixel_chunks, text_chunks):
+    ihdr, body = pixel_chunks
+    return b"\x89PNG\r\n\x1a\n" + ihdr + b"".join(_text_chunk(k, v) for k, v in text_chunks) + body
+
+
+# ──────────────────────────────────────────────
+# ComfyUI 프롬프트 / 워크플로우
+# ──────────────────────────────────────────────
+
+def make_prompt_graph(rng, checkpoints, loras):
+    """SaveImage가 저장하는 API 포맷 그래프 (체크포인트 → 로라 0~3개 → KSampler → 저장)"""
+    positive = ", ".join([rng.choice(_SUBJECTS)] + rng.sample(_TAGS, rng.randint(6, 18)))
+    negative = ", ".join(rng.sample(_NEGATIVE, rng.randint(4, 10)))
+    width, height = rng.choice(_SIZES)
+    graph = {"4": {"class_type": "CheckpointLoaderSimple", "inputs": {"ckpt_name": rng.choice(checkpoints)},
+                   "_meta": {"title": "Load Checkpoint"}}}
+    model, clip = ["4", 0], ["4", 1]
+    for i in range(rng.randint(0, 3)):
+        node_id = str(20 + i)
+        strength = round(rng.uniform(0.3, 1.2), 2)
+        graph[node_id] = {"class_type": "LoraLoader", "_meta": {"title": "Load LoRA"}, "inputs": {
+            "lora_name": rng.choice(loras), "strength_model": strength, "strength_clip": strength,
+            "model": model, "clip": clip}}
+        model, clip = [node_id, 0], [node_id, 1]
+    graph.update({
+        "6": {"class_type": "CLIPTextEncode", "inputs": {"text": positive, "clip": clip},
+              "_meta": {"title": "CLIP Text Encode (Prompt)"}},
+        "7": {"class_type": "CLIPTextEncode", "inputs": {"text": negative, "clip": clip},
+              "_meta": {"title": "CLIP Text Encode (Prompt)"}},
+        "5": {"class_type": "EmptyLatentImage", "inputs": {"width": width, "height": height, "batch_size": 1},
+              "_meta": {"title": "Empty Latent Image"}},
+        "3": {"class_type": "KSampler", "_meta": {"title": "KSampler"}, "inputs": {
+            "seed": rng.randrange(2 ** 48), "steps": rng.choice((20, 25, 28, 30, 40)),
+            "cfg": rng.choice((4.0, 5.5, 6.0, 7.0, 7.5)), "sampler_name": rng.choice(_SAMPLERS),
+            "scheduler": rng.choice(_SCHEDULERS), "denoise": 1.0,
+            "model": model, "positive": ["6", 0], "negative": ["7", 0], "latent_image": ["5", 0]}},
+        "8": {"class_type": "VAEDecode", "inputs": {"samples": ["3", 0], "vae": ["4", 2]},
+              "_meta": {"title": "VAE Decode"}},
+        "9": {"class_type": "SaveImage", "inputs": {"filename_prefix": "ComfyUI", "images": ["8", 0]},
+              "_meta": {"title": "Save Image"}},
+    })
+    return graph
+
+
+def make_ui_workflow(graph):
+    """API 그래프와 같은 구조의 UI 워크플로우 (노드 위치/크기/위젯 값/링크 목록)"""
+    nodes, links = [], []
+    for index, (node_id, node) in enumerate(graph.items()):
+        inputs, widgets = [], []
+        for name, value in node["inputs"].items():
+            if isinstance(value, list):
+                link_id = len(links) + 1
+                links.append([link_id, int(value[0]), value[1], int(node_id), len(inputs), name.upper()])
+                inputs.append({"name": name, "type": name.upper(), "link": link_id})
+            else:
+                widgets.append(value)
+        nodes.append({
+            "id": int(node_id), "type": node["class_type"], "pos": [index % 4 * 420, index // 4 * 320],
+            "size": [400, 260], "flags": {}, "order": index, "mode": 0, "inputs": inputs,
+            "outputs": [{"name": "OUTPUT", "type": "*", "links": [], "slot_index": 0}],
+            "properties": {"Node name for S&R": node["class_type"], "cnr_id": "comfy-core", "ver": "0.3.40"},
+            "widgets_values": widgets, "title": node["_meta"]["title"],
+        })
+    return {"last_node_id": max(int(k) for k in graph), "last_link_id": len(links), "nodes": nodes,
+            "links": links, "groups": [], "config": {}, "extra": {"ds": {"scale": 0.8, "offset": [0, 0]}},
+            "version": 0.4}
+
+
+def make_civitai_info(rng, name, model_type):
+    """StabilityMatrix/Civitai Helper 형식의 .civitai.info 사이드카"""
+    stem = os.path.splitext(os.path.basename(name))[0]
+    return {
+        "id": rng.randrange(10 ** 6), "modelId": rng.randrange(10 ** 6), "name": "v1.0",
+        "baseModel": rng.choice(_FAMILIES), "trainedWords": rng.sample(_TAGS, 4),
+        "description": " ".join(rng.sample(_TAGS, 12)),
+        "model": {"name": stem, "type": model_type, "nsfw": False, "tags": rng.sample(_TAGS, 5)},
+        "files": [{"name": os.path.basename(name), "sizeKB": rng.randrange(10 ** 4, 10 ** 7),
+                   "hashes": {"SHA256": f"{rng.getrandbits(256):064X}", "AutoV2": f"{rng.getrandbits(40):010X}"}}],
+        "images": [{"url": f"https://image.civitai.com/{rng.getrandbits(64):016x}.jpeg", "width": w, "height": h,
+                    "meta": {"prompt": ", ".join(rng.sample(_TAGS, 10)), "seed": rng.randrange(2 ** 32),
+                             "sampler": rng.choice(_SAMPLERS), "steps": 30, "cfgScale": 7}}
+                   for w, h in rng.sample(_SIZES, 3)],
+    }
+
+
+# ──────────────────────────────────────────────
+# 트리 생성
+# ──────────────────────────────────────────────
+
+def _write(path, data, mtime=None):
+    with open(path, "wb") as f:
+        f.write(data)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+
+
+def _build_models(models_dir, scale, rng, preview_png):
+    specs = (("checkpoints", checkpoint_names(scale), "Checkpoint"), ("loras", lora_names(scale), "LORA"))
+    safetensors = struct.pack("<Q", 2) + b"{}"
+    for folder, names, model_type in specs:
+        for i, name in enumerate(names):
+            path = os.path.join(models_dir, folder, *name.split("/"))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            base = os.path.splitext(path)[0]
+            _write(path, safetensors, BASE_TIME)
+            if i % 5:  # 프리뷰/사이드카가 없는 모델도 섞는다
+                _write(base + ".preview.png", preview_png, BASE_TIME)
+                _write(base + ".civitai.info",
+                       json.dumps(make_civitai_info(rng, name, model_type), indent=2).encode("utf-8"), BASE_TIME)
+    for folder, names in (("upscale_models", ("4x-UltraSharp.pth", "RealESRGAN_x4plus.pth")),
+                          ("ultralytics", ("bbox/face_yolov8m.pt", "segm/person_yolov8m-seg.pt")),
+                          ("sams", ("sam_vit_b_01ec64.pth",))):
+        for name in names:
+            path = os.path.join(models_dir, folder, *name.split("/"))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            _write(path, b"\0" * 16, BASE_TIME)
+    for dirpath, _, _ in os.walk(models_dir, topdown=False):
+        os.utime(dirpath, (BASE_TIME, BASE_TIME))
+
+
+def _build_output(output_dir, scale, rng, progress):
+    checkpoints, loras = checkpoint_names(scale), lora_names(scale)
+    variants = [make_pixel_chunks(scale.image_size, v) for v in range(16)]
+    total = scale.files
+    written = 0
+    for folder in folder_names(scale):
+        abs_dir = os.path.join(output_dir, *folder.split("/")) if folder else output_dir
+        os.makedirs(abs_dir, exist_ok=True)
+        for n in range(scale.images_per_folder):
+            graph = make_prompt_graph(rng, checkpoints, loras)
+            chunks = (("prompt", json.dumps(graph)), ("workflow", json.dumps(make_ui_workflow(graph))))
+            mtime = BASE_TIME - (total - written) * FILE_INTERVAL_SECONDS
+            _write(os.path.join(abs_dir, f"ComfyUI_{n + 1:05d}_.png"),
+                   encode_png(variants[written % len(variants)], chunks), mtime)
+            written += 1
+            if progress and written % 10000 == 0:
+                progress(f"output {written}/{total}")
+    for dirpath, _, _ in os.walk(output_dir, topdown=False):
+        os.utime(dirpath, (BASE_TIME, BASE_TIME))
+
+
+def build_tree(root, scale, progress=None):
+    """
+    root 아래에 output/, input/, models/를 만든다. 이미 같은 조건의 트리가 있으면 그대로 쓴다.
+    반환값: {"reused": bool, "seconds": 생성 시간, "bytes": output 폴더 크기}
+    """
+    manifest_path = os.path.join(root, MANIFEST_NAME)
+    spec = asdict(scale)
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("scale") == spec:
+            return {"reused": True, "seconds": manifest["seconds"], "bytes": manifest["bytes"]}
+    except (OSError, ValueError):
+        pass
+
+    started = time.perf_counter()
+    for sub in ("output", "input", "models"):
+        path = os.path.join(root, sub)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        os.makedirs(path)
+    rng = random.Random(scale.seed)
+    preview_png = encode_png(make_pixel_chunks(scale.image_size, 0), ())
+    _build_models(os.path.join(root, "models"), scale, rng, preview_png)
+    _build_output(os.path.join(root, "output"), scale, rng, progress)
+
+    size = 0
+    for dirpath, _, filenames in os.walk(os.path.join(root, "output")):
+        size += sum(os.path.getsize(os.path.join(dirpath, name)) for name in filenames)
+    result = {"reused": False, "seconds": round(time.perf_counter() - started, 3), "bytes": size}
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump({"scale": spec, "seconds": result["seconds"], "bytes": size}, f, indent=2)
+    return result
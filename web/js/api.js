@@ -5,14 +5,36 @@
  * 여러 탭에서 공통으로 사용하는 서버 통신 함수를 포함합니다.
  */
 
+/* 조건부 GET 캐시: URL → { etag, text }. 같은 URL을 다시 요청할 때 If-None-Match로 보내고,
+   서버가 304(변경 없음)로 답하면 보관한 본문을 다시 파싱한다 (갤러리/모델 목록/앱 상태 등). */
+const ETAG_CACHE_LIMIT = 32;
+const etagCache = new Map();
+
+function rememberEtag(url, etag, text) {
+    etagCache.delete(url);
+    etagCache.set(url, { etag, text });
+    if (etagCache.size > ETAG_CACHE_LIMIT) etagCache.delete(etagCache.keys().next().value);
+}
+
 const API = {
     /**
      * 공통 HTTP 요청 래퍼. 에러 시 alert 표시 후 throw.
      * ZIP 응답은 Blob, 그 외는 JSON으로 자동 파싱하여 반환.
+     * GET 응답에 ETag가 있으면 본문을 보관했다가 다음 요청에 조건부 헤더를 붙인다.
      */
     async request(url, options = {}) {
         try {
+            const isGet = !options.method || options.method === 'GET';
+            const cached = isGet ? etagCache.get(url) : null;
+            if (cached) {
+                // 브라우저 HTTP 캐시가 304를 가로채지 않도록 직접 재검증한다
+                options = { ...options, cache: 'no-store', headers: { ...options.headers, 'If-None-Match': cached.etag } };
+            }
             const response = await fetch(url, options);
+            if (response.status === 304 && cached) {
+                rememberEtag(url, cached.etag, cached.text);
+                return JSON.parse(cached.text);
+            }
             if (!response.ok) {
                 let errorMsg = `HTTP Error: ${response.status}`;
                 try {
@@ -25,6 +47,12 @@ const API = {
             if (contentType && contentType.includes("application/zip")) {
                 return await response.blob();
             }
+            const etag = isGet ? response.headers.get("ETag") : null;
+            if (etag) {
+                const text = await response.text();
+                rememberEtag(url, etag, text);
+                return JSON.parse(text);
+            }
             return await response.json();
         } catch (error) {
             console.error(`[API 통신 오류] ${url}:`, error);
@@ -69,17 +97,74 @@ async function fetchGallery(type) {
     if (!container || container.innerHTML !== '로딩 중...') return;
     try {
         const data = await API.get(`/assetmanager/api/${type}`);
-        container.innerHTML = data[type].map(item => {
-            const safeName = encodeURIComponent(item.name).replace(/'/g, "%27");
-            const safeTitle = item.name.replace(/"/g, '&quot;');
-            return `
-            <div class="card" style="cursor: pointer;" onclick="showModelInfo('${type}', decodeURIComponent('${safeName}'))" title="클릭하여 ${safeTitle} 상세 정보 보기">
-                ${item.image_url ? `<img src="${item.image_url}" loading="lazy">` : `<div class="no-image">No Preview</div>`}
-                <div class="info">${item.name}</div>
-            </div>
-            `;
-        }).join('');
+        renderModelCards(type, data[type]);
     } catch (e) { container.innerHTML = '<p>서버 통신 오류 발생</p>'; }
+    loadModelSearchFacets(type);
+}
+
+/** 모델 카드 목록을 체크포인트/로라 갤러리에 렌더링 */
+function renderModelCards(type, items) {
+    const container = document.getElementById(`${type === 'checkpoints' ? 'checkpoint' : 'lora'}-gallery`);
+    if (!container) return;
+    if (items.length === 0) {
+        container.innerHTML = '<p>조건에 맞는 모델이 없습니다.</p>';
+        return;
+    }
+    container.innerHTML = items.map(item => {
+        const safeName = encodeURIComponent(item.name).replace(/'/g, "%27");
+        const safeTitle = item.name.replace(/"/g, '&quot;');
+        return `
+        <div class="card" style="cursor: pointer;" onclick="showModelInfo('${type}', decodeURIComponent('${safeName}'))" title="클릭하여 ${safeTitle} 상세 정보 보기">
+            ${item.image_url ? `<img src="${item.thumb_url || item.image_url}" loading="lazy">` : `<div class="no-image">No Preview</div>`}
+            <div class="info">${item.name}</div>
+        </div>
+        `;
+    }).join('');
+}
+
+/* ──────────────────────────────────────────────
+   모델 검색 (메타데이터 인덱스: 이름, 태그, 트리거 단어, 베이스 모델, 해시)
+   ────────────────────────────────────────────── */
+
+const modelSearchTimers = {};
+
+/** 베이스 모델 필터 드롭다운을 인덱스의 베이스 모델 목록으로 채움 */
+async function loadModelSearchFacets(type) {
+    const select = document.getElementById(`${type === 'checkpoints' ? 'checkpoint' : 'lora'}-base-filter`);
+    if (!select) return;
+    try {
+        const data = await API.get(`/assetmanager/api/models/search/facets?folder=${type}`);
+        const current = select.value;
+        select.innerHTML = `<option value="">전체 베이스 모델</option>` + data.base_models.map(b =>
+            `<option value="${b.name.replace(/"/g, '&quot;')}">${b.name} (${b.count})</option>`).join('');
+        select.value = current;
+    } catch (e) { console.error("모델 검색 필터 로드 실패", e); }
+}
+
+/** 검색어 입력/필터 변경 시 호출. 입력이 멈추면 인덱스를 검색하여 카드를 다시 그린다. */
+function searchModels(type) {
+    clearTimeout(modelSearchTimers[type]);
+    modelSearchTimers[type] = setTimeout(() => runModelSearch(type), 250);
+}
+
+async function runModelSearch(type) {
+    const prefix = type === 'checkpoints' ? 'checkpoint' : 'lora';
+    const text = document.getElementById(`${prefix}-search`).value.trim();
+    const baseModel = document.getElementById(`${prefix}-base-filter`).value;
+    try {
+        if (!text && !baseModel) {
+            const data = await API.get(`/assetmanager/api/${type}`);
+            renderModelCards(type, data[type]);
+            return;
+        }
+        const params = new URLSearchParams({ folder: type, limit: 1000 });
+        // AutoV2(10자리) 이상의 16진수는 해시 접두어로 검색
+        if (/^[0-9a-fA-F]{10,64}$/.test(text)) params.set('hash', text);
+        else if (text) params.set('q', text);
+        if (baseModel) params.set('base_model', baseModel);
+        const data = await API.get(`/assetmanager/api/models/search?${params}`);
+        renderModelCards(type, data.models || []);
+    } catch (e) { console.error("모델 검색 실패", e); }
 }
 
 /* ──────────────────────────────────────────────
@@ -88,18 +173,22 @@ async function fetchGallery(type) {
 
 /** 생성 탭의 모든 드롭다운(select)을 서버 데이터로 채움 */
 async function loadDropdowns() {
+    // 체크포인트/로라/보조 모델을 한 번의 요청으로 받아온다
+    let catalog = {};
+    try {
+        catalog = await API.get('/assetmanager/api/model_catalog');
+    } catch (e) { console.error("모델 카탈로그 로드 실패", e); }
+
     try {
-        const dataCp = await API.get('/assetmanager/api/checkpoints');
-        document.getElementById('gen-checkpoint').innerHTML = dataCp.checkpoints.map(i => `<option value="${i.name}">${i.name}</option>`).join('');
+        document.getElementById('gen-checkpoint').innerHTML = catalog.checkpoints.map(i => `<option value="${i.name}">${i.name}</option>`).join('');
     } catch (e) { console.error("체크포인트 로드 실패", e); }
 
     try {
-        const dataLora = await API.get('/assetmanager/api/loras');
-        window.loraOptionsHTML = dataLora.loras.map(i => `<option value="${i.name}">${i.name}</option>`).join('');
+        window.loraOptionsHTML = catalog.loras.map(i => `<option value="${i.name}">${i.name}</option>`).join('');
     } catch (e) { console.error("로라 로드 실패", e); }
 
     try {
-        const dataModels = await API.get('/assetmanager/api/models');
+        const dataModels = catalog;
 
         /**
          * <option> HTML 생성 헬퍼.
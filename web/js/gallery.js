@@ -1,11 +1,13 @@
 /**
  * gallery.js — 갤러리(출력 이미지 브라우저) 프론트엔드 모듈
- * output 폴더의 이미지를 폴더별 트리 구조로 표시하고,
+ * output 폴더의 이미지를 폴더별 트리 구조로 표시하고 (폴더별 개수만 먼저 받고
+ * 이미지는 스크롤에 따라 페이지 단위로 불러옴),
  * 이미지 다중 선택(Shift/Ctrl), 삭제, 컨텍스트 메뉴,
  * 메타데이터 기반 "이 설정으로 생성" 기능을 제공합니다.
  */
 
-let fullGalleryData = [];
+let galleryFolders = [];
+let galleryTotalCount = 0;
 let currentFolderData = null;
 let selectedImagePaths = new Set();
 let lastSelectedIndex = -1;
@@ -14,30 +16,85 @@ let startX, startY;
 const selectionBox = document.getElementById('gallery-selection-box');
 const galleryGrid = document.getElementById('gallery-grid');
 
+/* 현재 폴더의 페이지 단위 로딩 상태 */
+const GALLERY_PAGE_SIZE = 120;
+let loadedGalleryImages = [];
+let galleryNextCursor = null;
+let galleryHasMore = true;
+let isGalleryPageLoading = false;
+let galleryRequestToken = 0;
+let gallerySortOrder = 'newest';
+let galleryScrollObserver = null;
+
 /* ──────────────────────────────────────────────
    서버 데이터 페치
    ────────────────────────────────────────────── */
 
-/** 갤러리 데이터를 서버에서 불러와 폴더 목록과 이미지 그리드를 렌더링 */
+/** 폴더 목록(폴더별 개수)을 서버에서 불러와 폴더 트리를 렌더링하고, 현재 폴더의 첫 페이지를 다시 불러온다 */
 async function fetchGalleryData() {
     try {
-        const data = await API.get('/assetmanager/api/gallery');
+        const data = await API.get('/assetmanager/api/gallery/folders');
         if (data.status === 'success') {
-            fullGalleryData = data.gallery;
+            galleryFolders = data.folders;
+            galleryTotalCount = data.total;
 
             if (currentFolderData) {
-                const refreshedFolder = fullGalleryData.find(g => g.folder === currentFolderData.folder);
-                currentFolderData = refreshedFolder || null;
+                const exists = galleryFolders.some(g => g.folder === currentFolderData.folder || g.folder.startsWith(currentFolderData.folder + '/'));
+                if (!exists) currentFolderData = null;
             }
 
             renderGalleryFolders(document.getElementById('gallery-search-input').value);
-            renderGalleryGrid(currentFolderData);
+            await resetGalleryGrid();
         }
     } catch (e) {
         console.error("갤러리 로딩 실패", e);
     }
 }
 
+/**
+ * 현재 폴더의 다음 페이지를 불러와 그리드 끝에 이어 붙인다.
+ * 폴더 전환 중에 도착한 이전 요청의 응답은 토큰 비교로 버린다.
+ */
+async function loadNextGalleryPage() {
+    if (isGalleryPageLoading || !galleryHasMore) return;
+
+    isGalleryPageLoading = true;
+    const token = galleryRequestToken;
+    const params = new URLSearchParams({ limit: GALLERY_PAGE_SIZE, order: gallerySortOrder });
+    if (currentFolderData) params.set('folder', currentFolderData.folder);
+    if (galleryNextCursor) params.set('cursor', galleryNextCursor);
+
+    try {
+        const data = await API.get(`/assetmanager/api/gallery/images?${params.toString()}`);
+        if (token !== galleryRequestToken || data.status !== 'success') return;
+
+        const startIndex = loadedGalleryImages.length;
+        loadedGalleryImages = loadedGalleryImages.concat(data.images);
+        galleryNextCursor = data.next_cursor;
+        galleryHasMore = !!data.next_cursor;
+        appendGalleryItems(data.images, startIndex);
+    } catch (e) {
+        console.error("갤러리 페이지 로딩 실패", e);
+    } finally {
+        if (token === galleryRequestToken) isGalleryPageLoading = false;
+    }
+}
+
+/** 현재 폴더의 남은 페이지를 모두 불러온다 (폴더 전체 삭제 등 전체 목록이 필요한 경우) */
+async function loadAllGalleryPages() {
+    while (galleryHasMore) {
+        const before = loadedGalleryImages.length;
+        await loadNextGalleryPage();
+        if (loadedGalleryImages.length === before) break;
+    }
+}
+
+/** 정렬 순서 변경 핸들러 */
+function changeGallerySortOrder(order) {
+    gallerySortOrder = order;
+    resetGalleryGrid();
+}
+
 /* ──────────────────────────────────────────────
    폴더 트리 구조 생성 및 렌더링
    ────────────────────────────────────────────── */
@@ -72,7 +129,7 @@ function buildFolderTree(data, filterText) {
                 };
             }
             current = current._children[part];
-            current._count += group.images.length;
+            current._count += group.count;
 
             if (i === parts.length - 1) {
                 current._index = index;
@@ -140,7 +197,7 @@ function toggleGalleryFolder(e, path) {
 function renderGalleryFolders(filterText = '') {
     const list = document.getElementById('gallery-folder-list');
 
-    let totalImages = fullGalleryData.reduce((sum, g) => sum + g.images.length, 0);
+    let totalImages = galleryTotalCount;
 
     let html = `
         <div class="gallery-folder-item ${currentFolderData === null ? 'active' : ''}" onclick="selectGalleryFolder(null)" style="margin-bottom: 10px;">
@@ -150,7 +207,7 @@ function renderGalleryFolders(filterText = '') {
         <div class="folder-tree">
     `;
 
-    const treeData = buildFolderTree(fullGalleryData, filterText);
+    const treeData = buildFolderTree(galleryFolders, filterText);
     html += renderTreeNodes(treeData._children);
 
     html += `</div>`;
@@ -180,60 +237,206 @@ function selectGalleryFolder(path) {
     document.getElementById('current-gallery-title').innerText = currentFolderData ? `📂 ${currentFolderData.folder}` : "🌌 전체 이미지";
 
     renderGalleryFolders(document.getElementById('gallery-search-input').value);
-    renderGalleryGrid(currentFolderData);
+    resetGalleryGrid();
 }
 
 /**
- * 현재 선택된 폴더(하위 포함) 또는 전체의 이미지 목록을 1차원 배열로 반환.
- * 생성 시간 역순으로 정렬된다.
+ * 현재까지 불러온 이미지 목록을 반환 (선택된 폴더와 하위 폴더의 병합 결과).
+ * 서버에서 정렬 순서대로 페이지 단위로 도착하므로 그대로 그리드 인덱스와 일치한다.
  */
 function getCurrentImageList() {
-    let all = [];
-    if (currentFolderData && currentFolderData.isAggregated) {
-        const targetPath = currentFolderData.folder;
-        fullGalleryData.forEach(g => {
-            if (g.folder === targetPath || g.folder.startsWith(targetPath + '/') || g.folder.startsWith(targetPath + '\\')) {
-                all = all.concat(g.images);
-            }
-        });
-    } else {
-        fullGalleryData.forEach(g => all = all.concat(g.images));
+    return loadedGalleryImages;
+}
+
+/* ──────────────────────────────────────────────
+   이미지 그리드 렌더링
+   ────────────────────────────────────────────── */
+
+/** 그리드를 비우고 현재 폴더의 첫 페이지부터 다시 불러온다 */
+async function resetGalleryGrid() {
+    const token = ++galleryRequestToken;
+    isGalleryPageLoading = false;
+    loadedGalleryImages = [];
+    galleryNextCursor = null;
+    galleryHasMore = true;
+    galleryGrid.innerHTML = '';
+    ensureGallerySentinel();
+    await loadNextGalleryPage();
+
+    if (token === galleryRequestToken && loadedGalleryImages.length === 0 && !galleryHasMore) {
+        galleryGrid.innerHTML = '<p class="empty-msg" style="grid-column: 1 / -1; margin-top: 50px;">이미지가 없습니다.</p>';
     }
+}
 
-    all.sort((a, b) => b.timestamp - a.timestamp);
-    return all;
+/* 고해상도 화면에서는 한 단계 큰 썸네일을 요청 */
+const GALLERY_THUMB_SIZE = window.devicePixelRatio > 1.5 ? 384 : 256;
+
+/** 원본 이미지 URL (서버는 이미지마다 URL을 보내지 않으므로 파일명/서브폴더로 만든다) */
+function buildGalleryViewUrl(img) {
+    return `/view?filename=${encodeURIComponent(img.filename)}&type=output&subfolder=${encodeURIComponent(img.subfolder || '')}`;
+}
+
+/** 그리드 타일용 썸네일 URL (원본은 라이트박스에서만 buildGalleryViewUrl로 불러온다) */
+function buildGalleryThumbUrl(img) {
+    return `/assetmanager/api/thumbnail?filename=${encodeURIComponent(img.filename)}&subfolder=${encodeURIComponent(img.subfolder || '')}&size=${GALLERY_THUMB_SIZE}`;
+}
+
+/** 이미지 한 장의 그리드 타일 HTML을 생성 */
+function buildGalleryItemHTML(img, idx) {
+    const fullPath = img.subfolder ? `${img.subfolder}/${img.filename}` : img.filename;
+    const isSelected = selectedImagePaths.has(fullPath);
+    const safePath = encodeURIComponent(fullPath).replace(/'/g, "%27");
+
+    return `
+        <div class="gallery-item ${isSelected ? 'selected' : ''}" 
+             data-index="${idx}" 
+             data-path="${fullPath}"
+             onclick="handleImageClick(event, Number(this.dataset.index), decodeURIComponent('${safePath}'))"
+             oncontextmenu="handleGalleryContextMenu(event, '${img.filename.replace(/'/g, "%27")}', '${(img.subfolder || '').replace(/'/g, "%27")}')">
+             
+            <img src="${buildGalleryThumbUrl(img)}" loading="lazy">
+            <div class="gallery-item-checkbox"></div>
+        </div>
+    `;
+}
+
+/** 새로 도착한 페이지의 타일을 그리드 끝(무한 스크롤 센티넬 앞)에 이어 붙인다 */
+function appendGalleryItems(images, startIndex) {
+    const sentinel = ensureGallerySentinel();
+    const html = images.map((img, i) => buildGalleryItemHTML(img, startIndex + i)).join('');
+    sentinel.insertAdjacentHTML('beforebegin', html);
+}
+
+/**
+ * 그리드 맨 끝에 무한 스크롤 감시용 센티넬 요소를 둔다.
+ * 센티넬이 화면에 들어오면 다음 페이지를 불러온다.
+ */
+function ensureGallerySentinel() {
+    let sentinel = document.getElementById('gallery-scroll-sentinel');
+    if (!sentinel) {
+        sentinel = document.createElement('div');
+        sentinel.id = 'gallery-scroll-sentinel';
+        sentinel.style.gridColumn = '1 / -1';
+        sentinel.style.height = '1px';
+    }
+    galleryGrid.appendChild(sentinel);
+
+    if (!galleryScrollObserver) {
+        galleryScrollObserver = new IntersectionObserver((entries) => {
+            if (entries.some(entry => entry.isIntersecting)) loadNextGalleryPage();
+        }, { root: galleryGrid, rootMargin: '600px 0px' });
+    }
+    galleryScrollObserver.disconnect();
+    galleryScrollObserver.observe(sentinel);
+    return sentinel;
+}
+
+/** 현재까지 불러온 이미지 타일 전체를 다시 그린다 (정렬 위치에 삽입이 필요한 경우) */
+function renderLoadedGalleryItems() {
+    galleryGrid.innerHTML = loadedGalleryImages.map((img, idx) => buildGalleryItemHTML(img, idx)).join('');
+    ensureGallerySentinel();
+}
+
+/** 타일 추가/삭제 후 그리드 순서대로 data-index를 다시 매긴다 */
+function reindexGalleryItems() {
+    galleryGrid.querySelectorAll('.gallery-item').forEach((el, i) => { el.dataset.index = i; });
 }
 
 /* ──────────────────────────────────────────────
-   이미지 그리드 렌더링
+   실시간 갤러리 변경 반영 (웹소켓 assetmanager.gallery 이벤트)
    ────────────────────────────────────────────── */
 
-/** 우측 이미지 그리드를 현재 폴더 데이터 기준으로 렌더링 */
-function renderGalleryGrid(folderData) {
-    const images = getCurrentImageList();
+const GALLERY_ROOT_LABEL = "📝 분류되지 않음 (Root)";
 
-    if (images.length === 0) {
-        galleryGrid.innerHTML = '<p class="empty-msg" style="grid-column: 1 / -1; margin-top: 50px;">이미지가 없습니다.</p>';
-        return;
+/** 이미지의 서브폴더 포함 경로 (선택 상태·DOM data-path 키) */
+function galleryImagePath(img) {
+    return img.subfolder ? `${img.subfolder}/${img.filename}` : img.filename;
+}
+
+/** 이미지가 현재 선택된 폴더(하위 폴더 포함) 보기에 속하는지 확인 */
+function isImageInCurrentView(img) {
+    if (!currentFolderData) return true;
+    const folder = currentFolderData.folder;
+    if (folder === GALLERY_ROOT_LABEL) return !img.subfolder;
+    return img.subfolder === folder || img.subfolder.startsWith(folder + '/');
+}
+
+/** 폴더별 이미지 개수와 전체 개수를 증감 */
+function adjustGalleryFolderCount(subfolder, diff) {
+    const label = subfolder || GALLERY_ROOT_LABEL;
+    let entry = galleryFolders.find(f => f.folder === label);
+    if (!entry) {
+        if (diff <= 0) return;
+        entry = { folder: label, subfolder: subfolder, count: 0 };
+        galleryFolders.push(entry);
     }
+    entry.count += diff;
+    galleryTotalCount += diff;
+    if (entry.count <= 0) galleryFolders = galleryFolders.filter(f => f !== entry);
+}
 
-    galleryGrid.innerHTML = images.map((img, idx) => {
-        const fullPath = img.subfolder ? `${img.subfolder}/${img.filename}` : img.filename;
-        const isSelected = selectedImagePaths.has(fullPath);
-        const safePath = encodeURIComponent(fullPath).replace(/'/g, "%27");
-
-        return `
-            <div class="gallery-item ${isSelected ? 'selected' : ''}" 
-                 data-index="${idx}" 
-                 data-path="${fullPath}"
-                 onclick="handleImageClick(event, ${idx}, decodeURIComponent('${safePath}'))"
-                 oncontextmenu="handleGalleryContextMenu(event, '${img.filename.replace(/'/g, "%27")}', '${(img.subfolder || '').replace(/'/g, "%27")}')">
-                 
-                <img src="${img.url}" loading="lazy">
-                <div class="gallery-item-checkbox"></div>
-            </div>
-        `;
-    }).join('');
+/** 화면에서 지정된 경로의 타일을 제거 (폴더 개수는 서버 변경 이벤트로 갱신된다) */
+function removeGalleryItems(paths) {
+    if (paths.size === 0) return;
+    loadedGalleryImages = loadedGalleryImages.filter(img => !paths.has(galleryImagePath(img)));
+    galleryGrid.querySelectorAll('.gallery-item').forEach(el => {
+        if (paths.has(el.getAttribute('data-path'))) el.remove();
+    });
+    paths.forEach(p => selectedImagePaths.delete(p));
+    lastSelectedIndex = -1;
+    reindexGalleryItems();
+    updateGallerySelectionInfo();
+}
+
+/**
+ * 서버가 보낸 갤러리 변경분(added/removed/moved)을 전체 재조회 없이 반영.
+ * 폴더 개수를 증감하고, 현재 보기에 해당하는 타일만 추가·제거한다.
+ */
+function applyGalleryDelta(delta) {
+    const removed = (delta.removed || []).concat((delta.moved || []).map(m => m.from));
+    const added = (delta.added || []).concat((delta.moved || []).map(m => m.to));
+
+    removed.forEach(img => adjustGalleryFolderCount(img.subfolder, -1));
+    added.forEach(img => adjustGalleryFolderCount(img.subfolder, 1));
+
+    removeGalleryItems(new Set(removed.map(galleryImagePath)));
+
+    const loadedPaths = new Set(loadedGalleryImages.map(galleryImagePath));
+    const visibleAdded = added.filter(img => isImageInCurrentView(img) && !loadedPaths.has(galleryImagePath(img)));
+    if (visibleAdded.length > 0) {
+        galleryGrid.querySelector('.empty-msg')?.remove();
+        if (gallerySortOrder === 'newest') {
+            /* 최신순: 새 이미지는 항상 맨 앞 */
+            visibleAdded.sort((a, b) => b.timestamp - a.timestamp);
+            loadedGalleryImages = visibleAdded.concat(loadedGalleryImages);
+            galleryGrid.insertAdjacentHTML('afterbegin', visibleAdded.map((img, i) => buildGalleryItemHTML(img, i)).join(''));
+            reindexGalleryItems();
+        } else if (!galleryHasMore) {
+            /* 그 외 정렬: 마지막 페이지까지 불러온 경우에만 정렬 위치에 끼워 넣는다 */
+            loadedGalleryImages = loadedGalleryImages.concat(visibleAdded);
+            if (gallerySortOrder === 'oldest') loadedGalleryImages.sort((a, b) => a.timestamp - b.timestamp);
+            else loadedGalleryImages.sort((a, b) => a.filename.localeCompare(b.filename));
+            renderLoadedGalleryItems();
+        }
+    }
+
+    if (removed.length > 0 || added.length > 0) {
+        renderGalleryFolders(document.getElementById('gallery-search-input').value);
+    }
+}
+
+if (window.ws) {
+    window.ws.addEventListener('message', (event) => {
+        if (typeof event.data !== 'string') return;
+        let msg;
+        try { msg = JSON.parse(event.data); } catch (e) { return; }
+        /* 갤러리 탭을 한 번도 열지 않았다면 데이터가 없으므로 무시 (탭을 열 때 새로 불러온다) */
+        if (msg.type === 'assetmanager.gallery' && galleryFolders.length + loadedGalleryImages.length > 0) {
+            /* 변경분이 너무 크면(첫 인덱싱 등) 서버는 목록 대신 reset만 보낸다 */
+            if (msg.data.reset) fetchGalleryData();
+            else applyGalleryDelta(msg.data);
+        }
+    });
 }
 
 /* ──────────────────────────────────────────────
@@ -280,7 +483,7 @@ function handleImageClick(e, index, fullPath) {
         updateGallerySelectionInfo();
     } else {
         const img = getCurrentImageList()[index];
-        openLightbox(img.url);
+        openLightbox(buildGalleryViewUrl(img));
     }
 }
 
@@ -345,70 +548,279 @@ async function sendToGenerateFromGallery() {
 }
 
 /* ──────────────────────────────────────────────
-   이미지 삭제
+   이미지 삭제(휴지통) / 이동 — 서버의 일괄 파일 작업(file_ops)으로 처리
    ────────────────────────────────────────────── */
 
-/** 컨텍스트 메뉴에서 선택한 단일 이미지를 삭제 */
+/** 선택된 경로(Set)를 {subfolder, filename} 목록으로 변환 */
+function selectedGalleryPayload() {
+    return Array.from(selectedImagePaths).map(path => {
+        const lastSlash = path.lastIndexOf('/');
+        if (lastSlash !== -1) {
+            return { subfolder: path.substring(0, lastSlash), filename: path.substring(lastSlash + 1) };
+        }
+        return { subfolder: "", filename: path };
+    });
+}
+
+/** 컨텍스트 메뉴에서 선택한 단일 이미지를 휴지통으로 이동 */
 async function deleteContextImage() {
     if (!window.currentTargetImg) return;
     const decodedFile = decodeURIComponent(window.currentTargetImg.filename);
     const decodedSub = decodeURIComponent(window.currentTargetImg.subfolder);
-    const path = decodedSub ? `${decodedSub}/${decodedFile}` : decodedFile;
 
-    if (confirm(`이 이미지를 영구 삭제하시겠습니까?\n${decodedFile}`)) {
+    if (confirm(`이 이미지를 휴지통으로 이동하시겠습니까?\n${decodedFile}`)) {
         await executeDelete([{ filename: decodedFile, subfolder: decodedSub }]);
     }
 }
 
-/** 체크박스로 선택된 모든 이미지를 일괄 삭제 */
+/** 체크박스로 선택된 모든 이미지를 휴지통으로 이동 */
 async function deleteSelectedGalleryImages() {
     if (selectedImagePaths.size === 0) return;
 
-    if (confirm(`선택한 ${selectedImagePaths.size}개의 이미지를 영구 삭제하시겠습니까?`)) {
-        const payload = Array.from(selectedImagePaths).map(path => {
-            const lastSlash = path.lastIndexOf('/');
-            if (lastSlash !== -1) {
-                return { subfolder: path.substring(0, lastSlash), filename: path.substring(lastSlash + 1) };
-            }
-            return { subfolder: "", filename: path };
-        });
-        await executeDelete(payload);
+    if (confirm(`선택한 ${selectedImagePaths.size}개의 이미지를 휴지통으로 이동하시겠습니까?`)) {
+        await executeDelete(selectedGalleryPayload());
         selectedImagePaths.clear();
     }
 }
 
-/** 현재 보이는 폴더의 모든 이미지를 삭제 */
+/** 선택한 이미지를 단독 검열기 대기열로 보낸다 (output 파일이므로 업로드 없이 서버에서 바로 처리) */
+function sendSelectedToCensor() {
+    if (selectedImagePaths.size === 0) return;
+    window.addOutputPathsToCensorQueue(Array.from(selectedImagePaths));
+    openTab('tab-tools-censor');
+}
+
+/** 현재 보이는 폴더의 모든 이미지를 휴지통으로 이동 (아직 불러오지 않은 페이지 포함) */
 async function deleteAllGalleryImagesInView() {
+    await loadAllGalleryPages();
     const images = getCurrentImageList();
     if (images.length === 0) return;
 
-    if (confirm(`현재 보이는 ${images.length}개의 이미지를 모두 영구 삭제하시겠습니까?`)) {
+    if (confirm(`현재 보이는 ${images.length}개의 이미지를 모두 휴지통으로 이동하시겠습니까?`)) {
         const payload = images.map(img => ({ subfolder: img.subfolder, filename: img.filename }));
         await executeDelete(payload);
         selectedImagePaths.clear();
     }
 }
 
-/** 삭제 API 요청을 실행하고 갤러리 데이터를 새로고침 */
+/** 휴지통 작업을 등록하고 타일을 바로 제거 (폴더 개수는 서버의 갤러리 변경 이벤트로 갱신된다) */
 async function executeDelete(imagesPayload) {
     try {
-        const data = await API.post('/assetmanager/api/delete_images', { images: imagesPayload });
-
+        const data = await API.post('/assetmanager/api/file_ops', { op: 'trash', images: imagesPayload });
         if (data.status === 'success') {
-            console.log(`Deleted: ${data.deleted}, Failed: ${data.failed}`);
-            await fetchGalleryData();
+            removeGalleryItems(new Set(imagesPayload.map(galleryImagePath)));
+            renderFileOpsStatus(data.job);
         } else {
             alert("삭제 중 오류가 발생했습니다: " + data.message);
         }
     } catch (e) {
         console.error(e);
-        alert("삭제 실패");
     } finally {
         document.getElementById('context-menu').style.display = 'none';
         updateGallerySelectionInfo();
     }
 }
 
+/** 선택한 이미지를 output 안의 다른 폴더로 이동 (타일은 서버의 갤러리 변경 이벤트로 옮겨진다) */
+async function moveSelectedGalleryImages() {
+    if (selectedImagePaths.size === 0) return;
+    const current = currentFolderData && currentFolderData.folder !== GALLERY_ROOT_LABEL ? currentFolderData.folder : '';
+    const dest = prompt(`선택한 ${selectedImagePaths.size}개의 이미지를 이동할 폴더 (output 기준, 비우면 루트)`, current);
+    if (dest === null) return;
+
+    try {
+        const data = await API.post('/assetmanager/api/file_ops', { op: 'move', images: selectedGalleryPayload(), dest: dest.trim() });
+        if (data.status === 'success') {
+            selectedImagePaths.clear();
+            syncDOMWithSelection();
+            updateGallerySelectionInfo();
+            renderFileOpsStatus(data.job);
+        }
+    } catch (e) {
+        console.error(e);
+    }
+}
+
+const FILE_OPS_LABELS = { trash: '🗑️ 휴지통 이동', move: '📁 이동', restore: '♻️ 복원', purge: '🔥 영구 삭제' };
+
+/** 파일 작업 진행 상황을 갤러리 헤더에 표시. 휴지통 이동이 끝나면 되돌리기 링크를 띄운다. */
+function renderFileOpsStatus(job) {
+    const el = document.getElementById('gallery-fileops-status');
+    if (!el || !job) return;
+    const label = FILE_OPS_LABELS[job.op] || job.op;
+    el.replaceChildren();
+
+    if (job.status === 'queued' || job.status === 'running') {
+        el.textContent = `${label} ${job.done + job.failed}/${job.total || '…'} `;
+        const cancel = document.createElement('a');
+        cancel.href = '#';
+        cancel.textContent = '취소';
+        cancel.onclick = (e) => { e.preventDefault(); API.post(`/assetmanager/api/file_ops/${job.id}/cancel`, {}).catch(() => { }); };
+        el.appendChild(cancel);
+        return;
+    }
+
+    const failed = job.failed ? `, 실패 ${job.failed}` : '';
+    const state = job.status === 'done' ? '완료' : (job.status === 'cancelled' ? '취소됨' : `실패: ${job.message || ''}`);
+    el.textContent = `${label} ${state} (${job.done}개${failed}) `;
+    if (job.op === 'trash' && job.trash_id && job.done > 0) {
+        const undo = document.createElement('a');
+        undo.href = '#';
+        undo.textContent = '되돌리기';
+        undo.onclick = (e) => { e.preventDefault(); submitTrashJob('restore', [job.trash_id]); };
+        el.appendChild(undo);
+    }
+    if (document.getElementById('trash-modal').style.display === 'flex') loadTrashList();
+}
+
+/* ──────────────────────────────────────────────
+   휴지통 모달
+   ────────────────────────────────────────────── */
+
+function formatBytes(bytes) {
+    if (bytes >= 1024 ** 3) return `${(bytes / 1024 ** 3).toFixed(1)}GB`;
+    if (bytes >= 1024 ** 2) return `${(bytes / 1024 ** 2).toFixed(1)}MB`;
+    return `${Math.max(1, Math.round(bytes / 1024))}KB`;
+}
+
+async function openTrashModal() {
+    document.getElementById('trash-modal').style.display = 'flex';
+    await loadTrashList();
+}
+
+function closeTrashModal() {
+    document.getElementById('trash-modal').style.display = 'none';
+}
+
+/** 휴지통 묶음 목록을 불러와 렌더링 (묶음 하나 = 한 번의 삭제) */
+async function loadTrashList() {
+    const body = document.getElementById('trash-body');
+    const summary = document.getElementById('trash-summary');
+    try {
+        const data = await API.get('/assetmanager/api/trash');
+        const policy = data.policy;
+        summary.textContent = `${data.count}개 · ${formatBytes(data.bytes)}` +
+            ` (보관: ${policy.max_days ? policy.max_days + '일' : '무기한'}, ${policy.max_bytes ? formatBytes(policy.max_bytes) : '용량 제한 없음'})`;
+        body.replaceChildren();
+        if (data.batches.length === 0) {
+            body.innerHTML = '<p class="empty-msg">휴지통이 비어 있습니다.</p>';
+            return;
+        }
+        data.batches.forEach(batch => {
+            const row = document.createElement('div');
+            row.style.cssText = 'display: flex; align-items: center; gap: 10px; padding: 8px 0; border-bottom: 1px solid #333;';
+            const info = document.createElement('div');
+            info.style.flex = '1';
+            const folders = batch.folders.map(f => f || '(Root)').join(', ');
+            info.textContent = `${new Date(batch.created * 1000).toLocaleString()} — ${batch.count}개, ${formatBytes(batch.bytes)}`;
+            const detail = document.createElement('div');
+            detail.style.cssText = 'font-size: 0.85em; color: #888;';
+            detail.textContent = folders;
+            info.appendChild(detail);
+
+            const restore = document.createElement('button');
+            restore.className = 'btn-secondary';
+            restore.textContent = '♻️ 복원';
+            restore.onclick = () => submitTrashJob('restore', [batch.id]);
+            const purge = document.createElement('button');
+            purge.className = 'btn-secondary';
+            purge.style.cssText = 'color: #ff5555; border-color: #ff5555;';
+            purge.textContent = '영구 삭제';
+            purge.onclick = () => {
+                if (confirm(`${batch.count}개의 이미지를 영구 삭제하시겠습니까? 되돌릴 수 없습니다.`)) submitTrashJob('purge', [batch.id]);
+            };
+            row.append(info, restore, purge);
+            body.appendChild(row);
+        });
+    } catch (e) {
+        body.innerHTML = '<p class="empty-msg">휴지통을 불러오지 못했습니다.</p>';
+    }
+}
+
+function emptyTrash() {
+    if (confirm('휴지통의 모든 이미지를 영구 삭제하시겠습니까? 되돌릴 수 없습니다.')) submitTrashJob('purge', ['*']);
+}
+
+async function submitTrashJob(op, trashIds) {
+    try {
+        const data = await API.post('/assetmanager/api/file_ops', { op, trash_ids: trashIds });
+        if (data.status === 'success') renderFileOpsStatus(data.job);
+    } catch (e) {
+        console.error(e);
+    }
+}
+
+/* ──────────────────────────────────────────────
+   유사 이미지 모달 — 서버의 지각 해시 묶음을 갤러리 선택으로 넘긴다
+   ────────────────────────────────────────────── */
+
+let duplicateClusters = [];
+
+async function openDuplicatesModal() {
+    document.getElementById('duplicates-modal').style.display = 'flex';
+    await loadDuplicates();
+}
+
+function closeDuplicatesModal() {
+    document.getElementById('duplicates-modal').style.display = 'none';
+}
+
+/** 현재 폴더(없으면 전체)의 유사 이미지 묶음을 불러와 렌더링. 묶음의 첫 이미지가 가장 최근 것이다. */
+async function loadDuplicates() {
+    const body = document.getElementById('duplicates-body');
+    const summary = document.getElementById('duplicates-summary');
+    const threshold = document.getElementById('duplicates-threshold').value;
+    const folder = currentFolderData ? currentFolderData.folder : '';
+    body.innerHTML = '<p class="empty-msg">검색 중...</p>';
+    try {
+        const data = await API.get(`/assetmanager/api/gallery/duplicates?threshold=${threshold}&folder=${encodeURIComponent(folder)}`);
+        duplicateClusters = data.clusters;
+        const extra = data.clusters.reduce((sum, c) => sum + c.length - 1, 0);
+        const more = data.total_clusters > data.clusters.length ? ` (상위 ${data.clusters.length}개 표시)` : '';
+        const pending = data.pending ? ` · 해시 계산 대기 ${data.pending}개` : '';
+        summary.textContent = `${data.total_clusters}묶음 · 중복 ${extra}개${more}${pending}`;
+        body.replaceChildren();
+        if (data.clusters.length === 0) {
+            body.innerHTML = '<p class="empty-msg">유사한 이미지가 없습니다.</p>';
+            return;
+        }
+        data.clusters.forEach(cluster => {
+            const row = document.createElement('div');
+            row.style.cssText = 'display: flex; flex-wrap: wrap; gap: 6px; padding: 8px 0; border-bottom: 1px solid #333;';
+            cluster.forEach((img, i) => {
+                const thumb = document.createElement('img');
+                thumb.src = `/assetmanager/api/thumbnail?filename=${encodeURIComponent(img.filename)}&subfolder=${encodeURIComponent(img.subfolder || '')}&size=128`;
+                thumb.loading = 'lazy';
+                thumb.title = `${galleryImagePath(img)} (거리 ${img.distance})`;
+                thumb.style.cssText = `width: 96px; height: 96px; object-fit: cover; border-radius: 4px; border: 2px solid ${i === 0 ? '#4CAF50' : '#555'};`;
+                row.appendChild(thumb);
+            });
+            body.appendChild(row);
+        });
+    } catch (e) {
+        body.innerHTML = '<p class="empty-msg">유사 이미지를 불러오지 못했습니다.</p>';
+    }
+}
+
+/** 묶음마다 가장 최근 이미지만 남기고 나머지를 갤러리 선택에 넣는다 (선택 삭제/이동 버튼으로 처리) */
+function selectDuplicatesExceptNewest() {
+    selectedImagePaths.clear();
+    duplicateClusters.forEach(cluster => cluster.slice(1).forEach(img => selectedImagePaths.add(galleryImagePath(img))));
+    lastSelectedIndex = -1;
+    syncDOMWithSelection();
+    updateGallerySelectionInfo();
+    closeDuplicatesModal();
+}
+
+if (window.ws) {
+    window.ws.addEventListener('message', (event) => {
+        if (typeof event.data !== 'string') return;
+        let msg;
+        try { msg = JSON.parse(event.data); } catch (e) { return; }
+        if (msg.type === 'assetmanager.fileops') renderFileOpsStatus(msg.data.job);
+    });
+}
+
 /* ──────────────────────────────────────────────
    DOM 초기화 (이벤트 바인딩)
    ────────────────────────────────────────────── */
@@ -75,6 +75,20 @@ window.ws.onmessage = function (event) {
     if (typeof event.data === "string") {
         const data = JSON.parse(event.data);
 
+        /* 서버 배치 진행 상황 */
+        if (data.type === 'assetmanager.batch' && data.data && data.data.batch) {
+            const batch = data.data.batch;
+            if (batch.kind === 'censor') {
+                if (window.handleCensorBatchEvent) window.handleCensorBatchEvent(data.data);
+                return;
+            }
+            if (!activeBatchId || batch.id === activeBatchId) {
+                activeBatchId = batch.id;
+                renderBatchStatus(batch);
+            }
+            return;
+        }
+
         /* 단독검열기 모드 중에는 Generate 탭 UI를 건드리지 않고 리턴 */
         if (window.isStandaloneExecution) {
             return;
@@ -154,34 +168,6 @@ window.ws.onmessage = function (event) {
     }
 };
 
-/* ──────────────────────────────────────────────
-   워크플로우 템플릿 로딩
-   ────────────────────────────────────────────── */
-
-window.baseWorkflow = null;
-
-/** 서버에서 워크플로우 JSON을 불러온다 */
-async function fetchWorkflowTemplate() {
-    try {
-        const data = await API.get('/assetmanager/api/workflow');
-        if (data.status === 'success') {
-            window.baseWorkflow = data.workflow;
-        } else {
-            console.error("Workflow JSON 로드 실패:", data.message);
-        }
-    } catch (e) {
-        console.error("fetchWorkflowTemplate 에러:", e);
-    }
-}
-
-fetchWorkflowTemplate();
-
-/** 워크플로우 내에서 노드 타이틀로 해당 노드 ID를 검색 */
-window.findNodeIdByTitle = function (workflow, targetTitle) {
-    const entry = Object.entries(workflow).find(([id, node]) => node._meta && node._meta.title === targetTitle);
-    return entry ? entry[0] : null;
-};
-
 /* ──────────────────────────────────────────────
    단일 생성 (버튼 클릭 → 즉시 실행)
    ────────────────────────────────────────────── */
@@ -197,42 +183,145 @@ async function generateImage() {
    배치 생성 (큐 전체를 순차 실행)
    ────────────────────────────────────────────── */
 
-/** 배치 모드: 대기열의 모든 작업을 경로 템플릿에 따라 순차 생성 */
+/**
+ * 현재 UI의 생성 설정을 서버 배치 스케줄러가 사용하는 형태로 모은다.
+ * (api/prompt_builder.py의 settings 구조, executeGeneration/파이프라인 모듈과 같은 DOM 값)
+ */
+function collectGenerationSettings() {
+    const val = (id, fallback) => document.getElementById(id)?.value || fallback;
+    const checked = (id) => !!document.getElementById(id)?.checked;
+
+    const isSeedRandom = document.getElementById('adv-seed-random')?.checked !== false;
+    const userSeed = document.getElementById('adv-seed')?.value;
+
+    const loras = [];
+    document.querySelectorAll('#selected-loras .lora-item').forEach(item => {
+        loras.push({
+            lora: item.querySelector('select').value,
+            strength: parseFloat(item.querySelector('input[type="number"]').value)
+        });
+    });
+
+    const censorLabels = [];
+    [['censor-nipples', 'nipples'], ['censor-pussy', 'pussy'], ['censor-penis', 'penis'], ['censor-anus', 'anus'],
+     ['censor-testicles', 'testicles'], ['censor-xray', 'x-ray'], ['censor-cross-section', 'cross-section']]
+        .forEach(([id, label]) => { if (checked(id)) censorLabels.push(label); });
+
+    const detailer = (toggleId, modelId) => ({ enabled: checked(toggleId), model: val(modelId, '') });
+
+    return {
+        checkpoint: val('gen-checkpoint', ''),
+        steps: parseInt(val('adv-steps', '28'), 10),
+        cfg: parseFloat(val('adv-cfg', '5')),
+        sampler: val('adv-sampler', 'euler_ancestral'),
+        scheduler: val('adv-scheduler', 'normal'),
+        dimensions: val('adv-dimensions', '1024 x 1024  (square)'),
+        seed: (isSeedRandom || !userSeed) ? null : parseInt(userSeed, 10),
+        loras,
+        upscale: {
+            enabled: checked('toggle-upscale'),
+            model: val('upscale-model', '4x-UltraSharp.pth'),
+            scale: parseFloat(val('upscale-scale', '1.5')),
+            steps: parseInt(val('upscale-steps', '10'), 10)
+        },
+        detailer: {
+            enabled: checked('toggle-detailer'),
+            face: detailer('detailer-face-toggle', 'detailer-face-model'),
+            eye: detailer('detailer-eye-toggle', 'detailer-eye-model'),
+            mouth: detailer('detailer-mouth-toggle', 'detailer-mouth-model'),
+            hand: detailer('detailer-hand-toggle', 'detailer-hand-model')
+        },
+        censor: {
+            enabled: checked('toggle-mosaic'),
+            labels: censorLabels,
+            mode: val('censor-mode', 'mosaic'),
+            intensity: parseInt(val('censor-intensity', '15'), 10)
+        }
+    };
+}
+
+let activeBatchId = null;
+
+/**
+ * 배치 모드: 대기열의 모든 작업을 서버 배치 스케줄러에 넘긴다.
+ * 서버가 프롬프트를 조립하고 ComfyUI 큐를 일정 깊이로 채우므로 탭을 닫아도 생성이 계속된다.
+ */
 async function startBatchGeneration() {
     if (jobQueue.length === 0) return alert("대기열에 작업이 없습니다.");
 
-    const template = document.getElementById('path-template').value;
-
-    for (const job of jobQueue) {
-        let finalPath = template;
-        Object.entries(job.labels).forEach(([key, val]) => {
-            finalPath = finalPath.replace(`[${key}]`, val);
+    try {
+        const data = await API.post('/assetmanager/api/batch', {
+            jobs: jobQueue,
+            path_template: document.getElementById('path-template').value,
+            base_positive: document.getElementById('base-pos').value,
+            base_negative: document.getElementById('base-neg').value,
+            settings: collectGenerationSettings(),
+            depth: parseInt(document.getElementById('batch-depth')?.value || '2', 10),
+            client_id: window.clientId
         });
+        activeBatchId = data.batch.id;
+        renderBatchStatus(data.batch);
+    } catch (e) {
+        console.error("배치 생성 요청 실패:", e);
+    }
+}
 
-        const fullPos = document.getElementById('base-pos').value + (job.fullPrompt.length > 0 ? ", " + job.fullPrompt.join(', ') : "");
-        const fullNeg = document.getElementById('base-neg').value;
+/** 배치 진행 상황 표시 (웹소켓 assetmanager.batch 이벤트 및 초기 조회) */
+function renderBatchStatus(batch) {
+    const box = document.getElementById('batch-status');
+    if (!box || !batch) return;
+    const c = batch.counts;
+    const finished = c.done + c.failed + c.cancelled;
+    const labels = { running: '진행 중', paused: '일시정지', done: '완료', cancelled: '취소됨' };
+    box.style.display = 'block';
+    box.innerHTML = `
+        <div style="display:flex; align-items:center; gap:10px;">
+            <span style="flex:1;">📦 배치 ${labels[batch.status] || batch.status}: ${finished} / ${batch.total}
+                (대기열 ${c.queued}${c.failed ? `, 실패 ${c.failed}` : ''})</span>
+            ${batch.status === 'running' ? `<button class="btn-secondary" style="font-size:0.8em; padding:3px 8px;" onclick="controlBatch('${batch.id}', 'pause')">⏸ 일시정지</button>` : ''}
+            ${batch.status === 'paused' ? `<button class="btn-secondary" style="font-size:0.8em; padding:3px 8px;" onclick="controlBatch('${batch.id}', 'resume')">▶ 재개</button>` : ''}
+            ${['running', 'paused'].includes(batch.status) ? `<button class="btn-secondary" style="font-size:0.8em; padding:3px 8px;" onclick="controlBatch('${batch.id}', 'cancel')">⏹ 취소</button>` : ''}
+        </div>
+        <div style="margin-top:6px; height:6px; background:#333; border-radius:3px; overflow:hidden;">
+            <div style="height:100%; width:${batch.total ? (finished / batch.total) * 100 : 0}%; background:#2196F3;"></div>
+        </div>`;
+}
 
-        for (let i = 0; i < job.repeatCount; i++) {
-            await executeGeneration(fullPos, fullNeg, finalPath);
-        }
+/** 배치 일시정지/재개/취소 */
+async function controlBatch(batchId, action) {
+    if (action === 'cancel' && !confirm("배치를 취소할까요? 이미 실행 중인 이미지는 끝까지 생성됩니다.")) return;
+    try {
+        const data = await API.post(`/assetmanager/api/batch/${batchId}/${action}`, {});
+        renderBatchStatus(data.batch);
+    } catch (e) {
+        console.error("배치 제어 실패:", e);
     }
 }
 
+/** 페이지를 다시 열었을 때 진행 중인 배치가 있으면 상태를 표시 */
+async function restoreBatchStatus() {
+    try {
+        const data = await API.get('/assetmanager/api/batch');
+        const active = data.batches.filter(b => b.kind !== 'censor' && (b.status === 'running' || b.status === 'paused')).pop();
+        if (active) {
+            activeBatchId = active.id;
+            renderBatchStatus(active);
+        }
+    } catch (e) { }
+}
+
+document.addEventListener("DOMContentLoaded", restoreBatchStatus);
+
 /* ──────────────────────────────────────────────
    공통 이미지 생성 통신 로직 (핵심)
    ────────────────────────────────────────────── */
 
 /**
- * 워크플로우 JSON을 복제하여 UI 설정값을 적용한 후 ComfyUI /prompt API로 전송.
- * 업스케일러/디테일러/검열 파이프라인을 동적으로 연결하고,
+ * 현재 UI 설정을 서버(/assetmanager/api/workflow/build)에서 /prompt 본문으로 조립한 뒤 ComfyUI에 전송.
+ * 업스케일러/디테일러/검열 파이프라인 연결은 서버의 템플릿 레지스트리와 prompt_builder가 담당하고,
  * 웹소켓을 통해 실행 완료 시점을 감지하여 Promise를 resolve한다.
  */
 async function executeGeneration(posPrompt, negPrompt, filenamePrefix) {
-    if (!window.baseWorkflow) {
-        alert("Workflow.json 파일이 로드되지 않았습니다. 잠시 후 다시 시도해주세요.");
-        return;
-    }
-
     document.getElementById('progress-container').style.display = 'block';
     document.getElementById('progress-bar').style.width = '0%';
     document.getElementById('live-preview-placeholder').style.display = 'block';
@@ -241,146 +330,32 @@ async function executeGeneration(posPrompt, negPrompt, filenamePrefix) {
     window.currentStepText = "작업을 준비하는 중";
     document.getElementById('live-status-text').innerText = '⏳ 서버에 전송 중...';
 
-    const promptData = JSON.parse(JSON.stringify(window.baseWorkflow));
-
-    /* 노드 타이틀 → ID 매핑 캐시 구축 */
-    window.globalNodeTitleMap = {};
-    for (const [id, node] of Object.entries(promptData)) {
-        if (node._meta && node._meta.title) {
-            window.globalNodeTitleMap[id] = node._meta.title;
-        }
-    }
-
-    /* UI 값 → 워크플로우 노드에 매핑 */
-    const ckptId = findNodeIdByTitle(promptData, "[Main] ckpt loader");
-    const promptId = findNodeIdByTitle(promptData, "[Main] Text Prompt");
-    const ksamplerId = findNodeIdByTitle(promptData, "[Main] KSampler");
-    const loraId = findNodeIdByTitle(promptData, "[Main] Lora Loader");
-    const upscalerSamplerId = findNodeIdByTitle(promptData, "[Upscaler] KSampler");
-    const imageSaveId = findNodeIdByTitle(promptData, "[Main] Image Save");
-    const vaeDecodeId = findNodeIdByTitle(promptData, "[Main] VAE decode");
-
-    if (ckptId) promptData[ckptId].inputs.ckpt_name = document.getElementById('gen-checkpoint').value;
-    if (promptId) {
-        promptData[promptId].inputs.pos = posPrompt || "1girl, masterpiece";
-        promptData[promptId].inputs.neg = negPrompt || "worst quality";
-    }
-
-    /* ── 고급 설정 → 워크플로우 노드에 주입 ── */
-    const stepNodeId = findNodeIdByTitle(promptData, "[Main] Step");
-    const cfgNodeId = findNodeIdByTitle(promptData, "[Main] CFG");
-    const samplerSchedulerNodeId = findNodeIdByTitle(promptData, "[Main] Sampler, Scheduler");
-    const latentNodeId = findNodeIdByTitle(promptData, "[Main] Latent Image");
-
-    const advSteps = parseInt(document.getElementById('adv-steps')?.value || '28', 10);
-    const advCfg = parseFloat(document.getElementById('adv-cfg')?.value || '5');
-    const advSampler = document.getElementById('adv-sampler')?.value || 'euler_ancestral';
-    const advScheduler = document.getElementById('adv-scheduler')?.value || 'normal';
-    const advDimensions = document.getElementById('adv-dimensions')?.value || '1024 x 1024  (square)';
-
-    if (stepNodeId) promptData[stepNodeId].inputs.value = advSteps;
-    if (cfgNodeId) promptData[cfgNodeId].inputs.value = advCfg;
-    if (samplerSchedulerNodeId) {
-        promptData[samplerSchedulerNodeId].inputs.sampler_name = advSampler;
-        promptData[samplerSchedulerNodeId].inputs.scheduler = advScheduler;
-    }
-    if (latentNodeId) promptData[latentNodeId].inputs.dimensions = advDimensions;
-
-    /* 시드 처리: 랜덤 체크 시 난수 생성, 해제 시 사용자 지정 시드 사용 */
-    const isSeedRandom = document.getElementById('adv-seed-random')?.checked !== false;
-    const userSeed = document.getElementById('adv-seed')?.value;
-    const seedValue = (isSeedRandom || !userSeed) ? Math.floor(Math.random() * 10000000000000000) : parseInt(userSeed, 10);
-
-    if (ksamplerId) promptData[ksamplerId].inputs.seed = seedValue;
-    if (upscalerSamplerId) {
-        promptData[upscalerSamplerId].inputs.seed = seedValue;
-        /* 업스케일러 Steps UI 값 반영 (노드 109) */
-        const upscaleSteps = parseInt(document.getElementById('upscale-steps')?.value || '10', 10);
-        promptData[upscalerSamplerId].inputs.steps = upscaleSteps;
-    }
-
-    /* 미리보기 전용 노드 제거 (서버 부하 방지) */
-    const previewMainId = findNodeIdByTitle(promptData, "[Main] Image Preview");
-    if (previewMainId) delete promptData[previewMainId];
-
-    /* 로라 설정 적용 (Power Lora Loader rgthree 형식) */
-    if (loraId) {
-        const loraItems = document.querySelectorAll('#selected-loras .lora-item');
-        delete promptData[loraId].inputs["lora_1"];
-        if (loraItems.length > 0) {
-            loraItems.forEach((item, index) => {
-                promptData[loraId].inputs[`lora_${index + 1}`] = {
-                    "on": true,
-                    "lora": item.querySelector('select').value,
-                    "strength": parseFloat(item.querySelector('input[type="number"]').value)
-                };
-            });
-        } else {
-            promptData[loraId].inputs["lora_1"] = { "on": false, "lora": "None", "strength": 1 };
-        }
-    }
-
-    /* ── 동적 노드 우회 파이프라인 (Rewiring Pipeline) ──
-       파이프라인 순서: VAE Decode → 업스케일러 → 디테일러 → 검열
-       각 단계의 마지막 출력 노드를 추적하여 다음 단계의 입력에 연결한다. */
-    let currentImageSource = [vaeDecodeId, 0];
-
-    if (window.applyUpscalerPipeline) {
-        currentImageSource = window.applyUpscalerPipeline(promptData, currentImageSource, findNodeIdByTitle);
-    }
-
-    if (window.applyDetailerPipeline) {
-        currentImageSource = window.applyDetailerPipeline(promptData, currentImageSource, findNodeIdByTitle);
-    }
-
-    /* 검열 파이프라인 적용 (원본 이미지 소스를 백업하여 이중 저장에 활용) */
-    const preCensorSource = [...currentImageSource];
-    const isCensorOn = document.getElementById('toggle-mosaic')?.checked || false;
-
-    if (window.applyCensorPipeline) {
-        currentImageSource = window.applyCensorPipeline(promptData, currentImageSource, window.findNodeIdByTitle);
-    }
-
-    /* 중간 단계 Save 노드 제거 (최종 Save만 유지) */
-    const redundantSaves = [
-        "[Upscaler] Image Save",
-        "[Detailer] Face Detailer Image Save",
-        "[Detailer] Eye Detailer Image Save",
-        "[Detailer] Mouth Detailer Image Save",
-        "[Detailer] Hand Detailer Image Save",
-    ];
-
-    if (!isCensorOn) {
-        redundantSaves.push("[Censor] Image Save");
-    }
-
-    redundantSaves.forEach(title => {
-        const rId = window.findNodeIdByTitle(promptData, title);
-        if (rId) delete promptData[rId];
-    });
-
-    /* 최종 Save 노드 연결 */
-    if (imageSaveId) {
-        promptData[imageSaveId].inputs.images = preCensorSource;
-        promptData[imageSaveId].inputs.filename_prefix = filenamePrefix;
+    const settings = collectGenerationSettings();
+    let built;
+    try {
+        built = await API.post('/assetmanager/api/workflow/build', {
+            settings, positive: posPrompt, negative: negPrompt, filename_prefix: filenamePrefix, client_id: window.clientId
+        });
+    } catch (e) {
+        document.getElementById('progress-container').style.display = 'none';
+        throw e;
     }
 
-    if (isCensorOn) {
-        const censorSaveId = window.findNodeIdByTitle(promptData, "[Censor] Image Save");
-        if (censorSaveId) {
-            promptData[censorSaveId].inputs.images = currentImageSource;
-            promptData[censorSaveId].inputs.filename_prefix = filenamePrefix + "_censored";
-        }
-    }
+    /* 노드 ID → 타이틀 매핑 (실행 중인 노드에 맞는 상태 텍스트 표시용) */
+    window.globalNodeTitleMap = built.titles || {};
+    const isCensorOn = settings.censor.enabled;
 
-    /* 서버 로그 기록 */
+    /* 서버 로그 기록 준비 (요약 메시지 + 검색용 구조화 필드) */
+    let finalLogMessage = null;
+    const logFields = { checkpoint: document.getElementById('gen-checkpoint')?.value, prompt: posPrompt, negative: negPrompt, filename_prefix: filenamePrefix };
     try {
         const logParts = [];
-        logParts.push(`Gen: ${document.getElementById('gen-checkpoint')?.value}`);
+        logParts.push(`Gen: ${logFields.checkpoint}`);
         logParts.push(`P: ${posPrompt.substring(0, 30)}...`);
 
         if (document.getElementById('toggle-upscale')?.checked) {
-            logParts.push(`Upscale: ON [${document.getElementById('upscale-model')?.value}] x${document.getElementById('upscale-ratio')?.value}`);
+            logFields.upscale = { model: document.getElementById('upscale-model')?.value, ratio: document.getElementById('upscale-ratio')?.value };
+            logParts.push(`Upscale: ON [${logFields.upscale.model}] x${logFields.upscale.ratio}`);
         } else {
             logParts.push(`Upscale: OFF`);
         }
@@ -391,6 +366,7 @@ async function executeGeneration(posPrompt, negPrompt, filenamePrefix) {
             if (document.getElementById('tool-detailer-eye')?.checked) dParts.push('Eye');
             if (document.getElementById('tool-detailer-mouth')?.checked) dParts.push('Mouth');
             if (document.getElementById('tool-detailer-hand')?.checked) dParts.push('Hand');
+            logFields.detailer = dParts;
             logParts.push(`Detailer: ON [${dParts.length > 0 ? dParts.join(", ") : "None"}]`);
         } else {
             logParts.push(`Detailer: OFF`);
@@ -403,18 +379,32 @@ async function executeGeneration(posPrompt, negPrompt, filenamePrefix) {
             if (document.getElementById('censor-vagina')?.checked) cParts.push('Vagina');
             if (document.getElementById('censor-penis')?.checked) cParts.push('Penis');
             if (document.getElementById('censor-nipples')?.checked) cParts.push('Nipples');
+            logFields.censor = { mode: cMode, intensity: cInt, targets: cParts };
             logParts.push(`Censor: ON [${cMode.toUpperCase()}] Intensity: ${cInt} Targets: ${cParts.length > 0 ? cParts.join(", ") : "None"}`);
         } else {
             logParts.push(`Censor: OFF`);
         }
 
-        const finalLogMessage = logParts.join(" | ");
-        API.post('/assetmanager/api/log', { message: finalLogMessage })
-            .catch(err => console.error("Logging failed:", err));
+        finalLogMessage = logParts.join(" | ");
     } catch (e) {
         console.error("Error while preparing log:", e);
     }
 
+    /* 작업이 끝나거나 실패했을 때 소요 시간과 함께 서버 로그에 한 번 기록 */
+    const startedAt = Date.now();
+    let queuedPromptId = null;
+    const writeGenerationLog = (status) => {
+        if (!finalLogMessage) return;
+        API.post('/assetmanager/api/log', {
+            message: finalLogMessage,
+            status,
+            prompt_id: queuedPromptId,
+            client_ts: startedAt,
+            duration_ms: Date.now() - startedAt,
+            fields: logFields
+        }).catch(err => console.error("Logging failed:", err));
+    };
+
     /* ComfyUI /prompt API 요청 후 웹소켓 완료 이벤트를 기다리는 Promise */
     return new Promise(async (resolve, reject) => {
         const tempHandler = function (event) {
@@ -422,6 +412,7 @@ async function executeGeneration(posPrompt, negPrompt, filenamePrefix) {
                 const data = JSON.parse(event.data);
                 if (data.type === 'executed' && data.data && data.data.prompt_id) {
                     window.ws.removeEventListener('message', tempHandler);
+                    writeGenerationLog('done');
                     resolve();
                 }
             }
@@ -429,15 +420,18 @@ async function executeGeneration(posPrompt, negPrompt, filenamePrefix) {
         window.ws.addEventListener('message', tempHandler);
 
         try {
-            const data = await API.post('/prompt', { prompt: promptData, client_id: window.clientId });
+            const data = await API.post('/prompt', built.payload);
+            queuedPromptId = data.prompt_id || null;
             if (!data.prompt_id) {
                 document.getElementById('progress-container').style.display = 'none';
                 window.ws.removeEventListener('message', tempHandler);
+                writeGenerationLog('failed');
                 reject(new Error("Job enqueue failed"));
             }
         } catch (e) {
             document.getElementById('progress-container').style.display = 'none';
             window.ws.removeEventListener('message', tempHandler);
+            writeGenerationLog('failed');
             reject(e);
         }
     });
@@ -3,6 +3,8 @@
  * 작품(Work) > 그룹(Category) > 조각(Item) 3단 계층 구조를 지원합니다.
  * 아코디언 트리, 모달 편집, 드래그앤드롭 정렬, 컨텍스트 메뉴 복사/붙여넣기,
  * 직교곱(Cartesian Product) 기반 배치 큐 전송, 내보내기/가져오기 기능을 제공합니다.
+ * 처음에는 작품/그룹 개요만 받고, 조각 목록은 작품을 펼칠 때 그 작품 것만 서버에서 받아 온다.
+ * (아직 받지 않은 그룹은 items 대신 item_count만 가진다)
  */
 
 let libraryData = { works: [] };
@@ -12,10 +14,14 @@ let selectedSet = {};
 let editingState = { work: null, category: null, item: null };
 let clipboardGroup = null;
 
+/* 서버 동기화 상태: 마지막으로 서버에 반영된 데이터 사본과 그 버전(ETag) */
+let libraryEtag = null;
+let lastSavedLibrary = { works: [] };
+let librarySaveChain = Promise.resolve(true);
+
 document.addEventListener("DOMContentLoaded", async () => {
     try {
-        const raw = await API.get('/assetmanager/api/library');
-        libraryData = migrateLibraryData(raw);
+        await loadLibrary();
     } catch (e) {
         console.warn("라이브러리 로드 오류, 빈 데이터로 시작:", e);
         libraryData = migrateLibraryData(null);
@@ -61,8 +67,7 @@ function migrateLibraryData(data) {
     });
 
     if (hasModifiedIds || (data.categories && !data.works)) {
-        API.post('/assetmanager/api/library', result)
-            .catch(err => console.error("마이그레이션 저장 실패:", err));
+        replaceLibraryOnServer(result);
     }
 
     return result;
@@ -91,25 +96,239 @@ function getAllCategories() {
     return result;
 }
 
+/* ──────────────────────────────────────────────
+   서버 저장 (변경분 PATCH + ETag 동시성 제어)
+   ────────────────────────────────────────────── */
+
+const LIBRARY_URL = '/assetmanager/api/library';
+/* 배열 이름 → 원소의 하위 배열 이름 (조각은 하위 배열 없음) */
+const LIBRARY_CHILD_KEY = { works: 'categories', categories: 'items', items: null };
+
+/** 라이브러리 요청. 현재 ETag를 If-Match로 보내고 상태 코드/본문/새 ETag를 그대로 돌려준다. */
+async function libraryRequest(method, body, url = LIBRARY_URL) {
+    const options = { method, headers: {} };
+    if (body !== undefined) {
+        options.headers['Content-Type'] = 'application/json';
+        options.body = JSON.stringify(body);
+    }
+    if (libraryEtag && method !== 'GET') options.headers['If-Match'] = libraryEtag;
+    const response = await fetch(url, options);
+    const data = await response.json().catch(() => ({}));
+    return { ok: response.ok, status: response.status, data, etag: response.headers.get('ETag') || data.etag || null };
+}
+
+/**
+ * 서버에서 작품/그룹 개요를 읽어 libraryData와 동기화 기준 상태를 초기화.
+ * 구 포맷이거나 그룹 ID 수정이 필요한 문서는 마이그레이션을 위해 전체를 받는다.
+ */
+async function loadLibrary() {
+    let res = await libraryRequest('GET', undefined, `${LIBRARY_URL}/outline`);
+    if (!res.ok) throw new Error(res.data.message || `HTTP Error: ${res.status}`);
+    let data = res.data;
+    if (data.outline && !hasDuplicateCategoryIds(data)) {
+        libraryEtag = data.etag;
+        delete data.outline;
+        delete data.etag;
+    } else {
+        res = await libraryRequest('GET');
+        if (!res.ok) throw new Error(res.data.message || `HTTP Error: ${res.status}`);
+        libraryEtag = res.etag;
+        data = res.data;
+    }
+    lastSavedLibrary = JSON.parse(JSON.stringify(data));
+    libraryData = migrateLibraryData(data);
+}
+
+function hasDuplicateCategoryIds(data) {
+    const seen = new Set();
+    return (data.works || []).some(w => (w.categories || []).some(cat => seen.has(cat.id) || !seen.add(cat.id)));
+}
+
+/** 기준 상태(lastSavedLibrary)에서 같은 ID의 작품/그룹을 찾는다 */
+function findSavedCategory(workId, catId) {
+    const work = lastSavedLibrary.works && lastSavedLibrary.works.find(w => w.id === workId);
+    return work ? (work.categories || []).find(c => c.id === catId) || null : null;
+}
+
+/** 개요만 받은 그룹에 조각 목록을 채운다 (화면 데이터와 기준 상태 모두) */
+function fillCategoryItems(workId, cat, items) {
+    cat.items = items;
+    delete cat.item_count;
+    const saved = findSavedCategory(workId, cat.id);
+    if (saved && !Array.isArray(saved.items)) {
+        saved.items = JSON.parse(JSON.stringify(items));
+        delete saved.item_count;
+    }
+}
+
+/** 작품의 아직 받지 않은 그룹 조각 목록을 서버에서 받아 온다 */
+async function ensureWorkItems(work) {
+    if (!work || work.categories.every(cat => Array.isArray(cat.items))) return;
+    const res = await libraryRequest('GET', undefined, `${LIBRARY_URL}/items?work=${encodeURIComponent(work.id)}`);
+    if (!res.ok) throw new Error(res.data.message || `HTTP Error: ${res.status}`);
+    work.categories.forEach(cat => {
+        if (Array.isArray(cat.items)) return;
+        if (!(cat.id in res.data.categories)) throw new Error(`서버에 그룹이 없습니다: ${cat.id}`);
+        fillCategoryItems(work.id, cat, res.data.categories[cat.id]);
+    });
+}
+
+/** 모든 그룹의 조각 목록을 채운다 (전체 저장/내보내기처럼 문서 전체가 필요한 경우) */
+async function ensureAllLibraryItems(...targets) {
+    const missing = data => data.works.some(w => w.categories.some(cat => !Array.isArray(cat.items)));
+    if (!targets.some(missing)) return;
+    const res = await libraryRequest('GET');
+    if (!res.ok) throw new Error(res.data.message || `HTTP Error: ${res.status}`);
+    const serverWorks = res.data.works || [];
+    targets.forEach(data => data.works.forEach(work => {
+        const serverWork = serverWorks.find(w => w.id === work.id);
+        work.categories.forEach(cat => {
+            if (Array.isArray(cat.items)) return;
+            const serverCat = serverWork && (serverWork.categories || []).find(c => c.id === cat.id);
+            fillCategoryItems(work.id, cat, serverCat ? JSON.parse(JSON.stringify(serverCat.items || [])) : []);
+        });
+    }));
+}
+
+function encodePointerSegment(seg) {
+    return String(seg).replace(/~/g, '~0').replace(/\//g, '~1');
+}
+
+/**
+ * 두 라이브러리 상태를 비교해 PATCH 연산 목록을 만든다.
+ * 작품/그룹/조각은 id로 짝을 지어 추가(add)·삭제(remove)·순서 변경(move)을 만들고,
+ * 작품/그룹은 바뀐 필드만, 조각은 바뀐 경우 통째로 교체(replace)한다.
+ */
+function diffLibrary(oldData, newData) {
+    const ops = [];
+    diffLibraryNode(ops, '', oldData || {}, newData || {}, 'works');
+    return ops;
+}
+
+function diffLibraryNode(ops, path, oldNode, newNode, childKey) {
+    if (!childKey) {
+        if (JSON.stringify(oldNode) !== JSON.stringify(newNode)) ops.push({ op: 'replace', path, value: newNode });
+        return;
+    }
+    const keys = new Set([...Object.keys(oldNode), ...Object.keys(newNode)]);
+    keys.forEach(key => {
+        const fieldPath = `${path}/${encodePointerSegment(key)}`;
+        if (key === childKey && Array.isArray(oldNode[key]) && Array.isArray(newNode[key])) return;
+        /* 개요만 받은 그룹: 조각 수 표시용 필드는 보내지 않고, 아직 받지 않은 조각 목록은 지우지 않는다 */
+        if (key === 'item_count' || (key === 'items' && !(key in newNode))) return;
+        if (!(key in newNode)) ops.push({ op: 'remove', path: fieldPath });
+        else if (!(key in oldNode)) ops.push({ op: 'add', path: fieldPath, value: newNode[key] });
+        else if (JSON.stringify(oldNode[key]) !== JSON.stringify(newNode[key])) ops.push({ op: 'replace', path: fieldPath, value: newNode[key] });
+    });
+    if (Array.isArray(oldNode[childKey]) && Array.isArray(newNode[childKey])) {
+        diffLibraryArray(ops, `${path}/${childKey}`, oldNode[childKey], newNode[childKey], LIBRARY_CHILD_KEY[childKey]);
+    }
+}
+
+function diffLibraryArray(ops, base, oldArr, newArr, childKey) {
+    const newIds = new Set(newArr.map(e => e.id));
+    const oldById = new Map(oldArr.map(e => [e.id, e]));
+
+    /* 1) 사라진 원소 삭제 → current는 서버 배열의 id 순서를 따라간다 */
+    const current = [];
+    oldArr.forEach(e => {
+        if (newIds.has(e.id)) current.push(e.id);
+        else ops.push({ op: 'remove', path: `${base}/${encodePointerSegment(e.id)}` });
+    });
+
+    /* 2) 앞에서부터 새 순서에 맞춰 추가/이동 후, 남아 있던 원소는 내부를 비교 */
+    newArr.forEach((e, i) => {
+        const path = `${base}/${encodePointerSegment(e.id)}`;
+        if (!oldById.has(e.id)) {
+            ops.push({ op: 'add', path, value: e, index: i });
+            current.splice(i, 0, e.id);
+            return;
+        }
+        if (current[i] !== e.id) {
+            ops.push({ op: 'move', from: path, path, index: i });
+            current.splice(current.indexOf(e.id), 1);
+            current.splice(i, 0, e.id);
+        }
+        diffLibraryNode(ops, path, oldById.get(e.id), e, childKey);
+    });
+}
+
+/** 저장 작업을 순서대로 실행 (동시에 두 요청이 같은 ETag로 나가지 않도록). 성공 여부를 반환. */
+function queueLibrarySave(task) {
+    librarySaveChain = librarySaveChain.then(task).then(() => true).catch(err => {
+        console.error("라이브러리 저장 실패:", err);
+        return false;
+    });
+    return librarySaveChain;
+}
+
+/** 전체 데이터를 서버에 저장 (가져오기/마이그레이션, 패치 실패 시 복구용) */
+async function putWholeLibrary(sent) {
+    await ensureAllLibraryItems(sent, libraryData);
+    const res = await libraryRequest('POST', sent);
+    if (res.status === 412) return resolveLibraryConflict(sent, res.etag);
+    if (!res.ok) throw new Error(res.data.message || `HTTP Error: ${res.status}`);
+    libraryEtag = res.etag;
+    lastSavedLibrary = sent;
+}
+
+/** 마지막 저장 이후의 변경분만 PATCH로 전송 */
+async function pushLibraryChanges() {
+    const sent = JSON.parse(JSON.stringify(libraryData));
+    const ops = diffLibrary(lastSavedLibrary, sent);
+    if (ops.length === 0) return;
+
+    const res = await libraryRequest('PATCH', { ops });
+    if (res.status === 412) return resolveLibraryConflict(sent, res.etag);
+    if (res.status === 400 || res.status === 409) {
+        /* 서버 문서와 기준 상태가 어긋난 경우 (중복 ID 등): 전체 저장으로 복구 */
+        console.warn("라이브러리 패치 실패, 전체 저장으로 전환:", res.data.message);
+        return putWholeLibrary(sent);
+    }
+    if (!res.ok) throw new Error(res.data.message || `HTTP Error: ${res.status}`);
+    libraryEtag = res.etag;
+    lastSavedLibrary = sent;
+}
+
+/** 다른 탭이 먼저 저장한 경우: 서버 내용을 다시 불러오거나 이 탭의 내용으로 덮어쓴다 */
+async function resolveLibraryConflict(sent, serverEtag) {
+    const reload = confirm(
+        "다른 탭(창)에서 프롬프트 라이브러리가 먼저 변경되었습니다.\n\n" +
+        "[확인] 서버의 최신 내용을 불러옵니다. (이 탭의 저장되지 않은 변경은 사라집니다)\n" +
+        "[취소] 이 탭의 내용으로 덮어씁니다."
+    );
+    if (reload) {
+        await loadLibrary();
+        if (!getActiveWork()) { activeWorkId = null; activeCategoryId = null; }
+        await ensureWorkItems(getActiveWork());
+        renderWorkTree();
+        renderItems();
+        return;
+    }
+    libraryEtag = serverEtag;
+    await putWholeLibrary(sent);
+}
+
+/** 전체 데이터를 저장 대기열에 넣는다 */
+function replaceLibraryOnServer(data) {
+    return queueLibrarySave(() => putWholeLibrary(JSON.parse(JSON.stringify(data))));
+}
+
 let libraryAutoSaveTimer;
 
-/** 라이브러리 데이터를 500ms 디바운스로 서버에 자동 저장 */
+/** 라이브러리 변경분을 500ms 디바운스로 서버에 자동 저장 */
 function debounceLibrarySave() {
     clearTimeout(libraryAutoSaveTimer);
-    libraryAutoSaveTimer = setTimeout(async () => {
-        API.post('/assetmanager/api/library', libraryData)
-            .catch(err => console.error("라이브러리 저장 실패:", err));
-    }, 500);
+    libraryAutoSaveTimer = setTimeout(() => queueLibrarySave(pushLibraryChanges), 500);
 }
 
 /** 즉시 저장 (사용자가 명시적으로 저장 버튼을 클릭한 경우) */
 async function saveLibrary() {
     clearTimeout(libraryAutoSaveTimer);
-    try {
-        await API.post('/assetmanager/api/library', libraryData);
+    if (await queueLibrarySave(pushLibraryChanges)) {
         alert("프롬프트 라이브러리가 저장되었습니다.");
-    } catch (e) {
-        console.error("라이브러리 저장 에러:", e);
+    } else {
+        alert("프롬프트 라이브러리 저장에 실패했습니다. 콘솔 로그를 확인해 주세요.");
     }
 }
 
@@ -148,7 +367,7 @@ function closeWorkEditModal() {
 }
 
 /** 수정 모달에서 입력된 값을 데이터에 반영 */
-function saveWorkEditModal() {
+async function saveWorkEditModal() {
     const type = document.getElementById('work-edit-type').value;
     const oldId = document.getElementById('work-edit-original-id').value;
     const newId = document.getElementById('work-edit-id').value.trim();
@@ -162,6 +381,8 @@ function saveWorkEditModal() {
         if (newId !== oldId && libraryData.works.some(w => w.id === newId)) {
             alert("이미 존재하는 작품 ID입니다."); return;
         }
+        /* ID 변경은 삭제 + 추가로 저장되므로 조각 목록을 먼저 받아 둔다 */
+        if (newId !== oldId) await ensureWorkItems(work);
         if (activeWorkId === oldId) activeWorkId = newId;
         work.id = newId;
         work.name = newName;
@@ -216,12 +437,17 @@ function deleteWork(e, workId) {
     debounceLibrarySave();
 }
 
-/** 작품을 펼치거나 접는다 */
-function toggleWork(workId) {
+/** 작품을 펼치거나 접는다. 펼친 작품의 조각 목록을 아직 받지 않았으면 받아 온다. */
+async function toggleWork(workId) {
     activeWorkId = activeWorkId === workId ? null : workId;
     activeCategoryId = null;
     renderWorkTree();
     renderItems();
+    try {
+        await ensureWorkItems(getActiveWork());
+    } catch (e) {
+        console.error("조각 목록 로드 실패", e);
+    }
 }
 
 /* ──────────────────────────────────────────────
@@ -255,9 +481,14 @@ function deleteCategory(e, catId) {
 }
 
 /** 특정 그룹을 선택하고 해당 그룹의 조각 목록을 표시 */
-function selectCategory(workId, catId) {
+async function selectCategory(workId, catId) {
     activeWorkId = workId;
     activeCategoryId = catId;
+    try {
+        await ensureWorkItems(getActiveWork());
+    } catch (e) {
+        console.error("조각 목록 로드 실패", e);
+    }
     renderWorkTree();
     renderItems();
     document.getElementById('btn-add-item').style.display = 'block';
@@ -301,7 +532,7 @@ function renderWorkTree() {
                     data-work-id="${work.id}" data-cat-id="${cat.id}" data-cat-idx="${cIdx}"
                     onclick="selectCategory('${work.id}', '${cat.id}')"
                     oncontextmenu="event.preventDefault(); showGroupContextMenu(event, '${work.id}', '${cat.id}');">`;
-                html += `<span class="group-name">${cat.name} <small style="color:#666;">(${cat.items.length})</small></span>`;
+                html += `<span class="group-name">${cat.name} <small style="color:#666;">(${Array.isArray(cat.items) ? cat.items.length : (cat.item_count || 0)})</small></span>`;
                 html += `<div class="action-btns">`;
                 html += `<button class="btn-edit" onclick="event.stopPropagation(); openWorkEditModal('category', '${cat.id}')" title="수정">✏️</button>`;
                 html += `<button class="btn-delete" onclick="deleteCategory(event, '${cat.id}')" title="삭제">×</button>`;
@@ -411,7 +642,7 @@ function attachTreeDragHandlers() {
         node.addEventListener('dragleave', () => {
             node.classList.remove('drag-over-top', 'drag-over-bottom', 'drag-over-center');
         });
-        node.addEventListener('drop', (e) => {
+        node.addEventListener('drop', async (e) => {
             e.preventDefault();
             e.stopPropagation();
             node.classList.remove('drag-over-top', 'drag-over-bottom', 'drag-over-center');
@@ -430,6 +661,8 @@ function attachTreeDragHandlers() {
                     if (!srcCat || !destWork) return;
                     const destCat = destWork.categories.find(c => c.id === destCatId);
                     if (!destCat) return;
+                    await ensureWorkItems(destWork);
+                    if (!Array.isArray(srcCat.items)) return;
 
                     const fromIdx = parseInt(data.idx);
                     if (isNaN(fromIdx) || fromIdx < 0 || fromIdx >= srcCat.items.length) return;
@@ -453,6 +686,8 @@ function attachTreeDragHandlers() {
                     const fromIdx = srcWork.categories.findIndex(c => c.id === data.catId);
                     const toIdx = parseInt(node.dataset.catIdx);
                     if (fromIdx === -1) return;
+                    /* 다른 작품으로 옮기면 삭제 + 추가로 저장되므로 조각 목록을 먼저 받아 둔다 */
+                    if (srcWork !== destWork) await ensureWorkItems(srcWork);
 
                     const rect = node.getBoundingClientRect();
                     const insertBefore = e.clientY < rect.top + rect.height / 2;
@@ -518,21 +753,23 @@ function showGroupContextMenu(e, workId, catId) {
 }
 
 /** 그룹을 클립보드에 복사 */
-function copyGroup(workId, catId) {
+async function copyGroup(workId, catId) {
     const work = libraryData.works.find(w => w.id === workId);
     if (!work) return;
     const cat = work.categories.find(c => c.id === catId);
     if (!cat) return;
+    await ensureWorkItems(work);
     clipboardGroup = { action: 'copy', workId, catId, data: JSON.parse(JSON.stringify(cat)) };
     document.getElementById('lib-context-menu').style.display = 'none';
 }
 
 /** 그룹을 클립보드에 잘라내기 */
-function cutGroup(workId, catId) {
+async function cutGroup(workId, catId) {
     const work = libraryData.works.find(w => w.id === workId);
     if (!work) return;
     const cat = work.categories.find(c => c.id === catId);
     if (!cat) return;
+    await ensureWorkItems(work);
     clipboardGroup = { action: 'cut', workId, catId, data: JSON.parse(JSON.stringify(cat)) };
     document.getElementById('lib-context-menu').style.display = 'none';
 }
@@ -578,6 +815,10 @@ function pasteGroupToWork(targetWorkId) {
  */
 function renderItems() {
     const list = document.getElementById('item-list');
+    if (librarySearch.query) {
+        renderLibrarySearchResults();
+        return;
+    }
     const category = getActiveCategory();
 
     if (!category) {
@@ -588,6 +829,10 @@ function renderItems() {
     }
 
     document.getElementById('current-cat-name').innerText = `📝 ${category.name}`;
+    if (!Array.isArray(category.items)) {
+        list.innerHTML = '<p class="empty-msg" style="width:100%;">조각 목록을 불러오는 중...</p>';
+        return;
+    }
     document.getElementById('btn-add-item').style.display = 'block';
 
     const activeParentIds = [];
@@ -627,7 +872,6 @@ function renderItems() {
         html = '<p class="empty-msg" style="width:100%; font-size: 0.9em;">조건에 맞는(활성화된) 조각이 없습니다.</p>';
     }
     list.innerHTML = html;
-    if (typeof filterPromptTags === 'function') filterPromptTags();
     attachItemDragHandlers();
 }
 
@@ -814,14 +1058,97 @@ function selectItemToSet(itemId, event) {
    검색
    ────────────────────────────────────────────── */
 
-/** 조각 목록을 검색어로 필터링하여 보이기/숨기기 처리 */
+/* 서버 검색 상태: 검색어가 있으면 조각 목록 자리에 전체 라이브러리 검색 결과를 표시한다 */
+const LIBRARY_SEARCH_PAGE = 100;
+let librarySearch = { query: '', results: [], total: 0, token: 0 };
+let librarySearchTimer;
+let librarySuggestTimer;
+
+/** 검색어 입력 시 호출. 입력이 멈추면 서버 역색인으로 검색하고, 마지막 태그의 자동 완성 후보를 채운다. */
 function filterPromptTags() {
     const input = document.getElementById('prompt-search-input');
     if (!input) return;
-    const filter = input.value.toLowerCase().trim();
-    document.querySelectorAll('#item-list .prompt-tag').forEach(tag => {
-        tag.style.display = tag.innerText.toLowerCase().includes(filter) ? 'flex' : 'none';
-    });
+    clearTimeout(librarySearchTimer);
+    clearTimeout(librarySuggestTimer);
+    if (!input.value.trim()) {
+        librarySearch = { query: '', results: [], total: 0, token: librarySearch.token + 1 };
+        renderItems();
+        return;
+    }
+    librarySearchTimer = setTimeout(() => runLibrarySearch(input.value, 0), 200);
+    librarySuggestTimer = setTimeout(() => updateLibrarySuggestions(input.value), 120);
+}
+
+/** 검색 요청. offset이 0이면 새 검색, 아니면 다음 페이지를 이어 붙인다. 늦게 도착한 이전 검색 응답은 버린다. */
+async function runLibrarySearch(query, offset) {
+    const token = offset === 0 ? librarySearch.token + 1 : librarySearch.token;
+    if (offset === 0) librarySearch.token = token;
+    const params = new URLSearchParams({ q: query, limit: LIBRARY_SEARCH_PAGE, offset });
+    const res = await libraryRequest('GET', undefined, `${LIBRARY_URL}/search?${params}`);
+    if (token !== librarySearch.token) return;
+    if (!res.ok) {
+        console.error("라이브러리 검색 실패:", res.data.message);
+        return;
+    }
+    librarySearch.query = query;
+    librarySearch.results = offset === 0 ? res.data.results : librarySearch.results.concat(res.data.results);
+    librarySearch.total = res.data.total;
+    renderLibrarySearchResults();
+}
+
+/** 입력 중인 마지막 태그(쉼표 뒤)의 자동 완성 후보를 datalist에 채운다 */
+async function updateLibrarySuggestions(value) {
+    const datalist = document.getElementById('prompt-search-suggestions');
+    if (!datalist) return;
+    const cut = value.lastIndexOf(',') + 1;
+    const head = value.slice(0, cut);
+    const prefix = value.slice(cut).trim();
+    if (!prefix) { datalist.innerHTML = ''; return; }
+    const res = await libraryRequest('GET', undefined, `${LIBRARY_URL}/suggest?prefix=${encodeURIComponent(prefix)}`);
+    if (!res.ok) return;
+    datalist.innerHTML = res.data.suggestions.map(s => {
+        const option = (head ? head + ' ' : '') + s.term;
+        return `<option value="${option.replace(/"/g, '&quot;')}">${s.count}</option>`;
+    }).join('');
+}
+
+/** 검색 결과를 조각 목록 자리에 렌더링 (작품 › 그룹 경로와 함께, 점수 순) */
+function renderLibrarySearchResults() {
+    const list = document.getElementById('item-list');
+    document.getElementById('current-cat-name').innerText = `🔍 검색 결과 (${librarySearch.total})`;
+    document.getElementById('btn-add-item').style.display = 'none';
+
+    if (librarySearch.results.length === 0) {
+        list.innerHTML = '<p class="empty-msg" style="width:100%;">검색 결과가 없습니다.</p>';
+        return;
+    }
+    const escape = text => String(text ?? '').replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/"/g, '&quot;');
+    let html = librarySearch.results.map((r, i) => `
+        <div class="prompt-tag" onclick="openLibrarySearchResult(${i})" title="${escape(r.prompt)}">
+            <small style="color:#888; margin-right:6px;">${escape(r.work_name)} › ${escape(r.category_name)}</small>
+            <span class="tag-name">${escape(r.name)}</span>
+        </div>
+    `).join('');
+    if (librarySearch.results.length < librarySearch.total) {
+        html += `<button class="btn-secondary" style="width:100%;" onclick="runLibrarySearch(librarySearch.query, ${librarySearch.results.length})">더 보기 (${librarySearch.results.length} / ${librarySearch.total})</button>`;
+    }
+    list.innerHTML = html;
+}
+
+/** 검색 결과를 클릭하면 검색을 닫고 해당 그룹으로 이동하여 조각을 선택한다 */
+async function openLibrarySearchResult(index) {
+    const r = librarySearch.results[index];
+    if (!r) return;
+    document.getElementById('prompt-search-input').value = '';
+    librarySearch = { query: '', results: [], total: 0, token: librarySearch.token + 1 };
+    if (!libraryData.works.some(w => w.id === r.work_id && w.categories.some(c => c.id === r.category_id))) {
+        return alert("저장되지 않은 변경으로 이 그룹이 옮겨졌거나 삭제되었습니다.");
+    }
+    await selectCategory(r.work_id, r.category_id);
+    const catSet = selectedSet[activeCategoryId];
+    if (!catSet || !catSet.has(r.item_id)) selectItemToSet(r.item_id, { shiftKey: true });
+    const tag = document.querySelector(`#item-list .prompt-tag[data-item-id="${CSS.escape(r.item_id)}"]`);
+    if (tag) tag.scrollIntoView({ block: 'nearest' });
 }
 
 /* ──────────────────────────────────────────────
@@ -872,7 +1199,7 @@ function countValidCombinations() {
         if (catSet && catSet.size > 0) {
             const items = [];
             for (const itemId of catSet) {
-                const item = cat.items.find(i => i.id === itemId);
+                const item = (cat.items || []).find(i => i.id === itemId);
                 if (item) items.push({ catId: cat.id, catName: cat.name, item });
             }
             if (items.length > 0) groupArrays.push(items);
@@ -896,7 +1223,7 @@ function renderBuilder() {
         if (catSet && catSet.size > 0) {
             const items = [];
             for (const itemId of catSet) {
-                const item = cat.items.find(i => i.id === itemId);
+                const item = (cat.items || []).find(i => i.id === itemId);
                 if (item) items.push(item);
             }
 
@@ -948,7 +1275,7 @@ function sendSetToQueue() {
         if (catSet && catSet.size > 0) {
             const items = [];
             for (const itemId of catSet) {
-                const item = cat.items.find(i => i.id === itemId);
+                const item = (cat.items || []).find(i => i.id === itemId);
                 if (item) items.push({ catId: cat.id, catName: cat.name, item });
             }
             if (items.length > 0) groupArrays.push(items);
@@ -989,7 +1316,12 @@ function sendSetToQueue() {
    ────────────────────────────────────────────── */
 
 /** 현재 라이브러리 데이터를 JSON 파일로 다운로드 */
-function exportLibrary() {
+async function exportLibrary() {
+    try {
+        await ensureAllLibraryItems(libraryData);
+    } catch (e) {
+        return alert("라이브러리 전체를 불러오지 못했습니다.");
+    }
     const dataStr = "data:text/json;charset=utf-8," + encodeURIComponent(JSON.stringify(libraryData, null, 4));
     const a = document.createElement('a');
     a.setAttribute("href", dataStr);
@@ -1005,7 +1337,8 @@ async function importLibrary(input) {
     reader.onload = async (e) => {
         try {
             libraryData = migrateLibraryData(JSON.parse(e.target.result));
-            await API.post('/assetmanager/api/library', libraryData);
+            clearTimeout(libraryAutoSaveTimer);
+            if (!await replaceLibraryOnServer(libraryData)) throw new Error("저장 실패");
             activeWorkId = null;
             activeCategoryId = null;
             renderWorkTree();
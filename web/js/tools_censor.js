@@ -1,7 +1,8 @@
 /**
  * tools_censor.js — 단독 검열(모자이크/화이트마스크) 도구 모듈
- * 이미지를 업로드하여 ComfyUI 검열 파이프라인으로 일괄 처리하고,
+ * 이미지(업로드 파일 또는 갤러리의 output 파일)를 서버 검열 배치로 일괄 처리하고,
  * 비교 슬라이더와 리터치 캔버스(브러시)로 결과를 확인·수정합니다.
+ * 제출/대기/완료 확인은 서버 배치 스케줄러가 맡고, 진행 상황은 assetmanager.batch 이벤트로 받습니다.
  */
 
 window.isStandaloneExecution = false;
@@ -9,6 +10,9 @@ window.isStandaloneExecution = false;
 let censorQueue = [];
 let isCensorProcessing = false;
 let currentCensorIndex = -1;
+/* 실행 중인 검열 배치 ID와, 서버 항목 순서(index)에 대응하는 큐 항목 목록 */
+let censorBatchId = null;
+let censorBatchItems = [];
 
 const censorDropzone = document.getElementById('censor-dropzone');
 const censorFileInput = document.getElementById('censor-file-input');
@@ -58,6 +62,9 @@ function resetCensorTool() {
     censorQueue = [];
     isCensorProcessing = false;
     currentCensorIndex = -1;
+    censorBatchId = null;
+    censorBatchItems = [];
+    window.isStandaloneExecution = false;
     document.getElementById('censor-detail-view').style.display = 'none';
     censorDropzone.style.display = 'flex';
     censorPreviewImg.src = "";
@@ -84,8 +91,8 @@ function addFilesToCensorQueue(files) {
         const file = files[i];
         if (!file.type.startsWith('image/')) continue;
         censorQueue.push({
-            id: 'censor_' + Date.now() + '_' + i, file, objectUrl: URL.createObjectURL(file),
-            status: 'pending', serverFilename: null, resultUrl: null
+            id: 'censor_' + Date.now() + '_' + i, file, name: file.name, objectUrl: URL.createObjectURL(file),
+            status: 'pending', resultUrl: null
         });
         addedCount++;
     }
@@ -95,6 +102,29 @@ function addFilesToCensorQueue(files) {
     }
 }
 
+/** output 폴더의 이미지(상대 경로)를 검열 큐에 추가. 서버에 이미 있으므로 업로드하지 않는다. */
+function addOutputPathsToCensorQueue(paths) {
+    if (isCensorProcessing) { alert("파이프라인이 실행 중입니다."); return; }
+    const queued = new Set(censorQueue.filter(i => i.path).map(i => i.path));
+    let addedCount = 0;
+    paths.forEach((path, i) => {
+        if (queued.has(path)) return;
+        const lastSlash = path.lastIndexOf('/');
+        const filename = path.substring(lastSlash + 1), subfolder = lastSlash !== -1 ? path.substring(0, lastSlash) : '';
+        censorQueue.push({
+            id: 'censor_' + Date.now() + '_p' + i, path, name: filename,
+            objectUrl: `/view?filename=${encodeURIComponent(filename)}&type=output&subfolder=${encodeURIComponent(subfolder)}`,
+            status: 'pending', resultUrl: null
+        });
+        addedCount++;
+    });
+    if (addedCount > 0) {
+        renderCensorQueue();
+        if (censorQueue.length === addedCount) viewCensorQueueItem(censorQueue[0].id);
+    }
+}
+window.addOutputPathsToCensorQueue = addOutputPathsToCensorQueue;
+
 /** 큐 썸네일 리스트 렌더링 */
 function renderCensorQueue() {
     if (!censorQueueContainer) return;
@@ -109,7 +139,7 @@ function renderCensorQueue() {
         else if (item.status === 'done') { borderCol = '#4CAF50'; overlayIcon = '✅'; }
         else if (item.status === 'error') { borderCol = '#ff5555'; overlayIcon = '❌'; }
         const isCurrent = (currentCensorIndex === idx && isCensorProcessing);
-        html += `<div class="censor-queue-item" style="position:relative;width:60px;height:60px;flex-shrink:0;border:2px solid ${isCurrent ? '#fff' : borderCol};border-radius:6px;overflow:hidden;cursor:${isCensorProcessing ? 'not-allowed' : 'pointer'};opacity:${isCensorProcessing && !isCurrent && item.status === 'pending' ? 0.5 : 1};" onclick="viewCensorQueueItem('${item.id}')" title="${item.file.name}"><img src="${item.resultUrl || item.objectUrl}" style="width:100%;height:100%;object-fit:cover;">${overlayIcon ? `<div style="position:absolute;bottom:0;right:0;background:rgba(0,0,0,0.6);padding:2px 4px;font-size:0.7em;">${overlayIcon}</div>` : ''}${item.status === 'pending' && !isCensorProcessing ? `<button onclick="event.stopPropagation();removeCensorQueueItem('${item.id}')" style="position:absolute;top:0;right:0;background:rgba(255,0,0,0.7);color:white;border:none;border-radius:0 0 0 4px;font-size:8px;padding:2px 4px;cursor:pointer;">X</button>` : ''}</div>`;
+        html += `<div class="censor-queue-item" style="position:relative;width:60px;height:60px;flex-shrink:0;border:2px solid ${isCurrent ? '#fff' : borderCol};border-radius:6px;overflow:hidden;cursor:${isCensorProcessing ? 'not-allowed' : 'pointer'};opacity:${isCensorProcessing && !isCurrent && item.status === 'pending' ? 0.5 : 1};" onclick="viewCensorQueueItem('${item.id}')" title="${item.name}"><img src="${item.resultUrl || item.objectUrl}" style="width:100%;height:100%;object-fit:cover;">${overlayIcon ? `<div style="position:absolute;bottom:0;right:0;background:rgba(0,0,0,0.6);padding:2px 4px;font-size:0.7em;">${overlayIcon}</div>` : ''}${item.status === 'pending' && !isCensorProcessing ? `<button onclick="event.stopPropagation();removeCensorQueueItem('${item.id}')" style="position:absolute;top:0;right:0;background:rgba(255,0,0,0.7);color:white;border:none;border-radius:0 0 0 4px;font-size:8px;padding:2px 4px;cursor:pointer;">X</button>` : ''}</div>`;
     });
     censorQueueContainer.innerHTML = html;
 }
@@ -136,76 +166,85 @@ function viewCensorQueueItem(id) {
     }
 }
 
-/** 이미지를 ComfyUI input 폴더에 업로드 */
-async function uploadCensorImageToServer(file) {
-    const formData = new FormData();
-    formData.append('image', file); formData.append('type', 'input'); formData.append('subfolder', ''); formData.append('overwrite', 'true');
-    const result = await API.post('/upload/image', formData, true);
-    return result.name;
-}
-
-/** 대기 중인 모든 이미지에 대해 검열 파이프라인을 순차 실행 */
+/** 대기 중인 모든 이미지를 서버 검열 배치로 제출 (output 파일은 경로만, 나머지는 한 번에 업로드) */
 async function runStandaloneCensor() {
     const pendingItems = censorQueue.filter(i => i.status === 'pending');
     if (pendingItems.length === 0) { alert("대기열에 처리할 이미지가 없습니다."); return; }
-    if (!window.baseWorkflow) { alert("워크플로우 데이터를 기다리는 중입니다."); return; }
 
-    const overrides = { isCensorOn: true, labels: [], censorMode: document.getElementById('tool-censor-mode').value, censorIntensity: parseInt(document.getElementById('tool-censor-intensity').value, 10) };
+    const censor = { labels: [], mode: document.getElementById('tool-censor-mode').value, intensity: parseInt(document.getElementById('tool-censor-intensity').value, 10) };
     const targetIds = ['nipples', 'pussy', 'penis', 'anus', 'testicles', 'xray', 'cross-section'];
-    targetIds.forEach(id => { if (document.getElementById(`tool-censor-${id}`)?.checked) overrides.labels.push(id === 'xray' ? 'x-ray' : id); });
-    if (overrides.labels.length === 0) { alert("최소 하나 이상의 검열 타겟 부위를 선택해주세요."); return; }
-
-    const promptDataTemplate = JSON.parse(JSON.stringify(window.baseWorkflow));
-    promptDataTemplate["9998"] = { "class_type": "LoadImage", "inputs": { "image": "" } };
-    const currentImageSource = ["9998", 0];
-    window.applyCensorPipeline(promptDataTemplate, currentImageSource, window.findNodeIdByTitle, overrides);
-
-    for (const nodeId of Object.keys(promptDataTemplate)) {
-        if (nodeId === "9998") continue;
-        const title = promptDataTemplate[nodeId]?._meta?.title || "";
-        if (!title.startsWith("[Censor]")) delete promptDataTemplate[nodeId];
-    }
-    const censorSaveId = window.findNodeIdByTitle(promptDataTemplate, "[Censor] Image Save");
-    if (censorSaveId) promptDataTemplate[censorSaveId].inputs.filename_prefix = "censor/StandaloneCensor";
+    targetIds.forEach(id => { if (document.getElementById(`tool-censor-${id}`)?.checked) censor.labels.push(id === 'xray' ? 'x-ray' : id); });
+    if (censor.labels.length === 0) { alert("최소 하나 이상의 검열 타겟 부위를 선택해주세요."); return; }
+
+    /* 서버는 paths 항목을 먼저, 업로드 파일을 그 뒤에 배치 항목으로 만든다 */
+    const pathItems = pendingItems.filter(i => i.path);
+    const fileItems = pendingItems.filter(i => !i.path);
+    const payload = { paths: pathItems.map(i => i.path), censor, depth: 4, client_id: window.clientId, name: 'Standalone Censor' };
+    const formData = new FormData();
+    formData.append('payload', JSON.stringify(payload));
+    fileItems.forEach(item => formData.append('image', item.file, item.name));
 
     window.isStandaloneExecution = true; isCensorProcessing = true;
-    let processedCount = 0; const totalCount = pendingItems.length;
-
-    for (let i = 0; i < censorQueue.length; i++) {
-        const item = censorQueue[i];
-        if (item.status !== 'pending') continue;
-        currentCensorIndex = i; item.status = 'processing'; renderCensorQueue(); viewCensorQueueItem(item.id);
-        processedCount++;
-        updateCensorStatus(`[${processedCount}/${totalCount}] 서버로 이미지 전송 중...`, '#FF9800', (processedCount - 1) / totalCount * 100);
-        try {
-            const serverFilename = await uploadCensorImageToServer(item.file); item.serverFilename = serverFilename;
-            updateCensorStatus(`[${processedCount}/${totalCount}] 검열 파이프라인 가동...`, '#FF9800', (processedCount - 0.5) / totalCount * 100);
-            const promptData = JSON.parse(JSON.stringify(promptDataTemplate));
-            promptData["9998"].inputs.image = serverFilename;
-            const finalUrl = await executeStandaloneWorkflow(promptData);
-            item.resultUrl = finalUrl; item.status = 'done'; censorPreviewImg.src = finalUrl;
-        } catch (e) { console.error(`[Standalone Censor] Item ${item.file.name} error:`, e); item.status = 'error'; }
+    censorBatchItems = [...pathItems, ...fileItems];
+    censorBatchItems.forEach(item => { item.status = 'processing'; item.batchId = null; });
+    renderCensorQueue();
+    updateCensorStatus(fileItems.length ? `이미지 ${fileItems.length}장 업로드 중...` : '검열 배치 등록 중...', '#FF9800', 0);
+
+    try {
+        const data = await API.post('/assetmanager/api/censor/batch', formData, true);
+        censorBatchId = data.batch.id;
+        censorBatchItems.forEach(item => { item.batchId = censorBatchId; });
+        /* 응답보다 먼저 도착해 놓친 이벤트가 있을 수 있으므로 항목 상태를 한 번 맞춘다 */
+        const detail = await API.get(`/assetmanager/api/batch/${censorBatchId}`).catch(() => null);
+        const batch = detail ? detail.batch : data.batch;
+        (batch.items || []).forEach(update => handleCensorBatchEvent({ batch, item: update }));
+        renderCensorBatchStatus(batch);
+    } catch (e) {
+        console.error("[Standalone Censor] 배치 등록 실패:", e);
+        censorBatchItems.forEach(item => { item.status = 'pending'; });
+        finishCensorBatch("검열 배치 등록 실패", '#ff5555');
+    }
+}
+
+/** assetmanager.batch 이벤트 중 검열 배치 이벤트 처리 (generate.js 웹소켓 핸들러에서 호출) */
+function handleCensorBatchEvent(data) {
+    if (!censorBatchId || data.batch.id !== censorBatchId) return;
+    const update = data.item;
+    const item = update ? censorBatchItems[update.index] : null;
+    if (item) {
+        if (update.status === 'done' && update.images && update.images.length > 0) {
+            const img = update.images[0];
+            item.status = 'done';
+            item.resultUrl = `/view?filename=${encodeURIComponent(img.filename)}&type=output&subfolder=${encodeURIComponent(img.subfolder || '')}&t=${Date.now()}`;
+            censorPreviewImg.src = item.resultUrl;
+        } else if (['done', 'failed', 'cancelled'].includes(update.status)) {
+            if (update.error) console.error(`[Standalone Censor] Item ${item.name} error:`, update.error);
+            item.status = 'error';
+        }
+        currentCensorIndex = censorQueue.indexOf(item);
         renderCensorQueue();
     }
-    window.isStandaloneExecution = false; isCensorProcessing = false; currentCensorIndex = -1; renderCensorQueue();
-    updateCensorStatus("✅ 전체 대기열 검열 파이프라인 완료", '#4CAF50', 100);
+    renderCensorBatchStatus(data.batch);
+}
+window.handleCensorBatchEvent = handleCensorBatchEvent;
+
+/** 배치 요약으로 진행 상태 표시, 배치가 끝나면 도구를 대기 상태로 되돌림 */
+function renderCensorBatchStatus(batch) {
+    const c = batch.counts;
+    const finished = c.done + c.failed + c.cancelled;
+    if (batch.status === 'running' || batch.status === 'paused') {
+        updateCensorStatus(`[${finished}/${batch.total}] 검열 파이프라인 가동 중... (GPU 대기열 ${c.queued})`, '#FF9800', batch.total ? finished / batch.total * 100 : 0);
+        return;
+    }
+    const failed = c.failed + c.cancelled;
+    finishCensorBatch(failed ? `✅ 검열 완료 (${c.done}장 성공, ${failed}장 실패)` : "✅ 전체 대기열 검열 파이프라인 완료", failed ? '#FF9800' : '#4CAF50');
 }
 
-/** 단독 워크플로우를 ComfyUI에 전송하고 웹소켓으로 완료를 대기하는 Promise */
-function executeStandaloneWorkflow(promptData) {
-    return new Promise(async (resolve, reject) => {
-        let settled = false;
-        const timeout = setTimeout(() => { if (!settled) { settled = true; if (window.ws) window.ws.removeEventListener('message', tempHandler); reject(new Error("처리 시간 초과 (30초)")); } }, 30000);
-        const tempHandler = function (event) {
-            if (typeof event.data === "string") {
-                const data = JSON.parse(event.data);
-                if (data.type === 'execution_error') { if (!settled) { settled = true; clearTimeout(timeout); if (window.ws) window.ws.removeEventListener('message', tempHandler); reject(new Error(`ComfyUI 실행 에러: ${data.data?.exception_message || JSON.stringify(data)}`)); } return; }
-                if (data.type === 'executed' && data.data && data.data.prompt_id) { if (!settled) { settled = true; clearTimeout(timeout); if (window.ws) window.ws.removeEventListener('message', tempHandler); if (data.data.output && data.data.output.images) { const imgInfo = data.data.output.images[0]; resolve(`/view?filename=${imgInfo.filename}&type=${imgInfo.type}&subfolder=${imgInfo.subfolder || ''}&t=${Date.now()}`); } else { resolve(null); } } }
-            }
-        };
-        if (window.ws) { window.ws.addEventListener('message', tempHandler); } else { reject("웹소켓이 연결되지 않았습니다."); }
-        try { await API.post('/prompt', { "prompt": promptData, "client_id": window.clientId }); } catch (e) { if (window.ws) window.ws.removeEventListener('message', tempHandler); reject(new Error(`프롬프트 POST 에러: ${e.message}`)); }
-    });
+function finishCensorBatch(text, color) {
+    window.isStandaloneExecution = false; isCensorProcessing = false; currentCensorIndex = -1;
+    censorBatchItems.forEach(item => { if (item.status === 'processing') item.status = 'error'; });
+    renderCensorQueue();
+    updateCensorStatus(text, color, 100);
 }
 
 /* ──────────────────────────────────────────────
@@ -286,16 +325,20 @@ async function saveRetouchedImage() {
     catch (e) { console.error("Merge upload failed", e); updateCensorStatus("저장 실패", '#ff5555'); }
 }
 
-/** 완료된 이미지들을 ZIP으로 일괄 다운로드 */
+/** 완료된 이미지들을 ZIP으로 일괄 다운로드 (한 배치의 결과면 서버의 배치 결과 폴더를 그대로 압축) */
 async function downloadCensorZip() {
     if (isCensorProcessing) { alert("파이프라인이 실행 중입니다."); return; }
     const doneItems = censorQueue.filter(i => i.status === 'done' && i.resultUrl);
     if (doneItems.length === 0) { alert("다운로드할 완료된 이미지가 없습니다."); return; }
+    const batchIds = new Set(doneItems.map(i => i.batchId));
     const filenames = doneItems.map(item => { const params = new URLSearchParams(item.resultUrl.split('?')[1]); const name = params.get('filename'); const sub = params.get('subfolder'); return sub ? `${sub}/${name}` : name; }).filter(Boolean);
     if (filenames.length === 0) return;
     updateCensorStatus("ZIP 파일 생성 중...", '#FF9800');
     try {
-        const blob = await API.post('/assetmanager/api/download_zip', { filenames });
+        const [batchId] = batchIds;
+        const blob = batchIds.size === 1 && batchId
+            ? await API.get(`/assetmanager/api/batch/${batchId}/archive`)
+            : await API.post('/assetmanager/api/download_zip', { filenames });
         if (blob instanceof Blob) { const downloadUrl = URL.createObjectURL(blob); const a = document.createElement('a'); a.href = downloadUrl; a.download = `Censored_Images_${Date.now()}.zip`; document.body.appendChild(a); a.click(); document.body.removeChild(a); URL.revokeObjectURL(downloadUrl); updateCensorStatus(`✅ ${filenames.length}장 ZIP 다운로드 완료`, '#4CAF50'); }
         else { alert("ZIP 파일 생성에 실패했습니다: " + (blob.message || "알 수 없는 에러")); updateCensorStatus("ZIP 다운로드 실패", '#ff5555'); }
     } catch (e) { console.error("ZIP download exception:", e); updateCensorStatus("ZIP 다운로드 오류", '#ff5555'); }
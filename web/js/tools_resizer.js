@@ -1,13 +1,13 @@
 /**
  * tools_resizer.js — 이미지 리사이즈 도구 모듈
  * 이미지를 드래그앤드롭으로 업로드하여 백엔드 API로 리사이즈/포맷 변환하고,
+ * 대기열 전체를 한 번에 서버 작업 풀로 보내 병렬 변환하고,
  * 결과를 큐 형태로 관리하며 ZIP으로 일괄 다운로드할 수 있습니다.
  * 지원 리사이즈 모드: 비율(scale), 최장변(longest), 정확한 크기(exact)
  */
 
 let resizerQueue = [];
 let isResizerProcessing = false;
-let currentResizerIndex = -1;
 
 const resizerDropzone = document.getElementById('resizer-dropzone');
 const resizerFileInput = document.getElementById('resizer-file-input');
@@ -82,7 +82,7 @@ function removeResizerQueueItem(event, index) {
 /** 도구를 기본 상태로 초기화 */
 function resetResizerTool() {
     resizerQueue.forEach(item => { if (item.objectUrl) URL.revokeObjectURL(item.objectUrl); });
-    resizerQueue = []; isResizerProcessing = false; currentResizerIndex = -1;
+    resizerQueue = []; isResizerProcessing = false;
     resizerDropPlaceholder.style.display = 'block';
     updateResizerStatus('준비됨', '#aaa', 0); renderResizerQueue();
 }
@@ -94,45 +94,82 @@ function updateResizerStatus(text, color, progressPercent = null) {
     if (progressPercent !== null) { const bar = document.getElementById('resizer-progress-bar'); if (bar) bar.style.width = `${progressPercent}%`; }
 }
 
-/** 대기열의 모든 이미지를 순차적으로 리사이즈 처리 */
+/** 현재 UI의 리사이즈 옵션을 FormData에 추가 (옵션 필드는 파일보다 먼저 와야 함) */
+function appendResizerOptions(formData) {
+    const mode = document.getElementById('resizer-mode').value;
+    formData.append("mode", mode);
+    formData.append("format", document.getElementById('resizer-format').value);
+    formData.append("quality", document.getElementById('resizer-quality').value);
+    if (mode === 'scale') formData.append("val_scale", document.getElementById('resizer-val-scale').value);
+    else if (mode === 'longest') formData.append("val_longest", document.getElementById('resizer-val-longest').value);
+    else if (mode === 'exact') { formData.append("val_width", document.getElementById('resizer-val-width').value); formData.append("val_height", document.getElementById('resizer-val-height').value); }
+}
+
+/**
+ * 대기열의 미완료 이미지를 한 번의 요청으로 업로드하여 서버 작업 풀에서 병렬 변환.
+ * 서버는 파일별 진행 상황을 NDJSON 라인으로 스트리밍하고 마지막에 요약 라인을 보낸다.
+ */
 async function runStandaloneResizer() {
     if (resizerQueue.length === 0) return alert("대기열에 이미지가 없습니다.");
     if (isResizerProcessing) return;
-    const hasPending = resizerQueue.some(item => item.status === 'pending' || item.status === 'error');
-    if (!hasPending) return alert("모든 변환 작업이 완료되었습니다.");
+    const targets = resizerQueue.filter(item => item.status === 'pending' || item.status === 'error');
+    if (targets.length === 0) return alert("모든 변환 작업이 완료되었습니다.");
 
-    isResizerProcessing = true; currentResizerIndex = -1;
-    resizerDropzone.style.cursor = 'not-allowed'; renderResizerQueue();
-    processNextResizerTarget();
-}
-
-/** 다음 대기 중인 항목을 찾아 리사이즈 API를 호출 */
-async function processNextResizerTarget() {
-    const nextIndex = resizerQueue.findIndex((item, idx) => idx > currentResizerIndex && (item.status === 'pending' || item.status === 'error'));
-    if (nextIndex === -1) { isResizerProcessing = false; resizerDropzone.style.cursor = 'pointer'; renderResizerQueue(); updateResizerStatus('모든 변환 작업 완료!', '#4CAF50', 100); return; }
+    isResizerProcessing = true;
+    resizerDropzone.style.cursor = 'not-allowed';
+    targets.forEach(item => { item.status = 'processing'; });
+    renderResizerQueue();
+    updateResizerStatus(`[0/${targets.length}] 변환 중...`, '#03A9F4', 0);
 
-    currentResizerIndex = nextIndex;
-    const item = resizerQueue[currentResizerIndex]; item.status = 'processing'; renderResizerQueue();
-    const progressPercent = Math.round((currentResizerIndex / resizerQueue.length) * 100);
-    updateResizerStatus(`[${currentResizerIndex + 1}/${resizerQueue.length}] 변환 중...`, '#03A9F4', progressPercent);
+    const formData = new FormData();
+    appendResizerOptions(formData);
+    targets.forEach(item => formData.append("file", item.file));
 
     try {
-        const formData = new FormData(); formData.append("file", item.file);
-        const mode = document.getElementById('resizer-mode').value;
-        const format = document.getElementById('resizer-format').value;
-        const quality = document.getElementById('resizer-quality').value;
-        formData.append("mode", mode); formData.append("format", format); formData.append("quality", quality);
-        if (mode === 'scale') formData.append("val_scale", document.getElementById('resizer-val-scale').value);
-        else if (mode === 'longest') formData.append("val_longest", document.getElementById('resizer-val-longest').value);
-        else if (mode === 'exact') { formData.append("val_width", document.getElementById('resizer-val-width').value); formData.append("val_height", document.getElementById('resizer-val-height').value); }
-
-        const data = await API.post('/assetmanager/api/resize', formData, true);
-        if (data.status === 'success') { item.status = 'done'; item.serverFilename = data.filename; item.resultUrl = data.url; }
-        else { console.error("Resize failed:", data.message); item.status = 'error'; }
-    } catch (e) { console.error("Network error during resize:", e); item.status = 'error'; }
+        const response = await fetch('/assetmanager/api/resize_batch', { method: 'POST', body: formData });
+        if (!response.ok) {
+            let message = `HTTP Error: ${response.status}`;
+            try { message = (await response.json()).message || message; } catch (e) { }
+            throw new Error(message);
+        }
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffered = '';
+        const handleLine = (line) => {
+            if (!line.trim()) return;
+            const msg = JSON.parse(line);
+            if (msg.type === 'progress') {
+                const item = targets[msg.index];
+                if (!item) return;
+                if (msg.status === 'done') { item.status = 'done'; item.serverFilename = msg.filename; item.resultUrl = msg.url; }
+                else { console.error("Resize failed:", msg.message); item.status = 'error'; }
+                renderResizerQueue();
+                updateResizerStatus(`[${msg.completed}/${msg.total}] 변환 중...`, '#03A9F4', Math.round((msg.completed / msg.total) * 100));
+            } else if (msg.type === 'summary') {
+                const color = msg.failed ? '#FF9800' : '#4CAF50';
+                updateResizerStatus(`모든 변환 작업 완료! (성공 ${msg.succeeded} / 실패 ${msg.failed}, ${msg.elapsed}초)`, color, 100);
+            }
+        };
+
+        while (true) {
+            const { done, value } = await reader.read();
+            if (done) break;
+            buffered += decoder.decode(value, { stream: true });
+            const lines = buffered.split('\n');
+            buffered = lines.pop();
+            lines.forEach(handleLine);
+        }
+        handleLine(buffered);
+    } catch (e) {
+        console.error("Network error during resize:", e);
+        updateResizerStatus("변환 중 오류 발생", '#f44336');
+    }
 
+    targets.forEach(item => { if (item.status === 'processing') item.status = 'error'; });
+    isResizerProcessing = false;
+    resizerDropzone.style.cursor = 'pointer';
     renderResizerQueue();
-    setTimeout(processNextResizerTarget, 100);
 }
 
 /** 완료된 리사이즈 이미지들을 ZIP으로 일괄 다운로드 */
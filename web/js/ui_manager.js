@@ -136,6 +136,9 @@ const UIManager = {
                 html += `<div style="margin-bottom:15px; font-size:0.9em; color:#ccc;">`;
                 if (info.base_model) html += `<div><b>Base Model:</b> ${info.base_model}</div>`;
                 if (info.tags && info.tags.length > 0) html += `<div><b>Tags:</b> ${info.tags.slice(0, 10).join(', ')}</div>`;
+                const trainedWords = info.trainedWords || (info.civitai && info.civitai.trainedWords);
+                if (trainedWords && trainedWords.length > 0) html += `<div><b>Trigger Words:</b> ${trainedWords.join(', ')}</div>`;
+                if (info.autov2) html += `<div><b>Hash (AutoV2):</b> ${info.autov2}</div>`;
                 html += `</div>`;
 
                 const desc = info.modelDescription || (info.civitai && info.civitai.model && info.civitai.model.description) || "상세 설명이 존재하지 않습니다.";